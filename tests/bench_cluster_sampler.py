@@ -0,0 +1,88 @@
+"""Benchmark: picking a cluster and target word, SQL aggregates vs in-memory sampler.
+
+Builds a synthetic vocabulary (see ``bench_pipeline.py``) with a bank of
+ready and answered questions, then times the previous per-pick path — the
+``get_cluster_question_counts`` aggregate, ``random.choices`` over every
+cluster, and the per-cluster accuracy aggregate — against
+``ClusterSampler.pick`` and its incremental updates.
+
+Run with: uv run python tests/bench_cluster_sampler.py [clusters] [picks]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_pipeline import synthetic_vocabulary
+
+from vocab_trainer.db import Database
+from vocab_trainer.models import Question
+
+
+def _sql_pick(db: Database) -> tuple[dict, dict]:
+    clusters = db.get_cluster_question_counts()
+    weights = [1.0 / (1 + c["question_count"]) for c in clusters]
+    chosen = random.choices(clusters, weights=weights, k=1)[0]
+    cluster = db.get_cluster_by_title(chosen["cluster_title"])
+    cw = db.get_cluster_words(cluster["id"])
+    acc = {a["word"].lower(): a for a in db.get_cluster_word_accuracy(chosen["cluster_title"])}
+    w = [1.0 + (1 - acc[c["word"].lower()]["correct"] / acc[c["word"].lower()]["total"])
+         if c["word"].lower() in acc else 2.0 for c in cw]
+    return cluster, random.choices(cw, weights=w, k=1)[0]
+
+
+def _question(i: int, title: str, word: str) -> Question:
+    return Question(
+        id=f"bench-{i}", question_type="fill_blank", stem="The ___ reply.",
+        choices=[word, "a", "b", "c"], correct_index=0, correct_word=word,
+        explanation="", context_sentence="", cluster_title=title, llm_provider="bench",
+    )
+
+
+def main(n_clusters: int, n_picks: int):
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        titles = synthetic_vocabulary(db, n_clusters)
+        words = db.get_all_cluster_words()
+        ids = {c["title"]: c["id"] for c in db.get_all_clusters()}
+        for i, title in enumerate(random.sample(titles, len(titles) // 2)):
+            db.save_question(_question(i, title, words[ids[title]][0]["word"]))
+            if i % 2:
+                db.mark_question_answered(f"bench-{i}", 0, i % 4 == 1)
+        print(f"{n_clusters} clusters, {db.get_question_bank_size()} questions\n")
+
+        t0 = time.perf_counter()
+        for _ in range(n_picks):
+            _sql_pick(db)
+        sql = (time.perf_counter() - t0) / n_picks
+
+        t0 = time.perf_counter()
+        sampler = db.cluster_sampler()
+        build = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(n_picks):
+            sampler.pick()
+        mem = (time.perf_counter() - t0) / n_picks
+
+        t0 = time.perf_counter()
+        for i in range(n_picks):
+            title = titles[i % len(titles)]
+            sampler.question_saved(f"upd-{i}", title, "x", True)
+            sampler.question_answered(f"upd-{i}", i % 2 == 0)
+        update = (time.perf_counter() - t0) / n_picks
+        db.close()
+
+    print(f"  SQL aggregates per pick:   {sql * 1e6:>9.0f} µs")
+    print(f"  Sampler build (once):      {build * 1e3:>9.1f} ms")
+    print(f"  Sampler pick:              {mem * 1e6:>9.1f} µs  ({sql / mem:.0f}x faster)")
+    print(f"  Sampler save + answer:     {update * 1e6:>9.1f} µs")
+
+
+if __name__ == "__main__":
+    clusters = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    picks = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    main(clusters, picks)
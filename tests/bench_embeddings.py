@@ -0,0 +1,87 @@
+"""Benchmark: building the embedding index and looking up palette words.
+
+Embeds a synthetic vocabulary (see ``bench_pipeline.py``) with the local
+``HashingEmbedder``, re-syncs after a small re-import to show that only
+changed entries are embedded, and times the per-draft lookups: the
+embedding index's top-k palette words and distractor candidates against
+the lexical ranking of a random sample used without it.  Each lookup is a
+matrix-vector product over every stored vector; repeat lookups for a
+cluster are memoised.  An Ollama model spends longer embedding; lookups
+cost the same.
+
+Run with: uv run python tests/bench_embeddings.py [clusters] [lookups]
+"""
+from __future__ import annotations
+
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_pipeline import synthetic_vocabulary
+
+from vocab_trainer.db import Database
+from vocab_trainer.embeddings import HashingEmbedder, sync_embeddings
+from vocab_trainer.models import VocabWord
+from vocab_trainer.palette import POOL, cluster_terms, pick_palette
+
+PALETTE = 20
+
+
+def main(n_clusters: int, n_lookups: int):
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        titles = synthetic_vocabulary(db, n_clusters)
+        embedder = HashingEmbedder()
+
+        t0 = time.perf_counter()
+        full = sync_embeddings(db, embedder)
+        build = time.perf_counter() - t0
+        db.import_words([VocabWord(f"added{i}", f"meaning of added{i}", "Extra", "more.md")
+                         for i in range(50)])
+        t0 = time.perf_counter()
+        again = sync_embeddings(db, embedder)
+        resync = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        index = db.embedding_index()
+        load = time.perf_counter() - t0
+        print(f"{full['total']} entries embedded in {build:.1f}s; re-sync after adding 50 words "
+              f"embedded {again['embedded']} in {resync * 1e3:.0f} ms; "
+              f"index loaded in {load * 1e3:.0f} ms\n")
+
+        rng = random.Random(0)
+        picks = []
+        for title in rng.choices(titles, k=n_lookups):
+            cluster = db.get_cluster_by_title(title)
+            picks.append((title, db.get_cluster_words(cluster["id"])))
+
+        def lookups():
+            t0 = time.perf_counter()
+            for title, cw in picks:
+                names = [w["word"] for w in cw]
+                index.nearest_words(title, PALETTE, exclude=names)
+                index.distractor_candidates(title, names[0], 4)
+            return (time.perf_counter() - t0) / n_lookups
+
+        embedded, memoised = lookups(), lookups()
+
+        t0 = time.perf_counter()
+        for title, cw in picks:
+            names = [w["word"] for w in cw]
+            pick_palette(db.get_random_words(limit=POOL, exclude=names),
+                         cluster_terms(title, cw), PALETTE)
+        lexical = (time.perf_counter() - t0) / n_lookups
+        db.close()
+
+    print(f"  Embedding top-k (palette + distractors): {embedded * 1e6:>8.0f} µs per draft")
+    print(f"  ... for a cluster seen before:             {memoised * 1e6:>8.1f} µs per draft")
+    print(f"  Lexical ranking of {POOL} random words:     {lexical * 1e6:>8.0f} µs per draft")
+
+
+if __name__ == "__main__":
+    clusters = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    main(clusters, lookups)
@@ -1,16 +1,24 @@
 """Benchmark: chat latency vs background generation contention.
 
-Requires Ollama running locally.
-Run with: uv run python tests/bench_llm_gate.py
+Requires Ollama running locally, or pass ``--fake`` to run every scenario
+against the in-process stand-in (one simulated GPU, 1s model load), e.g.
+on CI machines without a GPU.
+
+Run with: uv run python tests/bench_llm_gate.py [--fake]
 """
 from __future__ import annotations
 
 import asyncio
 import json
+import sys
 import time
 
 import httpx
 
+from vocab_trainer.fake_ollama import FakeOllama
+from vocab_trainer.providers.llm_ollama import OllamaProvider
+from vocab_trainer.providers.scheduler import LLMScheduler, Priority, ScheduledLLM
+
 OLLAMA_URL = "http://localhost:11434"
 MODEL = "qwen3:8b"
 
@@ -89,9 +97,82 @@ async def scenario_cancel():
     return r["first"]
 
 
+async def _scheduled_chat_ttft(sched: LLMScheduler, provider: OllamaProvider) -> float:
+    chat = ScheduledLLM(provider, sched, Priority.CHAT)
+    t0 = time.monotonic()
+    first = None
+    async for _ in chat.generate_stream(SHORT_CHAT, temperature=0.3, system="Be brief.", thinking=False):
+        if first is None:
+            first = time.monotonic() - t0
+    return first if first is not None else time.monotonic() - t0
+
+
+async def scenario_scheduler(n_background: int = 3, preempt: bool = True):
+    """Chat through the priority scheduler while background stages keep coming.
+
+    Mirrors the app: *n_background* question pipelines each issue a stream of
+    stage calls at REFILL/PREFETCH priority; chat arrives mid-flight.
+    """
+    provider = OllamaProvider(base_url=OLLAMA_URL, model=MODEL)
+    sched = LLMScheduler(max_concurrent=1, preempt=preempt)
+    stop = asyncio.Event()
+
+    async def pipeline(prio: Priority):
+        llm = ScheduledLLM(provider, sched, prio)
+        while not stop.is_set():
+            await llm.generate(LONG_BG, temperature=0.3, thinking=False)
+
+    workers = [
+        asyncio.create_task(pipeline(Priority.REFILL if i % 2 == 0 else Priority.PREFETCH))
+        for i in range(n_background)
+    ]
+    await asyncio.sleep(0.3)
+    ttft = await _scheduled_chat_ttft(sched, provider)
+    stop.set()
+    await asyncio.gather(*workers, return_exceptions=True)
+    st = sched.stats()
+    print(f"  Chat first token: {ttft:.2f}s  (background pipelines: {n_background}, "
+          f"preemptions: {st['preemptions']}, bg stages done: "
+          f"{st['completed']['refill'] + st['completed']['prefetch']})")
+    return ttft
+
+
+async def _evict():
+    """Unload the model from Ollama (``keep_alive: 0``)."""
+    async with httpx.AsyncClient(timeout=120.0) as c:
+        await c.post(f"{OLLAMA_URL}/api/generate", json={"model": MODEL, "keep_alive": 0})
+
+
+async def scenario_cold_vs_warm():
+    """Chat first-token latency with the model evicted vs kept resident.
+
+    Evicts the model (``keep_alive: 0``), measures a cold chat, then warms
+    it the way the app's lifespan does and measures again.
+    """
+    provider = OllamaProvider(base_url=OLLAMA_URL, model=MODEL, keep_alive="30m")
+    await _evict()
+    print(f"  Resident after evict: {(await provider.status())['resident']}")
+    cold = await _generate(SHORT_CHAT, system="Be brief.")
+    await _evict()
+    load = await provider.warm_up()
+    print(f"  Resident after warm-up: {(await provider.status())['resident']} "
+          f"(load took {load:.2f}s)")
+    warm = await _generate(SHORT_CHAT, system="Be brief.")
+    await provider.aclose()
+    print(f"  Cold first token: {cold['first']:.2f}s  Warm first token: {warm['first']:.2f}s")
+    return cold["first"], warm["first"]
+
+
 async def main():
-    print("Warming up (loading model)...")
-    await _generate("Hi")
+    global OLLAMA_URL
+    fake = None
+    if "--fake" in sys.argv[1:]:
+        fake = FakeOllama(models=[MODEL], token_rate=40.0, prompt_rate=500.0, load_delay=1.0).start()
+        OLLAMA_URL = fake.url
+        print(f"Using fake Ollama at {OLLAMA_URL}\n")
+
+    print("0. Cold vs warm model:")
+    cold, warm = await scenario_cold_vs_warm()
     print()
 
     print("1. Baseline (no contention):")
@@ -103,15 +184,27 @@ async def main():
     print("\n3. Cancel background, then chat:")
     cancelled = await scenario_cancel()
 
+    print("\n4. Scheduler, 3 background pipelines, no preemption:")
+    queued = await scenario_scheduler(3, preempt=False)
+
+    print("\n5. Scheduler, 3 background pipelines, preemption:")
+    preempted = await scenario_scheduler(3, preempt=True)
+
     print(f"\nSummary:")
+    print(f"  Cold start:  {cold:.2f}s  ({cold/warm:.1f}x warm)")
     print(f"  Baseline:    {baseline:.2f}s")
     print(f"  Contention:  {contention:.2f}s  ({contention/baseline:.1f}x baseline)")
     print(f"  Cancel:      {cancelled:.2f}s  ({cancelled/baseline:.1f}x baseline)")
+    print(f"  Sched/queue: {queued:.2f}s  ({queued/baseline:.1f}x baseline)")
+    print(f"  Sched/pre:   {preempted:.2f}s  ({preempted/baseline:.1f}x baseline)")
 
     if contention > baseline * 1.5:
         print("\n  Contention adds significant latency — Ollama serializes GPU work.")
     if cancelled < contention * 0.7:
         print("  Cancellation effectively frees the GPU for chat.")
+    if fake is not None:
+        print(f"\n  Fake server: {fake.stats()}")
+        fake.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+"""Benchmark: per-request HTTP overhead, fresh client vs pooled OllamaProvider.
+
+Runs against a local keep-alive stub that answers instantly, so the numbers
+are pure client/connection overhead — what every question stage and chat
+turn paid before the provider kept one pooled client.
+
+Run with: uv run python tests/bench_ollama_client.py [requests]
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from vocab_trainer.providers.llm_ollama import OllamaProvider
+
+
+class _Stub:
+    def __init__(self):
+        self.connections = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # like Ollama's Go server
+
+            def setup(self):
+                super().setup()
+                stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                body = json.dumps({"response": "ok", "eval_count": 1}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+async def _fresh_client(url: str, n: int) -> list[float]:
+    """Old behaviour: a new provider (and HTTP client) for every call."""
+    times = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        llm = OllamaProvider(base_url=url, model="bench")
+        await llm.generate("p", thinking=False)
+        await llm.aclose()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+async def _pooled_client(url: str, n: int) -> list[float]:
+    """New behaviour: one long-lived provider reusing pooled connections."""
+    llm = OllamaProvider(base_url=url, model="bench")
+    times = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await llm.generate("p", thinking=False)
+        times.append(time.perf_counter() - t0)
+    await llm.aclose()
+    return times
+
+
+def _report(label: str, times: list[float], connections: int) -> float:
+    ms = [t * 1000 for t in times]
+    median = statistics.median(ms)
+    p95 = sorted(ms)[int(len(ms) * 0.95) - 1]
+    print(f"  {label:<14} median {median:6.2f}ms  p95 {p95:6.2f}ms  "
+          f"connections {connections}")
+    return median
+
+
+async def main(n: int):
+    print(f"{n} sequential /api/generate calls against a local stub\n")
+    results = {}
+    for label, fn in (("fresh client", _fresh_client), ("pooled client", _pooled_client)):
+        stub = _Stub()
+        await fn(stub.url, 5)  # warm-up (imports, first connect)
+        stub.connections = 0
+        times = await fn(stub.url, n)
+        results[label] = _report(label, times, stub.connections)
+        stub.close()
+    saved = results["fresh client"] - results["pooled client"]
+    print(f"\n  Saved per request: {saved:.2f}ms "
+          f"({results['fresh client'] / results['pooled client']:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
@@ -0,0 +1,99 @@
+"""Benchmark: prefill tokens saved by the adaptive vocabulary palette.
+
+Runs the server's background loop over a synthetic vocabulary (see
+``bench_pipeline.py``) with the step-1 palette fixed at ``palette_words``
+and then with ``adaptive_palette`` on, and prints the draft calls' prompt
+tokens, the prefill tokens saved against the fixed run, draft acceptance
+per palette size and the size each question type settled at.
+
+``FakeLLMProvider`` drafts equally well with any palette, so the adaptive
+run shrinks towards an empty one; against a real model the acceptance
+columns show whether the palette earns its tokens.
+
+Run with: uv run python tests/bench_palette.py [clusters] [questions]
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_pipeline import synthetic_vocabulary
+
+from vocab_trainer import app as app_module
+from vocab_trainer.config import Settings
+from vocab_trainer.db import Database
+from vocab_trainer.metrics import UsageStats, generation_stats
+from vocab_trainer.providers.base import add_usage_listener, remove_usage_listener
+from vocab_trainer.providers.llm_fake import FakeLLMProvider
+from vocab_trainer.providers.registry import ProviderRegistry
+from vocab_trainer.question_generator import PROMPTS
+
+
+async def run(db: Database, titles: list[str], adaptive: bool) -> dict:
+    llm = FakeLLMProvider(seed=1)
+    app_module._db = db
+    app_module._settings = Settings(llm_provider="fake", session_size=0, llm_retries=0,
+                                    adaptive_palette=adaptive)
+    app_module._providers = ProviderRegistry()
+    app_module._providers._llm, app_module._providers._llm_key = llm, ("fake",)
+    app_module._palette.reset()
+    generation_stats.reset()
+    usage = UsageStats()
+    add_usage_listener(usage.record)
+    t0 = time.perf_counter()
+    try:
+        await app_module._generate_in_background(titles)
+    finally:
+        remove_usage_listener(usage.record)
+    elapsed = time.perf_counter() - t0
+    for task in list(app_module._bg_tasks):
+        task.cancel()
+    stages = usage.snapshot()
+    drafts = [stages[q] for q in PROMPTS if q in stages]
+    return {
+        "elapsed": elapsed,
+        "calls": sum(st["calls"] for st in drafts),
+        "prefill": sum(st["prefill_tokens"] for st in drafts),
+        "palette": app_module._get_palette().stats(),
+    }
+
+
+async def main(n_clusters: int, n_questions: int):
+    logging.disable(logging.CRITICAL)
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        titles = synthetic_vocabulary(db, n_clusters)
+        rng = random.Random(0)
+        fixed = await run(db, rng.sample(titles, n_questions), adaptive=False)
+        adaptive = await run(db, rng.sample(titles, n_questions), adaptive=True)
+        db.close()
+
+    print(f"{n_questions} questions per run\n")
+    print(f"  {'palette':<10} {'draft calls':>11} {'prefill tok':>12} {'tok/call':>9} "
+          f"{'words sent':>11} {'q/min':>7}")
+    for label, r in (("fixed", fixed), ("adaptive", adaptive)):
+        print(f"  {label:<10} {r['calls']:>11} {r['prefill']:>12} "
+              f"{r['prefill'] / max(1, r['calls']):>9.0f} "
+              f"{r['palette']['words_sent']:>11} {60 * n_questions / r['elapsed']:>7.0f}")
+    per_call = (fixed["prefill"] / max(1, fixed["calls"])
+                - adaptive["prefill"] / max(1, adaptive["calls"]))
+    print(f"\n  Prefill tokens saved: {per_call:.0f} per draft call, "
+          f"{per_call * adaptive['calls']:.0f} over the adaptive run "
+          f"({100 * per_call / (fixed['prefill'] / max(1, fixed['calls'])):.0f}%)")
+
+    print(f"\n  {'question type':<14} {'size':>5}  acceptance by palette size")
+    for qtype, row in adaptive["palette"]["question_types"].items():
+        acc = ", ".join(f"{size}: {100 * rate:.0f}%" for size, rate in row["acceptance"].items())
+        print(f"  {qtype:<14} {row['size']:>5}  {acc}")
+
+
+if __name__ == "__main__":
+    clusters = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    asyncio.run(main(clusters, questions))
@@ -0,0 +1,177 @@
+"""Benchmark: question pipeline throughput, offline, on a synthetic vocabulary.
+
+Runs ``generate_batch`` and the server's ``_generate_in_background`` loop
+against the deterministic ``FakeLLMProvider`` and a temporary database
+holding a large synthetic vocabulary, and reports questions/minute, LLM
+calls, retries and the time spent in SQLite.
+
+With zero simulated latency the numbers are pure pipeline overhead (prompt
+building, JSON parsing, validation, DB round trips); with latency they show
+how retries and failures stretch wall time.  ``dedup %`` is the share of
+valid drafts re-prompted as near-duplicates of the bank; ``gate saved``
+counts grammar-gate calls avoided by the local pre-filter and, in the
+background loop, by skipping the gate once its measured pass rate is high.
+
+Run with: uv run python tests/bench_pipeline.py [clusters] [questions]
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from vocab_trainer import app as app_module
+from vocab_trainer.config import Settings
+from vocab_trainer.db import Database
+from vocab_trainer.metrics import generation_stats
+from vocab_trainer.models import DistinctionCluster, DistinctionEntry, VocabWord
+from vocab_trainer.providers.llm_fake import FakeLLMProvider
+from vocab_trainer.providers.registry import ProviderRegistry
+from vocab_trainer.question_generator import generate_batch
+
+SYLLABLES = ["ba", "ko", "ri", "lu", "me", "sa", "tor", "vin", "dak", "pel", "zu", "gor", "nim", "fe"]
+WORDS_PER_CLUSTER = 6
+EXTRA_WORDS = 5000
+
+FAILURES = {"bad_json": 0.08, "missing_target": 0.08, "grammar_fail": 0.05, "error": 0.02}
+
+
+class _TimedConnection:
+    """Wraps a sqlite3 connection, adding up the time spent in each call."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.seconds = 0.0
+        self.statements = 0
+
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.seconds += time.perf_counter() - t0
+            self.statements += 1
+
+    def execute(self, *args):
+        return self._timed(self._conn.execute, *args)
+
+    def executemany(self, *args):
+        return self._timed(self._conn.executemany, *args)
+
+    def commit(self):
+        return self._timed(self._conn.commit)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def synthetic_vocabulary(db: Database, n_clusters: int) -> list[str]:
+    words = ("".join(p) for p in itertools.product(SYLLABLES, repeat=4))
+    clusters = []
+    vocab = []
+    for i in range(n_clusters):
+        entries = [
+            DistinctionEntry(w, f"meaning of {w}", f"what sets {w} apart")
+            for w in itertools.islice(words, WORDS_PER_CLUSTER)
+        ]
+        clusters.append(DistinctionCluster(
+            title=f"Cluster {i:05d}", preamble="", entries=entries, commentary="",
+        ))
+        vocab += [VocabWord(e.word, e.meaning, "Synthetic", "synthetic.md") for e in entries]
+    vocab += [VocabWord(w, f"meaning of {w}", "Extra", "synthetic.md")
+              for w in itertools.islice(words, EXTRA_WORDS)]
+    db.import_words(vocab)
+    db.import_clusters(clusters)
+    return [c.title for c in clusters]
+
+
+def _retries(llm: FakeLLMProvider, attempted: int, drafted: int, flagged: int,
+             gate_skipped: int) -> int:
+    """LLM calls beyond one per pipeline stage actually reached."""
+    first_calls = attempted + drafted - gate_skipped + (drafted - flagged)
+    return sum(llm.calls.values()) - first_calls
+
+
+def _report(label: str, llm: FakeLLMProvider, conn: _TimedConnection, questions: list,
+            attempted: int, elapsed: float) -> None:
+    flagged = sum(1 for q in questions if q.quality_issue)
+    gen = generation_stats.snapshot()
+    retries = _retries(llm, attempted, len(questions), flagged, gen.get("gate_skipped", 0))
+    generation_stats.reset()
+    print(f"  {label:<28} {len(questions):>5} {60 * len(questions) / elapsed:>9.0f} "
+          f"{sum(llm.calls.values()):>6} {retries:>7} {1000 * conn.seconds:>8.0f} "
+          f"{100 * conn.seconds / elapsed:>5.0f}% {100 * (gen['dedup_rate'] or 0.0):>6.1f}% "
+          f"{gen['gate_calls_saved']:>10}")
+
+
+async def run_batch(db: Database, titles: list[str], label: str, **fake) -> None:
+    llm = FakeLLMProvider(seed=1, **fake)
+    conn = db.conn = _TimedConnection(db.conn)
+    t0 = time.perf_counter()
+    questions = await generate_batch(llm, db, target_clusters=titles)
+    elapsed = time.perf_counter() - t0
+    db.conn = conn._conn
+    _report(label, llm, conn, questions, len(titles), elapsed)
+
+
+class _Saved:
+    def __init__(self, quality_issue):
+        self.quality_issue = quality_issue
+
+
+async def run_background(db: Database, titles: list[str], label: str, **fake) -> None:
+    """The server's background loop: scheduler, policy and checkpoints included."""
+    llm = FakeLLMProvider(seed=1, **fake)
+    app_module._db = db
+    app_module._settings = Settings(llm_provider="fake", session_size=0, llm_retries=0)
+    app_module._providers = ProviderRegistry()
+    app_module._providers._llm, app_module._providers._llm_key = llm, ("fake",)
+    app_module._grammar_gate.reset()
+    app_module._palette.reset()
+    before = {r["id"] for r in db.conn.execute("SELECT id FROM questions")}
+    conn = db.conn = _TimedConnection(db.conn)
+    t0 = time.perf_counter()
+    await app_module._generate_in_background(titles)
+    elapsed = time.perf_counter() - t0
+    db.conn = conn._conn
+    for task in list(app_module._bg_tasks):
+        task.cancel()
+    rows = db.conn.execute("SELECT id, quality_issue FROM questions").fetchall()
+    questions = [_Saved(r[1]) for r in rows if r[0] not in before]
+    _report(label, llm, conn, questions, len(titles), elapsed)
+
+
+async def main(n_clusters: int, n_questions: int):
+    logging.disable(logging.CRITICAL)
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        t0 = time.perf_counter()
+        titles = synthetic_vocabulary(db, n_clusters)
+        print(f"Synthetic vocabulary: {n_clusters} clusters, "
+              f"{db.get_word_count()} words ({time.perf_counter() - t0:.1f}s to import)\n")
+
+        rng = random.Random(0)
+        def sample():
+            return rng.sample(titles, min(n_questions, len(titles)))
+
+        print(f"  {'scenario':<28} {'qs':>5} {'q/min':>9} {'calls':>6} {'retries':>7} "
+              f"{'db ms':>8} {'db %':>6} {'dedup %':>7} {'gate saved':>10}")
+        await run_batch(db, sample(), "batch, no latency")
+        await run_batch(db, sample(), "batch, failures", failure_rates=FAILURES)
+        await run_batch(db, sample()[:n_questions // 5], "batch, 20ms/call + failures",
+                        latency=0.02, jitter=0.3, failure_rates=FAILURES)
+        await run_background(db, sample(), "background, no latency")
+        await run_background(db, sample(), "background, failures", failure_rates=FAILURES)
+        db.close()
+
+
+if __name__ == "__main__":
+    clusters = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(main(clusters, questions))
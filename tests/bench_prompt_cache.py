@@ -0,0 +1,103 @@
+"""Benchmark: prefill saved by byte-stable system prefixes, per call type.
+
+Runs the question pipeline's three call types (step 1, grammar gate,
+enrichment) several times in pipeline order.  The "cold" pass prepends a
+unique line to every system prefix so the backend can never reuse its
+cache; the "stable" pass sends the prefixes exactly as the app does.
+
+Ollama keeps one KV cache per parallel slot and picks the slot sharing the
+longest prefix, so with ``OLLAMA_NUM_PARALLEL`` >= 3 each call type keeps
+its own warm prefix; with a single slot only back-to-back calls of the same
+type benefit.
+
+Requires Ollama running locally.
+Run with: uv run python tests/bench_prompt_cache.py [rounds]
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import uuid
+
+from vocab_trainer.metrics import UsageStats
+from vocab_trainer.prompts import (
+    CHOICE_ENRICHMENT_PROMPT,
+    FILL_BLANK_PROMPT,
+    GRAMMAR_CHECK_PROMPT,
+    SYSTEM_PROMPTS,
+    format_cluster_info,
+)
+from vocab_trainer.providers.base import add_usage_listener, llm_stage, remove_usage_listener
+from vocab_trainer.providers.llm_ollama import OllamaProvider
+
+OLLAMA_URL = "http://localhost:11434"
+MODEL = "qwen3:8b"
+
+CLUSTER = [
+    {"word": "terse", "meaning": "brief to the point of rudeness", "distinction": "curt tone"},
+    {"word": "concise", "meaning": "brief but comprehensive", "distinction": "efficient, neutral"},
+    {"word": "laconic", "meaning": "using very few words", "distinction": "a personal style"},
+    {"word": "pithy", "meaning": "brief and full of meaning", "distinction": "memorable, witty"},
+]
+STEM = "Her ___ reply left the committee unsure whether she was annoyed or merely busy."
+CHOICES = ["terse", "concise", "laconic", "pithy"]
+
+CALLS = {
+    "fill_blank": FILL_BLANK_PROMPT.format(
+        cluster_title="Being Brief", cluster_info=format_cluster_info(CLUSTER),
+        target_word="terse", target_meaning=CLUSTER[0]["meaning"],
+        target_distinction=CLUSTER[0]["distinction"], enrichment_section="",
+    ),
+    "grammar": GRAMMAR_CHECK_PROMPT.format(
+        question_type="fill_blank", stem=STEM, correct_word="terse",
+        choices_formatted=", ".join(CHOICES),
+    ),
+    "enrichment": CHOICE_ENRICHMENT_PROMPT.format(
+        cluster_title="Being Brief", cluster_info=format_cluster_info(CLUSTER),
+        stem=STEM, choices_formatted=", ".join(CHOICES), correct_word="terse",
+        correct_index=0,
+    ),
+}
+
+
+async def run(llm: OllamaProvider, rounds: int, bust_cache: bool) -> dict:
+    stats = UsageStats()
+    add_usage_listener(stats.record)
+    try:
+        for _ in range(rounds):
+            for stage, prompt in CALLS.items():
+                system = SYSTEM_PROMPTS[stage]
+                if bust_cache:
+                    system = f"[run {uuid.uuid4()}]\n" + system
+                with llm_stage(stage):
+                    await llm.generate(prompt, temperature=0.3, system=system, thinking=False)
+    finally:
+        remove_usage_listener(stats.record)
+    return stats.snapshot()
+
+
+async def main(rounds: int):
+    llm = OllamaProvider(base_url=OLLAMA_URL, model=MODEL, keep_alive="30m")
+    print("Warming up...")
+    await llm.warm_up()
+
+    print(f"\n{rounds} pipeline rounds per pass\n")
+    cold = await run(llm, rounds, bust_cache=True)
+    stable = await run(llm, rounds, bust_cache=False)
+    await llm.aclose()
+
+    print(f"  {'call type':<12} {'cold tok':>9} {'cold ms':>8} {'stable tok':>11} "
+          f"{'stable ms':>10} {'saved ms/call':>14}")
+    total_saved = 0.0
+    for stage in CALLS:
+        c, s = cold[stage], stable[stage]
+        saved = c["prefill_ms_per_call"] - s["prefill_ms_per_call"]
+        total_saved += saved
+        print(f"  {stage:<12} {c['prefill_tokens_per_call']:>9.0f} {c['prefill_ms_per_call']:>8.0f} "
+              f"{s['prefill_tokens_per_call']:>11.0f} {s['prefill_ms_per_call']:>10.0f} "
+              f"{saved:>14.0f}")
+    print(f"\n  Prefill saved per generated question: {total_saved:.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
@@ -0,0 +1,86 @@
+"""Benchmark: per-stage model routing, large model everywhere vs small gate models.
+
+Runs the server's background loop over a synthetic vocabulary (see
+``bench_pipeline.py``) once per configuration.  Two ``FakeLLMProvider``
+instances stand in for the models: a slow, reliable "large" one and a
+"small" one that answers several times faster but returns unusable JSON
+more often.  For each configuration it prints questions/minute and, per
+stage, the model serving it, its mean backend latency and the share of its
+responses the pipeline accepted — the same figures ``GET /api/llm/usage``
+reports under ``routing``.
+
+Run with: uv run python tests/bench_stage_routing.py [clusters] [questions]
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_pipeline import synthetic_vocabulary
+
+from vocab_trainer import app as app_module
+from vocab_trainer.config import Settings
+from vocab_trainer.db import Database
+from vocab_trainer.metrics import generation_stats
+from vocab_trainer.providers.llm_fake import FakeLLMProvider
+from vocab_trainer.providers.llm_stages import StageRoutedLLM
+from vocab_trainer.providers.policy import LLMPolicy
+from vocab_trainer.providers.registry import ProviderRegistry
+
+LARGE = {"model": "large", "latency": 0.03, "jitter": 0.3, "failure_rates": {"bad_json": 0.02}}
+SMALL = {"model": "small", "latency": 0.008, "jitter": 0.3, "failure_rates": {"bad_json": 0.06}}
+
+CONFIGS = {
+    "large everywhere": {},
+    "small gate + enrichment": {"grammar": "small", "enrichment": "small"},
+    "small everywhere": {"fill_blank": "small", "best_fit": "small", "distinction": "small",
+                         "grammar": "small", "enrichment": "small"},
+}
+
+
+async def run(db: Database, titles: list[str], label: str, routes: dict[str, str]) -> None:
+    models = {"large": FakeLLMProvider(seed=1, **LARGE), "small": FakeLLMProvider(seed=2, **SMALL)}
+    llm = StageRoutedLLM(models["large"], {stage: models[m] for stage, m in routes.items()})
+    app_module._db = db
+    app_module._settings = Settings(llm_provider="fake", session_size=0, llm_retries=0,
+                                    grammar_skip_pass_rate=0)
+    app_module._providers = ProviderRegistry()
+    app_module._providers._llm, app_module._providers._llm_key = llm, ("fake",)
+    app_module._llm_policy = LLMPolicy()
+    generation_stats.reset()
+    before = db.get_question_bank_size()
+    t0 = time.perf_counter()
+    await app_module._generate_in_background(titles)
+    elapsed = time.perf_counter() - t0
+    for task in list(app_module._bg_tasks):
+        task.cancel()
+    made = db.get_question_bank_size() - before
+    print(f"\n{label}: {made} questions, {60 * made / elapsed:.0f} q/min")
+    print(f"  {'stage':<12} {'model':<12} {'calls':>6} {'latency ms':>11} {'accepted':>9}")
+    for stage, row in app_module._stage_report().items():
+        latency = f"{1000 * row['latency_s']:.1f}" if row["latency_s"] is not None else "-"
+        rate = f"{100 * row['acceptance_rate']:.0f}%" if row["acceptance_rate"] is not None else "-"
+        print(f"  {stage:<12} {row['model']:<12} {row['calls']:>6} {latency:>11} {rate:>9}")
+
+
+async def main(n_clusters: int, n_questions: int):
+    logging.disable(logging.CRITICAL)
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        titles = synthetic_vocabulary(db, n_clusters)
+        rng = random.Random(0)
+        for label, routes in CONFIGS.items():
+            await run(db, rng.sample(titles, n_questions), label, routes)
+        db.close()
+
+
+if __name__ == "__main__":
+    clusters = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    asyncio.run(main(clusters, questions))
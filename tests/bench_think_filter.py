@@ -0,0 +1,95 @@
+"""Benchmark: stripping <think> blocks from 10k-token streams.
+
+Compares the string-buffer filter OllamaProvider used to run on every
+streamed token (concatenate, search, slice) with the incremental
+ThinkFilter, and the DOTALL regex ``generate`` ran over complete
+responses with ``strip_think``.  Tokens are short word pieces, as
+emitted by a real model; half the stream is reasoning.
+
+Run with: uv run python tests/bench_think_filter.py [tokens]
+"""
+from __future__ import annotations
+
+import random
+import re
+import sys
+import time
+
+from vocab_trainer.providers.think import ThinkFilter, strip_think
+
+PIECES = ["the", " word", " ter", "se", " fits", ",", " because", " ", "\n", " {\"", "stem", "\":"]
+
+
+def make_tokens(n: int) -> list[str]:
+    rng = random.Random(0)
+    body = [rng.choice(PIECES) for _ in range(n - 4)]
+    half = len(body) // 2
+    return ["<th", "ink>", *body[:half], "</th", "ink>", *body[half:]]
+
+
+def buffer_filter(tokens: list[str]) -> str:
+    """The previous per-token filter, kept here for comparison."""
+    out = []
+    buf = ""
+    in_think = False
+    for token in tokens:
+        buf += token
+        while True:
+            if in_think:
+                idx = buf.find("</think>")
+                if idx >= 0:
+                    buf = buf[idx + 8:]
+                    in_think = False
+                else:
+                    buf = buf[-7:]
+                    break
+            else:
+                idx = buf.find("<think>")
+                if idx >= 0:
+                    if idx > 0:
+                        out.append(buf[:idx])
+                    buf = buf[idx + 7:]
+                    in_think = True
+                else:
+                    if len(buf) > 6:
+                        out.append(buf[:-6])
+                        buf = buf[-6:]
+                    break
+    if buf and not in_think:
+        out.append(buf)
+    return "".join(out)
+
+
+def incremental_filter(tokens: list[str]) -> str:
+    f = ThinkFilter()
+    return "".join(f.feed(t) for t in tokens) + f.flush()
+
+
+def timed(fn, arg, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(n: int):
+    tokens = make_tokens(n)
+    text = "".join(tokens)
+    assert buffer_filter(tokens) == incremental_filter(tokens) == strip_think(text)
+    regex = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+    print(f"{n} tokens, {len(text)} chars\n")
+    print(f"  {'streaming':<22} {'total ms':>9} {'us/token':>9}")
+    for label, fn in (("string buffer", buffer_filter), ("ThinkFilter", incremental_filter)):
+        t = timed(fn, tokens)
+        print(f"  {label:<22} {1000 * t:>9.2f} {1e6 * t / n:>9.2f}")
+
+    print(f"\n  {'complete response':<22} {'total ms':>9}")
+    for label, fn in (("DOTALL regex", lambda s: regex.sub("", s)), ("strip_think", strip_think)):
+        print(f"  {label:<22} {1000 * timed(fn, text):>9.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,64 @@
+"""Benchmark: word → cluster lookup for targeted generation.
+
+Times resolving target words to their cluster and entry on a synthetic
+vocabulary (see ``bench_pipeline.py``): the previous scan — every cluster's
+word list fetched and searched, per word — against ``find_word_cluster``,
+which uses the ``cluster_words(word COLLATE NOCASE)`` index.  The scan is
+timed on a sample and extrapolated; it is far too slow to run in full.
+
+Run with: uv run python tests/bench_word_index.py [clusters] [words]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_pipeline import synthetic_vocabulary
+
+from vocab_trainer.db import Database
+
+SCAN_SAMPLE = 20
+
+
+def _scan(db: Database, word: str) -> tuple[dict, dict] | None:
+    for cl in db.get_all_clusters():
+        cw = db.get_cluster_words(cl["id"])
+        info = next((w for w in cw if w["word"].lower() == word.lower()), None)
+        if info:
+            return cl, info
+    return None
+
+
+def main(n_clusters: int, n_words: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        synthetic_vocabulary(db, n_clusters)
+        words = [w for ws in db.get_all_cluster_words().values() for w in ws]
+        rng = random.Random(0)
+        targets = [rng.choice(words)["word"].upper() for _ in range(n_words)]
+        print(f"{n_clusters} clusters, {len(words)} cluster words, {n_words} target words\n")
+
+        t0 = time.perf_counter()
+        for word in targets[:SCAN_SAMPLE]:
+            assert _scan(db, word) is not None
+        scan = (time.perf_counter() - t0) / SCAN_SAMPLE
+
+        t0 = time.perf_counter()
+        for word in targets:
+            assert db.find_word_cluster(word) is not None
+        indexed = (time.perf_counter() - t0) / n_words
+        db.close()
+
+    print(f"  Scan, per word:      {scan * 1e3:>9.2f} ms  "
+          f"(~{scan * n_words:.0f}s for {n_words} words, extrapolated)")
+    print(f"  Index, per word:     {indexed * 1e6:>9.1f} µs  "
+          f"({indexed * n_words:.2f}s for {n_words} words, {scan / indexed:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    clusters = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    words = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    main(clusters, words)
@@ -0,0 +1,101 @@
+"""Tests for LLM token/cost accounting and the daily budget tiers."""
+from __future__ import annotations
+
+import pytest
+
+from vocab_trainer.accounting import (
+    MAX_DELAY,
+    UsageLedger,
+    budget_status,
+    budget_used,
+    cost_of,
+    price_for,
+    throttle_delay,
+    today,
+)
+from vocab_trainer.config import Settings
+from vocab_trainer.providers.base import add_usage_listener, llm_stage, remove_usage_listener, report_usage
+
+
+class TestPricing:
+    def test_longest_prefix_wins(self):
+        assert price_for("openai/gpt-4o-mini-2024-07-18") == price_for("openai/gpt-4o-mini")
+        assert price_for("openai/gpt-4o-mini") != price_for("openai/gpt-4o")
+
+    def test_local_and_unknown_models_free(self):
+        assert price_for("ollama/qwen3:8b") is None
+        assert cost_of({"provider": "ollama/qwen3:8b", "prompt_tokens": 10**6}) == 0.0
+        assert cost_of({"provider": "openai/some-future-model", "prompt_tokens": 10**6}) == 0.0
+
+    def test_cached_input_billed_at_cache_rate(self):
+        usage = {"provider": "anthropic/claude-sonnet-4-20250514",
+                 "prompt_tokens": 1_000_000, "cached_tokens": 1_000_000, "completion_tokens": 0}
+        assert cost_of(usage) == pytest.approx(0.30)
+        usage["cached_tokens"] = 0
+        usage["completion_tokens"] = 1_000_000
+        assert cost_of(usage) == pytest.approx(18.00)
+
+    def test_cache_writes_billed_at_write_rate(self):
+        usage = {"provider": "anthropic/claude-sonnet-4-20250514",
+                 "prompt_tokens": 1_000_000, "cache_creation_tokens": 1_000_000}
+        assert cost_of(usage) == pytest.approx(3.00 * 1.25)
+        usage["cache_creation_tokens"] = 400_000
+        assert cost_of(usage) == pytest.approx(0.6 * 3.00 + 0.4 * 3.75)
+
+
+class TestThrottle:
+    def test_prefetch_slows_then_stops(self):
+        assert throttle_delay(False, 0.2) == 0.0
+        assert 0 < throttle_delay(False, 0.6) < throttle_delay(False, 0.75) < MAX_DELAY
+        assert throttle_delay(False, 0.8) is None
+
+    def test_refill_only_slows_once_exhausted(self):
+        assert throttle_delay(True, 0.95) == 0.0
+        assert throttle_delay(True, 1.5) == MAX_DELAY
+
+
+class TestBudget:
+    def test_ledger_records_reported_usage(self, tmp_db):
+        ledger = UsageLedger(tmp_db)
+        add_usage_listener(ledger.record)
+        try:
+            with llm_stage("grammar"):
+                report_usage("openai/gpt-4o-mini", prompt_tokens=1000, cached_tokens=0,
+                             completion_tokens=100)
+        finally:
+            remove_usage_listener(ledger.record)
+        ledger.flush()
+        totals = tmp_db.get_llm_usage_totals(today())
+        assert totals["tokens"] == 1100
+        assert totals["cost_usd"] == pytest.approx((1000 * 0.15 + 100 * 0.60) / 1e6)
+        assert tmp_db.get_llm_usage_by_stage(today())["grammar"]["calls"] == 1
+
+    def test_ledger_batches_writes(self, tmp_db):
+        ledger = UsageLedger(tmp_db, flush_seconds=60)
+        usage = {"provider": "openai/gpt-4o-mini", "stage": "grammar",
+                 "prompt_tokens": 100, "completion_tokens": 10}
+        ledger.record(usage)
+        ledger.record(usage)
+        assert tmp_db.get_llm_usage_totals(today())["calls"] == 0
+        ledger.flush()
+        totals = tmp_db.get_llm_usage_totals(today())
+        assert (totals["calls"], totals["tokens"]) == (2, 220)
+        ledger.flush()
+        assert tmp_db.get_llm_usage_totals(today())["calls"] == 2
+
+    def test_ledger_flushes_when_interval_passed(self, tmp_db):
+        ledger = UsageLedger(tmp_db, flush_seconds=0)
+        ledger.record({"provider": "openai/gpt-4o-mini", "prompt_tokens": 5})
+        assert tmp_db.get_llm_usage_totals(today())["calls"] == 1
+
+    def test_no_budget_means_unlimited(self, tmp_db):
+        tmp_db.add_llm_usage(today(), "openai/gpt-4o-mini", "grammar", 10**9, 0, 0, 1000.0)
+        assert budget_used(tmp_db, Settings()) == 0.0
+
+    def test_tighter_limit_wins(self, tmp_db):
+        tmp_db.add_llm_usage(today(), "openai/gpt-4o-mini", "grammar", 500, 0, 100, 0.9)
+        s = Settings(llm_daily_token_budget=1000, llm_daily_cost_budget=1.0)
+        assert budget_used(tmp_db, s) == pytest.approx(0.9)
+        status = budget_status(tmp_db, s)["budget"]
+        assert status["prefetch"] == "stopped"
+        assert status["refill"] == "normal"
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 import asyncio
 import json
+import sqlite3
+import threading
 import uuid
 from pathlib import Path
 from unittest.mock import AsyncMock, patch
@@ -14,13 +16,17 @@ from vocab_trainer import app as app_module
 from vocab_trainer.app import app
 from vocab_trainer.config import Settings
 from vocab_trainer.db import Database
+from vocab_trainer.metrics import generation_stats
 from vocab_trainer.models import Question
+from vocab_trainer.providers.policy import LLMPolicy
+from vocab_trainer.providers.registry import ProviderRegistry
+from vocab_trainer.sessions import MemorySessionStore, SQLiteSessionStore
 
 
 class FakeLLM:
     """Fake LLM that returns valid question JSON for any cluster word."""
 
-    async def generate(self, prompt: str, temperature: float = 0.7) -> str:
+    async def generate(self, prompt: str, temperature: float = 0.7, **kwargs) -> str:
         return json.dumps({
             "stem": "The ___ answer was surprisingly brief.",
             "choices": ["terse", "concise", "pithy", "laconic"],
@@ -48,6 +54,9 @@ def test_app(tmp_path):
     app_module._settings = settings
     app_module._active_sessions.clear()
     app_module._bg_generating = False
+    app_module._llm_scheduler = None
+    app_module._llm_policy = LLMPolicy()
+    app_module._providers = ProviderRegistry()
 
     # Patch save_settings and _get_llm so tests never hit real config/LLM
     with patch("vocab_trainer.app.save_settings"), \
@@ -61,6 +70,9 @@ def test_app(tmp_path):
     app_module._settings = None
     app_module._active_sessions.clear()
     app_module._bg_generating = False
+    app_module._llm_scheduler = None
+    app_module._llm_policy = LLMPolicy()
+    app_module._providers = ProviderRegistry()
 
 
 @pytest.fixture
@@ -102,6 +114,14 @@ class TestStatsAPI:
         assert data["total_words"] == 0
         assert data["accuracy"] == 0
 
+    def test_stats_report_bank_depths(self, test_app_with_data):
+        client, db, settings = test_app_with_data
+        db.upsert_cluster_progress("Being Brief", 2.5, 1.0, 1, "2026-02-20T00:00:00+00:00", True)
+        bank = client.get("/api/stats").json()["bank"]
+        assert bank["adaptive"] is True
+        assert bank["max_depth"] == settings.max_bank_depth
+        assert bank["depths"] == {"1": {"clusters": 1, "ready": 1, "short": 0}}
+
     def test_stats_with_data(self, test_app_with_data):
         client, _, _ = test_app_with_data
         resp = client.get("/api/stats")
@@ -111,7 +131,318 @@ class TestStatsAPI:
         assert data["total_clusters"] == 1
 
 
+class TestLLMBackendsAPI:
+    def test_single_backend(self, test_app):
+        client, _, _ = test_app
+        data = client.get("/api/llm/backends").json()
+        assert data["backends"] == []
+        assert data["scheduler"]["max_concurrent"] == 1
+
+    def test_multiple_backends(self, test_app):
+        client, _, settings = test_app
+        settings.ollama_urls = ["http://gpu1:11434", "http://gpu2:11434"]
+        data = client.get("/api/llm/backends").json()
+        assert [b["url"] for b in data["backends"]] == settings.ollama_urls
+        assert all(b["healthy"] for b in data["backends"])
+        # Concurrency limit applies per backend
+        assert data["scheduler"]["max_concurrent"] == 2
+
+
+class TestLLMStatusAPI:
+    def test_provider_without_residency(self, test_app):
+        client, _, _ = test_app
+        data = client.get("/api/llm/status").json()
+        assert data == {"provider": "fake-llm", "resident": None, "backends": []}
+
+    def test_reports_backend_residency(self, test_app):
+        client, _, _ = test_app
+
+        class ResidentLLM(FakeLLM):
+            async def status(self):
+                return {"url": "http://gpu1:11434", "model": "m", "reachable": True,
+                        "resident": True, "expires_at": None, "size_vram": 1}
+
+        with patch("vocab_trainer.app._get_llm", return_value=ResidentLLM()):
+            data = client.get("/api/llm/status").json()
+        assert data["resident"] is True
+        assert data["backends"][0]["url"] == "http://gpu1:11434"
+
+
+class TestLLMUsageAPI:
+    def test_reports_usage_per_stage(self, test_app):
+        from vocab_trainer.providers.base import llm_stage, report_usage
+        client, _, _ = test_app
+        app_module._usage_stats.reset()
+        with llm_stage("grammar"):
+            report_usage("fake-llm", prefill_tokens=300, prefill_seconds=0.1)
+        stages = client.get("/api/llm/usage").json()["stages"]
+        assert stages["grammar"]["calls"] == 1
+        assert stages["grammar"]["prefill_tokens"] == 300
+        app_module._usage_stats.reset()
+
+    def test_reports_generation_outcomes(self, test_app):
+        from vocab_trainer.metrics import generation_stats
+        client, _, _ = test_app
+        generation_stats.reset()
+        generation_stats.count("dedup_checked", 4)
+        generation_stats.count("duplicate")
+        generation = client.get("/api/llm/usage").json()["generation"]
+        assert generation["dedup_rate"] == 0.25
+        gate = client.get("/api/llm/usage").json()["grammar_gate"]
+        assert gate["skip_at"] == 0.95 and gate["skipped"] == 0
+        palette = client.get("/api/llm/usage").json()["palette"]
+        assert palette["max_words"] == 30 and palette["adaptive"] is True
+
+    @pytest.mark.asyncio
+    async def test_reports_per_stage_routing(self, test_app):
+        from vocab_trainer.providers.base import llm_stage
+        from vocab_trainer.providers.llm_fake import FakeLLMProvider
+        from vocab_trainer.providers.llm_stages import StageRoutedLLM
+
+        client, _, _ = test_app
+        generation_stats.reset()
+        llm = StageRoutedLLM(FakeLLMProvider(model="large"),
+                             {"grammar": FakeLLMProvider(model="small")})
+        with patch("vocab_trainer.app._get_llm", return_value=llm):
+            with llm_stage("grammar"):
+                await app_module._scheduled_llm(app_module.Priority.REFILL).generate("p")
+            generation_stats.outcome("grammar", "fake/small", True)
+            routing = client.get("/api/llm/usage").json()["routing"]
+        assert routing["grammar"]["model"] == "fake/small"
+        assert routing["grammar"]["calls"] == 1
+        assert routing["grammar"]["latency_s"] is not None
+        assert routing["grammar"]["acceptance_rate"] == 1.0
+        generation_stats.reset()
+        generation_stats.reset()
+
+    def test_usage_persisted_with_budget_state(self, test_app):
+        from vocab_trainer.providers.base import llm_stage, report_usage
+        client, _, settings = test_app
+        settings.llm_daily_token_budget = 2000
+        with llm_stage("enrichment"):
+            report_usage("openai/gpt-4o-mini", prompt_tokens=1000, completion_tokens=200)
+        today = client.get("/api/llm/usage").json()["today"]
+        assert today["totals"]["tokens"] == 1200
+        assert today["totals"]["cost_usd"] > 0
+        assert today["stages"]["enrichment"]["calls"] == 1
+        assert today["budget"]["used"] == 0.6
+        assert today["budget"]["prefetch"] == "slowed"
+        app_module._usage_stats.reset()
+
+    def test_exhausted_budget_stops_new_cluster_prefetch(self, test_app_with_data):
+        from vocab_trainer.accounting import today
+        _, db, settings = test_app_with_data
+        db.conn.execute("DELETE FROM questions")
+        assert app_module._collect_generation_needs()[2] == 1
+        settings.llm_daily_token_budget = 1000
+        db.add_llm_usage(today(), "openai/gpt-4o-mini", "fill_blank", 900, 0, 0, 0.0)
+        titles, active, new = app_module._collect_generation_needs()
+        assert (titles, active, new) == ([], 0, 0)
+
+
+class TestBankDepth:
+    def test_slow_generation_deepens_short_interval_clusters(self, test_app_with_data):
+        _, db, settings = test_app_with_data
+        db.upsert_cluster_progress("Being Brief", 2.5, 1.0, 1, "2026-02-20T00:00:00+00:00", True)
+        generation_stats.reset()
+        assert app_module._collect_generation_needs()[:2] == ([], 0)
+
+        generation_stats.time_question(2 * 86400, produced=True)  # two days a question
+        titles, active, _ = app_module._collect_generation_needs()
+        assert (titles, active) == (["Being Brief"], 1)
+        db.conn.execute("DELETE FROM questions")
+        assert app_module._collect_generation_needs()[0] == ["Being Brief", "Being Brief"]
+
+        settings.adaptive_bank_depth = False
+        assert app_module._collect_generation_needs()[0] == ["Being Brief"]
+        generation_stats.reset()
+
+
+class TestForecastPrefetch:
+    @pytest.fixture
+    def due_cluster(self, test_app_with_data):
+        from vocab_trainer.providers.llm_fake import FakeLLMProvider
+        _, db, settings = test_app_with_data
+        db.conn.execute("DELETE FROM questions")
+        db.upsert_cluster_progress("Being Brief", 2.5, 1.0, 1, "2000-01-01T00:00:00+00:00", True)
+        with patch("vocab_trainer.app._get_llm", return_value=FakeLLMProvider()):
+            yield db, settings
+
+    @pytest.mark.asyncio
+    async def test_banks_due_clusters_up_to_depth(self, due_cluster):
+        db, settings = due_cluster
+        settings.max_bank_depth = 2
+        await app_module._forecast_in_background()
+        assert db.get_clusters_due_before("2100-01-01", 99)[0]["ready"] == 2
+        assert not app_module._forecasting
+        assert app_module._forecast_candidates(5) == []
+
+    @pytest.mark.asyncio
+    async def test_yields_to_refill_generation(self, due_cluster):
+        db, _ = due_cluster
+        app_module._bg_generating = True
+        await app_module._forecast_in_background()
+        assert db.get_question_bank_size() == 0
+
+    def test_disabled_by_zero_horizon(self, due_cluster):
+        _, settings = due_cluster
+        settings.prefetch_horizon_hours = 0
+        assert app_module._forecast_candidates(5) == []
+
+
+class TestExternalWorkers:
+    @pytest.fixture
+    def workers_on(self, test_app_with_data):
+        _, db, settings = test_app_with_data
+        db.conn.execute("DELETE FROM questions")
+        settings.external_workers = True
+        yield test_app_with_data
+        settings.external_workers = False
+        app_module._watching_jobs = False
+
+    @staticmethod
+    async def _stop_watcher():
+        app_module.get_settings().external_workers = False
+        await asyncio.gather(*app_module._bg_tasks, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_buffer_check_queues_jobs_instead_of_generating(self, workers_on):
+        _, db, _ = workers_on
+        await app_module._ensure_question_buffer()
+        assert not app_module._bg_generating
+        assert db.get_question_bank_size() == 0
+        queued = db.get_generation_job_counts()["queued"]
+        assert queued > 0
+        assert app_module._generating()
+        await app_module._ensure_question_buffer()
+        assert db.get_generation_job_counts()["queued"] == queued
+        await self._stop_watcher()
+
+    @pytest.mark.asyncio
+    async def test_watcher_follows_finished_jobs(self, workers_on):
+        _, db, _ = workers_on
+        await app_module._ensure_question_buffer()
+        assert app_module._watching_jobs
+        while (job := db.claim_generation_job("w1")) is not None:
+            db.finish_generation_job(job["id"], error="no valid question after retries")
+        assert not app_module._generating()
+        await asyncio.sleep(app_module.JOB_POLL + 0.2)
+        # the watcher re-checked the needs and queued replacements
+        assert db.get_generation_job_counts()["queued"] > 0
+        await self._stop_watcher()
+        assert not app_module._watching_jobs
+
+    def test_jobs_endpoint(self, workers_on):
+        client, db, _ = workers_on
+        db.enqueue_generation_jobs([("Being Brief", 1)])
+        data = client.get("/api/jobs").json()
+        assert data["external_workers"] is True
+        assert data["queued"] == 1
+
+
+class TestEmbeddingRefresh:
+    @staticmethod
+    def _recording(threads: list):
+        def refresh(db, model, url):
+            threads.append(threading.get_ident())
+            return {"embedded": 0, "removed": 0, "total": 0}
+        return refresh
+
+    @pytest.mark.asyncio
+    async def test_import_embeds_off_the_event_loop(self, test_app):
+        threads: list[int] = []
+        with patch("vocab_trainer.app.refresh_embeddings", self._recording(threads)):
+            result = await app_module.api_import()
+        assert result["embeddings"] == {"embedded": 0, "removed": 0, "total": 0}
+        assert threads and threads[0] != threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_refresh_uses_its_own_connection(self, test_app):
+        _, db, settings = test_app
+        used: list = []
+
+        def refresh(thread_db, model, url):
+            used.append(thread_db)
+            return {"embedded": 0, "removed": 0, "total": 0}
+
+        db.embedding_index()  # loaded before the refresh
+        with patch("vocab_trainer.app.refresh_embeddings", refresh):
+            await app_module._refresh_embeddings(db, settings)
+        assert used[0] is not db and used[0].db_path == db.db_path
+        with pytest.raises(sqlite3.ProgrammingError):
+            used[0].conn.execute("SELECT 1")  # closed with the thread
+        assert db._embedding_index is False  # reloaded on next use
+
+    @pytest.mark.asyncio
+    async def test_startup_refresh_runs_in_background(self, test_app):
+        _, db, settings = test_app
+        threads: list[int] = []
+        with patch("vocab_trainer.app.refresh_embeddings", self._recording(threads)):
+            app_module._start_embedding_refresh(db, settings)
+            assert not threads  # nothing ran before the caller moved on
+            await asyncio.gather(*app_module._bg_tasks)
+        assert threads and threads[0] != threading.get_ident()
+
+
+class TestLLMPolicyAPI:
+    def test_reports_breaker_and_stage_counters(self, test_app):
+        client, _, _ = test_app
+        app_module._llm_policy.count("grammar", "timeouts")
+        app_module._llm_policy.breaker_for("fake/x", "grammar")
+        data = client.get("/api/llm/policy").json()
+        assert data["breakers"] == [{"backend": "fake/x", "traffic": "background",
+                                     "state": "closed", "consecutive_failures": 0,
+                                     "retry_in": 0.0, "trips": 0}]
+        assert data["stages"]["grammar"]["timeouts"] == 1
+
+    def test_timeouts_follow_settings(self, test_app):
+        client, _, _ = test_app
+        client.put("/api/settings", json={"llm_stage_timeouts": {"grammar": 12}})
+        assert app_module._get_policy().timeout_for("grammar") == 12.0
+
+    def test_backend_change_resets_breaker(self, test_app):
+        client, _, _ = test_app
+        app_module._providers.llm(app_module.get_settings())
+        policy = app_module._llm_policy
+        breaker = policy.breaker_for("fake/x", "grammar")
+        breaker.threshold = 1
+        breaker.record_failure()
+        assert policy.blocking_breaker() is breaker
+        client.put("/api/settings", json={"llm_model": "other:1b"})
+        assert policy.blocking_breaker() is None
+
+    @pytest.mark.asyncio
+    async def test_background_waits_while_breaker_open(self):
+        app_module._llm_policy = LLMPolicy(breaker_threshold=1, breaker_cooldown=0.05)
+        app_module._llm_policy.breaker_for("fake/x", "fill_blank").record_failure()
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        assert await app_module._wait_for_backend()
+        assert loop.time() - t0 >= 0.04
+        app_module._llm_policy = LLMPolicy()
+
+    @pytest.mark.asyncio
+    async def test_background_ignores_open_chat_breaker(self):
+        app_module._llm_policy = LLMPolicy(breaker_threshold=1, breaker_cooldown=60)
+        app_module._llm_policy.breaker_for("fake/x", "chat").record_failure()
+        assert await asyncio.wait_for(app_module._wait_for_backend(), timeout=1)
+        app_module._llm_policy = LLMPolicy()
+
+
 class TestSettingsAPI:
+    def test_update_rebuilds_only_changed_providers(self, test_app):
+        client, _, _ = test_app
+        registry = app_module._providers
+        llm = registry.llm(app_module.get_settings())
+        tts = registry.tts(app_module.get_settings())
+        client.put("/api/settings", json={"session_size": 5})
+        assert registry.llm(app_module.get_settings()) is llm
+        client.put("/api/settings", json={"llm_model": "other:1b"})
+        new_llm = registry.llm(app_module.get_settings())
+        assert new_llm is not llm
+        assert new_llm.model == "other:1b"
+        assert registry.tts(app_module.get_settings()) is tts
+
     def test_get_settings(self, test_app):
         client, _, _ = test_app
         resp = client.get("/api/settings")
@@ -299,6 +630,81 @@ class TestSessionAPI:
         assert "current_question" not in data
 
 
+class TestSharedState:
+    """Several server processes: sessions in SQLite, generation by lease."""
+
+    @pytest.fixture
+    def shared(self, test_app_with_data, tmp_path):
+        _, db, _ = test_app_with_data
+        app_module._active_sessions = SQLiteSessionStore(db)
+        app_module._shared_state = True
+        app_module._config_mtime = None
+        with patch("vocab_trainer.app.CONFIG_PATH", tmp_path / "config.json"), \
+             patch("vocab_trainer.config.CONFIG_PATH", tmp_path / "config.json"):
+            yield test_app_with_data
+        app_module._active_sessions = MemorySessionStore()
+        app_module._shared_state = False
+
+    def test_session_state_lives_in_database(self, shared):
+        client, db, _ = shared
+        session_id = TestFullSessionFlow()._setup_session(db)
+        assert db.get_session_state(session_id) is not None
+
+        with patch("vocab_trainer.app._get_tts", side_effect=RuntimeError("no TTS in test")), \
+             patch("vocab_trainer.app._ensure_question_buffer", new_callable=AsyncMock):
+            resp = client.post("/api/session/answer", json={
+                "session_id": session_id, "selected_index": 0, "time_seconds": 2.0,
+            })
+        assert resp.json()["session_complete"] is True
+        assert db.get_session_state(session_id) is None
+
+    def test_second_answer_to_same_question_refused(self, shared):
+        client, db, _ = shared
+        session_id = TestFullSessionFlow()._setup_session(db)
+        body = {"session_id": session_id, "selected_index": 0, "time_seconds": 2.0}
+        with patch("vocab_trainer.app._get_tts", side_effect=RuntimeError("no TTS in test")), \
+             patch("vocab_trainer.app._ensure_question_buffer", new_callable=AsyncMock), \
+             patch("vocab_trainer.app._generating", return_value=True):
+            assert client.post("/api/session/answer", json=body).status_code == 200
+            assert client.post("/api/session/answer", json=body).status_code == 409
+        session, _ = app_module._active_sessions.load(session_id)
+        assert session["total"] == 1
+
+    def test_update_retries_after_conflicting_save(self, shared):
+        _, db, _ = shared
+        session_id = TestFullSessionFlow()._setup_session(db)
+        calls = []
+
+        def change(session):
+            calls.append(session["total"])
+            if len(calls) == 1:  # another process saves in between
+                other, version = app_module._active_sessions.load(session_id)
+                other["total"] = 10
+                app_module._active_sessions.save(session_id, other, version)
+            session["total"] += 1
+            return session["total"]
+
+        assert app_module._update_session(session_id, change) == 11
+        assert calls == [0, 10]
+
+    @pytest.mark.asyncio
+    async def test_generation_left_to_lease_holder(self, shared):
+        _, db, _ = shared
+        db.conn.execute("DELETE FROM questions")
+        db.acquire_lease("generation", "other-host:1", 60)
+        await app_module._ensure_question_buffer()
+        assert not app_module._bg_generating
+        assert app_module._generating()
+        db.release_lease("generation", "other-host:1")
+        assert not app_module._generating()
+
+    def test_settings_follow_config_file(self, shared, tmp_path):
+        _, _, settings = shared
+        (tmp_path / "config.json").write_text(json.dumps({**settings.to_dict(), "session_size": 7}))
+        app_module._config_checked = 0.0
+        assert app_module.get_settings().session_size == 7
+
+
 class TestAudioAPI:
     def test_missing_audio(self, test_app):
         client, _, _ = test_app
@@ -551,3 +957,90 @@ class TestLibraryAPI:
         resp = client.get("/api/stats")
         data = resp.json()
         assert data["clusters_archived"] == 1
+
+
+class StreamingFakeLLM(FakeLLM):
+    def __init__(self):
+        self.calls: list[dict] = []
+
+    async def generate_stream(self, prompt: str, temperature: float = 0.7, **kwargs):
+        self.calls.append({"prompt": prompt, **kwargs})
+        for tok in ("Terse ", "is ", "curt."):
+            yield tok
+
+
+def _sse_events(resp) -> list[dict]:
+    return [json.loads(line[6:]) for line in resp.text.splitlines()
+            if line.startswith("data: ")]
+
+
+class TestChatAPI:
+    def _chat(self, client, message="Why terse?", **extra):
+        return client.post("/api/chat", json={
+            "message": message,
+            "context": {"stem": "Her ___ reply.", "choices": ["terse", "concise"],
+                        "correct_word": "terse", "selected_index": 0, "was_correct": True},
+            **extra,
+        })
+
+    def test_conversation_kept_server_side(self, test_app):
+        client, _, _ = test_app
+        app_module._chat_conversations = app_module.ConversationStore()
+        llm = StreamingFakeLLM()
+        with patch("vocab_trainer.app._get_llm", return_value=llm):
+            first = _sse_events(self._chat(client))
+            conv_id = first[0]["conversation_id"]
+            self._chat(client, "And concise?", conversation_id=conv_id)
+
+        from vocab_trainer.prompts import CHAT_SYSTEM
+        assert all(c["system"] == CHAT_SYSTEM for c in llm.calls)
+        # Second turn extends the first prompt: the shared prefix is reusable
+        before = llm.calls[0]["prompt"].removesuffix("Dr. Voss:")
+        assert llm.calls[1]["prompt"].startswith(before)
+        assert "Dr. Voss: Terse is curt." in llm.calls[1]["prompt"]
+        assert llm.calls[1]["prompt"].endswith("Student: And concise?\n\nDr. Voss:")
+
+    def test_unknown_conversation_seeded_from_history(self, test_app):
+        client, _, _ = test_app
+        llm = StreamingFakeLLM()
+        history = [{"role": "user", "content": "Earlier question"},
+                   {"role": "assistant", "content": "Earlier answer"}]
+        with patch("vocab_trainer.app._get_llm", return_value=llm):
+            events = _sse_events(self._chat(client, conversation_id="gone", history=history))
+        assert events[0]["conversation_id"] != "gone"
+        assert "Dr. Voss: Earlier answer" in llm.calls[0]["prompt"]
+
+    def test_chat_streams_tokens(self, test_app):
+        client, _, _ = test_app
+        with patch("vocab_trainer.app._get_llm", return_value=StreamingFakeLLM()):
+            resp = self._chat(client)
+        assert resp.status_code == 200
+        events = _sse_events(resp)
+        assert "".join(e.get("token", "") for e in events) == "Terse is curt."
+        assert events[-1] == {"done": True}
+
+    def test_chat_does_not_cancel_background_tasks(self, test_app):
+        """Chat outranks background work in the scheduler instead of killing it."""
+
+        async def bg_work():
+            await asyncio.sleep(0.5)
+
+        async def run():
+            task = asyncio.create_task(bg_work())
+            app_module._bg_tasks.add(task)
+            task.add_done_callback(app_module._bg_tasks.discard)
+            with patch("vocab_trainer.app._get_llm", return_value=StreamingFakeLLM()):
+                request_body = {
+                    "message": "Why?",
+                    "context": {"choices": ["terse"], "correct_word": "terse"},
+                }
+                from httpx import ASGITransport, AsyncClient
+                async with AsyncClient(transport=ASGITransport(app=app),
+                                       base_url="http://test") as ac:
+                    resp = await ac.post("/api/chat", json=request_body)
+            assert resp.status_code == 200
+            assert "curt." in resp.text
+            assert not task.done()
+            task.cancel()
+
+        asyncio.run(run())
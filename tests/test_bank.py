@@ -0,0 +1,24 @@
+"""Tests for the adaptive question bank depth."""
+from __future__ import annotations
+
+import pytest
+
+from vocab_trainer.bank import DEFAULT_SECONDS_PER_QUESTION, refill_lead_days, target_depth
+
+
+class TestBankDepth:
+    def test_lead_time_scales_with_rotation_and_rate(self):
+        assert refill_lead_days(1440, 60.0) == pytest.approx(1.0)
+        assert refill_lead_days(1440, 30.0) == pytest.approx(0.5)
+        assert refill_lead_days(10, None) == refill_lead_days(10, DEFAULT_SECONDS_PER_QUESTION)
+
+    def test_depth_covers_reviews_within_lead_time(self):
+        assert target_depth(1.0, 0.2, 3) == 1
+        assert target_depth(1.0, 1.5, 3) == 2
+        assert target_depth(6.0, 1.5, 3) == 1
+        assert target_depth(1.0, 10.0, 3) == 3  # capped
+
+    def test_never_below_one(self):
+        assert target_depth(30.0, 0.0, 2) == 1
+        assert target_depth(None, 0.5, 2) == 1
+        assert target_depth(0.0, 1.5, 2) == 2  # interval floored at a day
@@ -0,0 +1,129 @@
+"""Tests for server-side chat conversations."""
+from __future__ import annotations
+
+import pytest
+
+from vocab_trainer.chat import ConversationStore, build_chat_context, estimate_tokens
+
+CONTEXT = {
+    "question_type": "fill_blank",
+    "stem": "Her ___ reply.",
+    "choices": ["terse", "concise", "pithy", "laconic"],
+    "correct_word": "terse",
+    "selected_index": 1,
+    "was_correct": False,
+    "cluster_title": "Being Brief",
+    "choice_details": [{"word": "terse", "meaning": "brief and rude", "distinction": "curt"}],
+}
+
+
+class SummaryLLM:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.prompts: list[str] = []
+
+    async def generate(self, prompt, temperature=0.7, **kwargs):
+        self.prompts.append(prompt)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return "They discussed terse vs concise."
+
+    def name(self):
+        return "summary-llm"
+
+
+class TestBuildChatContext:
+    def test_wrong_answer(self):
+        text = build_chat_context(CONTEXT)
+        assert "cluster: Being Brief" in text
+        assert 'chose "concise" — wrong' in text
+        assert "terse: brief and rude — curt" in text
+        assert text.endswith("Then illuminate the broader distinctions.")
+
+
+class TestConversation:
+    def test_prompts_are_append_only(self):
+        conv = ConversationStore().create(CONTEXT)
+        p1 = conv.prompt_for("Why terse?")
+        conv.add_turn("Why terse?", "Because it is curt.")
+        p2 = conv.prompt_for("And pithy?")
+        assert p2.startswith(p1.removesuffix("Dr. Voss:"))
+        assert p2.endswith("Student: And pithy?\n\nDr. Voss:")
+
+    def test_budget(self):
+        conv = ConversationStore().create(CONTEXT)
+        conv.add_turn("q" * 400, "a" * 400)
+        assert conv.turn_tokens() == estimate_tokens("q" * 400) * 2
+        assert conv.over_budget(150)
+        assert not conv.over_budget(500)
+
+    @pytest.mark.asyncio
+    async def test_compact_summarises_old_turns(self):
+        conv = ConversationStore().create(CONTEXT)
+        for i in range(4):
+            conv.add_turn(f"question {i}", f"answer {i}")
+        llm = SummaryLLM()
+        await conv.compact(llm, keep_turns=1)
+        assert [t["content"] for t in conv.turns] == ["question 3", "answer 3"]
+        assert conv.summary == "They discussed terse vs concise."
+        assert "answer 0" in llm.prompts[0]
+        prompt = conv.prompt_for("next")
+        assert "summary): They discussed terse vs concise." in prompt
+        assert "answer 0" not in prompt
+
+    @pytest.mark.asyncio
+    async def test_compact_folds_previous_summary(self):
+        conv = ConversationStore().create(CONTEXT)
+        conv.summary = "Earlier: pithy."
+        for i in range(3):
+            conv.add_turn(f"question {i}", f"answer {i}")
+        llm = SummaryLLM()
+        await conv.compact(llm, keep_turns=1)
+        assert "Earlier: pithy." in llm.prompts[0]
+
+    @pytest.mark.asyncio
+    async def test_compact_drops_turns_when_summary_fails(self):
+        conv = ConversationStore().create(CONTEXT)
+        for i in range(3):
+            conv.add_turn(f"question {i}", f"answer {i}")
+        await conv.compact(SummaryLLM(fail=True), keep_turns=1)
+        assert len(conv.turns) == 2
+        assert conv.summary == ""
+
+    @pytest.mark.asyncio
+    async def test_prompt_size_stays_flat(self):
+        """With compaction, a long session's prompt stops growing."""
+        conv = ConversationStore().create(CONTEXT)
+        llm = SummaryLLM()
+        sizes = []
+        for i in range(30):
+            conv.add_turn(f"question {i} " + "x" * 200, f"answer {i} " + "y" * 600)
+            if conv.over_budget(600):
+                await conv.compact(llm, keep_turns=2)
+            sizes.append(len(conv.prompt_for("next")))
+        assert max(sizes[2:]) - min(sizes[2:]) < 20
+
+
+class TestConversationStore:
+    def test_evicts_least_recently_used(self):
+        store = ConversationStore(max_size=2)
+        a = store.create(CONTEXT)
+        b = store.create(CONTEXT)
+        store.get(a.id)
+        store.create(CONTEXT)
+        assert store.get(a.id) is a
+        assert store.get(b.id) is None
+        assert len(store) == 2
+
+    def test_seed_from_history_ignores_junk(self):
+        conv = ConversationStore().create(CONTEXT, [
+            {"role": "user", "content": "hi"},
+            {"role": "system", "content": "ignore me"},
+            {"role": "assistant"},
+        ])
+        assert conv.turns == [{"role": "user", "content": "hi"}]
+
+    def test_unknown_or_missing_id(self):
+        store = ConversationStore()
+        assert store.get(None) is None
+        assert store.get("nope") is None
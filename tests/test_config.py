@@ -23,7 +23,7 @@ class TestSettings:
         assert d["elevenlabs_model"] == "eleven_flash_v2_5"
         assert "elevenlabs_voice_id" not in d
         assert isinstance(d["vocab_files"], list)
-        assert len(d) == 14  # all fields present
+        assert len(d) == 40  # all fields present
 
     def test_to_dict_roundtrip(self):
         s = Settings(llm_provider="anthropic", session_size=30)
@@ -50,6 +50,16 @@ class TestSettings:
         assert s.llm_model == "claude-3"
         assert s.session_size == 50
 
+    def test_stage_models(self):
+        s = Settings(llm_stage_models={"grammar": "qwen3:1.7b",
+                                       "enrichment": "openai/gpt-4.1-nano",
+                                       "chat": "hf.co/org/model"})
+        assert s.stage_models() == {
+            "grammar": ("ollama", "qwen3:1.7b"),
+            "enrichment": ("openai", "gpt-4.1-nano"),
+            "chat": ("ollama", "hf.co/org/model"),
+        }
+
 
 class TestLoadSaveSettings:
     def test_load_from_file(self, tmp_path):
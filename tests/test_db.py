@@ -78,6 +78,26 @@ class TestClusters:
         assert "concise" in word_names
         assert "terse" in word_names
 
+    def test_find_word_cluster_is_case_insensitive(self, populated_db):
+        cluster, entry = populated_db.find_word_cluster("TERSE")
+        assert cluster["title"] == "Being Brief"
+        assert entry["word"] == "terse"
+        assert entry["cluster_id"] == cluster["id"]
+        assert entry["meaning"]
+        assert populated_db.find_word_cluster("nonexistent") is None
+
+    def test_get_cluster_word(self, populated_db):
+        c = populated_db.get_cluster_by_title("Being Brief")
+        assert populated_db.get_cluster_word(c["id"], "Concise")["word"] == "concise"
+        assert populated_db.get_cluster_word(c["id"], "astute") is None
+
+    def test_word_lookup_uses_index(self, populated_db):
+        plan = populated_db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM cluster_words WHERE word = ? COLLATE NOCASE",
+            ("terse",),
+        ).fetchall()
+        assert "idx_cluster_words_word" in " ".join(r[3] for r in plan)
+
 
 class TestQuestions:
     def test_save_and_retrieve(self, populated_db, sample_question):
@@ -376,6 +396,48 @@ class TestClustersNeedingQuestions:
         assert "Being Brief" not in titles
 
 
+    def test_adaptive_depth_follows_interval(self, populated_db, sample_question):
+        """A refill lead time longer than the interval asks for a deeper bank."""
+        populated_db.save_question(sample_question)
+        populated_db.upsert_cluster_progress("Being Brief", 2.5, 1.0, 1, "2026-02-20T00:00:00+00:00", True)
+        assert populated_db.get_clusters_needing_questions(lead_days=0.5, max_depth=3) == []
+
+        needing = populated_db.get_clusters_needing_questions(lead_days=1.5, max_depth=3)
+        assert needing == [{"cluster_title": "Being Brief", "ready": 1, "depth": 2}]
+        needing = populated_db.get_clusters_needing_questions(lead_days=9.0, max_depth=3)
+        assert needing[0]["depth"] == 3
+
+    def test_bank_depths(self, populated_db, sample_question):
+        populated_db.save_question(sample_question)
+        populated_db.upsert_cluster_progress("Being Brief", 2.5, 1.0, 1, "2026-02-20T00:00:00+00:00", True)
+        assert populated_db.get_bank_depths(0.0, 2) == {1: {"clusters": 1, "ready": 1, "short": 0}}
+        assert populated_db.get_bank_depths(1.5, 2) == {2: {"clusters": 1, "ready": 1, "short": 1}}
+
+
+class TestClustersDueBefore:
+    def test_due_clusters_below_depth_in_due_order(self, populated_db, sample_question):
+        populated_db.import_clusters([DistinctionCluster(
+            title="Being Wary", preamble="", commentary="",
+            entries=[DistinctionEntry(w, "", "") for w in ("wary", "chary", "leery", "cagey")],
+        )])
+        populated_db.upsert_cluster_progress("Being Brief", 2.5, 1.0, 1, "2026-02-21T00:00:00+00:00", True)
+        populated_db.upsert_cluster_progress("Being Wary", 2.5, 1.0, 1, "2026-02-20T00:00:00+00:00", True)
+        due = populated_db.get_clusters_due_before("2026-02-22T00:00:00+00:00", 1)
+        assert [d["cluster_title"] for d in due] == ["Being Wary", "Being Brief"]
+
+        populated_db.save_question(sample_question)  # Being Brief now holds one
+        due = populated_db.get_clusters_due_before("2026-02-22T00:00:00+00:00", 1)
+        assert [d["cluster_title"] for d in due] == ["Being Wary"]
+        due = populated_db.get_clusters_due_before("2026-02-22T00:00:00+00:00", 2)
+        assert {d["cluster_title"]: d["ready"] for d in due} == {"Being Wary": 0, "Being Brief": 1}
+
+    def test_excludes_later_and_archived(self, populated_db):
+        populated_db.upsert_cluster_progress("Being Brief", 2.5, 1.0, 1, "2026-03-01T00:00:00+00:00", True)
+        assert populated_db.get_clusters_due_before("2026-02-22T00:00:00+00:00", 2) == []
+        populated_db.set_cluster_archived("Being Brief", True)
+        assert populated_db.get_clusters_due_before("2026-03-02T00:00:00+00:00", 2) == []
+
+
 class TestClusterWordAccuracy:
     def test_no_history(self, populated_db):
         """No answered questions → empty accuracy."""
@@ -494,3 +556,162 @@ class TestAudioCache:
         tmp_db.set_audio_cache("abc123", "/path/old.mp3", "edge-tts")
         tmp_db.set_audio_cache("abc123", "/path/new.mp3", "piper")
         assert tmp_db.get_audio_cache("abc123") == "/path/new.mp3"
+
+
+class TestPendingQuestions:
+    """Generation checkpoints in pending_questions."""
+
+    DRAFT = {
+        "stem": "Her ___ reply surprised everyone.",
+        "choices": ["terse", "concise", "pithy", "laconic"],
+        "correct_index": 0,
+        "explanation": "Terse implies rudeness.",
+        "context_sentence": "Her terse reply surprised everyone.",
+    }
+
+    def test_save_and_get(self, populated_db):
+        populated_db.save_pending_question("p1", "Being Brief", "terse", "fill_blank", self.DRAFT)
+        pending = populated_db.get_pending_question("Being Brief")
+        assert pending["id"] == "p1"
+        assert pending["stage"] == "drafted"
+        assert pending["data"] == self.DRAFT
+        assert pending["quality_issue"] is None
+
+    def test_filter_by_question_type(self, populated_db):
+        populated_db.save_pending_question("p1", "Being Brief", "terse", "fill_blank", self.DRAFT)
+        assert populated_db.get_pending_question("Being Brief", "best_fit") is None
+        assert populated_db.get_pending_question("Being Brief", "fill_blank") is not None
+
+    def test_mark_checked(self, populated_db):
+        populated_db.save_pending_question("p1", "Being Brief", "terse", "fill_blank", self.DRAFT)
+        populated_db.mark_pending_checked("p1", "bad grammar")
+        pending = populated_db.get_pending_question("Being Brief")
+        assert pending["stage"] == "checked"
+        assert pending["quality_issue"] == "bad grammar"
+
+    def test_save_question_clears_checkpoint(self, populated_db, sample_question):
+        populated_db.save_pending_question(
+            sample_question.id, "Being Brief", "terse", "fill_blank", self.DRAFT,
+        )
+        populated_db.save_question(sample_question)
+        assert populated_db.get_pending_question("Being Brief") is None
+
+    def test_claim_skips_checkpoints_held_by_live_runs(self, populated_db):
+        populated_db.save_pending_question("p1", "Being Brief", "terse", "fill_blank", self.DRAFT)
+        populated_db.save_pending_question("p2", "Being Brief", "curt", "fill_blank", self.DRAFT,
+                                           owner="a", hold_seconds=60)
+        assert populated_db.claim_pending_question("Being Brief", "b", 60)["id"] == "p1"
+        assert populated_db.claim_pending_question("Being Brief", "c", 60) is None
+        populated_db.release_pending_question("p1", "someone-else")
+        assert populated_db.claim_pending_question("Being Brief", "c", 60) is None
+        populated_db.release_pending_question("p1", "b")
+        assert populated_db.claim_pending_question("Being Brief", "c", 60)["owner"] == "c"
+
+    def test_expired_claim_can_be_taken_over(self, populated_db):
+        populated_db.save_pending_question("p1", "Being Brief", "terse", "fill_blank", self.DRAFT,
+                                           owner="crashed", hold_seconds=-1)
+        assert populated_db.claim_pending_question("Being Brief", "b", 60)["id"] == "p1"
+
+    def test_reimport_clears_checkpoints(self, populated_db, sample_cluster):
+        sample_cluster.source_file = "distinctions.md"
+        populated_db.import_clusters([sample_cluster])
+        populated_db.save_pending_question("p1", "Being Brief", "terse", "fill_blank", self.DRAFT)
+        assert populated_db.get_pending_cluster_titles() == ["Being Brief"]
+        populated_db.delete_clusters_by_source("distinctions.md")
+        assert populated_db.get_pending_cluster_titles() == []
+
+
+class TestLLMUsage:
+    def test_calls_accumulate_per_day_provider_stage(self, tmp_db):
+        for _ in range(2):
+            tmp_db.add_llm_usage("2025-01-01", "openai/gpt-4o-mini", "grammar", 100, 40, 10, 0.001)
+        tmp_db.add_llm_usage("2025-01-01", "openai/gpt-4o-mini", "enrichment", 50, 0, 5, 0.002)
+        tmp_db.add_llm_usage("2025-01-02", "openai/gpt-4o-mini", "grammar", 999, 0, 9, 1.0)
+
+        totals = tmp_db.get_llm_usage_totals("2025-01-01")
+        assert totals["calls"] == 3
+        assert totals["prompt_tokens"] == 250
+        assert totals["tokens"] == 275
+        assert totals["cost_usd"] == pytest.approx(0.004)
+        by_stage = tmp_db.get_llm_usage_by_stage("2025-01-01")
+        assert by_stage["grammar"]["calls"] == 2
+        assert by_stage["grammar"]["cached_tokens"] == 80
+
+    def test_empty_day(self, tmp_db):
+        assert tmp_db.get_llm_usage_totals("2025-01-01")["tokens"] == 0
+        assert tmp_db.get_llm_usage_by_stage("2025-01-01") == {}
+
+
+class TestGenerationJobs:
+    def test_enqueue_tops_up_open_jobs(self, tmp_db):
+        assert tmp_db.enqueue_generation_jobs([("A", 2), ("A", 2), ("B", 2)]) == 3
+        assert tmp_db.enqueue_generation_jobs([("A", 2), ("A", 2), ("A", 2)]) == 1
+        assert tmp_db.get_generation_job_counts()["queued"] == 4
+        # needed urgently now: queued jobs move up
+        tmp_db.enqueue_generation_jobs([("B", 1)])
+        assert tmp_db.claim_generation_job("w1")["cluster_title"] == "B"
+
+    def test_claim_order_and_lifecycle(self, tmp_db):
+        tmp_db.enqueue_generation_jobs([("late", 2), ("urgent", 1), ("later", 2)])
+        first = tmp_db.claim_generation_job("w1")
+        second = tmp_db.claim_generation_job("w2")
+        assert (first["cluster_title"], first["worker"], first["attempts"]) == ("urgent", "w1", 1)
+        assert second["cluster_title"] == "late"
+
+        tmp_db.finish_generation_job(first["id"], question_id="q1")
+        tmp_db.finish_generation_job(second["id"], error="no valid question")
+        finished = tmp_db.get_finished_generation_jobs()
+        assert [(j["status"], j["question_id"]) for j in finished] == [("done", "q1"), ("failed", None)]
+        assert tmp_db.get_finished_generation_jobs(finished[-1]["finished_at"]) == []
+
+        third = tmp_db.claim_generation_job("w1")
+        tmp_db.release_generation_job(third["id"])
+        assert tmp_db.claim_generation_job("w2")["attempts"] == 2
+        assert tmp_db.claim_generation_job("w2") is None
+
+    def test_released_job_waits_out_its_delay(self, tmp_db):
+        tmp_db.enqueue_generation_jobs([("A", 1), ("B", 2)])
+        job = tmp_db.claim_generation_job("w1")
+        tmp_db.release_generation_job(job["id"], delay=60)
+        assert tmp_db.claim_generation_job("w2")["cluster_title"] == "B"
+        assert tmp_db.claim_generation_job("w2") is None
+        tmp_db.conn.execute("UPDATE generation_jobs SET not_before = '2000-01-01T00:00:00+00:00'")
+        again = tmp_db.claim_generation_job("w2")
+        assert (again["id"], again["attempts"], again["not_before"]) == (job["id"], 2, None)
+
+    def test_stale_jobs_requeued(self, tmp_db):
+        tmp_db.enqueue_generation_jobs([("A", 1)])
+        job = tmp_db.claim_generation_job("crashed")
+        assert tmp_db.requeue_stale_generation_jobs("2000-01-01T00:00:00+00:00") == 0
+        assert tmp_db.requeue_stale_generation_jobs("2100-01-01T00:00:00+00:00") == 1
+        assert tmp_db.claim_generation_job("w2")["id"] == job["id"]
+
+    def test_jobs_survive_reopen_and_prune(self, tmp_path):
+        db = Database(tmp_path / "jobs.db")
+        db.enqueue_generation_jobs([("A", 1), ("B", 2)])
+        db.finish_generation_job(db.claim_generation_job("w")["id"], question_id="q")
+        db.close()
+        db = Database(tmp_path / "jobs.db")
+        assert db.get_generation_job_counts() == {"queued": 1, "running": 0, "done": 1, "failed": 0}
+        assert db.prune_generation_jobs("2100-01-01T00:00:00+00:00") == 1
+        assert db.get_generation_job_counts()["done"] == 0
+        db.close()
+
+
+class TestLeases:
+    def test_one_holder_at_a_time(self, tmp_db):
+        assert tmp_db.acquire_lease("generation", "a", 60)
+        assert tmp_db.acquire_lease("generation", "a", 60)  # renewal
+        assert not tmp_db.acquire_lease("generation", "b", 60)
+        assert tmp_db.get_lease_holder("generation") == "a"
+        tmp_db.release_lease("generation", "b")  # not b's to release
+        assert tmp_db.get_lease_holder("generation") == "a"
+        tmp_db.release_lease("generation", "a")
+        assert tmp_db.get_lease_holder("generation") is None
+        assert tmp_db.acquire_lease("generation", "b", 60)
+
+    def test_expired_lease_is_taken_over(self, tmp_db):
+        assert tmp_db.acquire_lease("forecast", "crashed", -1)
+        assert tmp_db.get_lease_holder("forecast") is None
+        assert tmp_db.acquire_lease("forecast", "b", 60)
+        assert tmp_db.get_lease_holder("forecast") == "b"
@@ -0,0 +1,66 @@
+"""Tests for MinHash near-duplicate detection of question stems."""
+from __future__ import annotations
+
+from vocab_trainer.dedup import StemIndex, question_text, signature, similarity
+from vocab_trainer.models import Question
+
+STEM = "Her ___ reply left the committee unsure what she meant."
+CONTEXT = "Her terse reply left the committee unsure what she meant."
+
+
+def _question(qid: str, stem: str, context: str) -> Question:
+    return Question(
+        id=qid, question_type="fill_blank", stem=stem,
+        choices=["terse", "concise", "laconic", "pithy"], correct_index=0,
+        correct_word="terse", explanation="", context_sentence=context,
+        cluster_title="Being Brief", llm_provider="test",
+    )
+
+
+class TestSignature:
+    def test_identical_texts_match_exactly(self):
+        assert similarity(signature(STEM), signature(STEM.upper() + "!")) == 1.0
+
+    def test_unrelated_texts_do_not_match(self):
+        other = "The river flooded the valley after three weeks of steady rain."
+        assert similarity(signature(STEM), signature(other)) < 0.2
+
+    def test_empty_text_has_no_signature(self):
+        assert signature("___ ...") is None
+
+
+class TestStemIndex:
+    def test_finds_near_duplicate_and_ignores_new_text(self):
+        index = StemIndex()
+        index.add("q1", question_text(STEM, CONTEXT), "Being Brief")
+        near = question_text(
+            "Her ___ reply left the whole committee unsure what she meant.",
+            "Her curt reply left the whole committee unsure what she meant.",
+        )
+        qid, sim = index.find_duplicate(near, "Being Brief")
+        assert qid == "q1" and sim >= 0.6
+        assert index.find_duplicate(near, "Being Wary") is None
+        fresh = question_text("The ___ guide pointed at the map without a word.",
+                              "The laconic guide pointed at the map without a word.")
+        assert index.find_duplicate(fresh, "Being Brief") is None
+
+    def test_remove_and_replace(self):
+        index = StemIndex()
+        index.add("q1", question_text(STEM, CONTEXT))
+        index.add("q1", "Completely different words about gardening in spring time.")
+        assert index.find_duplicate(question_text(STEM, CONTEXT)) is None
+        index.remove("q1")
+        assert len(index) == 0 and index.buckets == {}
+
+    def test_database_keeps_index_current(self, populated_db):
+        index = populated_db.stem_index()
+        populated_db.save_question(_question("q1", STEM, CONTEXT))
+        assert index.find_duplicate(question_text(STEM, CONTEXT), "Being Brief")[0] == "q1"
+        populated_db.update_question_content(
+            "q1", "A ___ nod was all the answer the guide gave.", ["a", "b", "c", "d"], 0,
+            "", "A laconic nod was all the answer the guide gave.", [],
+        )
+        assert index.find_duplicate(question_text(STEM, CONTEXT), "Being Brief") is None
+        assert index.cluster_of("q1") == "Being Brief"
+        rebuilt = StemIndex.from_db(populated_db)
+        assert rebuilt.signatures == index.signatures
@@ -0,0 +1,129 @@
+"""Tests for the optional embedding index."""
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from vocab_trainer.embeddings import (  # noqa: E402
+    HashingEmbedder,
+    OllamaEmbedder,
+    make_embedder,
+    refresh,
+    sync_embeddings,
+)
+from vocab_trainer.models import DistinctionCluster, DistinctionEntry, VocabWord  # noqa: E402
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=64)
+        self.texts: list[str] = []
+
+    def embed(self, texts):
+        self.texts += texts
+        return super().embed(texts)
+
+
+@pytest.fixture
+def two_clusters(populated_db):
+    populated_db.import_clusters([DistinctionCluster(
+        title="Talking Too Much", preamble="", commentary="",
+        entries=[
+            DistinctionEntry("verbose", "using more words than needed", "wordy and long"),
+            DistinctionEntry("garrulous", "excessively talkative", "about trivial things"),
+            DistinctionEntry("loquacious", "tending to talk a great deal", "fluent, sociable"),
+            DistinctionEntry("prolix", "tediously lengthy", "written rather than spoken"),
+        ],
+    )])
+    return populated_db
+
+
+class TestSync:
+    def test_incremental(self, two_clusters):
+        db, embedder = two_clusters, CountingEmbedder()
+        # 15 words (cluster words are imported into words too) + 10 cluster entries
+        assert sync_embeddings(db, embedder) == {"embedded": 25, "removed": 0, "total": 25}
+        assert sync_embeddings(db, embedder)["embedded"] == 0
+
+        db.delete_words_by_source("vocabulary.md")
+        db.import_words([VocabWord("astute", "shrewd and perceptive", "Cognition", "vocabulary.md")])
+        embedder.texts.clear()
+        assert sync_embeddings(db, embedder) == {"embedded": 1, "removed": 4, "total": 21}
+        assert embedder.texts == ["astute: shrewd and perceptive"]
+
+    def test_model_change_reembeds(self, populated_db):
+        sync_embeddings(populated_db, HashingEmbedder(dim=64))
+        assert sync_embeddings(populated_db, HashingEmbedder(dim=32))["embedded"] == 17
+        index = populated_db.embedding_index()
+        assert index.word_matrix.shape == (11, 32)
+
+    def test_refresh_is_optional(self, populated_db):
+        assert make_embedder("") is None
+        assert refresh(populated_db, "") is None
+        assert populated_db.embedding_index() is None
+        # an unreachable backend leaves the index out rather than failing the import
+        assert refresh(populated_db, "nomic-embed-text", "http://127.0.0.1:9") is None
+
+
+class TestIndex:
+    def test_nearest_words(self, two_clusters):
+        db = two_clusters
+        db.import_words([VocabWord("wordy", "using too many words, long-winded", "Style", "x.md")])
+        sync_embeddings(db, HashingEmbedder())
+        index = db.embedding_index()
+        members = ["verbose", "garrulous", "loquacious", "prolix"]
+        assert index.nearest_words("Talking Too Much", 1, exclude=members) == ["wordy"]
+        words = index.nearest_words("Talking Too Much", 20, exclude=members + ["WORDY"])
+        assert len(words) == 11 and not set(words) & set(members + ["wordy"])
+
+    def test_distractor_candidates_come_from_other_clusters(self, two_clusters):
+        sync_embeddings(two_clusters, HashingEmbedder())
+        index = two_clusters.embedding_index()
+        picked = index.distractor_candidates("Being Brief", "terse", 3)
+        assert len(picked) == 3
+        assert set(picked) <= {"verbose", "garrulous", "loquacious", "prolix"}
+        assert index.distractor_candidates("Being Brief", "nonexistent", 3) == []
+
+    def test_reloaded_after_sync(self, populated_db):
+        sync_embeddings(populated_db, HashingEmbedder())
+        first = populated_db.embedding_index()
+        assert populated_db.embedding_index() is first
+        populated_db.import_words([VocabWord("brisk", "quick and energetic", "Energy", "y.md")])
+        sync_embeddings(populated_db, HashingEmbedder())
+        assert populated_db.embedding_index() is not first
+        assert "brisk" in populated_db.embedding_index().words
+
+
+class TestOllamaEmbedder:
+    def test_batches_through_api_embed(self):
+        bodies = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                bodies.append((self.path, body))
+                reply = json.dumps({"embeddings": [[1.0, float(i)] for i in range(len(body["input"]))]})
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply.encode())
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            embedder = make_embedder("nomic-embed-text", url)
+            assert isinstance(embedder, OllamaEmbedder)
+            assert embedder.embed(["a", "b"]) == [[1.0, 0.0], [1.0, 1.0]]
+        finally:
+            server.shutdown()
+        assert bodies == [("/api/embed", {"model": "nomic-embed-text", "input": ["a", "b"]})]
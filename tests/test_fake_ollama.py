@@ -0,0 +1,140 @@
+"""Tests for the fake Ollama server, driven through the real OllamaProvider."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from vocab_trainer.fake_ollama import FakeOllama, _duration
+from vocab_trainer.providers.base import add_usage_listener, remove_usage_listener
+from vocab_trainer.providers.llm_ollama import OllamaProvider
+
+
+@pytest.fixture
+def fake():
+    server = FakeOllama(token_rate=0, prompt_rate=0).start()
+    yield server
+    server.close()
+
+
+def _provider(fake: FakeOllama, **kw) -> OllamaProvider:
+    return OllamaProvider(base_url=fake.url, model="qwen3:8b", **kw)
+
+
+class TestGenerate:
+    @pytest.mark.asyncio
+    async def test_generate_reports_usage(self, fake):
+        seen = []
+        add_usage_listener(seen.append)
+        try:
+            llm = _provider(fake)
+            text = await llm.generate("Say something.", thinking=False)
+            await llm.aclose()
+        finally:
+            remove_usage_listener(seen.append)
+        assert text.startswith("Words that share a meaning")
+        assert "think" not in text
+        assert seen[0]["completion_tokens"] > 0
+        assert seen[0]["prefill_tokens"] > 0
+
+    @pytest.mark.asyncio
+    async def test_without_think_flag_thinking_is_inline(self, fake):
+        async with httpx.AsyncClient(base_url=fake.url) as c:
+            async with c.stream("POST", "/api/generate",
+                                json={"model": "qwen3:8b", "prompt": "hi"}) as r:
+                lines = [json.loads(line) async for line in r.aiter_lines() if line.strip()]
+        tokens = [line["response"] for line in lines]
+        assert tokens[0] == "<think>"
+        assert lines[-1]["done"] and lines[-1]["eval_count"] == len(lines) - 1
+
+        llm = _provider(fake)
+        body = llm._body(prompt="hi", stream=True)
+        streamed = "".join([t async for t in llm._stream_tokens(body)])
+        await llm.aclose()
+        assert streamed.startswith("<think>")
+
+    @pytest.mark.asyncio
+    async def test_think_true_uses_separate_field(self, fake):
+        async with httpx.AsyncClient(base_url=fake.url) as c:
+            r = await c.post("/api/generate", json={
+                "model": "qwen3:8b", "prompt": "hi", "stream": False, "think": True,
+            })
+        data = r.json()
+        assert data["thinking"]
+        assert "<think>" not in data["response"]
+
+    @pytest.mark.asyncio
+    async def test_pipeline_prompts_get_valid_json(self, fake):
+        llm = _provider(fake)
+        prompt = ("Target word: **wary**\n\n- **wary**: cautious\n- **chary**: sparing\n"
+                  "- **leery**: suspicious\n- **cagey**: secretive\n")
+        text = "".join([t async for t in llm.generate_stream(prompt, thinking=False)])
+        await llm.aclose()
+        assert "wary" in json.loads(text)["choices"]
+
+
+class TestGpu:
+    @pytest.mark.asyncio
+    async def test_single_gpu_serialises_requests(self):
+        fake = FakeOllama(token_rate=100, prompt_rate=0, tokens=10).start()
+        try:
+            llm = _provider(fake)
+            t0 = time.monotonic()
+            await asyncio.gather(*(llm.generate("hi", thinking=False) for _ in range(3)))
+            elapsed = time.monotonic() - t0
+            await llm.aclose()
+        finally:
+            fake.close()
+        one = len(fake._answer("hi", False)[1]) / 100
+        assert elapsed >= 3 * one * 0.9
+        assert fake.stats()["max_waiting"] >= 2
+
+    @pytest.mark.asyncio
+    async def test_disconnect_frees_the_gpu(self):
+        fake = FakeOllama(token_rate=20, prompt_rate=0, tokens=200).start()
+        try:
+            llm = _provider(fake)
+            task = asyncio.create_task(llm.generate("long", thinking=False))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await llm.aclose()
+            for _ in range(100):
+                if fake.stats()["disconnects"]:
+                    break
+                await asyncio.sleep(0.02)
+            assert fake.gpus.acquire(timeout=1.0)
+            fake.gpus.release()
+        finally:
+            fake.close()
+        assert fake.stats()["disconnects"] == 1
+
+
+class TestResidency:
+    @pytest.mark.asyncio
+    async def test_warm_up_evict_and_status(self):
+        fake = FakeOllama(load_delay=0.1).start()
+        try:
+            llm = _provider(fake, keep_alive="30m")
+            assert not (await llm.status())["resident"]
+            assert await llm.warm_up() >= 0.1
+            assert (await llm.status())["resident"]
+            assert await llm.ping()
+            async with httpx.AsyncClient(base_url=fake.url) as c:
+                await c.post("/api/generate", json={"model": "qwen3:8b", "keep_alive": 0})
+            assert not (await llm.status())["resident"]
+            await llm.aclose()
+        finally:
+            fake.close()
+
+    def test_duration_parsing(self):
+        assert _duration("30m") == 1800
+        assert _duration("500ms") == 0.5
+        assert _duration(0) == 0
+        assert _duration(-1) == float("inf")
+        assert _duration("-1m") == float("inf")
+        assert _duration(None) == 300
@@ -0,0 +1,293 @@
+"""Tests for the Anthropic and OpenAI providers, against a local stub API server."""
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vocab_trainer.providers.base import add_usage_listener, llm_stage, remove_usage_listener
+from vocab_trainer.providers.llm_anthropic import AnthropicProvider
+from vocab_trainer.providers.llm_openai import OpenAIProvider
+
+ANTHROPIC_REPLY = {
+    "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-test",
+    "content": [{"type": "text", "text": "hello"}],
+    "stop_reason": "end_turn", "stop_sequence": None,
+    "usage": {"input_tokens": 20, "output_tokens": 5,
+              "cache_read_input_tokens": 1500, "cache_creation_input_tokens": 0},
+}
+
+OPENAI_REPLY = {
+    "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-test",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": "hello"}}],
+    "usage": {"prompt_tokens": 1600, "completion_tokens": 5, "total_tokens": 1605,
+              "prompt_tokens_details": {"cached_tokens": 1280}},
+}
+
+
+PAUSE = object()
+
+
+class _StubAPI:
+    """Answers every POST with *reply* and records the request bodies.
+
+    A list *reply* is sent as a server-sent event stream instead: each item
+    is an ``(event, data)`` pair (``event`` may be None); ``data`` is JSON-
+    encoded unless it is a string.  At a :data:`PAUSE` item the stream waits
+    until :attr:`release` is set, so a test can check that the first tokens
+    arrived before the rest of the response was even written.
+    """
+
+    def __init__(self, reply: dict | list):
+        self.bodies: list[dict] = []
+        self.release = threading.Event()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                stub.bodies.append(json.loads(self.rfile.read(length)))
+                if isinstance(reply, list):
+                    self._stream(reply)
+                    return
+                body = json.dumps(reply).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, events):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for item in events:
+                    if item is PAUSE:
+                        assert stub.release.wait(timeout=5), "client never saw the first tokens"
+                        continue
+                    event, data = item
+                    frame = f"event: {event}\n" if event else ""
+                    frame += f"data: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+                    self.wfile.write(frame.encode())
+                    self.wfile.flush()
+                self.close_connection = True
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True,
+        ).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def api_keys(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+
+@pytest.fixture
+def usage():
+    records: list[dict] = []
+    add_usage_listener(records.append)
+    yield records
+    remove_usage_listener(records.append)
+
+
+class TestAnthropicPromptCache:
+    @pytest.mark.asyncio
+    async def test_system_prefix_marked_cacheable(self, usage):
+        stub = _StubAPI(ANTHROPIC_REPLY)
+        try:
+            llm = AnthropicProvider(model="claude-test", base_url=stub.url)
+            with llm_stage("fill_blank"):
+                assert await llm.generate("item", system="STATIC") == "hello"
+        finally:
+            stub.close()
+        body = stub.bodies[0]
+        assert body["system"] == [
+            {"type": "text", "text": "STATIC", "cache_control": {"type": "ephemeral"}},
+        ]
+        assert body["messages"] == [{"role": "user", "content": "item"}]
+        assert body["temperature"] == 0.7
+        assert usage[0]["stage"] == "fill_blank"
+        assert usage[0]["cached_tokens"] == 1500
+        assert usage[0]["prompt_tokens"] == 1520
+        assert usage[0]["prefill_tokens"] == 20
+
+    @pytest.mark.asyncio
+    async def test_no_system_block_without_system(self, usage):
+        stub = _StubAPI(ANTHROPIC_REPLY)
+        try:
+            await AnthropicProvider(model="claude-test", base_url=stub.url).generate("item")
+        finally:
+            stub.close()
+        assert "system" not in stub.bodies[0]
+
+
+def _anthropic_events(with_thinking: bool) -> list:
+    def block_delta(index, delta):
+        return ("content_block_delta", {"type": "content_block_delta", "index": index, "delta": delta})
+
+    def block(kind, index, **fields):
+        return [
+            ("content_block_start", {"type": "content_block_start", "index": index,
+                                     "content_block": {"type": kind, **fields}}),
+        ]
+
+    events = [("message_start", {"type": "message_start", "message": {
+        "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-test",
+        "content": [], "stop_reason": None, "stop_sequence": None,
+        "usage": {"input_tokens": 20, "output_tokens": 1,
+                  "cache_read_input_tokens": 1500, "cache_creation_input_tokens": 0},
+    }})]
+    index = 0
+    if with_thinking:
+        events += block("thinking", 0, thinking="", signature="")
+        events.append(block_delta(0, {"type": "thinking_delta", "thinking": "Let me consider..."}))
+        events.append(("content_block_stop", {"type": "content_block_stop", "index": 0}))
+        index = 1
+    events += block("text", index, text="")
+    events.append(block_delta(index, {"type": "text_delta", "text": "Hel"}))
+    events.append(PAUSE)
+    for text in ("lo ", "there"):
+        events.append(block_delta(index, {"type": "text_delta", "text": text}))
+    events += [
+        ("content_block_stop", {"type": "content_block_stop", "index": index}),
+        ("message_delta", {"type": "message_delta",
+                           "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                           "usage": {"output_tokens": 9}}),
+        ("message_stop", {"type": "message_stop"}),
+    ]
+    return events
+
+
+def _openai_events(contents: list[str]) -> list:
+    def chunk(delta, usage=None, finish=None):
+        return (None, {
+            "id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": "gpt-test",
+            "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish}],
+            "usage": usage,
+        })
+
+    events = [chunk({"role": "assistant", "content": ""})]
+    events.append(chunk({"content": contents[0]}))
+    events.append(PAUSE)
+    events += [chunk({"content": c}) for c in contents[1:]]
+    events += [
+        chunk({}, finish="stop"),
+        chunk(None, usage={"prompt_tokens": 1600, "completion_tokens": 5, "total_tokens": 1605,
+                           "prompt_tokens_details": {"cached_tokens": 1280}}),
+        (None, "[DONE]"),
+    ]
+    return events
+
+
+async def _collect(stub: _StubAPI, stream) -> list[str]:
+    tokens = []
+    async for token in stream:
+        tokens.append(token)
+        stub.release.set()
+    return tokens
+
+
+class TestAnthropicStreaming:
+    @pytest.mark.asyncio
+    async def test_streams_text_deltas_incrementally(self, usage):
+        stub = _StubAPI(_anthropic_events(with_thinking=False))
+        try:
+            llm = AnthropicProvider(model="claude-test", base_url=stub.url)
+            with llm_stage("chat"):
+                tokens = await _collect(
+                    stub, llm.generate_stream("hi", temperature=0.4, system="PERSONA", thinking=False),
+                )
+        finally:
+            stub.close()
+        assert tokens == ["Hel", "lo ", "there"]
+        body = stub.bodies[0]
+        assert body["stream"] is True
+        assert body["temperature"] == 0.4
+        assert "thinking" not in body
+        assert body["system"] == [
+            {"type": "text", "text": "PERSONA", "cache_control": {"type": "ephemeral"}},
+        ]
+        assert usage == [{
+            "stage": "chat", "provider": "anthropic/claude-test", "prompt_tokens": 1520,
+            "cached_tokens": 1500, "cache_creation_tokens": 0, "prefill_tokens": 20,
+            "completion_tokens": 9,
+        }]
+
+    @pytest.mark.asyncio
+    async def test_thinking_enabled_but_not_yielded(self, usage):
+        stub = _StubAPI(_anthropic_events(with_thinking=True))
+        try:
+            llm = AnthropicProvider(model="claude-test", base_url=stub.url)
+            tokens = await _collect(stub, llm.generate_stream("hi", thinking=True))
+        finally:
+            stub.close()
+        assert "".join(tokens) == "Hello there"
+        body = stub.bodies[0]
+        assert body["thinking"]["type"] == "enabled"
+        assert body["max_tokens"] > body["thinking"]["budget_tokens"]
+        assert "temperature" not in body
+        assert "system" not in body
+
+
+class TestOpenAIStreaming:
+    @pytest.mark.asyncio
+    async def test_streams_content_deltas_incrementally(self, usage):
+        stub = _StubAPI(_openai_events(["Hello there, ", "student"]))
+        try:
+            llm = OpenAIProvider(model="gpt-test", base_url=stub.url)
+            with llm_stage("chat"):
+                tokens = await _collect(stub, llm.generate_stream("hi", system="PERSONA", thinking=False))
+        finally:
+            stub.close()
+        assert "".join(tokens) == "Hello there, student"
+        assert len(tokens) > 1
+        body = stub.bodies[0]
+        assert body["stream"] is True
+        assert body["stream_options"] == {"include_usage": True}
+        assert body["messages"][0] == {"role": "system", "content": "PERSONA"}
+        assert usage[0]["stage"] == "chat"
+        assert usage[0]["cached_tokens"] == 1280
+        assert usage[0]["completion_tokens"] == 5
+
+    @pytest.mark.asyncio
+    async def test_think_tags_stripped(self, usage):
+        stub = _StubAPI(_openai_events(["<thi", "nk>reasoning</th", "ink>An", "swer"]))
+        stub.release.set()  # nothing visible before the answer
+        try:
+            llm = OpenAIProvider(model="gpt-test", base_url=stub.url)
+            tokens = await _collect(stub, llm.generate_stream("hi"))
+        finally:
+            stub.close()
+        assert "".join(tokens) == "Answer"
+
+
+class TestOpenAIPromptCache:
+    @pytest.mark.asyncio
+    async def test_system_message_first_and_cached_tokens_reported(self, usage):
+        stub = _StubAPI(OPENAI_REPLY)
+        try:
+            llm = OpenAIProvider(model="gpt-test", base_url=stub.url)
+            with llm_stage("enrichment"):
+                assert await llm.generate("item", system="STATIC") == "hello"
+        finally:
+            stub.close()
+        assert stub.bodies[0]["messages"] == [
+            {"role": "system", "content": "STATIC"},
+            {"role": "user", "content": "item"},
+        ]
+        assert usage[0]["stage"] == "enrichment"
+        assert usage[0]["cached_tokens"] == 1280
+        assert usage[0]["prefill_tokens"] == 320
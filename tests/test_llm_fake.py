@@ -0,0 +1,72 @@
+"""Tests for the deterministic offline LLM provider."""
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from vocab_trainer.providers.llm_fake import FakeLLMProvider
+from vocab_trainer.question_generator import generate_question
+
+
+@pytest.fixture
+def cluster(populated_db):
+    return populated_db.get_cluster_by_title("Being Brief")
+
+
+def _target(cluster_db, word="terse"):
+    cw = cluster_db.get_cluster_words(cluster_db.get_cluster_by_title("Being Brief")["id"])
+    return next(w for w in cw if w["word"] == word)
+
+
+class TestFakeLLMProvider:
+    @pytest.mark.asyncio
+    async def test_full_pipeline_without_failures(self, populated_db, cluster):
+        llm = FakeLLMProvider()
+        q = await generate_question(llm, populated_db, cluster=cluster,
+                                    target_word_info=_target(populated_db))
+        assert q is not None
+        assert q.correct_word == "terse"
+        assert q.choices[q.correct_index] == "terse"
+        assert q.quality_issue is None
+        assert len(q.choice_details) == 4
+        assert q.choice_details[0]["why"]
+        assert llm.calls == {"draft": 1, "grammar": 1, "enrichment": 1}
+
+    @pytest.mark.asyncio
+    async def test_scripted_failures_trigger_retries(self, populated_db, cluster):
+        llm = FakeLLMProvider(script=["bad_json", "missing_target", None, "grammar_fail"])
+        q = await generate_question(llm, populated_db, cluster=cluster,
+                                    target_word_info=_target(populated_db))
+        assert llm.calls == {"draft": 3, "grammar": 1}
+        assert llm.failures == {"bad_json": 1, "missing_target": 1, "grammar_fail": 1}
+        assert q.quality_issue
+
+    @pytest.mark.asyncio
+    async def test_error_raises(self):
+        with pytest.raises(ConnectionError):
+            await FakeLLMProvider(script=["error"]).generate("hi")
+
+    def test_unknown_failure_mode_rejected(self):
+        with pytest.raises(ValueError, match="typo"):
+            FakeLLMProvider(failure_rates={"typo": 0.1})
+
+    @pytest.mark.asyncio
+    async def test_same_seed_same_run(self, populated_db, cluster):
+        async def run():
+            llm = FakeLLMProvider(failure_rates={"bad_json": 0.3, "grammar_fail": 0.3}, seed=42)
+            for _ in range(5):
+                await generate_question(llm, populated_db, cluster=cluster,
+                                        target_word_info=_target(populated_db), checkpoint=False)
+            return llm.calls, llm.failures
+
+        assert await run() == await run()
+
+    @pytest.mark.asyncio
+    async def test_latency_and_token_rate(self):
+        llm = FakeLLMProvider(latency=0.02, tokens_per_second=2000)
+        t0 = time.monotonic()
+        chunks = [c async for c in llm.generate_stream("Say something.")]
+        assert time.monotonic() - t0 >= 0.02
+        assert len(chunks) > 1
+        assert "".join(chunks) == await llm.generate("Say something.")
@@ -0,0 +1,186 @@
+"""Tests for OllamaProvider's pooled HTTP client, against a local keep-alive stub."""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vocab_trainer.providers.base import add_usage_listener, llm_stage, remove_usage_listener
+from vocab_trainer.providers.llm_ollama import OllamaProvider
+
+
+class _KeepAliveOllama:
+    """HTTP/1.1 Ollama stand-in that counts TCP connections it accepted."""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self.bodies: list[dict] = []
+        self.loaded: list[str] = []  # models reported by /api/ps
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, body: bytes, ctype: str = "application/json"):
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/ps":
+                    models = [{"name": m, "model": m, "expires_at": "2099-01-01T00:00:00Z",
+                               "size_vram": 1024} for m in stub.loaded]
+                    return self._reply(json.dumps({"models": models}).encode())
+                self._reply(json.dumps({"models": []}).encode())
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                req = json.loads(self.rfile.read(length))
+                stub.requests += 1
+                stub.bodies.append(req)
+                if not req.get("prompt"):
+                    # Empty prompt: Ollama just loads the model
+                    stub.loaded.append(req["model"])
+                    return self._reply(json.dumps({"response": "", "done": True}).encode())
+                timings = {"prompt_eval_count": 12, "prompt_eval_duration": 30_000_000,
+                           "eval_count": 1}
+                if req.get("stream"):
+                    lines = [{"response": "hi", "done": False},
+                             {"response": "", "done": True, **timings}]
+                    body = "".join(json.dumps(l) + "\n" for l in lines).encode()
+                    return self._reply(body, "application/x-ndjson")
+                self._reply(json.dumps({"response": "hi", **timings}).encode())
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True,
+        )
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    s = _KeepAliveOllama()
+    yield s
+    s.close()
+
+
+class TestPooledClient:
+    @pytest.mark.asyncio
+    async def test_sequential_calls_reuse_one_connection(self, stub):
+        llm = OllamaProvider(base_url=stub.url, model="m")
+        for _ in range(5):
+            assert await llm.generate("p") == "hi"
+        assert [t async for t in llm.generate_stream("p")] == ["hi"]
+        assert await llm.ping()
+        await llm.aclose()
+        assert stub.requests == 6
+        assert stub.connections == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_respect_connection_limit(self, stub):
+        llm = OllamaProvider(base_url=stub.url, model="m", max_connections=2)
+        await asyncio.gather(*(llm.generate("p") for _ in range(6)))
+        await llm.aclose()
+        assert stub.requests == 6
+        assert stub.connections <= 2
+
+    @pytest.mark.asyncio
+    async def test_aclose_then_reuse_opens_new_client(self, stub):
+        llm = OllamaProvider(base_url=stub.url, model="m")
+        await llm.generate("p")
+        await llm.aclose()
+        assert llm._client is None
+        assert await llm.generate("p") == "hi"
+        await llm.aclose()
+        assert stub.connections == 2
+
+    def test_new_event_loop_gets_fresh_client(self, stub):
+        # The CLI runs one asyncio.run() per question with the same provider
+        llm = OllamaProvider(base_url=stub.url, model="m")
+        assert asyncio.run(llm.generate("p")) == "hi"
+        assert asyncio.run(llm.generate("p")) == "hi"
+        assert stub.requests == 2
+
+    def test_timeouts_and_limits_are_configurable(self):
+        llm = OllamaProvider(timeout=30.0, connect_timeout=2.0, max_connections=3)
+        assert llm.timeout.read == 30.0
+        assert llm.timeout.connect == 2.0
+        assert llm.limits.max_connections == 3
+
+
+class TestKeepAliveAndWarmUp:
+    @pytest.mark.asyncio
+    async def test_keep_alive_sent_on_every_request(self, stub):
+        llm = OllamaProvider(base_url=stub.url, model="m", keep_alive="30m")
+        await llm.generate("p")
+        [t async for t in llm.generate_stream("p")]
+        await llm.aclose()
+        assert [b["keep_alive"] for b in stub.bodies] == ["30m", "30m"]
+
+    @pytest.mark.asyncio
+    async def test_no_keep_alive_leaves_server_default(self, stub):
+        llm = OllamaProvider(base_url=stub.url, model="m")
+        await llm.generate("p")
+        await llm.aclose()
+        assert "keep_alive" not in stub.bodies[0]
+
+    @pytest.mark.asyncio
+    async def test_warm_up_loads_model_and_status_reports_it(self, stub):
+        llm = OllamaProvider(base_url=stub.url, model="qwen3", keep_alive=-1)
+        assert (await llm.status())["resident"] is False
+        await llm.warm_up()
+        assert stub.bodies[-1] == {"model": "qwen3", "prompt": "", "keep_alive": -1}
+        stub.loaded = ["qwen3:latest"]  # Ollama reports the tagged name
+        status = await llm.status()
+        await llm.aclose()
+        assert status["reachable"] and status["resident"]
+        assert status["size_vram"] == 1024
+
+    @pytest.mark.asyncio
+    async def test_status_when_server_down(self):
+        llm = OllamaProvider(base_url="http://127.0.0.1:9", model="m", connect_timeout=0.5)
+        status = await llm.status()
+        await llm.aclose()
+        assert status["reachable"] is False
+        assert status["resident"] is False
+
+
+class TestSystemPrefixAndUsage:
+    @pytest.mark.asyncio
+    async def test_system_sent_separately_and_usage_reported(self, stub):
+        usage = []
+        add_usage_listener(usage.append)
+        try:
+            llm = OllamaProvider(base_url=stub.url, model="m")
+            with llm_stage("grammar"):
+                await llm.generate("item", system="STATIC PREFIX")
+            with llm_stage("chat"):
+                [t async for t in llm.generate_stream("hello", system="PERSONA")]
+            await llm.aclose()
+        finally:
+            remove_usage_listener(usage.append)
+        assert stub.bodies[0]["system"] == "STATIC PREFIX"
+        assert stub.bodies[0]["prompt"] == "item"
+        assert [u["stage"] for u in usage] == ["grammar", "chat"]
+        assert usage[0]["prefill_tokens"] == 12
+        assert usage[0]["prefill_seconds"] == pytest.approx(0.03)
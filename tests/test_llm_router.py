@@ -0,0 +1,227 @@
+"""Tests for the multi-backend LLM router, against local fake Ollama servers."""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from vocab_trainer.providers.llm_ollama import OllamaProvider
+from vocab_trainer.providers.llm_router import RouterProvider, build_ollama_router
+
+
+class _FakeOllama:
+    """Minimal Ollama stand-in: /api/generate after *delay* seconds, /api/tags."""
+
+    def __init__(self, delay: float = 0.0, label: str = "x"):
+        self.delay = delay
+        self.label = label
+        self.fail = False
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: bytes, ctype: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if fake.fail:
+                    return self._reply(503, b"{}")
+                self._reply(200, json.dumps({"models": []}).encode())
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                req = json.loads(self.rfile.read(length))
+                fake.requests += 1
+                if fake.fail:
+                    return self._reply(500, b'{"error": "boom"}')
+                time.sleep(fake.delay)
+                text = f"from-{fake.label}"
+                if req.get("stream"):
+                    lines = [{"response": text, "done": False}, {"response": "", "done": True}]
+                    body = "".join(json.dumps(l) + "\n" for l in lines).encode()
+                    return self._reply(200, body, "application/x-ndjson")
+                self._reply(200, json.dumps({"response": text, "eval_count": 1}).encode())
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True,
+        )
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def servers():
+    started: list[_FakeOllama] = []
+
+    def make(delay: float, label: str) -> _FakeOllama:
+        s = _FakeOllama(delay, label)
+        started.append(s)
+        return s
+
+    yield make
+    for s in started:
+        s.close()
+
+
+class TestRouterProvider:
+    @pytest.mark.asyncio
+    async def test_prefers_faster_backend(self, servers):
+        fast, slow = servers(0.01, "fast"), servers(0.2, "slow")
+        router = build_ollama_router([slow.url, fast.url], "m")
+        # Prime both latency estimates
+        await asyncio.gather(router.generate("a"), router.generate("b"))
+        results = [await router.generate("q") for _ in range(5)]
+        assert results == ["from-fast"] * 5
+        stats = {s["url"]: s for s in router.stats()}
+        assert stats[fast.url]["latency_s"] < stats[slow.url]["latency_s"]
+
+    @pytest.mark.asyncio
+    async def test_spreads_concurrent_load(self, servers):
+        a, b = servers(0.1, "a"), servers(0.1, "b")
+        router = build_ollama_router([a.url, b.url], "m")
+        results = await asyncio.gather(*(router.generate(f"q{i}") for i in range(6)))
+        assert set(results) == {"from-a", "from-b"}
+        assert a.requests >= 2 and b.requests >= 2
+
+    @pytest.mark.asyncio
+    async def test_fails_over_and_ejects(self, servers):
+        good, bad = servers(0.0, "good"), servers(0.0, "bad")
+        bad.fail = True
+        router = RouterProvider(
+            [OllamaProvider(base_url=bad.url, model="m"), OllamaProvider(base_url=good.url, model="m")],
+            eject_after=1, eject_seconds=60,
+        )
+        # Make the bad backend look attractive so it gets tried first
+        router.backends[0].latency = 0.001
+        router.backends[1].latency = 1.0
+        assert await router.generate("q") == "from-good"
+        stats = {s["url"]: s for s in router.stats()}
+        assert stats[bad.url]["healthy"] is False
+        assert stats[bad.url]["ejections"] == 1
+        bad_before = bad.requests
+        for _ in range(3):
+            assert await router.generate("q") == "from-good"
+        assert bad.requests == bad_before  # ejected — no more traffic
+
+    @pytest.mark.asyncio
+    async def test_readmits_after_cooldown_when_healthy(self, servers):
+        good, flaky = servers(0.0, "good"), servers(0.0, "flaky")
+        flaky.fail = True
+        router = RouterProvider(
+            [OllamaProvider(base_url=flaky.url, model="m"), OllamaProvider(base_url=good.url, model="m")],
+            eject_after=1, eject_seconds=60,
+        )
+        router.backends[0].latency = 0.001
+        router.backends[1].latency = 1.0
+        await router.generate("q")
+        assert router.stats()[0]["healthy"] is False
+
+        # Still failing its health probe after the cooldown — stays out
+        router.backends[0].ejected_until = time.monotonic() - 1
+        assert await router.generate("q") == "from-good"
+        await router.backends[0].probe
+        assert router.stats()[0]["healthy"] is False
+
+        flaky.fail = False
+        router.backends[0].ejected_until = time.monotonic() - 1
+        assert await router.generate("q") == "from-good"  # probe runs alongside
+        await router.backends[0].probe
+        assert router.stats()[0]["healthy"] is True
+        assert await router.generate("q") == "from-flaky"
+
+    @pytest.mark.asyncio
+    async def test_slow_probe_never_blocks_requests(self, servers):
+        good, flaky = servers(0.0, "good"), servers(0.0, "flaky")
+        router = RouterProvider(
+            [OllamaProvider(base_url=flaky.url, model="m"), OllamaProvider(base_url=good.url, model="m")],
+            eject_after=1, eject_seconds=60,
+        )
+        release = asyncio.Event()
+        pings = 0
+
+        async def slow_ping() -> bool:
+            nonlocal pings
+            pings += 1
+            await release.wait()
+            return True
+
+        router.backends[0].provider.ping = slow_ping
+        router.backends[0].ejected_until = time.monotonic() - 1
+        results = await asyncio.wait_for(
+            asyncio.gather(*(router.generate(f"q{i}") for i in range(3))), timeout=2)
+        assert results == ["from-good"] * 3
+        assert pings == 1  # one probe in flight per backend
+        release.set()
+        await router.backends[0].probe
+        assert router.stats()[0]["healthy"] is True
+        await router.aclose()
+
+    @pytest.mark.asyncio
+    async def test_last_resort_success_readmits(self, servers):
+        ejected, failing = servers(0.0, "ejected"), servers(0.0, "failing")
+        failing.fail = True
+        router = RouterProvider(
+            [OllamaProvider(base_url=ejected.url, model="m"),
+             OllamaProvider(base_url=failing.url, model="m")],
+            eject_after=1, eject_seconds=60,
+        )
+        router.backends[0].ejected_until = time.monotonic() + 60  # cooldown still running
+        assert await router.generate("q") == "from-ejected"
+        assert router.stats()[0]["healthy"] is True
+        assert router.stats()[1]["healthy"] is False
+        assert await router.generate("q") == "from-ejected"
+
+    @pytest.mark.asyncio
+    async def test_all_backends_down_raises(self, servers):
+        a = servers(0.0, "a")
+        a.fail = True
+        router = build_ollama_router([a.url], "m")
+        with pytest.raises(Exception):
+            await router.generate("q")
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_before_first_token(self, servers):
+        good, bad = servers(0.0, "good"), servers(0.0, "bad")
+        bad.fail = True
+        router = build_ollama_router([bad.url, good.url], "m")
+        router.backends[0].latency = 0.001
+        router.backends[1].latency = 1.0
+        tokens = [t async for t in router.generate_stream("q")]
+        assert "".join(tokens) == "from-good"
+
+    def test_name_single_model(self):
+        router = build_ollama_router(["http://a", "http://b"], "qwen3:8b")
+        assert router.name() == "ollama/qwen3:8b"
+
+    def test_requires_backends(self):
+        with pytest.raises(ValueError):
+            RouterProvider([])
+
+
+class TestWarmUpAndStatus:
+    @pytest.mark.asyncio
+    async def test_warm_up_and_status_cover_every_backend(self, servers):
+        a, b = servers(0, "a"), servers(0, "b")
+        router = build_ollama_router([a.url, b.url], "m", keep_alive="10m")
+        await router.warm_up()
+        status = await router.status()
+        await router.aclose()
+        assert a.requests == b.requests == 1
+        assert [s["url"] for s in status] == [a.url, b.url]
+        assert all(s["reachable"] for s in status)
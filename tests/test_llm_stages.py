@@ -0,0 +1,48 @@
+"""Tests for per-stage model routing."""
+from __future__ import annotations
+
+import pytest
+
+from vocab_trainer.metrics import generation_stats
+from vocab_trainer.providers.base import llm_stage
+from vocab_trainer.providers.llm_fake import FakeLLMProvider
+from vocab_trainer.providers.llm_stages import StageRoutedLLM
+from vocab_trainer.question_generator import generate_question
+
+
+@pytest.fixture
+def routed():
+    large, small = FakeLLMProvider(model="large"), FakeLLMProvider(model="small")
+    return StageRoutedLLM(large, {"grammar": small, "enrichment": small}), large, small
+
+
+class TestStageRoutedLLM:
+    @pytest.mark.asyncio
+    async def test_dispatches_by_stage(self, routed):
+        llm, large, small = routed
+        with llm_stage("grammar"):
+            await llm.generate("hello")
+            assert llm.name() == "fake/small"
+        with llm_stage("chat"):
+            tokens = [t async for t in llm.generate_stream("hello")]
+            assert llm.name() == "fake/large"
+        assert tokens
+        assert sum(small.calls.values()) == 1 and sum(large.calls.values()) == 1
+        assert llm.route_names() == {"enrichment": "fake/small", "grammar": "fake/small"}
+        assert llm.providers() == [large, small]
+
+    @pytest.mark.asyncio
+    async def test_pipeline_stages_use_their_models(self, routed, populated_db):
+        llm, large, small = routed
+        generation_stats.reset()
+        cluster = populated_db.get_cluster_by_title("Being Brief")
+        target = populated_db.get_cluster_words(cluster["id"])[0]
+        q = await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                    question_type="fill_blank", checkpoint=False)
+        assert q.llm_provider == "fake/large"  # the stem writer
+        assert large.calls["draft"] == 1
+        assert small.calls["grammar"] == 1 and small.calls["enrichment"] == 1
+        stages = {(a["stage"], a["model"]) for a in generation_stats.acceptance()}
+        assert stages == {("fill_blank", "fake/large"), ("grammar", "fake/small"),
+                          ("enrichment", "fake/small")}
+        generation_stats.reset()
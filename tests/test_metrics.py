@@ -0,0 +1,41 @@
+"""Tests for in-process usage metrics."""
+from __future__ import annotations
+
+import pytest
+
+from vocab_trainer.metrics import GenerationStats, UsageStats
+
+
+class TestUsageStats:
+    def test_aggregates_per_stage(self):
+        stats = UsageStats()
+        stats.record({"stage": "grammar", "prefill_tokens": 400, "prefill_seconds": 0.2})
+        stats.record({"stage": "grammar", "prefill_tokens": 100, "prefill_seconds": 0.05,
+                      "completion_tokens": None})
+        stats.record({"stage": "fill_blank", "prompt_tokens": 2000, "cached_tokens": 1500,
+                      "prefill_tokens": 500})
+        snap = stats.snapshot()
+        assert snap["grammar"]["calls"] == 2
+        assert snap["grammar"]["prefill_tokens_per_call"] == 250
+        assert snap["grammar"]["prefill_ms_per_call"] == 125
+        assert snap["grammar"]["cache_hit_rate"] is None
+        assert snap["fill_blank"]["cache_hit_rate"] == 0.75
+
+    def test_reset(self):
+        stats = UsageStats()
+        stats.record({"stage": "chat"})
+        stats.reset()
+        assert stats.snapshot() == {}
+
+
+class TestGenerationStats:
+    def test_seconds_per_question_charges_failed_attempts(self):
+        stats = GenerationStats()
+        assert stats.snapshot()["seconds_per_question"] is None
+        stats.time_question(20.0, produced=False)
+        stats.time_question(40.0, produced=True)
+        assert stats.seconds_per_question() == 60.0
+        stats.time_question(10.0, produced=True)
+        assert stats.seconds_per_question() == pytest.approx(50.0)
+        stats.reset()
+        assert stats.seconds_per_question() is None
@@ -0,0 +1,62 @@
+"""Tests for palette word choice and the adaptive palette size."""
+from __future__ import annotations
+
+from vocab_trainer.palette import PaletteSizer, cluster_terms, pick_palette
+
+CLUSTER = [
+    {"word": "terse", "meaning": "brief to the point of rudeness", "distinction": "curt tone"},
+    {"word": "concise", "meaning": "brief but comprehensive", "distinction": "efficient"},
+]
+
+
+def _run(sizer: PaletteSizer, qtype: str, rate_by_size: dict[int, float], drafts: int) -> None:
+    """Feed *drafts* outcomes, accepting the given share at each size."""
+    for i in range(drafts):
+        size = sizer.size(qtype)
+        sizer.record(qtype, size, (i % 20) < 20 * rate_by_size.get(size, 1.0))
+
+
+class TestPickPalette:
+    def test_relevant_words_first(self):
+        candidates = [
+            {"word": "zebra", "definition": "a striped African animal"},
+            {"word": "brusque", "definition": "abrupt and brief, with a rude tone"},
+            {"word": "ledger", "definition": "a book of accounts"},
+            {"word": "compendious", "definition": "comprehensive yet brief"},
+        ]
+        terms = cluster_terms("Being Brief", CLUSTER)
+        picked = [w["word"] for w in pick_palette(candidates, terms, 2)]
+        assert sorted(picked) == ["brusque", "compendious"]
+        assert pick_palette(candidates, terms, 0) == []
+
+    def test_ties_keep_candidate_order(self):
+        candidates = [{"word": f"w{i}", "definition": "unrelated gloss"} for i in range(5)]
+        assert pick_palette(candidates, {"brief"}, 3) == candidates[:3]
+
+
+class TestPaletteSizer:
+    def test_shrinks_when_smaller_palette_does_as_well(self):
+        sizer = PaletteSizer(max_words=30, window=20)
+        assert sizer.size("fill_blank") == 30
+        _run(sizer, "fill_blank", {}, 200)
+        assert sizer.stats()["question_types"]["fill_blank"]["size"] == 0
+        assert sizer.stats()["words_saved"] > 0
+
+    def test_steps_back_up_when_larger_palette_helps(self):
+        sizer = PaletteSizer(max_words=30, window=20)
+        _run(sizer, "fill_blank", {30: 0.9, 20: 0.9, 10: 0.5, 5: 0.5, 0: 0.5}, 400)
+        assert sizer.size("fill_blank") == 20
+        assert sizer.stats()["question_types"]["fill_blank"]["acceptance"][10] == 0.5
+
+    def test_slow_prefill_shrinks(self):
+        sizer = PaletteSizer(max_words=30, max_prefill_ms=500, window=20)
+        sizer.record_usage({"stage": "best_fit", "prefill_seconds": 0.8})
+        _run(sizer, "best_fit", {30: 1.0, 20: 0.5}, 20)
+        assert sizer.size("best_fit") == 20  # despite the worse acceptance below
+
+    def test_fixed_when_not_adaptive(self):
+        sizer = PaletteSizer(max_words=12, adaptive=False)
+        _run(sizer, "fill_blank", {}, 100)
+        assert sizer.size("fill_blank") == 12
+        sizer.configure(max_words=0)
+        assert sizer.size("fill_blank") == 0
@@ -0,0 +1,197 @@
+"""Tests for LLM call timeouts, retry backoff and the circuit breaker."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from vocab_trainer.providers.base import llm_stage
+from vocab_trainer.providers.policy import (
+    BackendUnavailable,
+    CircuitBreaker,
+    LLMPolicy,
+    PolicyLLM,
+)
+
+
+class FlakyLLM:
+    """Fake LLM that fails its first *failures* calls, optionally by hanging."""
+
+    def __init__(self, failures: int = 0, hang: bool = False, tokens=("a", "b")):
+        self.failures = failures
+        self.hang = hang
+        self.tokens = tokens
+        self.calls = 0
+
+    async def generate(self, prompt: str, temperature: float = 0.7, **kwargs) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            if self.hang:
+                await asyncio.sleep(10)
+            raise ConnectionError("backend down")
+        return "ok"
+
+    async def generate_stream(self, prompt: str, temperature: float = 0.7, **kwargs):
+        self.calls += 1
+        for tok in self.tokens:
+            if self.hang:
+                await asyncio.sleep(10)
+            yield tok
+
+    def name(self) -> str:
+        return "flaky"
+
+
+def _policy(**kwargs) -> LLMPolicy:
+    kwargs.setdefault("backoff_base", 0.001)
+    kwargs.setdefault("breaker_threshold", 10)
+    kwargs.setdefault("breaker_cooldown", 60)
+    return LLMPolicy(**kwargs)
+
+
+class TestRetries:
+    @pytest.mark.asyncio
+    async def test_retries_then_succeeds(self):
+        policy = _policy(retries=2)
+        llm = PolicyLLM(FlakyLLM(failures=2), policy)
+        with llm_stage("grammar"):
+            assert await llm.generate("p") == "ok"
+        st = policy.stats()["stages"]["grammar"]
+        assert (st["calls"], st["errors"], st["retries"], st["ok"]) == (3, 2, 2, 1)
+        assert st["latency_s"] is not None and st["latency_s"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_gives_up_with_original_error(self):
+        llm = PolicyLLM(FlakyLLM(failures=5), _policy(retries=1))
+        with pytest.raises(ConnectionError):
+            await llm.generate("p")
+        assert llm.provider.calls == 2
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = LLMPolicy(backoff_base=1.0, backoff_max=5.0)
+        delays = [policy.backoff(attempt) for attempt in range(10) for _ in range(20)]
+        assert all(0 <= d <= 5.0 for d in delays)
+        assert len(set(delays)) > 1
+        assert max(policy.backoff(0) for _ in range(50)) <= 1.0
+
+
+class TestTimeouts:
+    @pytest.mark.asyncio
+    async def test_per_stage_timeout(self):
+        policy = _policy(stage_timeouts={"grammar": 0.05}, default_timeout=5, retries=0)
+        llm = PolicyLLM(FlakyLLM(failures=1, hang=True), policy)
+        with llm_stage("grammar"), pytest.raises(asyncio.TimeoutError):
+            await llm.generate("p")
+        assert policy.stats()["stages"]["grammar"]["timeouts"] == 1
+
+    def test_default_timeout_for_unlisted_stage(self):
+        policy = LLMPolicy(stage_timeouts={"grammar": 1.0}, default_timeout=7.0)
+        assert policy.timeout_for("grammar") == 1.0
+        assert policy.timeout_for("other") == 7.0
+
+    @pytest.mark.asyncio
+    async def test_stalled_stream_fails(self):
+        policy = _policy(stage_timeouts={"chat": 0.05})
+        llm = PolicyLLM(FlakyLLM(hang=True), policy)
+        with llm_stage("chat"), pytest.raises(RuntimeError, match="stalled"):
+            async for _ in llm.generate_stream("p"):
+                pass
+        assert policy.breaker_for("flaky", "chat").failures == 1
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_opens_and_rejects_fast(self):
+        policy = _policy(retries=5, breaker_threshold=3)
+        flaky = FlakyLLM(failures=100)
+        llm = PolicyLLM(flaky, policy)
+        with pytest.raises(BackendUnavailable) as exc:
+            await llm.generate("p")
+        assert flaky.calls == 3
+        assert exc.value.retry_in > 0
+        assert policy.breaker_for("flaky", "other").is_open
+
+        with pytest.raises(BackendUnavailable):
+            await llm.generate("p")
+        assert flaky.calls == 3  # rejected without touching the backend
+        stats = policy.stats()
+        assert stats["stages"]["other"]["rejected"] == 1
+        [breaker] = stats["breakers"]
+        assert (breaker["backend"], breaker["traffic"]) == ("flaky", "background")
+        assert breaker["state"] == "open"
+        assert breaker["trips"] == 1
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_closes_breaker(self):
+        policy = _policy(breaker_threshold=1, breaker_cooldown=0.05)
+        breaker = policy.breaker_for("flaky", "other")
+        llm = PolicyLLM(FlakyLLM(failures=1), policy)
+        with pytest.raises(BackendUnavailable):
+            await llm.generate("p")
+        await asyncio.sleep(0.06)
+        assert breaker.state == "half_open"
+        assert await llm.generate("p") == "ok"
+        assert breaker.state == "closed"
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0)
+        breaker.record_failure()
+        assert breaker.allow()  # the probe
+        assert not breaker.allow()  # only one at a time
+        breaker.record_failure()
+        assert breaker.trips == 1
+        assert breaker.opened_at is not None
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_frees_slot(self):
+        policy = _policy(breaker_threshold=1, breaker_cooldown=0)
+        breaker = policy.breaker_for("flaky", "other")
+        breaker.record_failure()
+        llm = PolicyLLM(FlakyLLM(failures=1, hang=True), policy)
+        task = asyncio.create_task(llm.generate("p"))
+        await asyncio.sleep(0.01)
+        assert breaker.is_open  # probe in flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not breaker.is_open
+        assert breaker.allow()
+
+    @pytest.mark.asyncio
+    async def test_background_failures_leave_chat_open(self):
+        policy = _policy(retries=0, breaker_threshold=1)
+        llm = PolicyLLM(FlakyLLM(failures=1), policy)
+        with llm_stage("fill_blank"), pytest.raises(BackendUnavailable):
+            await llm.generate("p")
+        assert policy.blocking_breaker() is policy.breaker_for("flaky", "fill_blank")
+        with llm_stage("chat"):
+            assert await llm.generate("p") == "ok"
+        assert not policy.breaker_for("flaky", "chat").is_open
+
+    @pytest.mark.asyncio
+    async def test_each_backend_has_its_own_breaker(self):
+        class Named(FlakyLLM):
+            def __init__(self, label, **kw):
+                super().__init__(**kw)
+                self.label = label
+
+            def name(self) -> str:
+                return self.label
+
+        policy = _policy(retries=0, breaker_threshold=1)
+        down = PolicyLLM(Named("down", failures=100), policy)
+        up = PolicyLLM(Named("up"), policy)
+        with llm_stage("grammar"):
+            with pytest.raises(BackendUnavailable):
+                await down.generate("p")
+            assert await up.generate("p") == "ok"
+        assert policy.breaker_for("down", "grammar").is_open
+        assert not policy.breaker_for("up", "grammar").is_open
+
+    def test_configure_updates_existing_breakers(self):
+        policy = _policy()
+        breaker = policy.breaker_for("flaky", "grammar")
+        policy.configure({}, 120.0, 2, breaker_threshold=2, breaker_cooldown=5.0)
+        assert (breaker.threshold, breaker.cooldown) == (2, 5.0)
+        policy.reset_breakers()
+        assert policy.breaker_for("flaky", "grammar") is not breaker
@@ -0,0 +1,107 @@
+"""Tests for the local pre-filter rules and the grammar-gate skip policy."""
+from __future__ import annotations
+
+from vocab_trainer.prefilter import GrammarGate, check_draft, inflection_suffix
+
+CLUSTER = ["terse", "concise", "pithy", "laconic", "succinct", "curt"]
+
+
+def _draft(stem: str, choices=None, correct_index: int = 0) -> dict:
+    return {
+        "stem": stem,
+        "choices": choices or ["terse", "concise", "pithy", "curt"],
+        "correct_index": correct_index,
+    }
+
+
+class TestInflectionSuffix:
+    def test_suffixes(self):
+        assert inflection_suffix("terse", "terse") == ""
+        assert inflection_suffix("tersely", "terse") == "ly"
+        assert inflection_suffix("cajoling", "cajole") == "ing"
+        assert inflection_suffix("carried", "carry") == "ed"
+        assert inflection_suffix("curtain", "curt") is None
+
+
+class TestCheckDraft:
+    def test_clean_draft_passes(self):
+        data = _draft("Her ___ reply left no room for pleasantries.")
+        assert check_draft(data, "fill_blank", "terse", CLUSTER) == (None, [])
+
+    def test_article_fixed_when_all_choices_agree(self):
+        data = _draft("It was an ___ reply to a long letter.")
+        assert check_draft(data, "fill_blank", "terse", CLUSTER) == (None, ["article"])
+        assert data["stem"] == "It was a ___ reply to a long letter."
+
+        data = _draft("A ___ remark opened the meeting.",
+                      ["acerbic", "astringent", "incisive", "icy"])
+        check_draft(data, "fill_blank", "acerbic", ["acerbic", "astringent", "incisive", "icy"])
+        assert data["stem"] == "An ___ remark opened the meeting."
+
+    def test_mixed_articles_left_alone(self):
+        data = _draft("She gave a(n) ___ answer to the board.", ["terse", "apt", "pithy", "curt"])
+        check_draft(data, "fill_blank", "terse", CLUSTER + ["apt"])
+        assert data["stem"] == "She gave a(n) ___ answer to the board."
+
+    def test_inconsistent_inflections_rejected(self):
+        verbs = ["cajole", "wheedle", "coax", "inveigle"]
+        data = _draft("She ___ her brother into washing the dishes.",
+                      ["cajoled", "wheedle", "coaxed", "inveigled"])
+        reason, _ = check_draft(data, "fill_blank", "cajoled", verbs)
+        assert "same grammatical form" in reason
+
+        data = _draft("She ___ her brother into washing the dishes.",
+                      ["cajoled", "wheedled", "coaxed", "inveigled"])
+        assert check_draft(data, "fill_blank", "cajoled", verbs)[0] is None
+
+    def test_stem_length(self):
+        assert "too short" in check_draft(_draft("A ___ one."), "fill_blank", "terse", CLUSTER)[0]
+        long_stem = "The ___ reply " + "went on and on " * 20
+        assert "too long" in check_draft(_draft(long_stem), "fill_blank", "terse", CLUSTER)[0]
+
+    def test_doubled_word(self):
+        reason, _ = check_draft(_draft("Her ___ reply left the the room silent."),
+                                "fill_blank", "terse", CLUSTER)
+        assert "repeats a word" in reason
+        assert check_draft(_draft("He had had a ___ reply ready for them."),
+                           "fill_blank", "terse", CLUSTER)[0] is None
+
+    def test_stem_containing_answer_form(self):
+        reason, _ = check_draft(_draft("Which word fits someone cajoling a friend into a favour?",
+                                       ["cajole", "wheedle", "coax", "inveigle"]),
+                                "distinction", "cajole", ["cajole", "wheedle", "coax", "inveigle"])
+        assert "gives the answer away" in reason
+
+    def test_unrelated_lookalikes_are_not_giveaways(self):
+        for answer, stem in [
+            ("ear", "She arrived early to hear the ___ report from the board."),
+            ("fin", "The final ___ decision came after a long debate."),
+            ("sever", "They chose to ___ ties after several bitter disputes."),
+            ("whole", "He was wholly ___ about the plan and its outcome."),
+        ]:
+            data = _draft(stem, [answer, "split", "part", "cut"])
+            assert check_draft(data, "best_fit", answer, [answer])[0] is None, answer
+
+
+class TestGrammarGate:
+    def test_checks_until_enough_passes(self):
+        gate = GrammarGate(skip_at=0.9, min_checks=10, audit_every=4)
+        for _ in range(10):
+            assert gate.should_check("m", "fill_blank")
+            gate.record("m", "fill_blank", True)
+        decisions = [gate.should_check("m", "fill_blank") for _ in range(8)]
+        assert decisions == [False, False, False, True] * 2  # every 4th is audited
+        assert gate.should_check("m", "best_fit")  # other types measured separately
+        assert gate.stats()["skipped"] == 6
+
+    def test_low_pass_rate_keeps_checking(self):
+        gate = GrammarGate(skip_at=0.9, min_checks=10)
+        for i in range(20):
+            gate.record("m", "fill_blank", i % 5 != 0)
+        assert gate.pass_rate("m", "fill_blank") == 0.8
+        assert all(gate.should_check("m", "fill_blank") for _ in range(10))
+
+    def test_disabled(self):
+        gate = GrammarGate(skip_at=0, min_checks=1)
+        gate.record("m", "fill_blank", True)
+        assert gate.should_check("m", "fill_blank")
@@ -1,10 +1,14 @@
 """Tests for prompt templates and formatting."""
 from __future__ import annotations
 
+import json
+import re
+
 from vocab_trainer.prompts import (
     BEST_FIT_PROMPT,
     DISTINCTION_PROMPT,
     FILL_BLANK_PROMPT,
+    SYSTEM_PROMPTS,
     format_cluster_info,
     format_enrichment,
 )
@@ -84,3 +88,27 @@ class TestPromptTemplates:
             # After formatting, only literal braces from JSON example should exist
             assert "{cluster_title}" not in result
             assert "{target_word}" not in result
+
+
+class TestSystemPrefixes:
+    def test_system_prefixes_are_literal(self):
+        """System prefixes are sent verbatim — no placeholders, no escaped braces."""
+        for name, system in SYSTEM_PROMPTS.items():
+            assert "{{" not in system, name
+            assert not re.search(r"\{[a-z_]+\}", system), name
+
+    def test_few_shot_examples_are_valid_json(self):
+        for name, system in SYSTEM_PROMPTS.items():
+            blocks = re.findall(r"```json\n(.*?)\n```", system, re.DOTALL)
+            assert blocks or name == "chat", name
+            for block in blocks:
+                json.loads(block)
+
+    def test_shared_part_lives_in_system_prefix(self):
+        """The per-item template is small next to its static prefix."""
+        for qtype, template in [("fill_blank", FILL_BLANK_PROMPT),
+                                ("best_fit", BEST_FIT_PROMPT),
+                                ("distinction", DISTINCTION_PROMPT)]:
+            assert "Elena Voss" in SYSTEM_PROMPTS[qtype]
+            assert "Elena Voss" not in template
+            assert len(template) < len(SYSTEM_PROMPTS[qtype])
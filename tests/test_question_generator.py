@@ -1,11 +1,14 @@
 """Tests for question generation (JSON extraction, validation, LLM orchestration)."""
 from __future__ import annotations
 
+import asyncio
 import json
 
 import pytest
 
 from vocab_trainer.question_generator import (
+    GRAMMAR_CHECK_RETRIES,
+    NO_VERDICT,
     _enrich_choices,
     _extract_json,
     _fix_article_before_blank,
@@ -14,6 +17,7 @@ from vocab_trainer.question_generator import (
     _pick_target_in_cluster,
     _validate_grammar,
     _validate_question,
+    generate_batch,
     generate_question,
 )
 
@@ -25,7 +29,7 @@ class FakeLLM:
         self._responses = responses or []
         self._call_count = 0
 
-    async def generate(self, prompt: str, temperature: float = 0.7) -> str:
+    async def generate(self, prompt: str, temperature: float = 0.7, **kwargs) -> str:
         idx = min(self._call_count, len(self._responses) - 1)
         self._call_count += 1
         return self._responses[idx]
@@ -554,3 +558,438 @@ class TestGenerateQuestion:
 
         q = await generate_question(llm, tmp_db)
         assert q is None
+
+
+class TestDuplicateStems:
+    @pytest.mark.asyncio
+    async def test_near_duplicate_draft_is_reprompted(self, populated_db, sample_question):
+        from vocab_trainer.metrics import generation_stats
+
+        populated_db.save_question(sample_question)
+        duplicate = json.dumps({
+            "stem": sample_question.stem,
+            "choices": ["terse", "concise", "laconic", "pithy"],
+            "correct_index": 0,
+            "explanation": "Terse fits.",
+            "context_sentence": sample_question.context_sentence,
+        })
+        fresh = json.dumps({
+            "stem": "The ___ guide pointed at the map without a single word.",
+            "choices": ["terse", "concise", "laconic", "pithy"],
+            "correct_index": 0,
+            "explanation": "Terse fits.",
+            "context_sentence": "The terse guide pointed at the map without a single word.",
+        })
+        prompts = []
+
+        class Recording(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                prompts.append(prompt)
+                return await super().generate(prompt, temperature, **kwargs)
+
+        llm = Recording(responses=[duplicate, fresh, _make_grammar_ok_response(),
+                                   _make_enrichment_response(["terse", "concise", "laconic", "pithy"])])
+        cluster = populated_db.get_cluster_by_title("Being Brief")
+        cw = populated_db.get_cluster_words(cluster["id"])
+        target = next(w for w in cw if w["word"] == "terse")
+        generation_stats.reset()
+        q = await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                    question_type="fill_blank", checkpoint=False)
+        assert q.stem.startswith("The ___ guide")
+        assert "nearly identical to an existing question" in prompts[1]
+        assert sample_question.stem in prompts[1]
+        stats = generation_stats.snapshot()
+        assert stats["dedup_checked"] == 2 and stats["duplicate"] == 1
+        generation_stats.reset()
+
+
+class TestPrefilterAndGate:
+    FRESH = json.dumps({
+        "stem": "The ___ guide pointed at the map without a single word.",
+        "choices": ["terse", "concise", "laconic", "pithy"],
+        "correct_index": 0,
+        "explanation": "Terse fits.",
+        "context_sentence": "The terse guide pointed at the map without a single word.",
+    })
+
+    def _target(self, db):
+        cluster = db.get_cluster_by_title("Being Brief")
+        cw = db.get_cluster_words(cluster["id"])
+        return cluster, next(w for w in cw if w["word"] == "terse")
+
+    @pytest.mark.asyncio
+    async def test_rule_failure_reprompts_without_gate_call(self, populated_db):
+        from vocab_trainer.metrics import generation_stats
+
+        doubled = json.dumps({**json.loads(self.FRESH),
+                              "stem": "The ___ guide pointed at the the map in silence."})
+        prompts = []
+
+        class Recording(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                prompts.append(kwargs.get("system"))
+                return await super().generate(prompt, temperature, **kwargs)
+
+        llm = Recording(responses=[doubled, self.FRESH, _make_grammar_ok_response(),
+                                   _make_enrichment_response(["terse", "concise", "laconic", "pithy"])])
+        cluster, target = self._target(populated_db)
+        generation_stats.reset()
+        q = await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                    question_type="fill_blank", checkpoint=False)
+        assert q.stem.startswith("The ___ guide pointed at the map")
+        assert llm.call_count == 4  # two drafts, one gate call, enrichment
+        stats = generation_stats.snapshot()
+        assert stats["prefilter_rejected"] == 1
+        assert stats["gate_checked"] == 1
+        assert stats["gate_calls_saved"] == 1
+        generation_stats.reset()
+
+    @pytest.mark.asyncio
+    async def test_gate_skipped_at_high_pass_rate(self, populated_db):
+        from vocab_trainer.metrics import generation_stats
+        from vocab_trainer.prefilter import GrammarGate
+
+        gate = GrammarGate(skip_at=0.9, min_checks=3, audit_every=10)
+        for _ in range(3):
+            gate.record("fake-llm", "fill_blank", True)
+        llm = FakeLLM(responses=[self.FRESH, _make_enrichment_response(
+            ["terse", "concise", "laconic", "pithy"])])
+        cluster, target = self._target(populated_db)
+        generation_stats.reset()
+        q = await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                    question_type="fill_blank", checkpoint=False, gate=gate)
+        assert q.quality_issue is None
+        assert len(q.choice_details) == 4
+        assert llm.call_count == 2  # draft and enrichment only
+        assert generation_stats.snapshot()["gate_skipped"] == 1
+        generation_stats.reset()
+
+
+    @pytest.mark.asyncio
+    async def test_gate_without_verdict_is_not_counted_as_pass(self, populated_db):
+        from vocab_trainer.prefilter import GrammarGate
+
+        gate = GrammarGate(skip_at=0.9, min_checks=1)
+        llm = FakeLLM(responses=[self.FRESH] + ["not json"] * GRAMMAR_CHECK_RETRIES + [
+            _make_enrichment_response(["terse", "concise", "laconic", "pithy"])])
+        cluster, target = self._target(populated_db)
+        q = await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                    question_type="fill_blank", checkpoint=False, gate=gate)
+        assert q.quality_issue is None  # let through, not blocked
+        assert gate.pass_rate("fake-llm", "fill_blank") is None
+        assert await _validate_grammar(FakeLLM(responses=["nope"] * GRAMMAR_CHECK_RETRIES),
+                                       "fill_blank", json.loads(self.FRESH)) is NO_VERDICT
+
+    @pytest.mark.asyncio
+    async def test_gate_rates_kept_under_the_grammar_model(self, populated_db):
+        from vocab_trainer.prefilter import GrammarGate
+        from vocab_trainer.providers.llm_stages import StageRoutedLLM
+
+        class Named(FakeLLM):
+            def __init__(self, label, responses):
+                super().__init__(responses)
+                self.label = label
+
+            def name(self):
+                return self.label
+
+        llm = StageRoutedLLM(
+            Named("fake/big", [self.FRESH, _make_enrichment_response(
+                ["terse", "concise", "laconic", "pithy"])]),
+            {"grammar": Named("fake/small", [_make_grammar_ok_response()])},
+        )
+        gate = GrammarGate(skip_at=0.9, min_checks=3)
+        cluster, target = self._target(populated_db)
+        q = await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                    question_type="fill_blank", checkpoint=False, gate=gate)
+        assert [r["model"] for r in gate.stats()["rates"]] == ["fake/small"]
+        assert gate.pass_rate("fake/small", "fill_blank") == 1.0
+        assert q.llm_provider == "fake/big"  # the model that drafted it
+
+
+class TestGenerateBatch:
+    @pytest.mark.asyncio
+    async def test_target_words_found_case_insensitively(self, populated_db):
+        from vocab_trainer.providers.llm_fake import FakeLLMProvider
+
+        questions = await generate_batch(
+            FakeLLMProvider(), populated_db, count=5, target_words=["TERSE", "unknown", "pithy"],
+        )
+        assert [q.correct_word for q in questions] == ["terse", "pithy"]
+        assert all(q.cluster_title == "Being Brief" for q in questions)
+
+
+class TestCheckpointResume:
+    """Stage outputs persist to pending_questions and are resumed."""
+
+    STEP1 = json.dumps({
+        "stem": "Her ___ reply surprised everyone.",
+        "choices": ["terse", "concise", "pithy", "laconic"],
+        "correct_index": 0,
+        "explanation": "Terse implies rudeness.",
+        "context_sentence": "Her terse reply surprised everyone.",
+    })
+
+    def _cluster_and_target(self, db, word="terse"):
+        cluster = db.get_random_cluster()
+        cw = db.get_cluster_words(cluster["id"])
+        return cluster, next(w for w in cw if w["word"] == word)
+
+    @pytest.mark.asyncio
+    async def test_interrupted_gate_keeps_step1(self, populated_db):
+        """Cancellation during the grammar gate leaves the step-1 draft behind."""
+        class CancelOnGate(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                if "grammar auditor" in kwargs.get("system", ""):
+                    raise asyncio.CancelledError
+                return await super().generate(prompt, temperature)
+
+        cluster, target = self._cluster_and_target(populated_db)
+        llm = CancelOnGate(responses=[self.STEP1])
+        with pytest.raises(asyncio.CancelledError):
+            await generate_question(llm, populated_db, cluster=cluster,
+                                    target_word_info=target, question_type="fill_blank")
+
+        pending = populated_db.get_pending_question(cluster["title"])
+        assert pending["stage"] == "drafted"
+        assert pending["target_word"] == "terse"
+
+        # Resume: only the gate and enrichment run — no new step-1 call
+        llm2 = FakeLLM(responses=[
+            _make_grammar_ok_response(),
+            _make_enrichment_response(["terse", "concise", "pithy", "laconic"]),
+        ])
+        q = await generate_question(llm2, populated_db, cluster=cluster, target_word_info=target)
+        assert llm2.call_count == 2
+        assert q.id == pending["id"]
+        assert q.correct_word == "terse"
+        assert q.question_type == "fill_blank"
+        assert len(q.choice_details) == 4
+
+        populated_db.save_question(q)
+        assert populated_db.get_pending_question(cluster["title"]) is None
+
+    @pytest.mark.asyncio
+    async def test_interrupted_enrichment_keeps_verdict(self, populated_db):
+        """Cancellation during enrichment leaves the gate verdict behind."""
+        class CancelOnEnrich(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                if "annotates" in prompt:
+                    raise asyncio.CancelledError
+                return await super().generate(prompt, temperature)
+
+        cluster, target = self._cluster_and_target(populated_db)
+        llm = CancelOnEnrich(responses=[self.STEP1, _make_grammar_ok_response()])
+        with pytest.raises(asyncio.CancelledError):
+            await generate_question(llm, populated_db, cluster=cluster,
+                                    target_word_info=target, question_type="fill_blank")
+        assert populated_db.get_pending_question(cluster["title"])["stage"] == "checked"
+
+        llm2 = FakeLLM(responses=[
+            _make_enrichment_response(["terse", "concise", "pithy", "laconic"]),
+        ])
+        q = await generate_question(llm2, populated_db, cluster=cluster, target_word_info=target)
+        assert llm2.call_count == 1
+        assert q.quality_issue is None
+        assert len(q.choice_details) == 4
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_for_another_target_not_resumed(self, populated_db):
+        """Asking for "concise" never hands back a "terse" checkpoint."""
+        cluster, _ = self._cluster_and_target(populated_db)
+        populated_db.save_pending_question(
+            "p1", cluster["title"], "terse", "fill_blank", json.loads(self.STEP1),
+        )
+        concise = self._cluster_and_target(populated_db, "concise")[1]
+        step1 = json.loads(self.STEP1)
+        step1.update(correct_index=1, context_sentence="Her concise reply surprised everyone.")
+        llm = FakeLLM(responses=[
+            json.dumps(step1), _make_grammar_ok_response(),
+            _make_enrichment_response(["terse", "concise", "pithy", "laconic"]),
+        ])
+        q = await generate_question(llm, populated_db, cluster=cluster,
+                                    target_word_info=concise, question_type="fill_blank")
+        assert q.id != "p1"
+        assert q.correct_word == "concise"
+        assert llm.call_count == 3
+        # The terse checkpoint is left for a run that asks for terse
+        assert populated_db.claim_pending_question(
+            cluster["title"], "other", 60.0, target_word="TERSE",
+        )["id"] == "p1"
+
+    @pytest.mark.asyncio
+    async def test_stale_checkpoint_discarded(self, populated_db):
+        cluster, target = self._cluster_and_target(populated_db)
+        # A draft that no longer validates for its target word
+        step1 = json.loads(self.STEP1)
+        step1["choices"][0] = "blunt"
+        populated_db.save_pending_question(
+            "stale", cluster["title"], "terse", "fill_blank", step1,
+        )
+        llm = FakeLLM(responses=[
+            self.STEP1, _make_grammar_ok_response(),
+            _make_enrichment_response(["terse", "concise", "pithy", "laconic"]),
+        ])
+        q = await generate_question(llm, populated_db, cluster=cluster,
+                                    target_word_info=target, question_type="fill_blank")
+        assert q.id != "stale"
+        assert llm.call_count == 3
+        # The stale row is gone; the fresh run left its own checkpoint
+        assert populated_db.get_pending_question(cluster["title"])["id"] == q.id
+
+    @pytest.mark.asyncio
+    async def test_concurrent_runs_never_share_a_checkpoint(self, populated_db):
+        """Two runs for one cluster: one resumes the checkpoint, the other drafts."""
+        cluster, target = self._cluster_and_target(populated_db)
+        populated_db.save_pending_question(
+            "p1", cluster["title"], "terse", "fill_blank", json.loads(self.STEP1),
+        )
+
+        class SlowGate(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                if "grammar auditor" in kwargs.get("system", ""):
+                    await asyncio.sleep(0.01)
+                return await super().generate(prompt, temperature)
+
+        enrichment = _make_enrichment_response(["terse", "concise", "pithy", "laconic"])
+        resumer = SlowGate(responses=[_make_grammar_ok_response(), enrichment])
+        drafter = SlowGate(responses=[self.STEP1, _make_grammar_ok_response(), enrichment])
+        first = asyncio.create_task(generate_question(
+            resumer, populated_db, cluster=cluster, target_word_info=target,
+            question_type="fill_blank"))
+        await asyncio.sleep(0)  # the first run claims p1 before the second starts
+        second = await generate_question(
+            drafter, populated_db, cluster=cluster, target_word_info=target,
+            question_type="fill_blank")
+        first = await first
+        assert first.id == "p1" and resumer.call_count == 2
+        assert second.id != "p1" and drafter.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_cancelled_run_releases_its_claim(self, populated_db):
+        cluster, target = self._cluster_and_target(populated_db)
+        populated_db.save_pending_question(
+            "p1", cluster["title"], "terse", "fill_blank", json.loads(self.STEP1),
+        )
+
+        class CancelOnGate(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                raise asyncio.CancelledError
+
+        with pytest.raises(asyncio.CancelledError):
+            await generate_question(CancelOnGate(responses=[""]), populated_db,
+                                    cluster=cluster, target_word_info=target)
+        assert populated_db.get_pending_question(cluster["title"])["owner"] is None
+        assert populated_db.claim_pending_question(cluster["title"], "next", 60)["id"] == "p1"
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_disabled(self, populated_db):
+        cluster, target = self._cluster_and_target(populated_db)
+        llm = FakeLLM(responses=[self.STEP1, _make_grammar_fail_response("bad")])
+        q = await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                    question_type="fill_blank", checkpoint=False)
+        assert q.quality_issue == "bad"
+        assert populated_db.get_pending_question(cluster["title"]) is None
+
+
+class TestStablePrefixes:
+    @pytest.mark.asyncio
+    async def test_each_stage_sends_its_static_system_prefix(self, populated_db):
+        from vocab_trainer.prompts import SYSTEM_PROMPTS
+        from vocab_trainer.providers.base import current_stage
+
+        calls = []
+
+        class Recording(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                calls.append((current_stage(), kwargs.get("system")))
+                return await super().generate(prompt, temperature)
+
+        cluster = populated_db.get_random_cluster()
+        target = next(w for w in populated_db.get_cluster_words(cluster["id"])
+                      if w["word"] == "terse")
+        llm = Recording(responses=[
+            TestCheckpointResume.STEP1,
+            _make_grammar_ok_response(),
+            _make_enrichment_response(["terse", "concise", "pithy", "laconic"]),
+        ])
+        await generate_question(llm, populated_db, cluster=cluster,
+                                target_word_info=target, question_type="best_fit")
+        assert calls == [
+            ("best_fit", SYSTEM_PROMPTS["best_fit"]),
+            ("grammar", SYSTEM_PROMPTS["grammar"]),
+            ("enrichment", SYSTEM_PROMPTS["enrichment"]),
+        ]
+
+
+class TestPalette:
+    @pytest.mark.asyncio
+    async def test_palette_sized_by_sizer_and_learns(self, populated_db):
+        from vocab_trainer.palette import PaletteSizer
+
+        prompts = []
+
+        class Recording(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                prompts.append(prompt)
+                return await super().generate(prompt, temperature, **kwargs)
+
+        llm = Recording(responses=[TestPrefilterAndGate.FRESH, _make_grammar_ok_response(),
+                                   _make_enrichment_response(["terse", "concise", "laconic", "pithy"])])
+        cluster, target = TestPrefilterAndGate()._target(populated_db)
+        sizer = PaletteSizer(max_words=2, adaptive=False)
+        q = await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                    question_type="fill_blank", checkpoint=False, palette=sizer)
+        assert q is not None
+        palette = next(line for line in prompts[0].splitlines() if "palette" in line.lower())
+        assert len(palette.split(":", 1)[1].split(",")) == 2
+        assert sizer.stats()["question_types"]["fill_blank"]["acceptance"] == {2: 1.0}
+
+    @pytest.mark.asyncio
+    async def test_empty_palette_leaves_no_section(self, populated_db):
+        from vocab_trainer.palette import PaletteSizer
+
+        prompts = []
+
+        class Recording(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                prompts.append(prompt)
+                return await super().generate(prompt, temperature, **kwargs)
+
+        llm = Recording(responses=[TestPrefilterAndGate.FRESH, _make_grammar_ok_response(),
+                                   _make_enrichment_response(["terse", "concise", "laconic", "pithy"])])
+        cluster, target = TestPrefilterAndGate()._target(populated_db)
+        await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                question_type="fill_blank", checkpoint=False,
+                                palette=PaletteSizer(max_words=0))
+        assert "palette" not in prompts[0].lower()
+
+    @pytest.mark.asyncio
+    async def test_embedding_index_supplies_palette_and_neighbours(self, populated_db):
+        pytest.importorskip("numpy")
+        from vocab_trainer.embeddings import HashingEmbedder, sync_embeddings
+        from vocab_trainer.models import DistinctionCluster, DistinctionEntry
+
+        populated_db.import_clusters([DistinctionCluster(
+            title="Talking Too Much", preamble="", commentary="",
+            entries=[DistinctionEntry(w, f"talking a great deal, {w}", "wordy")
+                     for w in ("verbose", "garrulous", "loquacious", "prolix")],
+        )])
+        sync_embeddings(populated_db, HashingEmbedder())
+        prompts = []
+
+        class Recording(FakeLLM):
+            async def generate(self, prompt, temperature=0.7, **kwargs):
+                prompts.append(prompt)
+                return await super().generate(prompt, temperature, **kwargs)
+
+        llm = Recording(responses=[TestPrefilterAndGate.FRESH, _make_grammar_ok_response(),
+                                   _make_enrichment_response(["terse", "concise", "laconic", "pithy"])])
+        cluster, target = TestPrefilterAndGate()._target(populated_db)
+        await generate_question(llm, populated_db, cluster=cluster, target_word_info=target,
+                                question_type="fill_blank", checkpoint=False)
+        lines = prompts[0].splitlines()
+        palette = next(line for line in lines if line.startswith("Vocabulary palette"))
+        assert "terse" not in palette  # cluster words stay out of the palette
+        neighbours = next(line for line in lines if line.startswith("Close words"))
+        assert len(neighbours.split(":", 1)[1].split(",")) == 4
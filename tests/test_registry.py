@@ -0,0 +1,96 @@
+"""Tests for the provider factory and registry."""
+from __future__ import annotations
+
+import pytest
+
+from vocab_trainer.config import Settings
+from vocab_trainer.providers.llm_ollama import OllamaProvider
+from vocab_trainer.providers.llm_router import RouterProvider
+from vocab_trainer.providers.llm_stages import StageRoutedLLM
+from vocab_trainer.providers.registry import ProviderRegistry, build_llm, build_tts
+from vocab_trainer.providers.tts_edge import EdgeTTSProvider
+
+
+class TestFactory:
+    def test_ollama(self):
+        llm = build_llm(Settings(ollama_timeout=30.0))
+        assert isinstance(llm, OllamaProvider)
+        assert llm.timeout.read == 30.0
+
+    def test_ollama_router(self):
+        llm = build_llm(Settings(ollama_urls=["http://a:1", "http://b:2"]))
+        assert isinstance(llm, RouterProvider)
+        assert len(llm.backends) == 2
+
+    def test_stage_routes_share_instances(self):
+        llm = build_llm(Settings(llm_stage_models={
+            "grammar": "qwen3:1.7b", "enrichment": "qwen3:1.7b", "chat": "qwen3:8b",
+        }))
+        assert isinstance(llm, StageRoutedLLM)
+        assert llm.routes["grammar"] is llm.routes["enrichment"]
+        assert llm.routes["grammar"].model == "qwen3:1.7b"
+        assert llm.routes["chat"] is llm.default  # same as the configured model
+        assert len(llm.providers()) == 2
+
+    def test_unknown_providers(self):
+        with pytest.raises(ValueError, match="Unknown LLM provider"):
+            build_llm(Settings(llm_provider="nope"))
+        with pytest.raises(ValueError, match="Unknown TTS provider"):
+            build_tts(Settings(tts_provider="nope"))
+
+
+class TestProviderRegistry:
+    def test_reuses_instances(self):
+        s = Settings()
+        reg = ProviderRegistry()
+        assert reg.llm(s) is reg.llm(s)
+        assert reg.tts(s) is reg.tts(s)
+        assert isinstance(reg.tts(s), EdgeTTSProvider)
+
+    def test_rebuilds_on_relevant_change_only(self):
+        s = Settings()
+        reg = ProviderRegistry()
+        llm, tts = reg.llm(s), reg.tts(s)
+        s.session_size = 5
+        s.auto_narrate = False
+        assert reg.refresh(s) == []
+        assert reg.llm(s) is llm
+        s.tts_voice = "en-GB-RyanNeural"
+        assert reg.refresh(s) == ["tts"]
+        assert reg.llm(s) is llm
+        assert reg.tts(s) is not tts
+        assert reg.tts(s).voice == "en-GB-RyanNeural"
+
+    def test_stage_route_change_rebuilds_llm(self):
+        s = Settings()
+        reg = ProviderRegistry()
+        llm = reg.llm(s)
+        s.llm_stage_models = {"grammar": "qwen3:1.7b"}
+        assert reg.refresh(s) == ["llm"]
+        assert isinstance(reg.llm(s), StageRoutedLLM)
+        assert reg.llm(s) is not llm
+
+    def test_direct_setting_change_is_noticed(self):
+        s = Settings()
+        reg = ProviderRegistry()
+        llm = reg.llm(s)
+        s.ollama_max_connections = 2
+        assert reg.llm(s) is not llm
+        assert reg.llm(s).limits.max_connections == 2
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_current_and_replaced(self, monkeypatch):
+        closed = []
+
+        async def fake_aclose(self):
+            closed.append(self.model)
+
+        monkeypatch.setattr(OllamaProvider, "aclose", fake_aclose)
+        s = Settings(llm_model="a")
+        reg = ProviderRegistry()
+        reg.llm(s)
+        s.llm_model = "b"
+        reg.llm(s)
+        assert closed == []  # replaced provider may still have calls in flight
+        await reg.aclose()
+        assert closed == ["a", "b"]
@@ -0,0 +1,146 @@
+"""Tests for the in-memory cluster sampler and its Fenwick tree."""
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+import pytest
+
+from vocab_trainer.models import DistinctionCluster, DistinctionEntry, Question
+from vocab_trainer.sampler import ClusterSampler, FenwickTree
+
+
+class TestFenwickTree:
+    def test_prefix_sums_and_updates(self):
+        weights = [3.0, 0.0, 1.5, 2.0, 0.5]
+        tree = FenwickTree(weights)
+        for k in range(len(weights) + 1):
+            assert tree.prefix(k) == pytest.approx(sum(weights[:k]))
+        tree.set(1, 4.0)
+        tree.set(4, 0.0)
+        assert tree.total() == pytest.approx(10.5)
+        assert tree.prefix(2) == pytest.approx(7.0)
+
+    def test_find_maps_draws_to_weighted_index(self):
+        tree = FenwickTree([1.0, 0.0, 2.0, 1.0])
+        assert tree.find(0.0) == 0
+        assert tree.find(0.999) == 0
+        assert tree.find(1.0) == 2
+        assert tree.find(2.999) == 2
+        assert tree.find(3.5) == 3
+
+    def test_find_never_returns_zero_weight(self):
+        tree = FenwickTree([0.0, 1.0, 0.0, 0.0])
+        for x in (0.0, 0.5, 0.9999999, 1.0):
+            assert tree.find(x) == 1
+
+    def test_distribution_matches_weights(self):
+        rng = random.Random(0)
+        weights = [1.0, 2.0, 0.0, 5.0]
+        tree = FenwickTree(weights)
+        counts = Counter(tree.find(rng.random() * tree.total()) for _ in range(8000))
+        assert counts[2] == 0
+        assert counts[3] / counts[0] == pytest.approx(5.0, rel=0.15)
+
+
+def _question(qid: str, title: str, word: str, quality_issue=None) -> Question:
+    return Question(
+        id=qid, question_type="fill_blank", stem="The ___ reply.",
+        choices=["terse", "concise", "laconic", "pithy"], correct_index=0,
+        correct_word=word, explanation="", context_sentence="", cluster_title=title,
+        llm_provider="test", quality_issue=quality_issue,
+    )
+
+
+def _sql_weights(db) -> dict[str, float]:
+    return {c["cluster_title"]: 1.0 / (1 + c["question_count"])
+            for c in db.get_cluster_question_counts()}
+
+
+def _sampler_weights(db) -> dict[str, float]:
+    sampler = db.cluster_sampler()
+    return {t: sampler.weight(t) for t in sampler.index if sampler.weight(t) > 0}
+
+
+@pytest.fixture
+def two_clusters(populated_db):
+    populated_db.import_clusters([DistinctionCluster(
+        title="Being Wary", preamble="", commentary="",
+        entries=[DistinctionEntry(w, f"{w} meaning", "") for w in
+                 ("wary", "chary", "leery", "cagey")],
+    )])
+    return populated_db
+
+
+class TestClusterSampler:
+    def test_tracks_saves_answers_and_archiving(self, two_clusters):
+        db = two_clusters
+        db.cluster_sampler()  # built before the writes, updated by them
+        db.save_question(_question("q1", "Being Brief", "terse"))
+        db.save_question(_question("q2", "Being Brief", "concise"))
+        db.save_question(_question("q3", "Being Wary", "wary", quality_issue="bad"))
+        assert _sampler_weights(db) == pytest.approx(_sql_weights(db))
+
+        db.mark_question_answered("q1", 0, True)
+        db.save_question(_question("q2", "Being Wary", "wary"))  # replaced, moves cluster
+        assert _sampler_weights(db) == pytest.approx(_sql_weights(db))
+
+        db.upsert_cluster_progress("Being Brief", 2.5, 1.0, 1, "2026-01-01", True)
+        db.set_cluster_archived("Being Brief", True)
+        assert _sampler_weights(db) == pytest.approx(_sql_weights(db))
+        assert set(_sampler_weights(db)) == {"Being Wary"}
+        db.set_cluster_archived("Being Brief", False)
+        assert _sampler_weights(db) == pytest.approx(_sql_weights(db))
+
+    def test_rebuilt_sampler_matches_incremental_one(self, two_clusters):
+        db = two_clusters
+        incremental = db.cluster_sampler()
+        db.save_question(_question("q1", "Being Brief", "terse"))
+        db.mark_question_answered("q1", 1, False)
+        db.save_question(_question("q2", "Being Brief", "terse"))
+        db.mark_question_answered("q2", 0, True)
+        rebuilt = ClusterSampler.from_db(db)
+        assert rebuilt.ready == incremental.ready
+        assert rebuilt.accuracy == incremental.accuracy == {"Being Brief": {"terse": [2, 1]}}
+
+    def test_pick_makes_no_queries(self, two_clusters):
+        db = two_clusters
+        db.cluster_sampler()
+        statements = []
+        db.conn.set_trace_callback(statements.append)
+        try:
+            for _ in range(20):
+                cluster, word = db.cluster_sampler().pick()
+                assert word["word"] in {w["word"] for w in db.cluster_sampler().words[cluster["title"]]}
+        finally:
+            db.conn.set_trace_callback(None)
+        assert statements == []
+
+    def test_reimport_rebuilds(self, two_clusters):
+        db = two_clusters
+        before = db.cluster_sampler()
+        db.import_clusters([DistinctionCluster(
+            title="Tiny", preamble="", commentary="",
+            entries=[DistinctionEntry("a", "", ""), DistinctionEntry("b", "", "")],
+        )])
+        after = db.cluster_sampler()
+        assert after is not before
+        assert "Tiny" not in after.index  # fewer than four words
+
+    def test_unknown_answer_triggers_rebuild(self, two_clusters):
+        db = two_clusters
+        before = db.cluster_sampler()
+        db.mark_question_answered("nope", 0, True)
+        assert db.cluster_sampler() is not before
+
+    def test_empty_database(self, tmp_db):
+        assert tmp_db.cluster_sampler().pick() is None
+
+    def test_coverage_weighting(self, two_clusters):
+        db = two_clusters
+        for i in range(3):
+            db.save_question(_question(f"q{i}", "Being Brief", "terse"))
+        sampler = ClusterSampler.from_db(db, rng=random.Random(1))
+        counts = Counter(sampler.pick_cluster()["title"] for _ in range(4000))
+        # weights 1/4 vs 1/1
+        assert counts["Being Wary"] / counts["Being Brief"] == pytest.approx(4.0, rel=0.2)
@@ -0,0 +1,185 @@
+"""Tests for the priority LLM scheduler."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from vocab_trainer.providers.scheduler import LLMScheduler, Priority, ScheduledLLM
+
+
+class SlowLLM:
+    """Fake LLM whose calls take *delay* seconds and log start/finish order."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.events: list[str] = []
+        self.cancelled: list[str] = []
+
+    async def generate(self, prompt: str, temperature: float = 0.7) -> str:
+        self.events.append(f"start:{prompt}")
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(prompt)
+            raise
+        self.events.append(f"end:{prompt}")
+        return f"reply:{prompt}"
+
+    async def generate_stream(self, prompt: str, temperature: float = 0.7):
+        self.events.append(f"start:{prompt}")
+        for tok in ("a", "b", "c"):
+            await asyncio.sleep(self.delay / 3)
+            yield tok
+        self.events.append(f"end:{prompt}")
+
+    def name(self) -> str:
+        return "slow-llm"
+
+
+class TestLLMScheduler:
+    @pytest.mark.asyncio
+    async def test_respects_concurrency_limit(self):
+        sched = LLMScheduler(max_concurrent=2)
+        peak = 0
+        active = 0
+
+        async def job():
+            nonlocal peak, active
+            async with sched.slot(Priority.REFILL):
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(job() for _ in range(6)))
+        assert peak == 2
+        assert sched.stats()["completed"]["refill"] == 6
+
+    @pytest.mark.asyncio
+    async def test_waiters_admitted_in_priority_order(self):
+        sched = LLMScheduler(max_concurrent=1, preempt=False)
+        order: list[str] = []
+
+        async def job(label: str, prio: Priority):
+            async with sched.slot(prio):
+                order.append(label)
+                await asyncio.sleep(0.01)
+
+        holder = asyncio.create_task(job("first", Priority.PREFETCH))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(job("prefetch", Priority.PREFETCH)),
+            asyncio.create_task(job("refill", Priority.REFILL)),
+            asyncio.create_task(job("chat", Priority.CHAT)),
+        ]
+        await asyncio.gather(holder, *tasks)
+        assert order == ["first", "chat", "refill", "prefetch"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        sched = LLMScheduler(max_concurrent=1)
+        gate = asyncio.Event()
+
+        async def holder():
+            async with sched.slot(Priority.REFILL, preemptible=False):
+                await gate.wait()
+
+        h = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(sched.acquire(Priority.PREFETCH))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        gate.set()
+        await h
+        # Slot is free again
+        async with sched.slot(Priority.CHAT):
+            pass
+        assert sched.stats()["running"] == {"chat": 0, "refill": 0, "prefetch": 0}
+
+    @pytest.mark.asyncio
+    async def test_configure_admits_waiters_when_capacity_grows(self):
+        sched = LLMScheduler(max_concurrent=1, preempt=False)
+        held = await sched.acquire(Priority.REFILL, preemptible=False)
+        waiter = asyncio.create_task(sched.acquire(Priority.PREFETCH))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        sched.configure(max_concurrent=2, preempt=True)
+        slot = await asyncio.wait_for(waiter, timeout=1)
+        assert sched.preempt and sched.stats()["max_concurrent"] == 2
+        sched.release(slot)
+        sched.release(held)
+
+    @pytest.mark.asyncio
+    async def test_busy_above(self):
+        sched = LLMScheduler(max_concurrent=1, preempt=False)
+        assert not sched.busy_above(Priority.PREFETCH)
+        async with sched.slot(Priority.PREFETCH):
+            assert not sched.busy_above(Priority.PREFETCH)
+            waiter = asyncio.create_task(sched.acquire(Priority.REFILL))
+            await asyncio.sleep(0)
+            assert sched.busy_above(Priority.PREFETCH)
+            assert not sched.busy_above(Priority.REFILL)
+        sched.release(await waiter)
+        assert not sched.busy_above(Priority.PREFETCH)
+
+
+class TestScheduledLLM:
+    @pytest.mark.asyncio
+    async def test_chat_preempts_background_call_and_it_is_retried(self):
+        llm = SlowLLM(delay=0.1)
+        sched = LLMScheduler(max_concurrent=1, preempt=True)
+        bg = ScheduledLLM(llm, sched, Priority.REFILL)
+        chat = ScheduledLLM(llm, sched, Priority.CHAT)
+
+        bg_task = asyncio.create_task(bg.generate("grammar"))
+        await asyncio.sleep(0.02)
+        tokens = [t async for t in chat.generate_stream("hello")]
+
+        assert tokens == ["a", "b", "c"]
+        # Background stage was cancelled mid-flight, not lost: it re-runs after chat
+        assert await bg_task == "reply:grammar"
+        assert llm.cancelled == ["grammar"]
+        assert llm.events == ["start:grammar", "start:hello", "end:hello",
+                              "start:grammar", "end:grammar"]
+        assert sched.stats()["preemptions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_without_preemption_chat_waits_for_stage_boundary(self):
+        llm = SlowLLM(delay=0.05)
+        sched = LLMScheduler(max_concurrent=1, preempt=False)
+        bg = ScheduledLLM(llm, sched, Priority.PREFETCH)
+        chat = ScheduledLLM(llm, sched, Priority.CHAT)
+
+        async def two_stage_question():
+            await bg.generate("step1")
+            await bg.generate("grammar")
+
+        q = asyncio.create_task(two_stage_question())
+        await asyncio.sleep(0.01)
+        await chat.generate("hello")
+        await q
+
+        assert llm.cancelled == []
+        # Chat slots in between the two background stages
+        assert llm.events == ["start:step1", "end:step1", "start:hello", "end:hello",
+                              "start:grammar", "end:grammar"]
+
+    @pytest.mark.asyncio
+    async def test_outer_cancellation_propagates(self):
+        llm = SlowLLM(delay=1.0)
+        sched = LLMScheduler(max_concurrent=1)
+        bg = ScheduledLLM(llm, sched, Priority.REFILL)
+
+        task = asyncio.create_task(bg.generate("slow"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert sched.stats()["running"]["refill"] == 0
+
+    def test_name_delegates(self):
+        sched = LLMScheduler()
+        assert ScheduledLLM(SlowLLM(), sched, Priority.CHAT).name() == "slow-llm"
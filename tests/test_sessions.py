@@ -0,0 +1,105 @@
+"""Tests for the active-session stores (single process and SQLite)."""
+from __future__ import annotations
+
+import pytest
+
+from vocab_trainer.sessions import (
+    MemorySessionStore,
+    SessionConflict,
+    SQLiteSessionStore,
+    make_session_store,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_db):
+    return make_session_store(request.param, tmp_db)
+
+
+def _state(**kw) -> dict:
+    return {"questions": [{"id": "q1"}], "current_index": 0, "total": 0,
+            "seen_ids": {"q1"}, "seen_clusters": {"being brief"}, **kw}
+
+
+class TestSessionStore:
+    def test_round_trip_keeps_sets(self, store):
+        store[1] = _state()
+        session, version = store.load(1)
+        assert session["seen_ids"] == {"q1"}
+        assert session["seen_clusters"] == {"being brief"}
+        assert 1 in store and 2 not in store
+        assert store.load(2) is None
+
+    def test_load_returns_a_copy(self, store):
+        store[1] = _state()
+        session, _ = store.load(1)
+        session["total"] = 5
+        assert store.load(1)[0]["total"] == 0
+
+    def test_saved_state_is_a_copy(self, store):
+        state = _state()
+        store[1] = state
+        state["seen_ids"].add("q2")
+        session, version = store.load(1)
+        session["seen_ids"].add("q3")
+        store.save(1, session, version)
+        session["seen_ids"].add("q4")
+        assert store.load(1)[0]["seen_ids"] == {"q1", "q3"}
+
+    def test_stale_save_conflicts(self, store):
+        store[1] = _state()
+        first, v1 = store.load(1)
+        second, _ = store.load(1)
+        second["total"] = 1
+        v2 = store.save(1, second, v1)
+        assert v2 == v1 + 1
+        first["total"] = 7
+        with pytest.raises(SessionConflict):
+            store.save(1, first, v1)
+        assert store.load(1) == ({**second, "total": 1}, v2)
+
+    def test_save_of_deleted_session_conflicts(self, store):
+        store[1] = _state()
+        session, version = store.load(1)
+        assert store.delete(1)
+        assert not store.delete(1)
+        with pytest.raises(SessionConflict):
+            store.save(1, session, version)
+
+    def test_latest_is_last_saved(self, store):
+        assert store.latest() is None
+        store[1] = _state()
+        store[2] = _state()
+        session, version = store.load(1)
+        store.save(1, session, version)
+        assert store.latest() == 1
+
+    def test_prune_and_clear(self, store):
+        store[1] = _state()
+        assert store.prune("2000-01-01") == 0
+        assert store.prune("9999-01-01") == 1
+        store[2] = _state()
+        store.clear()
+        assert store.latest() is None
+
+
+class TestSharedAcrossConnections:
+    def test_second_process_sees_and_conflicts(self, tmp_path):
+        from vocab_trainer.db import Database
+        a, b = Database(tmp_path / "s.db"), Database(tmp_path / "s.db")
+        one, two = SQLiteSessionStore(a), SQLiteSessionStore(b)
+        one[1] = _state()
+        session, version = two.load(1)
+        session["current_index"] = 1
+        two.save(1, session, version)
+        with pytest.raises(SessionConflict):
+            one.save(1, _state(), version)
+        assert one.load(1)[0]["current_index"] == 1
+        a.close()
+        b.close()
+
+
+def test_unknown_store():
+    with pytest.raises(ValueError, match="Unknown session store"):
+        make_session_store("redis", None)
+    assert isinstance(make_session_store("memory", None), MemorySessionStore)
@@ -0,0 +1,84 @@
+"""Tests for the incremental <think> block filter."""
+from __future__ import annotations
+
+import random
+import re
+
+import pytest
+
+from vocab_trainer.providers.think import ThinkFilter, strip_think, strip_think_stream
+
+SAMPLES = [
+    "plain answer",
+    "<think>reasoning</think>Answer",
+    "<think>draft {\"a\": 1}</think>\n{\"a\": 2}",
+    "before<think>x</think>middle<think>y</think>after",
+    "a < b and c <th d </think> e",
+    "<<think>x</think>>",
+    "<think>a < b </thin </think>done",
+    "ends with <thi",
+    "trailing <",
+    "",
+]
+
+
+def _regex(text: str) -> str:
+    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)
+
+
+def _feed(chunks: list[str]) -> str:
+    f = ThinkFilter()
+    return "".join(f.feed(c) for c in chunks) + f.flush()
+
+
+def _split(text: str, cuts: list[int]) -> list[str]:
+    bounds = [0, *sorted(cuts), len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+class TestStripThink:
+    @pytest.mark.parametrize("text", SAMPLES)
+    def test_matches_regex_for_closed_blocks(self, text):
+        assert strip_think(text) == _regex(text)
+
+    def test_unclosed_block_hidden(self):
+        assert strip_think("Answer<think>still reasoning") == "Answer"
+
+    def test_stray_close_tag_kept(self):
+        # Templates that open the block themselves leave only the close tag
+        assert strip_think("</think>{}") == "</think>{}"
+
+
+class TestChunkBoundaries:
+    @pytest.mark.parametrize("text", SAMPLES)
+    def test_every_single_split(self, text):
+        for cut in range(len(text) + 1):
+            assert _feed(_split(text, [cut])) == _regex(text), cut
+
+    @pytest.mark.parametrize("text", SAMPLES)
+    def test_one_char_at_a_time(self, text):
+        assert _feed(list(text)) == _regex(text)
+
+    def test_random_splits(self):
+        rng = random.Random(7)
+        for _ in range(500):
+            text = "".join(rng.choice(["<think>", "</think>", "<", "t", "<th", "ok ", "</"])
+                           for _ in range(rng.randint(0, 12)))
+            cuts = [rng.randint(0, len(text)) for _ in range(rng.randint(0, 6))]
+            assert _feed(_split(text, cuts)) == strip_think(text), (text, cuts)
+
+    def test_visible_text_not_held_back(self):
+        f = ThinkFilter()
+        assert f.feed("Hello") == "Hello"
+        assert f.feed(" there <th") == " there "
+        assert f.feed("ink>secret</think>!") == "!"
+
+
+class TestStream:
+    @pytest.mark.asyncio
+    async def test_stream(self):
+        async def tokens():
+            for t in ["Hi <thi", "nk>plan</th", "ink>", " there"]:
+                yield t
+
+        assert [t async for t in strip_think_stream(tokens())] == ["Hi ", " there"]
@@ -0,0 +1,128 @@
+"""Tests for the generation worker (vocab-trainer worker)."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from vocab_trainer.config import Settings
+from vocab_trainer.providers.llm_fake import FakeLLMProvider
+from vocab_trainer.providers.policy import BackendUnavailable
+from vocab_trainer.worker import MAX_ATTEMPTS, GenerationWorker
+
+
+def _worker(db, **kw) -> GenerationWorker:
+    s = Settings(llm_provider="fake", llm_retries=0)
+    return GenerationWorker(db, settings=s, name="w1", llm=FakeLLMProvider(seed=1), **kw)
+
+
+class TestGenerationWorker:
+    @pytest.mark.asyncio
+    async def test_drains_queue_and_saves_questions(self, populated_db):
+        populated_db.enqueue_generation_jobs([("Being Brief", 1), ("Being Brief", 2)])
+        counts = await _worker(populated_db).run(drain=True)
+        assert counts == {"done": 2, "failed": 0, "released": 0}
+        assert populated_db.get_generation_job_counts() == {
+            "queued": 0, "running": 0, "done": 2, "failed": 0}
+        ids = [j["question_id"] for j in populated_db.get_finished_generation_jobs()]
+        assert all(populated_db.get_question_stem(qid) for qid in ids)
+
+    @pytest.mark.asyncio
+    async def test_unknown_cluster_fails_job(self, populated_db):
+        populated_db.enqueue_generation_jobs([("No Such Cluster", 1)])
+        counts = await _worker(populated_db).run(drain=True)
+        assert counts["failed"] == 1
+        job = populated_db.get_finished_generation_jobs()[0]
+        assert job["status"] == "failed" and "fewer than 4 words" in job["error"]
+
+    @pytest.mark.asyncio
+    async def test_claim_refreshes_cached_indexes(self, populated_db, monkeypatch):
+        forgotten = []
+        monkeypatch.setattr(populated_db, "forget_cached_indexes", lambda: forgotten.append(1))
+        worker = _worker(populated_db)
+        assert not await worker.run_one()  # nothing claimed, nothing dropped
+        assert forgotten == []
+        populated_db.enqueue_generation_jobs([("Being Brief", 1)])
+        assert await worker.run_one()
+        assert forgotten == [1]
+
+    @pytest.mark.asyncio
+    async def test_requeues_stale_job_from_crashed_worker(self, populated_db):
+        populated_db.enqueue_generation_jobs([("Being Brief", 1)])
+        job = populated_db.claim_generation_job("crashed")
+        populated_db.conn.execute(
+            "UPDATE generation_jobs SET heartbeat_at = '2000-01-01T00:00:00+00:00'")
+        populated_db.conn.commit()
+        assert await _worker(populated_db).run_one()
+        done = populated_db.get_finished_generation_jobs()[0]
+        assert (done["id"], done["worker"], done["status"]) == (job["id"], "w1", "done")
+        assert done["attempts"] == 2
+
+    @pytest.mark.asyncio
+    async def test_releases_job_when_backend_unavailable(self, populated_db, monkeypatch):
+        populated_db.enqueue_generation_jobs([("Being Brief", 1)])
+        worker = _worker(populated_db)
+
+        async def down(job):
+            raise BackendUnavailable(30)
+
+        monkeypatch.setattr(worker, "_run", down)
+        with pytest.raises(BackendUnavailable):
+            await worker.run_one()
+        assert worker.processed["released"] == 1
+        assert populated_db.get_generation_job_counts()["queued"] == 1
+
+    @pytest.mark.asyncio
+    async def test_released_job_backs_off_then_fails(self, populated_db, monkeypatch):
+        populated_db.enqueue_generation_jobs([("Being Brief", 1)])
+        worker = _worker(populated_db)
+
+        async def down(job):
+            raise BackendUnavailable(0)
+
+        monkeypatch.setattr(worker, "_run", down)
+        with pytest.raises(BackendUnavailable):
+            await worker.run_one()
+        job = populated_db.conn.execute("SELECT * FROM generation_jobs").fetchone()
+        assert job["not_before"] is not None
+        assert not await worker.run_one()  # still waiting out its backoff
+
+        populated_db.conn.execute(
+            "UPDATE generation_jobs SET attempts = ?, not_before = NULL", (MAX_ATTEMPTS - 1,))
+        with pytest.raises(BackendUnavailable):
+            await worker.run_one()
+        job = populated_db.get_finished_generation_jobs()[0]
+        assert job["status"] == "failed" and "backend unavailable" in job["error"]
+        assert worker.processed == {"done": 0, "failed": 1, "released": 1}
+
+    @pytest.mark.asyncio
+    async def test_two_workers_never_resume_the_same_checkpoint(self, populated_db, monkeypatch):
+        # Checkpoints are only resumed for the target a run picked
+        monkeypatch.setattr(
+            "vocab_trainer.worker._pick_target_in_cluster",
+            lambda db, title, cw: next(w for w in cw if w["word"] == "terse"),
+        )
+        draft = {
+            "stem": "Her ___ reply surprised everyone at the table.",
+            "choices": ["terse", "concise", "pithy", "laconic"],
+            "correct_index": 0,
+            "explanation": "Terse implies rudeness.",
+            "context_sentence": "Her terse reply surprised everyone at the table.",
+        }
+        populated_db.save_pending_question("p1", "Being Brief", "terse", "fill_blank", draft)
+        populated_db.enqueue_generation_jobs([("Being Brief", 1), ("Being Brief", 1)])
+        first, second = _worker(populated_db), _worker(populated_db)
+        second.name = "w2"
+        await asyncio.gather(first.run_one(), second.run_one())
+        ids = [j["question_id"] for j in populated_db.get_finished_generation_jobs()]
+        assert len(ids) == 2 and ids.count("p1") == 1
+        assert populated_db.get_pending_question("Being Brief") is None
+
+    @pytest.mark.asyncio
+    async def test_stop_event_ends_idle_worker(self, populated_db):
+        stop = asyncio.Event()
+        task = asyncio.create_task(_worker(populated_db).run(stop=stop))
+        await asyncio.sleep(0.05)
+        stop.set()
+        counts = await asyncio.wait_for(task, timeout=2)
+        assert counts == {"done": 0, "failed": 0, "released": 0}
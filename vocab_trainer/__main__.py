@@ -1,14 +1,16 @@
 """CLI entry point for vocab-trainer.
 
 Usage:
-  uv run python -m vocab_trainer serve [--port PORT] [--no-auto-import]
+  uv run python -m vocab_trainer serve [--port PORT] [--workers N] [--no-auto-import]
   uv run python -m vocab_trainer stop
-  uv run python -m vocab_trainer restart [--port PORT]
+  uv run python -m vocab_trainer restart [--port PORT] [--workers N]
   uv run python -m vocab_trainer status
   uv run python -m vocab_trainer import
   uv run python -m vocab_trainer generate [--count N]
   uv run python -m vocab_trainer regenerate [--batch N] [--dry-run]
   uv run python -m vocab_trainer stats
+  uv run python -m vocab_trainer worker [--name NAME] [--drain]
+  uv run python -m vocab_trainer fake-ollama [--port PORT] [--gpus N] [--token-rate T]
 """
 from __future__ import annotations
 
@@ -41,9 +43,15 @@ def main():
         _regenerate(args[1:])
     elif command == "stats":
         _stats()
+    elif command == "worker":
+        _worker(args[1:])
+    elif command == "fake-ollama":
+        from vocab_trainer.fake_ollama import main as fake_ollama
+        fake_ollama(args[1:])
     else:
         print(f"Unknown command: {command}")
-        print("Commands: serve, stop, restart, status, import, generate, regenerate, stats")
+        print("Commands: serve, stop, restart, status, import, generate, regenerate, stats, "
+              "worker, fake-ollama")
         sys.exit(1)
 
 
@@ -121,6 +129,9 @@ def _serve(args: list[str]):
 
     port = int(_parse_flag(args, "--port", "8765"))
     host = _parse_flag(args, "--host", "127.0.0.1")
+    workers = max(1, int(_parse_flag(args, "--workers", "1")))
+    # Several processes keep sessions and generation coordination in SQLite
+    os.environ["VOCAB_TRAINER_WORKERS"] = str(workers)
     _write_pid()
 
     if host == "0.0.0.0":
@@ -129,23 +140,28 @@ def _serve(args: list[str]):
         print(f"Starting Wiseacre on http://{local_ip}:{port}")
     else:
         print(f"Starting Wiseacre on http://{host}:{port}")
+    if workers > 1:
+        print(f"{workers} server processes, sharing sessions through the database")
     print("Press Ctrl+C to stop\n")
     try:
         uvicorn.run(
             "vocab_trainer.app:app",
             host=host,
             port=port,
+            workers=workers,
             reload=False,
             timeout_graceful_shutdown=5,
         )
     finally:
         _remove_pid()
         os.environ.pop("VOCAB_TRAINER_NO_AUTO_IMPORT", None)
+        os.environ.pop("VOCAB_TRAINER_WORKERS", None)
 
 
 def _import_vocab():
     from vocab_trainer.config import load_settings
     from vocab_trainer.db import Database
+    from vocab_trainer.embeddings import refresh as refresh_embeddings
     from vocab_trainer.parsers.distinctions_parser import parse_distinctions_file
     from vocab_trainer.parsers.vocabulary_parser import parse_vocabulary_file
 
@@ -176,9 +192,23 @@ def _import_vocab():
         db.set_file_mtime(str(vf), vf.stat().st_mtime_ns)
 
     print(f"\nTotal in DB: {db.get_word_count()} words, {db.get_cluster_count()} clusters")
+    embedded = refresh_embeddings(db, settings.embedding_model, settings.ollama_url)
+    if embedded is not None:
+        print(f"Embedding index: {embedded['embedded']} embedded, "
+              f"{embedded['removed']} removed, {embedded['total']} entries")
     db.close()
 
 
+def _record_usage(db):
+    """Count this run's LLM tokens and cost toward the daily budget; flush
+    the returned ledger before closing *db*."""
+    from vocab_trainer.accounting import UsageLedger
+    from vocab_trainer.providers.base import add_usage_listener
+    ledger = UsageLedger(db)
+    add_usage_listener(ledger.record)
+    return ledger
+
+
 def _generate(args: list[str]):
     count = 10
     for i, a in enumerate(args):
@@ -199,27 +229,49 @@ def _generate(args: list[str]):
 
     print(f"Generating {count} questions using {settings.llm_provider}...")
 
-    if settings.llm_provider == "ollama":
-        from vocab_trainer.providers.llm_ollama import OllamaProvider
-        llm = OllamaProvider(base_url=settings.ollama_url, model=settings.llm_model)
-    elif settings.llm_provider == "anthropic":
-        from vocab_trainer.providers.llm_anthropic import AnthropicProvider
-        llm = AnthropicProvider()
-    elif settings.llm_provider == "openai":
-        from vocab_trainer.providers.llm_openai import OpenAIProvider
-        llm = OpenAIProvider()
-    else:
-        print(f"Unknown LLM provider: {settings.llm_provider}")
+    from vocab_trainer.providers.registry import build_llm
+    try:
+        llm = build_llm(settings)
+    except ValueError as e:
+        print(e)
         sys.exit(1)
+    ledger = _record_usage(db)
 
     from vocab_trainer.question_generator import generate_batch
     questions = asyncio.run(generate_batch(llm, db, count=count))
+    ledger.flush()
 
     print(f"\nGenerated {len(questions)} questions")
     print(f"Question bank size: {db.get_question_bank_size()}")
     db.close()
 
 
+def _worker(args: list[str]):
+    """Run generation jobs queued by a server with ``external_workers`` on."""
+    import logging
+
+    from vocab_trainer.config import load_settings
+    from vocab_trainer.db import Database
+    from vocab_trainer.worker import GenerationWorker
+
+    logging.basicConfig(level=logging.INFO, format="%(name)s | %(message)s")
+    settings = load_settings()
+    db = Database(settings.db_full_path)
+    name = _parse_flag(args, "--name", "") or None
+    worker = GenerationWorker(db, name=name)
+    if not settings.external_workers:
+        print("Note: external_workers is off in config.json, so the server "
+              "generates in-process and queues no jobs.")
+    print(f"Worker {worker.name} processing generation jobs (Ctrl+C to stop)")
+    try:
+        counts = asyncio.run(worker.run(drain="--drain" in args))
+        print(f"Done: {counts['done']} questions, {counts['failed']} failed")
+    except KeyboardInterrupt:
+        print("\nStopped; any job in progress was returned to the queue.")
+    finally:
+        db.close()
+
+
 def _regenerate(args: list[str]):
     import json as _json
     from datetime import datetime, timezone
@@ -258,19 +310,14 @@ def _regenerate(args: list[str]):
         db.close()
         return
 
-    # Set up LLM provider (same pattern as _generate)
-    if settings.llm_provider == "ollama":
-        from vocab_trainer.providers.llm_ollama import OllamaProvider
-        llm = OllamaProvider(base_url=settings.ollama_url, model=settings.llm_model)
-    elif settings.llm_provider == "anthropic":
-        from vocab_trainer.providers.llm_anthropic import AnthropicProvider
-        llm = AnthropicProvider()
-    elif settings.llm_provider == "openai":
-        from vocab_trainer.providers.llm_openai import OpenAIProvider
-        llm = OpenAIProvider()
-    else:
-        print(f"Unknown LLM provider: {settings.llm_provider}")
+    # Set up LLM provider
+    from vocab_trainer.providers.registry import build_llm
+    try:
+        llm = build_llm(settings)
+    except ValueError as e:
+        print(e)
         sys.exit(1)
+    ledger = _record_usage(db)
 
     from vocab_trainer.question_generator import generate_question
 
@@ -295,11 +342,7 @@ def _regenerate(args: list[str]):
             failed += 1
             continue
 
-        cluster_words = db.get_cluster_words(cluster["id"])
-        word_info = next(
-            (w for w in cluster_words if w["word"].lower() == target_word.lower()),
-            None,
-        )
+        word_info = db.get_cluster_word(cluster["id"], target_word)
         if word_info is None:
             print(f"  [{i}/{len(batch)}] SKIP {target_word} — not found in cluster '{cluster_title}'")
             failed += 1
@@ -307,7 +350,8 @@ def _regenerate(args: list[str]):
 
         # Generate new question
         new_q = asyncio.run(
-            generate_question(llm, db, cluster=cluster, target_word_info=word_info, question_type=question_type)
+            generate_question(llm, db, cluster=cluster, target_word_info=word_info,
+                              question_type=question_type, checkpoint=False)
         )
 
         if new_q is None:
@@ -349,6 +393,8 @@ def _regenerate(args: list[str]):
         })
         succeeded += 1
 
+    ledger.flush()
+
     # Write log
     log_path.write_text(_json.dumps(log_entries, indent=2, ensure_ascii=False))
 
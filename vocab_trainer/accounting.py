@@ -0,0 +1,171 @@
+"""Token and cost accounting for LLM calls, and the daily budget.
+
+Every provider call's usage report (see
+:func:`vocab_trainer.providers.base.report_usage`) is priced and added to
+the ``llm_usage`` table, one row per day, provider and stage.  The ledger
+sums reports in memory and writes them every few seconds in one
+transaction, so LLM calls never wait on a database commit.  The daily
+budget — in tokens, US dollars, or both — throttles background generation
+in tiers: speculative prefetch slows down first and stops well before the
+budget is spent, refills a running session is waiting for slow down only
+once it is exhausted, and chat is never throttled.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vocab_trainer.config import Settings
+    from vocab_trainer.db import Database
+
+log = logging.getLogger("vocab_trainer.accounting")
+
+# USD per million tokens: (uncached input, cached input, output).  Matched
+# by model-name prefix, longest first; unknown hosted models cost nothing
+# until added here.  Local backends (Ollama) are always free.
+PRICES: dict[str, tuple[float, float, float]] = {
+    "claude-opus-4": (15.00, 1.50, 75.00),
+    "claude-sonnet-4": (3.00, 0.30, 15.00),
+    "claude-3-7-sonnet": (3.00, 0.30, 15.00),
+    "claude-3-5-haiku": (0.80, 0.08, 4.00),
+    "claude-haiku-4": (1.00, 0.10, 5.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+}
+
+# Anthropic bills writing a prompt-cache entry at 1.25x the input rate.
+CACHE_WRITE_MULTIPLIER = 1.25
+
+# Seconds the ledger sums usage in memory before writing it.
+LEDGER_FLUSH_SECONDS = 5.0
+
+# Budget tiers, as the fraction of the daily budget already used.
+PREFETCH_SLOW_AT = 0.5   # prefetch starts pausing between questions
+PREFETCH_STOP_AT = 0.8   # prefetch stops for the day
+REFILL_SLOW_AT = 1.0     # refills drop to one question per MAX_DELAY
+MAX_DELAY = 60.0
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def price_for(provider: str) -> tuple[float, float, float] | None:
+    """Per-million-token prices for a provider name like ``"openai/gpt-4o-mini"``."""
+    kind, _, model = provider.partition("/")
+    if kind not in ("anthropic", "openai"):
+        return None
+    for prefix in sorted(PRICES, key=len, reverse=True):
+        if model.startswith(prefix):
+            return PRICES[prefix]
+    return None
+
+
+def cost_of(usage: dict) -> float:
+    """US dollars for one usage report (0.0 for local or unpriced models)."""
+    prices = price_for(usage.get("provider", ""))
+    if prices is None:
+        return 0.0
+    uncached_in, cached_in, output = prices
+    cached = usage.get("cached_tokens") or 0
+    written = usage.get("cache_creation_tokens") or 0
+    uncached = (usage.get("prompt_tokens") or 0) - cached - written
+    completion = usage.get("completion_tokens") or 0
+    return (uncached * uncached_in + cached * cached_in
+            + written * uncached_in * CACHE_WRITE_MULTIPLIER
+            + completion * output) / 1_000_000
+
+
+class UsageLedger:
+    """Usage listener that persists every call's tokens and cost to *db*.
+
+    Reports are summed per day, provider and stage and written at most every
+    *flush_seconds*, so the budget may trail the last few seconds of calls;
+    call :meth:`flush` before reading totals that must be exact.
+    """
+
+    def __init__(self, db: Database, flush_seconds: float = LEDGER_FLUSH_SECONDS):
+        self.db = db
+        self.flush_seconds = flush_seconds
+        # (day, provider, stage) -> [calls, prompt, cached, completion, cost]
+        self._pending: dict[tuple[str, str, str], list] = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, usage: dict) -> None:
+        key = (today(), usage.get("provider", "unknown"), usage.get("stage", "other"))
+        with self._lock:
+            row = self._pending.setdefault(key, [0, 0, 0, 0, 0.0])
+            row[0] += 1
+            row[1] += usage.get("prompt_tokens") or 0
+            row[2] += usage.get("cached_tokens") or 0
+            row[3] += usage.get("completion_tokens") or 0
+            row[4] += cost_of(usage)
+            due = time.monotonic() - self._flushed_at >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write everything recorded so far."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if pending:
+            self.db.add_llm_usage_rows([(*key, *row) for key, row in pending.items()])
+
+
+def budget_used(db: Database, settings: Settings) -> float:
+    """Fraction of today's budget spent (the larger of tokens and dollars).
+
+    0.0 when no budget is configured.
+    """
+    limits = (settings.llm_daily_token_budget, settings.llm_daily_cost_budget)
+    if not any(limits):
+        return 0.0
+    totals = db.get_llm_usage_totals(today())
+    used = 0.0
+    if settings.llm_daily_token_budget:
+        used = max(used, totals["tokens"] / settings.llm_daily_token_budget)
+    if settings.llm_daily_cost_budget:
+        used = max(used, totals["cost_usd"] / settings.llm_daily_cost_budget)
+    return used
+
+
+def throttle_delay(refill: bool, used: float) -> float | None:
+    """Seconds to wait before the next background question, or None to skip it.
+
+    *refill* is True for a question a running session is waiting for.
+    """
+    if refill:
+        return MAX_DELAY if used >= REFILL_SLOW_AT else 0.0
+    if used >= PREFETCH_STOP_AT:
+        return None
+    if used >= PREFETCH_SLOW_AT:
+        return MAX_DELAY * (used - PREFETCH_SLOW_AT) / (PREFETCH_STOP_AT - PREFETCH_SLOW_AT)
+    return 0.0
+
+
+def budget_status(db: Database, settings: Settings) -> dict:
+    """Today's totals per stage plus the budget and which tiers are active."""
+    day = today()
+    used = budget_used(db, settings)
+    return {
+        "day": day,
+        "totals": db.get_llm_usage_totals(day),
+        "stages": db.get_llm_usage_by_stage(day),
+        "budget": {
+            "tokens": settings.llm_daily_token_budget or None,
+            "cost_usd": settings.llm_daily_cost_budget or None,
+            "used": round(used, 3),
+            "prefetch": "stopped" if used >= PREFETCH_STOP_AT
+                        else "slowed" if used >= PREFETCH_SLOW_AT else "normal",
+            "refill": "slowed" if used >= REFILL_SLOW_AT else "normal",
+        },
+    }
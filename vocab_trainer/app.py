@@ -7,8 +7,11 @@ import logging
 import os
 import random
 import signal
+import socket
+import time
 
 from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 logging.basicConfig(level=logging.INFO, format="%(name)s | %(message)s")
@@ -17,19 +20,46 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
+from vocab_trainer.accounting import UsageLedger, budget_status, budget_used, throttle_delay
 from vocab_trainer.audio import get_or_create_audio, sentence_hash
-from vocab_trainer.config import Settings, load_settings, save_settings
+from vocab_trainer.bank import refill_lead_days
+from vocab_trainer.chat import Conversation, ConversationStore
+from vocab_trainer.config import CONFIG_PATH, Settings, load_settings, save_settings
 from vocab_trainer.db import Database
+from vocab_trainer.embeddings import refresh as refresh_embeddings
+from vocab_trainer.metrics import UsageStats, generation_stats
 from vocab_trainer.models import Question
+from vocab_trainer.palette import PaletteSizer
 from vocab_trainer.parsers.distinctions_parser import parse_distinctions_file
 from vocab_trainer.parsers.vocabulary_parser import parse_vocabulary_file
+from vocab_trainer.prefilter import GrammarGate
+from vocab_trainer.prompts import CHAT_SYSTEM
+from vocab_trainer.providers.base import add_usage_listener, llm_stage
+from vocab_trainer.providers.policy import BackendUnavailable, LLMPolicy, PolicyLLM
+from vocab_trainer.providers.registry import ProviderRegistry
+from vocab_trainer.providers.scheduler import LLMScheduler, Priority, ScheduledLLM
 from vocab_trainer.question_generator import generate_batch, generate_question
+from vocab_trainer.sessions import MemorySessionStore, SessionConflict, make_session_store
 from vocab_trainer.srs import quality_from_answer, record_review
 
 # Global state (initialized in lifespan)
 _db: Database | None = None
 _settings: Settings | None = None
-_active_sessions: dict[int, dict] = {}  # session_id -> session state
+_active_sessions = MemorySessionStore()  # session_id -> session state
+
+# With several server processes (``serve --workers N`` or ``session_store:
+# "sqlite"``) sessions live in the database, background generation is
+# coordinated through leases there, and settings follow config.json.
+_shared_state = False
+_process_name = f"{socket.gethostname()}:{os.getpid()}"
+_config_mtime: int | None = None
+_config_checked = 0.0
+
+LEASE_SECONDS = 60.0  # a lease its holder stopped renewing is free after this
+LEASE_RENEW = 10.0
+SETTINGS_POLL = 1.0   # seconds between config.json checks
+SESSION_RETRIES = 5   # reload-and-reapply attempts on a session conflict
+SESSION_KEEP_HOURS = 24.0  # untouched active sessions are dropped after this
 
 
 def get_db() -> Database:
@@ -39,62 +69,225 @@ def get_db() -> Database:
 
 def get_settings() -> Settings:
     assert _settings is not None
+    if _shared_state:
+        _follow_config()
     return _settings
 
 
+def _config_stamp() -> int | None:
+    try:
+        return CONFIG_PATH.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _follow_config() -> None:
+    """Pick up settings another server process saved to config.json."""
+    global _settings, _config_mtime, _config_checked
+    now = time.monotonic()
+    if now - _config_checked < SETTINGS_POLL:
+        return
+    _config_checked = now
+    stamp = _config_stamp()
+    if stamp == _config_mtime:
+        return
+    _config_mtime = stamp
+    _settings = load_settings()
+    if "llm" in _providers.refresh(_settings):
+        _llm_policy.reset_breakers()
+
+
+def _take_lease(name: str) -> bool:
+    """Take cross-process lease *name*; always granted to a lone process."""
+    return not _shared_state or get_db().acquire_lease(name, _process_name, LEASE_SECONDS)
+
+
+def _drop_lease(name: str) -> None:
+    if _shared_state:
+        get_db().release_lease(name, _process_name)
+
+
+def _keep_lease(name: str) -> asyncio.Task | None:
+    """Renew lease *name* until the returned task is cancelled."""
+    if not _shared_state:
+        return None
+
+    async def _renew():
+        while True:
+            await asyncio.sleep(LEASE_RENEW)
+            get_db().acquire_lease(name, _process_name, LEASE_SECONDS)
+
+    return asyncio.create_task(_renew())
+
+
 def _get_llm():
+    return _providers.llm(get_settings())
+
+
+def _get_scheduler() -> LLMScheduler:
+    """The shared LLM scheduler; limits follow the current settings.
+
+    With several Ollama backends the limit applies per backend, and the
+    router spreads admitted calls across them.
+    """
+    global _llm_scheduler
     s = get_settings()
-    if s.llm_provider == "ollama":
-        from vocab_trainer.providers.llm_ollama import OllamaProvider
-        return OllamaProvider(base_url=s.ollama_url, model=s.llm_model)
-    elif s.llm_provider == "anthropic":
-        from vocab_trainer.providers.llm_anthropic import AnthropicProvider
-        return AnthropicProvider()
-    elif s.llm_provider == "openai":
-        from vocab_trainer.providers.llm_openai import OpenAIProvider
-        return OpenAIProvider()
-    raise ValueError(f"Unknown LLM provider: {s.llm_provider}")
+    backends = len(s.ollama_urls) if s.llm_provider == "ollama" and s.ollama_urls else 1
+    limit = max(1, int(s.llm_max_concurrent)) * backends
+    if _llm_scheduler is None:
+        _llm_scheduler = LLMScheduler(max_concurrent=limit, preempt=s.llm_preempt_background)
+    else:
+        _llm_scheduler.configure(max_concurrent=limit, preempt=s.llm_preempt_background)
+    return _llm_scheduler
 
 
-def _get_tts():
+def _get_policy() -> LLMPolicy:
+    """The shared timeout/retry/circuit-breaker policy, following current settings."""
+    _llm_policy.configure(**get_settings().policy_options())
+    return _llm_policy
+
+
+def _get_gate() -> GrammarGate:
+    """The shared grammar-gate skip policy, following current settings."""
+    _grammar_gate.configure(skip_at=float(get_settings().grammar_skip_pass_rate))
+    return _grammar_gate
+
+
+def _get_palette() -> PaletteSizer:
+    """The shared step-1 palette sizer, following current settings."""
     s = get_settings()
-    if s.tts_provider == "edge-tts":
-        from vocab_trainer.providers.tts_edge import EdgeTTSProvider
-        return EdgeTTSProvider(voice=s.tts_voice)
-    elif s.tts_provider == "elevenlabs":
-        from vocab_trainer.providers.tts_elevenlabs import ElevenLabsProvider
-        return ElevenLabsProvider(voice_id=s.tts_voice, model_id=s.elevenlabs_model)
-    elif s.tts_provider == "piper":
-        from vocab_trainer.providers.tts_piper import PiperTTSProvider
-        return PiperTTSProvider(model=s.tts_voice)
-    raise ValueError(f"Unknown TTS provider: {s.tts_provider}")
+    _palette.configure(max_words=int(s.palette_words),
+                       max_prefill_ms=float(s.palette_max_prefill_ms),
+                       adaptive=bool(s.adaptive_palette))
+    return _palette
+
+
+def _scheduled_llm(priority: Priority) -> ScheduledLLM:
+    """The configured LLM, with every call admitted by the scheduler at *priority*.
+
+    Inside the scheduler slot each call runs under the shared policy, so its
+    timeout counts backend time only.
+    """
+    return ScheduledLLM(PolicyLLM(_get_llm(), _get_policy()), _get_scheduler(), priority)
+
+
+def _get_tts():
+    return _providers.tts(get_settings())
 
 
 _bg_generating = False
+_forecasting = False  # idle-time prefetch for clusters coming due
+_watching_jobs = False  # following generation_jobs finished by worker processes
 _shutting_down = False
 _shutdown_event: asyncio.Event | None = None  # set on shutdown to unblock SSE sleeps
 _bg_log = logging.getLogger("vocab_trainer.bg")
 
-# Background LLM tasks — tracked so chat can cancel them for GPU priority.
+# Seconds between idle checks while the forecast prefetcher waits out
+# chat or refill work.
+FORECAST_IDLE_POLL = 0.5
+
+# With external workers: seconds between checks for finished jobs, and
+# clusters coming due queued per check once nothing else is needed.
+JOB_POLL = 1.0
+FORECAST_JOBS = 5
+
+# Background tasks — tracked so shutdown can cancel them.
 _bg_tasks: set[asyncio.Task] = set()
 
+# All LLM calls (chat, refill, prefetch) share one priority scheduler so chat
+# gets the GPU first and background work waits instead of being cancelled.
+_llm_scheduler: LLMScheduler | None = None
+
+# Per-stage timeouts, retry backoff and the per-backend circuit breakers
+# that pause background generation while a backend is down.
+_llm_policy = LLMPolicy()
+
+# Measured grammar-gate pass rates; drafts from model/question-type pairs
+# that almost always pass skip the gate (see prefilter.py).
+_grammar_gate = GrammarGate()
+
+# Vocabulary palette size per question type, shrunk while a smaller palette
+# drafts as well or prefill runs slow (see palette.py).
+_palette = PaletteSizer()
+add_usage_listener(_palette.record_usage)
+
+# LLM/TTS providers are built once and reused; PUT /api/settings drops the
+# ones whose settings changed.
+_providers = ProviderRegistry()
+
+# Per-call-type token/prefill totals, fed by every provider call.
+_usage_stats = UsageStats()
+add_usage_listener(_usage_stats.record)
+
+
+# Persists every call's tokens and cost, which the daily budget reads.
+_usage_ledger: UsageLedger | None = None
+
+
+def _account_usage(usage: dict) -> None:
+    global _usage_ledger
+    if _db is None:
+        return
+    if _usage_ledger is None or _usage_ledger.db is not _db:
+        _usage_ledger = UsageLedger(_db)
+    _usage_ledger.record(usage)
+
+
+def _flush_usage() -> None:
+    if _usage_ledger is not None and _usage_ledger.db is _db:
+        _usage_ledger.flush()
+
+
+add_usage_listener(_account_usage)
+
+
+def _bank_policy() -> tuple[float, int]:
+    """(refill lead time in days, depth cap) for the active-cluster bank."""
+    s = get_settings()
+    if not s.adaptive_bank_depth:
+        return 0.0, 1
+    lead = refill_lead_days(get_db().get_active_cluster_count(),
+                            generation_stats.seconds_per_question())
+    return lead, max(1, s.max_bank_depth)
+
+
+def _clusters_needing_questions() -> list[dict]:
+    """Active clusters below their target bank depth, in due order."""
+    return get_db().get_clusters_needing_questions(*_bank_policy())
+
+
+def _bank_stats() -> dict:
+    lead, max_depth = _bank_policy()
+    return {
+        "adaptive": get_settings().adaptive_bank_depth,
+        "seconds_per_question": generation_stats.seconds_per_question(),
+        "refill_lead_hours": round(lead * 24, 2),
+        "max_depth": max_depth,
+        "depths": get_db().get_bank_depths(lead, max_depth),
+    }
+
 
 def _collect_generation_needs() -> tuple[list[str], int, int]:
     """Find clusters needing questions.
 
+    A cluster short of several questions appears once per missing question.
     Returns (cluster_titles, active_count, new_count).
     """
     db = get_db()
     s = get_settings()
 
     # 1. Active clusters that need replacement questions
-    needing = db.get_clusters_needing_questions()
-    cluster_titles = [n["cluster_title"] for n in needing]
-    active_count = len(cluster_titles)
+    needing = _clusters_needing_questions()
+    cluster_titles = [n["cluster_title"] for n in needing
+                      for _ in range(n["depth"] - n["ready"])]
+    active_count = len(needing)
 
-    # 2. New clusters without ready questions (up to session_size)
+    # 2. New clusters without ready questions (up to session_size) —
+    # speculative, so the first thing a tight LLM budget cuts
     new_ready = db.get_new_clusters_with_ready_count()
     new_slots = max(0, s.session_size - new_ready)
+    if throttle_delay(False, budget_used(db, s)) is None:
+        new_slots = 0
     new_count = 0
     if new_slots > 0:
         new_needing = db.get_new_clusters_without_questions(limit=new_slots)
@@ -102,6 +295,11 @@ def _collect_generation_needs() -> tuple[list[str], int, int]:
         cluster_titles.extend(new_titles)
         new_count = len(new_titles)
 
+    # Finish checkpointed questions first — their LLM work is already paid for
+    pending = set(db.get_pending_cluster_titles())
+    if pending:
+        cluster_titles.sort(key=lambda t: t not in pending)
+
     return cluster_titles, active_count, new_count
 
 
@@ -136,15 +334,30 @@ def _pregenerate_audio(*texts: str) -> None:
 
 
 async def _ensure_question_buffer():
-    """Kick off background generation if clusters need questions."""
+    """Kick off background generation if clusters need questions.
+
+    With ``external_workers`` the needs are queued as jobs for
+    ``vocab-trainer worker`` processes instead.  With several server
+    processes only the one holding the "generation" lease generates; it
+    picks up needs from the others' sessions as it goes.
+    """
     global _bg_generating
+    if get_settings().external_workers:
+        _enqueue_generation_needs()
+        return
     if _bg_generating:
         _bg_log.debug("Buffer check: skipped (generation already running)")
         return
 
     cluster_titles, active_count, new_count = _collect_generation_needs()
     if not cluster_titles:
+        _start_forecast()
+        return
+    if not _take_lease("generation"):
+        _bg_log.debug("Buffer check: skipped (another process is generating)")
         return
+    if _shared_state:
+        get_db().forget_cached_indexes()  # others may have saved questions
 
     _bg_log.info("Buffer: %s clusters need questions",
                  _log_needs(active_count, new_count))
@@ -155,20 +368,231 @@ async def _ensure_question_buffer():
     task.add_done_callback(_bg_tasks.discard)
 
 
+def _generating() -> bool:
+    """Whether more questions are on their way (in-process, from another
+    server process, or from workers)."""
+    if _bg_generating:
+        return True
+    if _shared_state and get_db().get_lease_holder("generation"):
+        return True
+    if get_settings().external_workers:
+        counts = get_db().get_generation_job_counts()
+        return counts["queued"] + counts["running"] > 0
+    return False
+
+
+def _enqueue_generation_needs() -> None:
+    """Queue a job per missing question; clusters coming due when none are.
+
+    Refills for active clusters are queued at REFILL priority, the rest at
+    PREFETCH, so workers take them in the order the in-process loop would.
+    Needs already covered by open jobs aren't queued twice.
+    """
+    db = get_db()
+    cluster_titles, active_count, new_count = _collect_generation_needs()
+    refill = {n["cluster_title"] for n in _clusters_needing_questions()}
+    needs = [(t, Priority.REFILL if t in refill else Priority.PREFETCH)
+             for t in cluster_titles]
+    if not needs and throttle_delay(False, budget_used(db, get_settings())) is not None:
+        needs = [(t, Priority.PREFETCH) for t in _forecast_candidates(FORECAST_JOBS)]
+    added = db.enqueue_generation_jobs(needs)
+    if added:
+        _bg_log.info("Queued %d generation jobs (%s)", added,
+                     _log_needs(active_count, new_count) or "coming due")
+    _start_job_watcher()
+
+
+def _start_job_watcher() -> None:
+    global _watching_jobs
+    if _watching_jobs or _shutting_down:
+        return
+    _watching_jobs = True
+    seen = max((j["finished_at"] for j in get_db().get_finished_generation_jobs()), default="")
+    task = asyncio.create_task(_watch_generation_jobs(seen))
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+
+
+async def _watch_generation_jobs(seen: str):
+    """Follow jobs finished by worker processes after *seen* (ISO time).
+
+    Each finished job feeds the generation-rate estimate behind the bank
+    depth, and drops the cached sampler and stem index that don't know its
+    question; then the needs are checked again, as the in-process loop does
+    after every question.  Sessions pick the new questions up from the
+    database on their own.
+    """
+    global _watching_jobs
+    try:
+        db = get_db()
+        while get_settings().external_workers:
+            finished = db.get_finished_generation_jobs(seen)
+            for job in finished:
+                seen = job["finished_at"]
+                if job["claimed_at"] and job["finished_at"]:
+                    took = (datetime.fromisoformat(job["finished_at"])
+                            - datetime.fromisoformat(job["claimed_at"])).total_seconds()
+                    generation_stats.time_question(took, job["status"] == "done")
+            if finished:
+                done = sum(1 for j in finished if j["status"] == "done")
+                _bg_log.info("Workers finished %d jobs (%d questions)", len(finished), done)
+                db.forget_cached_indexes()
+                _enqueue_generation_needs()
+            if not await _pause(JOB_POLL):
+                break
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        _bg_log.warning("Job watcher failed: %s", e)
+    finally:
+        _watching_jobs = False
+
+
+def _forecast_candidates(limit: int) -> list[str]:
+    """Clusters due within the prefetch horizon and below the bank-depth cap."""
+    s = get_settings()
+    if s.prefetch_horizon_hours <= 0 or s.max_bank_depth < 1:
+        return []
+    until = datetime.now(timezone.utc) + timedelta(hours=s.prefetch_horizon_hours)
+    rows = get_db().get_clusters_due_before(until.isoformat(), s.max_bank_depth, limit)
+    return [r["cluster_title"] for r in rows]
+
+
+def _start_forecast() -> None:
+    """Start the forecast prefetcher if it is idle and has work."""
+    global _forecasting
+    if _forecasting or _shutting_down or not _forecast_candidates(1):
+        return
+    if not _take_lease("forecast"):
+        return
+    _forecasting = True
+    task = asyncio.create_task(_forecast_in_background())
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+
+
+async def _forecast_in_background():
+    """Pre-generate questions for clusters coming due, in due-date order.
+
+    After a long break many clusters come due at once; questions banked for
+    them beforehand mean the session doesn't wait on refills.  This only
+    uses otherwise idle LLM time: it stops as soon as refill generation
+    starts, waits while chat or refill calls are queued, and its own calls
+    run at PREFETCH priority, so the scheduler preempts them for
+    interactive work.  It ends once every cluster due within
+    ``prefetch_horizon_hours`` holds ``max_bank_depth`` ready questions.
+    """
+    global _forecasting
+    lease = _keep_lease("forecast")
+    try:
+        from vocab_trainer.question_generator import _pick_target_in_cluster
+
+        db = get_db()
+        if _shared_state:
+            db.forget_cached_indexes()
+        llm = _scheduled_llm(Priority.PREFETCH)
+        attempts: dict[str, int] = {}
+        generated = 0
+        while not _generating():
+            if _get_scheduler().busy_above(Priority.PREFETCH):
+                if not await _pause(FORECAST_IDLE_POLL):
+                    break
+                continue
+            depth = get_settings().max_bank_depth
+            exhausted = sum(1 for n in attempts.values() if n >= depth)
+            titles = [t for t in _forecast_candidates(exhausted + 1)
+                      if attempts.get(t, 0) < depth]
+            if not titles:
+                break
+            cluster_title = titles[0]
+            attempts[cluster_title] = attempts.get(cluster_title, 0) + 1
+
+            delay = throttle_delay(False, budget_used(db, get_settings()))
+            if delay is None:
+                break
+            if delay > 0 and not await _pause(delay):
+                break
+            if not await _wait_for_backend():
+                break
+            cluster = db.get_cluster_by_title(cluster_title)
+            cw = db.get_cluster_words(cluster["id"]) if cluster else []
+            if len(cw) < 4:
+                attempts[cluster_title] = depth
+                continue
+            word_info = _pick_target_in_cluster(db, cluster_title, cw)
+            _bg_log.info("Forecast: generating for '%s' (target: %s)",
+                         cluster_title, word_info["word"])
+            started = time.monotonic()
+            try:
+                q = await generate_question(llm, db, cluster=cluster,
+                                            target_word_info=word_info, gate=_get_gate(),
+                                            palette=_get_palette())
+            except BackendUnavailable:
+                attempts[cluster_title] -= 1
+                continue
+            generation_stats.time_question(time.monotonic() - started, q is not None)
+            if q:
+                db.save_question(q)
+                generated += 1
+        if generated:
+            _bg_log.info("Forecast: banked %d questions for clusters coming due", generated)
+    except asyncio.CancelledError:
+        _bg_log.info("Forecast prefetch cancelled (shutdown)")
+    except Exception as e:
+        _bg_log.warning("Forecast prefetch failed: %s", e)
+    finally:
+        if lease:
+            lease.cancel()
+        _forecasting = False
+        try:
+            _drop_lease("forecast")
+        except Exception:
+            pass  # DB may be closed during shutdown
+
+
+async def _pause(delay: float) -> bool:
+    """Sleep *delay* seconds, waking early on shutdown.  False if shutting down."""
+    if _shutdown_event:
+        try:
+            await asyncio.wait_for(_shutdown_event.wait(), timeout=delay)
+            return False
+        except asyncio.TimeoutError:
+            return True
+    await asyncio.sleep(delay)
+    return True
+
+
+async def _wait_for_backend() -> bool:
+    """Sleep while a background circuit breaker is open.  False if shutting down."""
+    while (breaker := _llm_policy.blocking_breaker()) is not None:
+        # A probe already in flight leaves retry_in() at 0; poll gently
+        delay = breaker.retry_in() or 1.0
+        _bg_log.info("Backend unavailable — background generation paused for %.0fs", delay)
+        if not await _pause(delay):
+            return False
+    return True
+
+
 async def _generate_in_background(initial_clusters: list[str]):
     """Generate questions one at a time, polling for new needs between each.
 
     When the user answers questions mid-batch, their clusters need
     replacement questions.  Instead of waiting for the batch to finish,
     we poll after each generation and grow the queue dynamically.
+
+    Active clusters (a session is waiting for their replacement) run at
+    REFILL priority; new clusters are speculative and run at PREFETCH.
     """
     global _bg_generating
     cancelled = False
+    lease = _keep_lease("generation")
     try:
         from vocab_trainer.question_generator import _pick_target_in_cluster
 
         db = get_db()
-        llm = _get_llm()
+        refill_llm = _scheduled_llm(Priority.REFILL)
+        prefetch_llm = _scheduled_llm(Priority.PREFETCH)
+        refill = {n["cluster_title"] for n in _clusters_needing_questions()}
         queue = list(initial_clusters)
         seen: set[str] = set(queue)
         generated = 0
@@ -188,9 +612,31 @@ async def _generate_in_background(initial_clusters: list[str]):
 
             _bg_log.info("[%d/%d] Generating for '%s' (target: %s)",
                          idx, len(queue), cluster_title, word_info["word"])
-            q = await generate_question(
-                llm, db, cluster=cluster, target_word_info=word_info,
-            )
+            is_refill = cluster_title in refill
+            delay = throttle_delay(is_refill, budget_used(db, get_settings()))
+            if delay is None:
+                _bg_log.info("[%d/%d] Skipping '%s' — daily LLM budget reserved for refills",
+                             idx, len(queue), cluster_title)
+                continue
+            if delay > 0:
+                _bg_log.info("Daily LLM budget running low — waiting %.0fs", delay)
+                if not await _pause(delay):
+                    break
+            llm = refill_llm if is_refill else prefetch_llm
+            if not await _wait_for_backend():
+                break
+            started = time.monotonic()
+            try:
+                q = await generate_question(
+                    llm, db, cluster=cluster, target_word_info=word_info,
+                    gate=_get_gate(), palette=_get_palette(),
+                )
+            except BackendUnavailable:
+                # Finished stages are checkpointed; retry once the breaker
+                # lets a probe through.
+                idx -= 1
+                continue
+            generation_stats.time_question(time.monotonic() - started, q is not None)
             if q:
                 db.save_question(q)
                 if q.quality_issue:
@@ -202,23 +648,31 @@ async def _generate_in_background(initial_clusters: list[str]):
                                 idx, len(queue), cluster_title)
 
             # Poll for active clusters needing replacement (answered mid-batch).
-            for n in db.get_clusters_needing_questions():
+            for n in _clusters_needing_questions():
                 ct = n["cluster_title"]
                 if ct not in seen:
-                    queue.append(ct)
+                    missing = n["depth"] - n["ready"]
+                    queue.extend([ct] * missing)
                     seen.add(ct)
-                    _bg_log.info("Buffer grew: +1 active (%s), now %d total",
-                                 ct, len(queue))
+                    refill.add(ct)
+                    _bg_log.info("Buffer grew: +%d active (%s), now %d total",
+                                 missing, ct, len(queue))
 
         _bg_log.info("Generated %d questions, bank now %d ready",
                      generated, db.get_ready_question_count())
     except asyncio.CancelledError:
-        _bg_log.info("Background generation cancelled (session/chat priority)")
+        _bg_log.info("Background generation cancelled (shutdown)")
         cancelled = True
     except Exception as e:
         _bg_log.warning("Background generation failed: %s", e)
     finally:
+        if lease:
+            lease.cancel()
         _bg_generating = False
+        try:
+            _drop_lease("generation")
+        except Exception:
+            pass  # DB may be closed during shutdown
         if not cancelled:
             try:
                 await _ensure_question_buffer()
@@ -250,6 +704,50 @@ def _auto_import_if_changed(db: Database, settings: Settings) -> None:
         db.set_file_mtime(str(vf), current_mtime)
 
 
+async def _refresh_embeddings(db: Database, settings: Settings) -> dict | None:
+    """Sync the embedding index in a worker thread: embedding calls block.
+
+    The thread gets its own connection, so the server's keeps serving
+    requests; *db* reloads the index once the sync is done.
+    """
+    def _sync() -> dict | None:
+        thread_db = Database(db.db_path)
+        try:
+            return refresh_embeddings(thread_db, settings.embedding_model, settings.ollama_url)
+        finally:
+            thread_db.close()
+
+    try:
+        return await asyncio.to_thread(_sync)
+    finally:
+        db.forget_embedding_index()
+
+
+def _start_embedding_refresh(db: Database, settings: Settings) -> None:
+    """Bring the embedding index up to date in the background after startup."""
+    async def _refresh():
+        if not _take_lease("embeddings"):
+            return  # another process is already on it
+        lease = _keep_lease("embeddings")
+        try:
+            await _refresh_embeddings(db, settings)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            _bg_log.warning("Embedding index refresh failed: %s", e)
+        finally:
+            if lease:
+                lease.cancel()
+            try:
+                _drop_lease("embeddings")
+            except Exception:
+                pass  # DB may be closed during shutdown
+
+    task = asyncio.create_task(_refresh())
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+
+
 def _install_shutdown_handlers() -> None:
     """Wrap uvicorn's signal handlers to close SSE connections immediately.
 
@@ -304,16 +802,43 @@ def _cleanup_orphaned_audio(db: Database, settings: Settings) -> None:
         log.info("Removed %d orphaned audio files", removed)
 
 
+def _start_warm_up():
+    """Load the LLM in the background so the first real call is warm."""
+    async def _warm_up():
+        try:
+            llm = _get_llm()
+            if hasattr(llm, "warm_up"):
+                await llm.warm_up()
+        except Exception as e:
+            _bg_log.warning("LLM warm-up failed: %s", e)
+
+    task = asyncio.create_task(_warm_up())
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+
+
 @asynccontextmanager
 async def lifespan(app_instance):
-    global _db, _settings, _shutdown_event
+    global _db, _settings, _shutdown_event, _active_sessions, _shared_state, _config_mtime
     if _db is None:
         _shutdown_event = asyncio.Event()
+        _config_mtime = _config_stamp()
         _settings = load_settings()
         _db = Database(_settings.db_full_path)
-        if not os.environ.get("VOCAB_TRAINER_NO_AUTO_IMPORT"):
-            _auto_import_if_changed(_db, _settings)
-        _cleanup_orphaned_audio(_db, _settings)
+        workers = int(os.environ.get("VOCAB_TRAINER_WORKERS", "1"))
+        store = "sqlite" if workers > 1 else _settings.session_store
+        _active_sessions = make_session_store(store, _db)
+        _shared_state = store == "sqlite"
+        # With several processes starting at once, one imports and cleans up
+        if _take_lease("startup"):
+            try:
+                if not os.environ.get("VOCAB_TRAINER_NO_AUTO_IMPORT"):
+                    _auto_import_if_changed(_db, _settings)
+                    _start_embedding_refresh(_db, _settings)
+                _cleanup_orphaned_audio(_db, _settings)
+            finally:
+                _drop_lease("startup")
+        _start_warm_up()
         await _ensure_question_buffer()
         _install_shutdown_handlers()
     yield
@@ -326,7 +851,9 @@ async def lifespan(app_instance):
         t.cancel()
     if _bg_tasks:
         await asyncio.wait(list(_bg_tasks), timeout=2)
+    await _providers.aclose()
     if _db:
+        _flush_usage()
         _db.close()
 
 app = FastAPI(title="Wiseacre", lifespan=lifespan)
@@ -374,7 +901,84 @@ if img_dir.is_dir():
 
 @app.get("/api/stats")
 async def api_stats():
-    return get_db().get_stats()
+    """Library and review totals, plus the question bank's target depths."""
+    return {**get_db().get_stats(), "bank": _bank_stats()}
+
+
+@app.get("/api/llm/backends")
+async def api_llm_backends():
+    """Per-backend load and health stats (multi-backend Ollama only)."""
+    s = get_settings()
+    backends = _providers.llm(s).stats() if s.llm_provider == "ollama" and s.ollama_urls else []
+    return {"backends": backends, "scheduler": _get_scheduler().stats()}
+
+
+@app.get("/api/llm/status")
+async def api_llm_status():
+    """Whether the configured model is loaded (resident) on its backend(s)."""
+    llm = _get_llm()
+    backends = []
+    if hasattr(llm, "status"):
+        status = await llm.status()
+        backends = status if isinstance(status, list) else [status]
+    return {
+        "provider": llm.name(),
+        "resident": all(b["resident"] for b in backends) if backends else None,
+        "backends": backends,
+    }
+
+
+@app.get("/api/llm/policy")
+async def api_llm_policy():
+    """Circuit breaker state and per-stage timeout/retry/error counters."""
+    return _get_policy().stats()
+
+
+def _stage_report() -> dict[str, dict]:
+    """Per stage: the model serving it, mean backend latency and the share
+    of its responses the pipeline accepted (see ``llm_stage_models``)."""
+    llm = _get_llm()
+    latency = _get_policy().stats()["stages"]
+    acceptance = {(a["stage"], a["model"]): a for a in generation_stats.acceptance()}
+    report = {}
+    for stage in sorted(set(latency) | {stage for stage, _ in acceptance}):
+        with llm_stage(stage):
+            model = llm.name()
+        acc = acceptance.get((stage, model))
+        report[stage] = {
+            "model": model,
+            "calls": latency.get(stage, {}).get("ok", 0),
+            "latency_s": latency.get(stage, {}).get("latency_s"),
+            "responses": acc["responses"] if acc else 0,
+            "acceptance_rate": acc["acceptance_rate"] if acc else None,
+        }
+    return report
+
+
+@app.get("/api/llm/usage")
+async def api_llm_usage():
+    """Token and prefill totals per call type since startup, generation
+    outcomes (e.g. near-duplicate rate, grammar-gate calls saved), gate pass
+    rates, palette sizes, per-stage model/latency/acceptance, and today's persisted totals,
+    cost and budget state."""
+    _flush_usage()
+    return {
+        "stages": _usage_stats.snapshot(),
+        "generation": generation_stats.snapshot(),
+        "grammar_gate": _get_gate().stats(),
+        "palette": _get_palette().stats(),
+        "routing": _stage_report(),
+        "today": budget_status(get_db(), get_settings()),
+    }
+
+
+@app.get("/api/jobs")
+async def api_jobs():
+    """Generation jobs by status, for ``external_workers`` deployments."""
+    return {
+        "external_workers": get_settings().external_workers,
+        **get_db().get_generation_job_counts(),
+    }
 
 
 # ── API: Import ───────────────────────────────────────────────────────────
@@ -399,12 +1003,14 @@ async def api_import():
             words = parse_vocabulary_file(vf)
             total_words += db.import_words(words)
         db.set_file_mtime(str(vf), vf.stat().st_mtime_ns)
+    embeddings = await _refresh_embeddings(db, s)
 
     return {
         "words_imported": total_words,
         "clusters_imported": total_clusters,
         "total_words": db.get_word_count(),
         "total_clusters": db.get_cluster_count(),
+        "embeddings": embeddings,
     }
 
 
@@ -416,9 +1022,10 @@ async def api_generate(request: Request):
     count = body.get("count", 10)
 
     db = get_db()
-    llm = _get_llm()
+    llm = _scheduled_llm(Priority.REFILL)
 
-    questions = await generate_batch(llm, db, count=count)
+    questions = await generate_batch(llm, db, count=count, gate=_get_gate(),
+                                     palette=_get_palette())
     return {
         "generated": len(questions),
         "bank_size": db.get_question_bank_size(),
@@ -434,6 +1041,8 @@ async def api_session_start():
     _session_log = logging.getLogger("vocab_trainer.session")
 
     session_id = db.start_session()
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=SESSION_KEEP_HOURS)
+    _active_sessions.prune(cutoff.isoformat())
 
     # Load ready questions with SRS priority (due reviews + new clusters only)
     questions_data = db.get_session_questions(limit=200)
@@ -495,23 +1104,25 @@ async def api_session_answer(request: Request):
     selected_index = body["selected_index"]
     time_seconds = body.get("time_seconds")
 
-    if session_id not in _active_sessions:
-        raise HTTPException(404, "Session not found")
-
-    session = _active_sessions[session_id]
-    current_q = session.get("current_question")
-    if not current_q:
-        raise HTTPException(400, "No current question")
+    def claim(session: dict) -> dict:
+        current_q = session.get("current_question")
+        if not current_q:
+            raise HTTPException(400, "No current question")
+        if session.get("question_answered"):
+            raise HTTPException(409, "Question already answered")
+        session["question_answered"] = True
+        session["total"] += 1
+        if selected_index == current_q["correct_index"]:
+            session["correct"] += 1
+        if current_q.get("priority") == 0:
+            session["review_count"] += 1
+        else:
+            session["new_count"] += 1
+        return session
 
+    session = _update_session(session_id, claim)
+    current_q = session["current_question"]
     correct = selected_index == current_q["correct_index"]
-    session["question_answered"] = True
-    session["total"] += 1
-    if correct:
-        session["correct"] += 1
-    if current_q.get("priority") == 0:
-        session["review_count"] += 1
-    else:
-        session["new_count"] += 1
 
     db = get_db()
     s = get_settings()
@@ -569,15 +1180,18 @@ async def api_session_answer(request: Request):
     }
 
     # Advance to next question
-    session["current_index"] += 1
-    if session["current_index"] >= len(session["questions"]):
-        # Try loading more from the DB before ending
-        more = _load_more_questions(db, s, session)
-        if more:
-            session["questions"].extend(more)
+    def advance(session: dict) -> dict:
+        session["current_index"] += 1
+        if session["current_index"] >= len(session["questions"]):
+            # Try loading more from the DB before ending
+            more = _load_more_questions(db, s, session)
+            if more:
+                session["questions"].extend(more)
+        return session
 
+    session = _update_session(session_id, advance)
     if session["current_index"] >= len(session["questions"]):
-        if _bg_generating:
+        if _generating():
             # More questions are being generated — don't end yet
             result["session_complete"] = False
             result["generating"] = True
@@ -592,13 +1206,35 @@ async def api_session_answer(request: Request):
                 "review_count": session.get("review_count", 0),
                 "new_count": session.get("new_count", 0),
             }
-            del _active_sessions[session_id]
+            _active_sessions.delete(session_id)
     else:
         result["session_complete"] = False
 
     return result
 
 
+def _update_session(session_id: int, change):
+    """Apply *change* to the stored session and save it; returns what
+    *change* returns.
+
+    *change* gets a fresh copy of the state.  When another request saved
+    the session in between, the state is reloaded and *change* applied
+    again, so it must not have side effects beyond the session.
+    """
+    for _ in range(SESSION_RETRIES):
+        found = _active_sessions.load(session_id)
+        if found is None:
+            raise HTTPException(404, "Session not found")
+        session, version = found
+        result = change(session)
+        try:
+            _active_sessions.save(session_id, session, version)
+        except SessionConflict:
+            continue
+        return result
+    raise HTTPException(409, "Session is busy; try again")
+
+
 def _session_progress(session: dict) -> dict:
     """Build progress dict for a session."""
     target = session.get("target", len(session["questions"]))
@@ -610,7 +1246,7 @@ def _session_progress(session: dict) -> dict:
         "correct": session["correct"],
         "ready": ready,
         "target": target,
-        "generating": _bg_generating,
+        "generating": _generating(),
         "has_next": has_next,
     }
 
@@ -638,10 +1274,16 @@ def _load_more_questions(db, settings, session) -> list[dict]:
 
 
 async def _get_next_question(session_id: int) -> dict:
-    if session_id not in _active_sessions:
-        raise HTTPException(404, "Session not found")
+    question = _update_session(session_id, lambda session: _serve_question(session_id, session))
+    if "stem" in question:
+        # Pre-generate TTS in background so audio is ready when the user answers
+        _pregenerate_audio(question["explanation"], question["context_sentence"])
+    return question
+
 
-    session = _active_sessions[session_id]
+def _serve_question(session_id: int, session: dict) -> dict:
+    """Make the question at the session's position current (loading more
+    when it ran out); the waiting or complete state when there is none."""
     idx = session["current_index"]
 
     if idx >= len(session["questions"]):
@@ -650,7 +1292,7 @@ async def _get_next_question(session_id: int) -> dict:
         more = _load_more_questions(db_reload, get_settings(), session)
         if more:
             session["questions"].extend(more)
-        elif _bg_generating:
+        elif _generating():
             return {"generating": True, "session_id": session_id}
         else:
             return {"session_complete": True, "session_id": session_id}
@@ -704,10 +1346,6 @@ async def _get_next_question(session_id: int) -> dict:
     # Store for answer checking
     session["current_question"] = question
     session["question_answered"] = False
-
-    # Pre-generate TTS in background so audio is ready when the user answers
-    _pregenerate_audio(q_data.get("explanation", ""), q_data.get("context_sentence", ""))
-
     return question
 
 
@@ -743,16 +1381,21 @@ async def api_session_events(session_id: int):
         last_progress = None
         heartbeat_counter = 0
         while not _shutting_down:
-            if session_id not in _active_sessions:
+            found = _active_sessions.load(session_id)
+            if found is None:
                 yield f"data: {json.dumps({'type': 'complete'})}\n\n"
                 return
 
-            session = _active_sessions[session_id]
+            session, version = found
             db = get_db()
             s = get_settings()
             more = _load_more_questions(db, s, session)
             if more:
                 session["questions"].extend(more)
+                try:
+                    _active_sessions.save(session_id, session, version)
+                except SessionConflict:
+                    pass  # a request moved the session on; the next tick reloads it
 
             progress = _session_progress(session)
             if progress != last_progress:
@@ -788,10 +1431,11 @@ async def api_session_finish(request: Request):
     body = await request.json()
     session_id = body["session_id"]
 
-    if session_id not in _active_sessions:
+    found = _active_sessions.load(session_id)
+    if found is None or not _active_sessions.delete(session_id):
         raise HTTPException(404, "Session not found")
 
-    session = _active_sessions.pop(session_id)
+    session, _ = found
     db = get_db()
     db.end_session(session_id, session["total"], session["correct"])
 
@@ -817,11 +1461,12 @@ async def api_session_summary():
 @app.get("/api/session/active")
 async def api_session_active():
     """Return the active session state for cross-device resumption."""
-    if not _active_sessions:
+    session_id = _active_sessions.latest()
+    found = _active_sessions.load(session_id) if session_id is not None else None
+    if found is None:
         return {"active": False}
 
-    session_id = next(iter(_active_sessions))
-    session = _active_sessions[session_id]
+    session, _ = found
     result = {
         "active": True,
         "session_id": session_id,
@@ -951,92 +1596,28 @@ async def api_update_settings(request: Request):
         if k in known:
             setattr(s, k, v)
     save_settings(s)
+    global _config_mtime
+    _config_mtime = _config_stamp()
+    if "llm" in _providers.refresh(s):
+        # A different backend starts with a clean slate
+        _llm_policy.reset_breakers()
     return s.to_dict()
 
 
 # ── API: Chat (LLM tutor) ───────────────────────────────────────────────
 
-def _build_chat_prompt(context: dict, history: list[dict], message: str) -> str:
-    """Build a single prompt for the chat LLM call.
-
-    Always includes the full preamble (persona, formatting rules, quiz
-    context, word definitions) so the model maintains voice and
-    instructions across the entire conversation.
-    """
-    # ── Quiz context ──
-    q_type = context.get("question_type", "fill_blank")
-    type_labels = {
-        "fill_blank": "fill-in-the-blank",
-        "best_fit": "best-fit",
-        "distinction": "distinction",
-    }
-    stem = context.get("stem", "")
-    choices = context.get("choices", [])
-    correct_word = context.get("correct_word", "")
-    explanation = context.get("explanation", "")
-    context_sentence = context.get("context_sentence", "")
-    cluster_title = context.get("cluster_title", "")
-    selected_idx = context.get("selected_index")
-    was_correct = context.get("was_correct")
-    details = context.get("choice_details", [])
-
-    labels = ["A", "B", "C", "D"]
-    choices_str = ", ".join(f"{labels[i]}) {c}" for i, c in enumerate(choices))
-    chosen = choices[selected_idx] if selected_idx is not None and selected_idx < len(choices) else "?"
-
-    # Build word definitions block
-    defs_lines = []
-    for d in details:
-        if d.get("meaning"):
-            line = f"  - {d['word']}: {d['meaning']}"
-            if d.get("distinction"):
-                line += f" — {d['distinction']}"
-            if d.get("why"):
-                line += f"\n    → In this sentence: {d['why']}"
-            defs_lines.append(line)
-    defs_block = "\n".join(defs_lines) if defs_lines else ""
-
-    if was_correct:
-        outcome = f'The student chose "{chosen}" — correct.'
-        task = f"Deepen their understanding of why **{correct_word}** fits and how it differs from the alternatives."
-    else:
-        outcome = f'The student chose "{chosen}" — wrong. The correct answer is "{correct_word}".'
-        task = f"Clarify why **{chosen}** doesn't fit and what makes **{correct_word}** the right choice. Then illuminate the broader distinctions."
-
-    preamble = f"""You are Dr. Elena Voss, a lexicographer and assessment specialist with 20 years of experience designing items for the GRE, SAT, and Cambridge English exams. You have an extraordinary talent for illuminating subtle semantic boundaries — you tell students not just why an answer is right, but exactly why the closest alternative fails.
-
-You write in flowing prose with **bold** highlights and example sentences woven in naturally. Your first sentence always delivers substance — a specific semantic distinction, an etymological root, a revealing collocational pattern. Never use lists, bullet points, numbered steps, tables, or headers. Everything is connected prose.
-
-Here is an example of the quality of insight you produce:
-"**Beatific** and **blissful** both describe profound happiness, but they diverge in register and reach. **Beatific** carries a specifically religious resonance — from Latin *beatus* (blessed) — and implies serene, transcendent joy: you'd write 'a beatific smile' but never 'beatific ignorance.' **Blissful** works in secular contexts and pairs naturally with unawareness — 'blissful ignorance,' 'blissful sleep' — a happiness that's felt rather than radiated outward. **Elated** moves into a different register entirely: it's active, momentary, tied to a specific occasion, where the other two describe sustained states."
+_chat_conversations = ConversationStore()
 
-Context for this question:
-{type_labels.get(q_type, q_type)} quiz{" — cluster: " + cluster_title if cluster_title else ""}
-Stem: {stem}
-Choices: {choices_str}
-{outcome}
-Explanation: {explanation}
-Context sentence: {context_sentence}
-"""
 
-    if defs_block:
-        preamble += f"""Word definitions:
-{defs_block}
-"""
+def _spawn_chat_compaction(conv: Conversation) -> None:
+    """Summarise a conversation's oldest turns before its next turn runs."""
+    async def _compact():
+        async with conv.lock:
+            await conv.compact(_scheduled_llm(Priority.CHAT), get_settings().chat_keep_turns)
 
-    preamble += task
-
-    # ── Conversation turns ──
-    lines = [preamble, ""]
-    for msg in history:
-        role = "Student" if msg["role"] == "user" else "Dr. Voss"
-        lines.append(f"{role}: {msg['content']}")
-        lines.append("")
-    lines.append(f"Student: {message}")
-    lines.append("")
-    lines.append("Dr. Voss:")
-
-    return "\n".join(lines)
+    task = asyncio.create_task(_compact())
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
 
 
 @app.post("/api/chat")
@@ -1044,40 +1625,49 @@ async def api_chat(request: Request):
     body = await request.json()
     message = body.get("message", "")
     context = body.get("context", {})
-    history = body.get("history", [])
     thinking = body.get("thinking", False)
 
     if not message:
         raise HTTPException(400, "No message provided")
 
-    prompt = _build_chat_prompt(context, history, message)
-    llm = _get_llm()
-
-    # Cancel in-flight background LLM tasks to free the GPU immediately
-    cancelled_tasks = set(_bg_tasks)
-    for t in cancelled_tasks:
-        t.cancel()
-    for t in cancelled_tasks:
-        try:
-            await t
-        except (asyncio.CancelledError, Exception):
-            pass
+    # Conversations live server-side; the client only echoes the id back.
+    # An unknown id (server restarted, conversation evicted) starts a new
+    # conversation seeded from the client's copy of the history.
+    conv = _chat_conversations.get(body.get("conversation_id"))
+    if conv is None:
+        conv = _chat_conversations.create(context, body.get("history", []))
+    # Chat outranks background generation in the scheduler: queued background
+    # stages wait, and an in-flight one is preempted and re-queued.
+    llm = _scheduled_llm(Priority.CHAT)
+    s = get_settings()
 
     async def stream():
         try:
-            first_token = True
-            if thinking:
-                yield f"data: {json.dumps({'thinking': True})}\n\n"
-            async for token in llm.generate_stream(prompt, temperature=0.7, thinking=thinking):
-                if first_token and thinking:
-                    yield f"data: {json.dumps({'thinking': False})}\n\n"
-                    first_token = False
-                yield f"data: {json.dumps({'token': token})}\n\n"
+            async with conv.lock:
+                yield f"data: {json.dumps({'conversation_id': conv.id})}\n\n"
+                prompt = conv.prompt_for(message)
+                first_token = True
+                if thinking:
+                    yield f"data: {json.dumps({'thinking': True})}\n\n"
+                response = []
+                with llm_stage("chat"):
+                    async for token in llm.generate_stream(
+                        prompt, temperature=0.7, system=CHAT_SYSTEM, thinking=thinking,
+                    ):
+                        if first_token and thinking:
+                            yield f"data: {json.dumps({'thinking': False})}\n\n"
+                            first_token = False
+                        response.append(token)
+                        yield f"data: {json.dumps({'token': token})}\n\n"
+                conv.add_turn(message, "".join(response))
+                if conv.over_budget(s.chat_token_budget):
+                    # Queued on the conversation lock ahead of the next turn
+                    _spawn_chat_compaction(conv)
             yield f"data: {json.dumps({'done': True})}\n\n"
         except Exception as e:
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
         finally:
-            # Resume background buffer generation
+            # Top up in case the bank drained while we were chatting
             await _ensure_question_buffer()
 
     return StreamingResponse(
@@ -0,0 +1,37 @@
+"""Adaptive depth of the ready-question bank per active cluster.
+
+Every active cluster keeps at least one ready question so a review never
+waits on the LLM.  One is not enough when the generator is slow relative
+to the size of the rotation: after a cluster's question is used, the
+replacement joins a queue behind every other cluster needing one, and a
+cluster on a short interval can come due again before its turn.
+
+The *refill lead time* is how long the generator takes to write one
+question for every active cluster, at the measured seconds per question.
+A cluster's target depth is the number of reviews it will have in that
+time — ``ceil(lead / interval)`` — between 1 and ``max_bank_depth``.  Fast
+generators or long intervals stay at one; a slow GPU behind a large
+rotation banks extra questions for the clusters that come due most often.
+"""
+from __future__ import annotations
+
+import math
+
+# Assumed until the background generator has timed a question.
+DEFAULT_SECONDS_PER_QUESTION = 60.0
+# SM-2 never schedules sooner than a day; guards against zero intervals.
+MIN_INTERVAL_DAYS = 1.0
+
+
+def refill_lead_days(active_clusters: int, seconds_per_question: float | None) -> float:
+    """Days needed to generate one question for each of *active_clusters*."""
+    if seconds_per_question is None:
+        seconds_per_question = DEFAULT_SECONDS_PER_QUESTION
+    return active_clusters * seconds_per_question / 86400
+
+
+def target_depth(interval_days: float | None, lead_days: float, max_depth: int) -> int:
+    """Ready questions to keep for a cluster reviewed every *interval_days*."""
+    interval = max(interval_days or MIN_INTERVAL_DAYS, MIN_INTERVAL_DAYS)
+    reviews = math.ceil(lead_days / interval)
+    return max(1, min(max_depth, reviews))
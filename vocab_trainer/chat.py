@@ -0,0 +1,184 @@
+"""Tutor chat conversations, kept server-side between turns.
+
+Each turn's prompt is the static persona (sent as the system prompt), the
+quiz context, an optional summary of trimmed turns, and the recent turns —
+in that order and append-only.  Consecutive turns therefore share
+everything but the newest exchange as a byte-identical prefix, which the
+backend serves from its prompt/KV cache instead of prefilling again.  Once
+the transcript outgrows the token budget the oldest turns are folded into
+the summary, so prompt size (and time-to-first-token) stays flat over a
+long tutoring session.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from vocab_trainer.prompts import CHAT_SUMMARY_PROMPT
+from vocab_trainer.providers.base import llm_stage
+
+if TYPE_CHECKING:
+    from vocab_trainer.providers.base import LLMProvider
+
+log = logging.getLogger("vocab_trainer.chat")
+
+SUMMARY_MAX_WORDS = 120
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English prose)."""
+    return (len(text) + 3) // 4
+
+
+def build_chat_context(context: dict) -> str:
+    """The per-question part of the chat prompt: quiz item, outcome, task."""
+    q_type = context.get("question_type", "fill_blank")
+    type_labels = {
+        "fill_blank": "fill-in-the-blank",
+        "best_fit": "best-fit",
+        "distinction": "distinction",
+    }
+    stem = context.get("stem", "")
+    choices = context.get("choices", [])
+    correct_word = context.get("correct_word", "")
+    explanation = context.get("explanation", "")
+    context_sentence = context.get("context_sentence", "")
+    cluster_title = context.get("cluster_title", "")
+    selected_idx = context.get("selected_index")
+    was_correct = context.get("was_correct")
+    details = context.get("choice_details", [])
+
+    labels = ["A", "B", "C", "D"]
+    choices_str = ", ".join(f"{labels[i]}) {c}" for i, c in enumerate(choices))
+    chosen = choices[selected_idx] if selected_idx is not None and selected_idx < len(choices) else "?"
+
+    # Build word definitions block
+    defs_lines = []
+    for d in details:
+        if d.get("meaning"):
+            line = f"  - {d['word']}: {d['meaning']}"
+            if d.get("distinction"):
+                line += f" — {d['distinction']}"
+            if d.get("why"):
+                line += f"\n    → In this sentence: {d['why']}"
+            defs_lines.append(line)
+    defs_block = "\n".join(defs_lines) if defs_lines else ""
+
+    if was_correct:
+        outcome = f'The student chose "{chosen}" — correct.'
+        task = f"Deepen their understanding of why **{correct_word}** fits and how it differs from the alternatives."
+    else:
+        outcome = f'The student chose "{chosen}" — wrong. The correct answer is "{correct_word}".'
+        task = f"Clarify why **{chosen}** doesn't fit and what makes **{correct_word}** the right choice. Then illuminate the broader distinctions."
+
+    text = f"""Context for this question:
+{type_labels.get(q_type, q_type)} quiz{" — cluster: " + cluster_title if cluster_title else ""}
+Stem: {stem}
+Choices: {choices_str}
+{outcome}
+Explanation: {explanation}
+Context sentence: {context_sentence}
+"""
+
+    if defs_block:
+        text += f"""Word definitions:
+{defs_block}
+"""
+
+    return text + task
+
+
+def _format_turns(turns: list[dict]) -> list[str]:
+    lines = []
+    for msg in turns:
+        role = "Student" if msg["role"] == "user" else "Dr. Voss"
+        lines.append(f"{role}: {msg['content']}")
+        lines.append("")
+    return lines
+
+
+@dataclass
+class Conversation:
+    """One tutoring conversation about one quiz question."""
+
+    id: str
+    context: str
+    turns: list[dict] = field(default_factory=list)
+    summary: str = ""
+    updated_at: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    def prompt_for(self, message: str) -> str:
+        lines = [self.context, ""]
+        if self.summary:
+            lines += [f"Earlier in this conversation (summary): {self.summary}", ""]
+        lines += _format_turns(self.turns)
+        lines += [f"Student: {message}", "", "Dr. Voss:"]
+        return "\n".join(lines)
+
+    def add_turn(self, message: str, response: str) -> None:
+        self.turns.append({"role": "user", "content": message})
+        self.turns.append({"role": "assistant", "content": response})
+        self.updated_at = time.monotonic()
+
+    def turn_tokens(self) -> int:
+        return sum(estimate_tokens(t["content"]) for t in self.turns)
+
+    def over_budget(self, budget: int) -> bool:
+        return self.turn_tokens() + estimate_tokens(self.summary) > budget
+
+    async def compact(self, llm: LLMProvider | None, keep_turns: int) -> None:
+        """Fold all but the last *keep_turns* exchanges into the summary.
+
+        With no *llm*, or if summarising fails, the old turns are simply
+        dropped — the conversation carries on with less history.
+        """
+        cut = max(0, len(self.turns) - 2 * keep_turns)
+        if cut == 0:
+            return
+        old, self.turns = self.turns[:cut], self.turns[cut:]
+        if llm is None:
+            return
+        transcript = "\n".join(_format_turns(old)).strip()
+        if self.summary:
+            transcript = f"(Earlier summary: {self.summary})\n\n{transcript}"
+        prompt = CHAT_SUMMARY_PROMPT.format(max_words=SUMMARY_MAX_WORDS, transcript=transcript)
+        try:
+            with llm_stage("chat_summary"):
+                self.summary = (await llm.generate(prompt, temperature=0.2)).strip()
+            log.info("Chat %s: summarised %d turns", self.id[:8], len(old))
+        except Exception as e:
+            log.warning("Chat %s: summary failed, dropping %d turns: %s",
+                        self.id[:8], len(old), e)
+
+
+class ConversationStore:
+    """Conversations by id, least-recently-used first out beyond *max_size*."""
+
+    def __init__(self, max_size: int = 100):
+        self.max_size = max_size
+        self._items: OrderedDict[str, Conversation] = OrderedDict()
+
+    def create(self, context: dict, history: list[dict] | None = None) -> Conversation:
+        conv = Conversation(id=uuid.uuid4().hex, context=build_chat_context(context))
+        for msg in history or []:
+            if msg.get("role") in ("user", "assistant") and msg.get("content") is not None:
+                conv.turns.append({"role": msg["role"], "content": msg["content"]})
+        self._items[conv.id] = conv
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        return conv
+
+    def get(self, conversation_id: str | None) -> Conversation | None:
+        conv = self._items.get(conversation_id) if conversation_id else None
+        if conv is not None:
+            self._items.move_to_end(conv.id)
+        return conv
+
+    def __len__(self) -> int:
+        return len(self._items)
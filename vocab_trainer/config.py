@@ -6,6 +6,8 @@ from pathlib import Path
 
 CONFIG_PATH = Path(__file__).resolve().parent.parent / "config.json"
 
+LLM_PROVIDERS = ("ollama", "anthropic", "openai", "fake")
+
 DEFAULTS = {
     "llm_provider": "ollama",
     "llm_model": "qwen3:8b",
@@ -17,10 +19,36 @@ DEFAULTS = {
     "audio_cache_dir": "audio_cache",
     "db_path": "progress.db",
     "ollama_url": "http://localhost:11434",
+    "ollama_urls": [],
+    "ollama_timeout": 120.0,
+    "ollama_connect_timeout": 5.0,
+    "ollama_max_connections": 8,
+    "ollama_keep_alive": "30m",
     "archive_interval_days": 45,
     "llm_thinking": False,
     "auto_narrate": True,
     "context_level": "simple",
+    "llm_max_concurrent": 1,
+    "llm_preempt_background": True,
+    "chat_token_budget": 1500,
+    "chat_keep_turns": 2,
+    "llm_stage_timeouts": {},
+    "llm_retries": 2,
+    "llm_breaker_threshold": 5,
+    "llm_breaker_cooldown": 30.0,
+    "llm_daily_token_budget": 0,
+    "llm_daily_cost_budget": 0.0,
+    "prefetch_horizon_hours": 12.0,
+    "max_bank_depth": 2,
+    "adaptive_bank_depth": True,
+    "grammar_skip_pass_rate": 0.95,
+    "palette_words": 30,
+    "adaptive_palette": True,
+    "palette_max_prefill_ms": 1500.0,
+    "embedding_model": "",
+    "external_workers": False,
+    "session_store": "memory",
+    "llm_stage_models": {},
 }
 
 
@@ -36,10 +64,36 @@ class Settings:
     audio_cache_dir: str = DEFAULTS["audio_cache_dir"]
     db_path: str = DEFAULTS["db_path"]
     ollama_url: str = DEFAULTS["ollama_url"]
+    ollama_urls: list[str] = field(default_factory=lambda: list(DEFAULTS["ollama_urls"]))
+    ollama_timeout: float = DEFAULTS["ollama_timeout"]
+    ollama_connect_timeout: float = DEFAULTS["ollama_connect_timeout"]
+    ollama_max_connections: int = DEFAULTS["ollama_max_connections"]
+    ollama_keep_alive: str | int | None = DEFAULTS["ollama_keep_alive"]
     archive_interval_days: int = DEFAULTS["archive_interval_days"]
     llm_thinking: bool = DEFAULTS["llm_thinking"]
     auto_narrate: bool = DEFAULTS["auto_narrate"]
     context_level: str = DEFAULTS["context_level"]
+    llm_max_concurrent: int = DEFAULTS["llm_max_concurrent"]
+    llm_preempt_background: bool = DEFAULTS["llm_preempt_background"]
+    chat_token_budget: int = DEFAULTS["chat_token_budget"]
+    chat_keep_turns: int = DEFAULTS["chat_keep_turns"]
+    llm_stage_timeouts: dict[str, float] = field(default_factory=lambda: dict(DEFAULTS["llm_stage_timeouts"]))
+    llm_retries: int = DEFAULTS["llm_retries"]
+    llm_breaker_threshold: int = DEFAULTS["llm_breaker_threshold"]
+    llm_breaker_cooldown: float = DEFAULTS["llm_breaker_cooldown"]
+    llm_daily_token_budget: int = DEFAULTS["llm_daily_token_budget"]
+    llm_daily_cost_budget: float = DEFAULTS["llm_daily_cost_budget"]
+    prefetch_horizon_hours: float = DEFAULTS["prefetch_horizon_hours"]
+    max_bank_depth: int = DEFAULTS["max_bank_depth"]
+    adaptive_bank_depth: bool = DEFAULTS["adaptive_bank_depth"]
+    grammar_skip_pass_rate: float = DEFAULTS["grammar_skip_pass_rate"]
+    palette_words: int = DEFAULTS["palette_words"]
+    adaptive_palette: bool = DEFAULTS["adaptive_palette"]
+    palette_max_prefill_ms: float = DEFAULTS["palette_max_prefill_ms"]
+    embedding_model: str = DEFAULTS["embedding_model"]
+    external_workers: bool = DEFAULTS["external_workers"]
+    session_store: str = DEFAULTS["session_store"]
+    llm_stage_models: dict[str, str] = field(default_factory=lambda: dict(DEFAULTS["llm_stage_models"]))
 
     @property
     def project_root(self) -> Path:
@@ -63,6 +117,44 @@ class Settings:
             return [root / f for f in self.vocab_files]
         return sorted(self.data_dir.glob("*.md"))
 
+    def ollama_options(self) -> dict:
+        """Keyword arguments for :class:`OllamaProvider` (client and keep-alive)."""
+        return {
+            "timeout": float(self.ollama_timeout),
+            "connect_timeout": float(self.ollama_connect_timeout),
+            "max_connections": int(self.ollama_max_connections),
+            "keep_alive": self.ollama_keep_alive,
+        }
+
+    def policy_options(self) -> dict:
+        """Keyword arguments for :meth:`LLMPolicy.configure` (timeouts, retries, breaker).
+
+        *llm_stage_timeouts* overrides the built-in per-stage deadlines;
+        stages not listed in either fall back to *ollama_timeout*.
+        """
+        return {
+            "stage_timeouts": {k: float(v) for k, v in self.llm_stage_timeouts.items()},
+            "default_timeout": float(self.ollama_timeout),
+            "retries": int(self.llm_retries),
+            "breaker_threshold": int(self.llm_breaker_threshold),
+            "breaker_cooldown": float(self.llm_breaker_cooldown),
+        }
+
+    def stage_models(self) -> dict[str, tuple[str, str]]:
+        """Stage → (provider, model) from *llm_stage_models*.
+
+        A value is either a model for the configured provider
+        (``"qwen3:1.7b"``) or ``"provider/model"`` to use another one
+        (``"openai/gpt-4.1-nano"``).
+        """
+        routes = {}
+        for stage, spec in self.llm_stage_models.items():
+            kind, sep, model = spec.partition("/")
+            if not sep or kind not in LLM_PROVIDERS:
+                kind, model = self.llm_provider, spec
+            routes[stage] = (kind, model)
+        return routes
+
     def to_dict(self) -> dict:
         return {
             "llm_provider": self.llm_provider,
@@ -75,10 +167,36 @@ class Settings:
             "audio_cache_dir": self.audio_cache_dir,
             "db_path": self.db_path,
             "ollama_url": self.ollama_url,
+            "ollama_urls": self.ollama_urls,
+            "ollama_timeout": self.ollama_timeout,
+            "ollama_connect_timeout": self.ollama_connect_timeout,
+            "ollama_max_connections": self.ollama_max_connections,
+            "ollama_keep_alive": self.ollama_keep_alive,
             "archive_interval_days": self.archive_interval_days,
             "llm_thinking": self.llm_thinking,
             "auto_narrate": self.auto_narrate,
             "context_level": self.context_level,
+            "llm_max_concurrent": self.llm_max_concurrent,
+            "llm_preempt_background": self.llm_preempt_background,
+            "chat_token_budget": self.chat_token_budget,
+            "chat_keep_turns": self.chat_keep_turns,
+            "llm_stage_timeouts": self.llm_stage_timeouts,
+            "llm_retries": self.llm_retries,
+            "llm_breaker_threshold": self.llm_breaker_threshold,
+            "llm_breaker_cooldown": self.llm_breaker_cooldown,
+            "llm_daily_token_budget": self.llm_daily_token_budget,
+            "llm_daily_cost_budget": self.llm_daily_cost_budget,
+            "prefetch_horizon_hours": self.prefetch_horizon_hours,
+            "max_bank_depth": self.max_bank_depth,
+            "adaptive_bank_depth": self.adaptive_bank_depth,
+            "grammar_skip_pass_rate": self.grammar_skip_pass_rate,
+            "palette_words": self.palette_words,
+            "adaptive_palette": self.adaptive_palette,
+            "palette_max_prefill_ms": self.palette_max_prefill_ms,
+            "embedding_model": self.embedding_model,
+            "external_workers": self.external_workers,
+            "session_store": self.session_store,
+            "llm_stage_models": self.llm_stage_models,
         }
 
 
@@ -10,6 +10,10 @@ from vocab_trainer.models import (
     Question,
     VocabWord,
 )
+from vocab_trainer.bank import target_depth
+from vocab_trainer.dedup import StemIndex, question_text
+from vocab_trainer.embeddings import EmbeddingIndex
+from vocab_trainer.sampler import ClusterSampler
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS words (
@@ -35,6 +39,9 @@ CREATE TABLE IF NOT EXISTS cluster_words (
     PRIMARY KEY (cluster_id, word)
 );
 
+CREATE INDEX IF NOT EXISTS idx_cluster_words_word
+    ON cluster_words (word COLLATE NOCASE);
+
 CREATE TABLE IF NOT EXISTS questions (
     id TEXT PRIMARY KEY,
     question_type TEXT NOT NULL,
@@ -86,6 +93,73 @@ CREATE TABLE IF NOT EXISTS file_mtimes (
     file_path TEXT PRIMARY KEY,
     mtime_ns INTEGER NOT NULL
 );
+
+CREATE TABLE IF NOT EXISTS pending_questions (
+    id TEXT PRIMARY KEY,
+    cluster_title TEXT NOT NULL,
+    target_word TEXT NOT NULL,
+    question_type TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    data_json TEXT NOT NULL,
+    quality_issue TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    owner TEXT,                   -- generator working on it, NULL when free
+    claimed_until TEXT
+);
+
+CREATE TABLE IF NOT EXISTS llm_usage (
+    day TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    calls INTEGER DEFAULT 0,
+    prompt_tokens INTEGER DEFAULT 0,
+    cached_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    cost_usd REAL DEFAULT 0,
+    PRIMARY KEY (day, provider, stage)
+);
+
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cluster_title TEXT NOT NULL,
+    priority INTEGER NOT NULL,    -- scheduler Priority: lower runs first
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, done, failed
+    worker TEXT,
+    attempts INTEGER DEFAULT 0,
+    question_id TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    claimed_at TEXT,
+    heartbeat_at TEXT,
+    finished_at TEXT,
+    not_before TEXT               -- a released job waits until then
+);
+
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_status
+    ON generation_jobs (status, priority, id);
+
+CREATE TABLE IF NOT EXISTS active_sessions (
+    id INTEGER PRIMARY KEY,       -- sessions.id
+    state TEXT NOT NULL,          -- JSON, see sessions.py
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,        -- "generation", "forecast", "startup"
+    holder TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS embeddings (
+    cluster_title TEXT NOT NULL,  -- '' for entries in words
+    word TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,         -- float32
+    PRIMARY KEY (cluster_title, word)
+);
 """
 
 
@@ -107,6 +181,9 @@ class Database:
         self.conn.row_factory = sqlite3.Row
         self.conn.execute("PRAGMA journal_mode=WAL")
         self._init_schema()
+        self._sampler: ClusterSampler | None = None
+        self._stem_index: StemIndex | None = None
+        self._embedding_index: EmbeddingIndex | None | bool = False  # False: not loaded
 
     def _init_schema(self) -> None:
         self.conn.executescript(SCHEMA)
@@ -115,6 +192,15 @@ class Database:
             self.conn.execute("ALTER TABLE questions ADD COLUMN quality_issue TEXT")
         except sqlite3.OperationalError:
             pass  # column already exists
+        for column in ("owner", "claimed_until"):
+            try:
+                self.conn.execute(f"ALTER TABLE pending_questions ADD COLUMN {column} TEXT")
+            except sqlite3.OperationalError:
+                pass  # column already exists
+        try:
+            self.conn.execute("ALTER TABLE generation_jobs ADD COLUMN not_before TEXT")
+        except sqlite3.OperationalError:
+            pass  # column already exists
         # Migrate word_progress → cluster_progress (pessimistic merge)
         self._migrate_word_progress_to_cluster()
         self.conn.commit()
@@ -172,17 +258,24 @@ class Database:
         return cur.rowcount
 
     def delete_clusters_by_source(self, source_file: str) -> int:
-        """Remove clusters (and their entries) from *source_file*."""
-        ids = [
-            row[0]
-            for row in self.conn.execute(
-                "SELECT id FROM clusters WHERE source_file = ?", (source_file,)
-            ).fetchall()
-        ]
+        """Remove clusters (and their entries) from *source_file*.
+
+        Checkpointed questions for those clusters are dropped too — they were
+        drafted against word lists that are about to change.
+        """
+        rows = self.conn.execute(
+            "SELECT id, title FROM clusters WHERE source_file = ?", (source_file,)
+        ).fetchall()
+        ids = [row[0] for row in rows]
         for cid in ids:
             self.conn.execute("DELETE FROM cluster_words WHERE cluster_id = ?", (cid,))
+        for row in rows:
+            self.conn.execute(
+                "DELETE FROM pending_questions WHERE cluster_title = ?", (row[1],)
+            )
         self.conn.execute("DELETE FROM clusters WHERE source_file = ?", (source_file,))
         self.conn.commit()
+        self._sampler = None
         return len(ids)
 
     def import_words(self, words: list[VocabWord]) -> int:
@@ -224,6 +317,7 @@ class Database:
                 )
             count += 1
         self.conn.commit()
+        self._sampler = None
         return count
 
     # ── File mtimes ─────────────────────────────────────────────────────
@@ -273,6 +367,57 @@ class Database:
         ).fetchone()
         return dict(row) if row else None
 
+    def get_cluster_word(self, cluster_id: int, word: str) -> dict | None:
+        """One entry of a cluster, matching *word* case-insensitively."""
+        row = self.conn.execute(
+            "SELECT * FROM cluster_words WHERE cluster_id = ? AND word = ? COLLATE NOCASE",
+            (cluster_id, word),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def find_word_cluster(self, word: str) -> tuple[dict, dict] | None:
+        """The first cluster containing *word* (case-insensitive) and its entry.
+
+        Uses the ``cluster_words(word COLLATE NOCASE)`` index, so the cost
+        does not grow with the number of clusters.
+        """
+        row = self.conn.execute("""
+            SELECT c.*, cw.word, cw.meaning, cw.distinction
+            FROM cluster_words cw
+            JOIN clusters c ON c.id = cw.cluster_id
+            WHERE cw.word = ? COLLATE NOCASE
+            ORDER BY cw.cluster_id
+            LIMIT 1
+        """, (word,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        info = {k: entry.pop(k) for k in ("word", "meaning", "distinction")}
+        return entry, {"cluster_id": entry["id"], **info}
+
+    def get_all_cluster_words(self) -> dict[int, list[dict]]:
+        """Every cluster's words in one query, keyed by cluster id."""
+        result: dict[int, list[dict]] = {}
+        for r in self.conn.execute("SELECT * FROM cluster_words"):
+            result.setdefault(r["cluster_id"], []).append(dict(r))
+        return result
+
+    def get_archived_cluster_titles(self) -> set[str]:
+        rows = self.conn.execute(
+            "SELECT cluster_title FROM cluster_progress WHERE archived = 1"
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def cluster_sampler(self) -> ClusterSampler:
+        """The in-memory cluster/target sampler, built on first use.
+
+        Kept current by the write methods below; rebuilt after clusters are
+        re-imported.
+        """
+        if self._sampler is None:
+            self._sampler = ClusterSampler.from_db(self)
+        return self._sampler
+
     def get_random_cluster(self) -> dict | None:
         row = self.conn.execute(
             "SELECT * FROM clusters ORDER BY RANDOM() LIMIT 1"
@@ -282,6 +427,8 @@ class Database:
     # ── Questions ─────────────────────────────────────────────────────────
 
     def save_question(self, q: Question) -> None:
+        """Insert or replace *q*; its generation checkpoint (same id) is cleared."""
+        self.conn.execute("DELETE FROM pending_questions WHERE id = ?", (q.id,))
         self.conn.execute(
             "INSERT OR REPLACE INTO questions "
             "(id, question_type, target_word, stem, choices_json, correct_index, "
@@ -305,6 +452,493 @@ class Database:
             ),
         )
         self.conn.commit()
+        if self._sampler is not None:
+            self._sampler.question_saved(
+                q.id, q.cluster_title or "", q.correct_word, q.quality_issue is None,
+            )
+        if self._stem_index is not None:
+            self._stem_index.add(q.id, question_text(q.stem, q.context_sentence),
+                                 q.cluster_title or "")
+
+    def get_question_texts(self) -> list[dict]:
+        """id, cluster, stem and context sentence of every question (for the stem index)."""
+        rows = self.conn.execute(
+            "SELECT id, cluster_title, stem, context_sentence FROM questions"
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_question_stem(self, question_id: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT stem FROM questions WHERE id = ?", (question_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def stem_index(self) -> StemIndex:
+        """Near-duplicate index over question texts, built on first use and
+        kept current by :meth:`save_question` and :meth:`update_question_content`."""
+        if self._stem_index is None:
+            self._stem_index = StemIndex.from_db(self)
+        return self._stem_index
+
+    # ── Embeddings ────────────────────────────────────────────────────────
+
+    def get_embedding_hashes(self) -> dict[tuple[str, str], tuple[str, str]]:
+        """(cluster title, word) -> (model, text hash) of every stored vector."""
+        rows = self.conn.execute(
+            "SELECT cluster_title, word, model, text_hash FROM embeddings"
+        ).fetchall()
+        return {(r[0], r[1]): (r[2], r[3]) for r in rows}
+
+    def get_embeddings(self) -> list[dict]:
+        rows = self.conn.execute(
+            "SELECT cluster_title, word, vector FROM embeddings ORDER BY cluster_title, word"
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def save_embeddings(self, rows: list[tuple[str, str, str, str, bytes]]) -> None:
+        """Store (cluster title, word, model, text hash, vector) rows."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings "
+            "(cluster_title, word, model, text_hash, vector) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.conn.commit()
+        self.forget_embedding_index()
+
+    def delete_embeddings(self, keys: list[tuple[str, str]]) -> None:
+        if not keys:
+            return
+        self.conn.executemany(
+            "DELETE FROM embeddings WHERE cluster_title = ? AND word = ?", keys,
+        )
+        self.conn.commit()
+        self.forget_embedding_index()
+
+    def embedding_index(self) -> EmbeddingIndex | None:
+        """Top-k index over the stored embeddings, loaded on first use and
+        after they change; None when there are none (or NumPy is missing)."""
+        if self._embedding_index is False:
+            self._embedding_index = EmbeddingIndex.from_db(self)
+        return self._embedding_index
+
+    def forget_embedding_index(self) -> None:
+        """Reload the embedding index on next use — after embeddings were
+        saved through another connection."""
+        self._embedding_index = False
+
+    # ── Generation checkpoints ────────────────────────────────────────────
+
+    def save_pending_question(
+        self,
+        pending_id: str,
+        cluster_title: str,
+        target_word: str,
+        question_type: str,
+        data: dict,
+        owner: str | None = None,
+        hold_seconds: float = 0.0,
+    ) -> None:
+        """Checkpoint a validated step-1 draft (stage ``drafted``), claimed
+        by *owner* for *hold_seconds* when given."""
+        now = datetime.now(timezone.utc)
+        until = (now + timedelta(seconds=hold_seconds)).isoformat() if owner else None
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pending_questions "
+            "(id, cluster_title, target_word, question_type, stage, data_json, "
+            "quality_issue, created_at, updated_at, owner, claimed_until) "
+            "VALUES (?, ?, ?, ?, 'drafted', ?, NULL, ?, ?, ?, ?)",
+            (pending_id, cluster_title, target_word, question_type,
+             json.dumps(data), now.isoformat(), now.isoformat(), owner, until),
+        )
+        self.conn.commit()
+
+    def mark_pending_checked(self, pending_id: str, quality_issue: str | None,
+                             hold_seconds: float | None = None) -> None:
+        """Record the grammar gate verdict (stage ``checked``), extending the
+        claim by *hold_seconds* when given."""
+        now = datetime.now(timezone.utc)
+        if hold_seconds is None:
+            self.conn.execute(
+                "UPDATE pending_questions SET stage = 'checked', quality_issue = ?, "
+                "updated_at = ? WHERE id = ?",
+                (quality_issue, now.isoformat(), pending_id),
+            )
+        else:
+            self.conn.execute(
+                "UPDATE pending_questions SET stage = 'checked', quality_issue = ?, "
+                "updated_at = ?, claimed_until = ? WHERE id = ?",
+                (quality_issue, now.isoformat(),
+                 (now + timedelta(seconds=hold_seconds)).isoformat(), pending_id),
+            )
+        self.conn.commit()
+
+    def claim_pending_question(
+        self, cluster_title: str, owner: str, hold_seconds: float,
+        question_type: str | None = None, target_word: str | None = None,
+    ) -> dict | None:
+        """Claim the oldest checkpoint for a cluster that no live generator
+        holds, for *hold_seconds*; None when there is none.  *question_type*
+        and *target_word* narrow the search when given.
+
+        A claim is a compare-and-set on the row, so two generators never
+        resume the same checkpoint.  Claims expire, so a checkpoint held by
+        a crashed process becomes resumable again.
+        """
+        now = datetime.now(timezone.utc)
+        until = (now + timedelta(seconds=hold_seconds)).isoformat()
+        sql = ("SELECT id FROM pending_questions WHERE cluster_title = ? "
+               "AND (owner IS NULL OR claimed_until < ?)")
+        params: list = [cluster_title, now.isoformat()]
+        if question_type is not None:
+            sql += " AND question_type = ?"
+            params.append(question_type)
+        if target_word is not None:
+            sql += " AND target_word = ? COLLATE NOCASE"
+            params.append(target_word)
+        sql += " ORDER BY created_at ASC LIMIT 1"
+        while True:
+            row = self.conn.execute(sql, params).fetchone()
+            if row is None:
+                return None
+            cur = self.conn.execute(
+                "UPDATE pending_questions SET owner = ?, claimed_until = ? "
+                "WHERE id = ? AND (owner IS NULL OR claimed_until < ?)",
+                (owner, until, row[0], now.isoformat()),
+            )
+            self.conn.commit()
+            if cur.rowcount == 1:
+                pending = dict(self.conn.execute(
+                    "SELECT * FROM pending_questions WHERE id = ?", (row[0],)
+                ).fetchone())
+                pending["data"] = json.loads(pending.pop("data_json"))
+                return pending
+            # another generator claimed it in between; try the next one
+
+    def release_pending_question(self, pending_id: str, owner: str) -> None:
+        """Give up *owner*'s claim so another run can resume the checkpoint."""
+        self.conn.execute(
+            "UPDATE pending_questions SET owner = NULL, claimed_until = NULL "
+            "WHERE id = ? AND owner = ?",
+            (pending_id, owner),
+        )
+        self.conn.commit()
+
+    def get_pending_question(
+        self, cluster_title: str, question_type: str | None = None,
+    ) -> dict | None:
+        """Oldest checkpoint for a cluster, with ``data`` decoded from JSON."""
+        sql = "SELECT * FROM pending_questions WHERE cluster_title = ?"
+        params: list = [cluster_title]
+        if question_type is not None:
+            sql += " AND question_type = ?"
+            params.append(question_type)
+        row = self.conn.execute(
+            sql + " ORDER BY created_at ASC LIMIT 1", params
+        ).fetchone()
+        if row is None:
+            return None
+        pending = dict(row)
+        pending["data"] = json.loads(pending.pop("data_json"))
+        return pending
+
+    def get_pending_cluster_titles(self) -> list[str]:
+        rows = self.conn.execute(
+            "SELECT DISTINCT cluster_title FROM pending_questions"
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def delete_pending_question(self, pending_id: str) -> None:
+        self.conn.execute("DELETE FROM pending_questions WHERE id = ?", (pending_id,))
+        self.conn.commit()
+
+    # ── Generation job queue ──────────────────────────────────────────────
+
+    def enqueue_generation_jobs(self, needs: list[tuple[str, int]]) -> int:
+        """Queue (cluster title, priority) jobs, topping up rather than adding.
+
+        A title listed n times ends up with n open (queued or running) jobs;
+        jobs already open for it count toward that.  A queued job is moved
+        up if it is now needed at a higher priority.  Returns jobs added.
+        """
+        wanted: dict[str, list[int]] = {}
+        for title, priority in needs:
+            wanted.setdefault(title, []).append(int(priority))
+        if not wanted:
+            return 0
+        now = datetime.now(timezone.utc).isoformat()
+        added = 0
+        for title, priorities in wanted.items():
+            priorities.sort()
+            open_jobs = self.conn.execute(
+                "SELECT COUNT(*) FROM generation_jobs "
+                "WHERE cluster_title = ? AND status IN ('queued', 'running')",
+                (title,),
+            ).fetchone()[0]
+            self.conn.execute(
+                "UPDATE generation_jobs SET priority = ? "
+                "WHERE cluster_title = ? AND status = 'queued' AND priority > ?",
+                (priorities[0], title, priorities[0]),
+            )
+            missing = priorities[open_jobs:]
+            self.conn.executemany(
+                "INSERT INTO generation_jobs (cluster_title, priority, created_at) "
+                "VALUES (?, ?, ?)",
+                [(title, p, now) for p in missing],
+            )
+            added += len(missing)
+        self.conn.commit()
+        return added
+
+    def claim_generation_job(self, worker: str) -> dict | None:
+        """Atomically take the most urgent queued job for *worker*, skipping
+        released jobs still waiting out their delay.
+
+        A claim is a compare-and-set on the row, so two workers never take
+        the same job.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        while True:
+            row = self.conn.execute(
+                "SELECT id FROM generation_jobs WHERE status = 'queued' "
+                "AND (not_before IS NULL OR not_before <= ?) "
+                "ORDER BY priority, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            cur = self.conn.execute(
+                "UPDATE generation_jobs SET status = 'running', worker = ?, "
+                "attempts = attempts + 1, claimed_at = ?, heartbeat_at = ?, "
+                "not_before = NULL WHERE id = ? AND status = 'queued'",
+                (worker, now, now, row[0]),
+            )
+            self.conn.commit()
+            if cur.rowcount == 1:
+                return dict(self.conn.execute(
+                    "SELECT * FROM generation_jobs WHERE id = ?", (row[0],)
+                ).fetchone())
+            # another worker claimed it in between; try the next one
+
+    def heartbeat_generation_job(self, job_id: int) -> None:
+        self.conn.execute(
+            "UPDATE generation_jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+            (datetime.now(timezone.utc).isoformat(), job_id),
+        )
+        self.conn.commit()
+
+    def finish_generation_job(
+        self, job_id: int, question_id: str | None = None, error: str | None = None,
+    ) -> None:
+        """Mark a job done (with the saved question's id) or failed."""
+        self.conn.execute(
+            "UPDATE generation_jobs SET status = ?, question_id = ?, error = ?, "
+            "finished_at = ? WHERE id = ?",
+            ("done" if question_id else "failed", question_id, error,
+             datetime.now(timezone.utc).isoformat(), job_id),
+        )
+        self.conn.commit()
+
+    def release_generation_job(self, job_id: int, delay: float = 0.0) -> None:
+        """Put a running job back in the queue (backend down, worker
+        stopping); no worker claims it again for *delay* seconds."""
+        not_before = None
+        if delay > 0:
+            not_before = (datetime.now(timezone.utc) + timedelta(seconds=delay)).isoformat()
+        self.conn.execute(
+            "UPDATE generation_jobs SET status = 'queued', worker = NULL, not_before = ? "
+            "WHERE id = ? AND status = 'running'",
+            (not_before, job_id),
+        )
+        self.conn.commit()
+
+    def requeue_stale_generation_jobs(self, before: str) -> int:
+        """Requeue running jobs whose worker last reported before *before*
+        (it crashed or was killed).  Returns jobs requeued."""
+        cur = self.conn.execute(
+            "UPDATE generation_jobs SET status = 'queued', worker = NULL "
+            "WHERE status = 'running' AND heartbeat_at < ?",
+            (before,),
+        )
+        self.conn.commit()
+        return cur.rowcount
+
+    def get_finished_generation_jobs(self, after: str = "") -> list[dict]:
+        """Done and failed jobs finished after *after* (ISO time), in the
+        order they finished.  Jobs finish out of id order, since the most
+        urgent is claimed first."""
+        rows = self.conn.execute(
+            "SELECT * FROM generation_jobs WHERE status IN ('done', 'failed') "
+            "AND finished_at > ? ORDER BY finished_at, id",
+            (after,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_generation_job_counts(self) -> dict[str, int]:
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) FROM generation_jobs GROUP BY status"
+        ).fetchall()
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        counts.update({r[0]: r[1] for r in rows})
+        return counts
+
+    def prune_generation_jobs(self, before: str) -> int:
+        """Delete finished jobs that finished before *before*."""
+        cur = self.conn.execute(
+            "DELETE FROM generation_jobs WHERE status IN ('done', 'failed') "
+            "AND finished_at < ?",
+            (before,),
+        )
+        self.conn.commit()
+        return cur.rowcount
+
+    def forget_cached_indexes(self) -> None:
+        """Drop the in-memory sampler and stem index so they are rebuilt from
+        the database — after another process (a generation worker) saved
+        questions this connection's caches haven't seen."""
+        self._sampler = None
+        self._stem_index = None
+
+    # ── Shared session state and leases ───────────────────────────────────
+
+    def get_session_state(self, session_id: int) -> tuple[str, int] | None:
+        """(state JSON, version) of an active session, or None."""
+        row = self.conn.execute(
+            "SELECT state, version FROM active_sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put_session_state(self, session_id: int, state: str) -> None:
+        """Create or replace a session's state, bumping its version."""
+        self.conn.execute(
+            "INSERT INTO active_sessions (id, state, version, updated_at) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT(id) DO UPDATE SET state = excluded.state, "
+            "version = active_sessions.version + 1, updated_at = excluded.updated_at",
+            (session_id, state, datetime.now(timezone.utc).isoformat()),
+        )
+        self.conn.commit()
+
+    def update_session_state(self, session_id: int, state: str, version: int) -> bool:
+        """Save a session's state if it is still at *version*."""
+        cur = self.conn.execute(
+            "UPDATE active_sessions SET state = ?, version = version + 1, updated_at = ? "
+            "WHERE id = ? AND version = ?",
+            (state, datetime.now(timezone.utc).isoformat(), session_id, version),
+        )
+        self.conn.commit()
+        return cur.rowcount == 1
+
+    def delete_session_state(self, session_id: int) -> bool:
+        cur = self.conn.execute("DELETE FROM active_sessions WHERE id = ?", (session_id,))
+        self.conn.commit()
+        return cur.rowcount == 1
+
+    def get_latest_session_id(self) -> int | None:
+        row = self.conn.execute(
+            "SELECT id FROM active_sessions ORDER BY updated_at DESC, id DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def prune_session_states(self, before: str | None = None) -> int:
+        """Delete active sessions last saved before *before* (all when None)."""
+        if before is None:
+            cur = self.conn.execute("DELETE FROM active_sessions")
+        else:
+            cur = self.conn.execute("DELETE FROM active_sessions WHERE updated_at < ?", (before,))
+        self.conn.commit()
+        return cur.rowcount
+
+    def acquire_lease(self, name: str, holder: str, seconds: float) -> bool:
+        """Take or renew lease *name* for *seconds*.  Fails while another
+        holder's lease is unexpired."""
+        now = datetime.now(timezone.utc)
+        cur = self.conn.execute(
+            "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, "
+            "expires_at = excluded.expires_at "
+            "WHERE leases.holder = excluded.holder OR leases.expires_at < ?",
+            (name, holder, (now + timedelta(seconds=seconds)).isoformat(), now.isoformat()),
+        )
+        self.conn.commit()
+        return cur.rowcount == 1
+
+    def release_lease(self, name: str, holder: str) -> None:
+        self.conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+        self.conn.commit()
+
+    def get_lease_holder(self, name: str) -> str | None:
+        """Holder of lease *name*, or None when free or expired."""
+        row = self.conn.execute(
+            "SELECT holder FROM leases WHERE name = ? AND expires_at > ?",
+            (name, datetime.now(timezone.utc).isoformat()),
+        ).fetchone()
+        return row[0] if row else None
+
+    # ── LLM usage accounting ──────────────────────────────────────────────
+
+    def add_llm_usage(
+        self,
+        day: str,
+        provider: str,
+        stage: str,
+        prompt_tokens: int,
+        cached_tokens: int,
+        completion_tokens: int,
+        cost_usd: float,
+    ) -> None:
+        """Add one call's tokens and cost to the day's row for provider/stage."""
+        self.add_llm_usage_rows([(day, provider, stage, 1, prompt_tokens, cached_tokens,
+                                  completion_tokens, cost_usd)])
+
+    def add_llm_usage_rows(self, rows: list[tuple]) -> None:
+        """Add summed usage in one transaction.  Each row is ``(day, provider,
+        stage, calls, prompt_tokens, cached_tokens, completion_tokens, cost_usd)``."""
+        self.conn.executemany(
+            "INSERT INTO llm_usage "
+            "(day, provider, stage, calls, prompt_tokens, cached_tokens, "
+            "completion_tokens, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (day, provider, stage) DO UPDATE SET "
+            "calls = calls + excluded.calls, "
+            "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+            "cached_tokens = cached_tokens + excluded.cached_tokens, "
+            "completion_tokens = completion_tokens + excluded.completion_tokens, "
+            "cost_usd = cost_usd + excluded.cost_usd",
+            rows,
+        )
+        self.conn.commit()
+
+    def get_llm_usage_totals(self, day: str) -> dict:
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(calls), 0), COALESCE(SUM(prompt_tokens), 0), "
+            "COALESCE(SUM(cached_tokens), 0), COALESCE(SUM(completion_tokens), 0), "
+            "COALESCE(SUM(cost_usd), 0) FROM llm_usage WHERE day = ?",
+            (day,),
+        ).fetchone()
+        return {
+            "calls": row[0],
+            "prompt_tokens": row[1],
+            "cached_tokens": row[2],
+            "completion_tokens": row[3],
+            "tokens": row[1] + row[3],
+            "cost_usd": round(row[4], 6),
+        }
+
+    def get_llm_usage_by_stage(self, day: str) -> dict[str, dict]:
+        rows = self.conn.execute(
+            "SELECT stage, SUM(calls), SUM(prompt_tokens), SUM(cached_tokens), "
+            "SUM(completion_tokens), SUM(cost_usd) FROM llm_usage "
+            "WHERE day = ? GROUP BY stage ORDER BY stage",
+            (day,),
+        ).fetchall()
+        return {
+            r[0]: {
+                "calls": r[1],
+                "prompt_tokens": r[2],
+                "cached_tokens": r[3],
+                "completion_tokens": r[4],
+                "cost_usd": round(r[5], 6),
+            }
+            for r in rows
+        }
 
     def get_question_bank_size(self) -> int:
         row = self.conn.execute("SELECT COUNT(*) FROM questions").fetchone()
@@ -420,6 +1054,10 @@ class Database:
              response_time_ms, session_id, question_id),
         )
         self.conn.commit()
+        if self._sampler is not None and not self._sampler.question_answered(
+            question_id, was_correct,
+        ):
+            self._sampler = None
 
     def get_active_clusters(self) -> list[dict]:
         """Active (non-archived) clusters with SRS info and per-word accuracy."""
@@ -524,31 +1162,92 @@ class Database:
 
     def set_cluster_archived(self, cluster_title: str, archived: bool) -> None:
         """Archive or restore a cluster."""
-        self.conn.execute(
+        cur = self.conn.execute(
             "UPDATE cluster_progress SET archived = ? "
             "WHERE cluster_title = ?",
             (1 if archived else 0, cluster_title),
         )
         self.conn.commit()
+        if self._sampler is not None and cur.rowcount:
+            self._sampler.set_archived(cluster_title, archived)
 
-    def get_clusters_needing_questions(self) -> list[dict]:
-        """Active clusters that have no ready (unanswered) question.
+    def get_clusters_needing_questions(
+        self, lead_days: float = 0.0, max_depth: int = 1,
+    ) -> list[dict]:
+        """Active clusters holding fewer ready questions than their target depth.
 
-        Ordered by next_review so due clusters generate first.
+        The depth follows each cluster's review interval and the generator's
+        refill lead time (see :mod:`vocab_trainer.bank`); with the defaults
+        every cluster wants exactly one.  Returns {cluster_title, ready,
+        depth}, ordered by next_review so due clusters generate first.
         """
         rows = self.conn.execute("""
-            SELECT cp.cluster_title
+            SELECT cp.cluster_title, cp.interval_days, COUNT(q.id) AS ready
             FROM cluster_progress cp
             LEFT JOIN questions q
                 ON COALESCE(q.cluster_title, '') = cp.cluster_title
                 AND q.answered_at IS NULL
                 AND q.quality_issue IS NULL
             WHERE cp.archived = 0
-              AND q.id IS NULL
+            GROUP BY cp.cluster_title
             ORDER BY cp.next_review ASC
         """).fetchall()
-        return [dict(r) for r in rows]
+        needing = []
+        for r in rows:
+            depth = target_depth(r["interval_days"], lead_days, max_depth)
+            if r["ready"] < depth:
+                needing.append({"cluster_title": r["cluster_title"],
+                                "ready": r["ready"], "depth": depth})
+        return needing
 
+    def get_bank_depths(self, lead_days: float, max_depth: int) -> dict[int, dict]:
+        """Active clusters per target depth: {depth: {clusters, ready, short}}.
+
+        *ready* counts banked questions up to the target; *short* is the
+        number of clusters still below it.
+        """
+        rows = self.conn.execute("""
+            SELECT cp.interval_days, COUNT(q.id) AS ready
+            FROM cluster_progress cp
+            LEFT JOIN questions q
+                ON COALESCE(q.cluster_title, '') = cp.cluster_title
+                AND q.answered_at IS NULL
+                AND q.quality_issue IS NULL
+            WHERE cp.archived = 0
+            GROUP BY cp.cluster_title
+        """).fetchall()
+        depths: dict[int, dict] = {}
+        for r in rows:
+            depth = target_depth(r["interval_days"], lead_days, max_depth)
+            d = depths.setdefault(depth, {"clusters": 0, "ready": 0, "short": 0})
+            d["clusters"] += 1
+            d["ready"] += min(r["ready"], depth)
+            d["short"] += r["ready"] < depth
+        return dict(sorted(depths.items()))
+
+    def get_clusters_due_before(
+        self, until: str, max_ready: int, limit: int = 20,
+    ) -> list[dict]:
+        """Active clusters due by *until* with fewer than *max_ready* ready questions.
+
+        Returns {cluster_title, next_review, ready} in due-date order — the
+        forecast prefetcher's work list.
+        """
+        rows = self.conn.execute("""
+            SELECT cp.cluster_title, cp.next_review, COUNT(q.id) AS ready
+            FROM cluster_progress cp
+            LEFT JOIN questions q
+                ON q.cluster_title = cp.cluster_title
+                AND q.answered_at IS NULL
+                AND q.quality_issue IS NULL
+            WHERE cp.archived = 0
+              AND cp.next_review <= ?
+            GROUP BY cp.cluster_title
+            HAVING COUNT(q.id) < ?
+            ORDER BY cp.next_review ASC
+            LIMIT ?
+        """, (until, max_ready, limit)).fetchall()
+        return [dict(r) for r in rows]
 
     def get_new_clusters_with_ready_count(self) -> int:
         """Count distinct new (no cluster_progress) clusters that have a ready question."""
@@ -660,6 +1359,25 @@ class Database:
         """).fetchall()
         return [dict(r) for r in rows]
 
+    def get_question_outcomes(self) -> list[dict]:
+        """Every question's cluster, target word, readiness and result.
+
+        ``ready`` is True for a question without a quality issue;
+        ``was_correct`` is None until answered.  Feeds the cluster sampler.
+        """
+        rows = self.conn.execute("""
+            SELECT id, cluster_title, target_word,
+                   quality_issue IS NULL AS ready,
+                   CASE WHEN answered_at IS NULL THEN NULL ELSE was_correct = 1 END
+                       AS was_correct
+            FROM questions
+        """).fetchall()
+        return [
+            {**dict(r), "ready": bool(r["ready"]),
+             "was_correct": None if r["was_correct"] is None else bool(r["was_correct"])}
+            for r in rows
+        ]
+
     def get_reviewed_cluster_count(self) -> int:
         """Count of clusters with any review history."""
         row = self.conn.execute("SELECT COUNT(*) FROM cluster_progress").fetchone()
@@ -776,6 +1494,10 @@ class Database:
             ),
         )
         self.conn.commit()
+        if self._stem_index is not None:
+            index = self._stem_index
+            index.add(question_id, question_text(stem, context_sentence),
+                      index.cluster_of(question_id) or "")
 
     def get_all_questions_ordered(self) -> list[dict]:
         """All questions ordered by cluster_title, target_word for batch processing."""
@@ -0,0 +1,128 @@
+"""Near-duplicate detection for question stems (MinHash over character shingles).
+
+Background generation keeps returning to the same high-weight words, and
+the model readily writes the same sentence twice.  :class:`StemIndex` holds
+a MinHash signature of every question's stem and context sentence, bucketed
+by locality-sensitive hashing, so a fresh draft can be checked against the
+whole bank in roughly constant time — before the grammar gate and choice
+enrichment spend any more LLM calls on it.
+
+Shingles are character 4-grams of the normalised text rather than word
+n-grams: stems are one sentence long, and a single inserted word would
+break every word shingle around it.  Signatures use one 64-bit hash per
+shingle XOR-ed with per-slot masks instead of independent hash functions —
+cheaper to compute in pure Python, and accurate enough for a threshold
+check.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vocab_trainer.db import Database
+
+SHINGLE = 4           # characters per shingle
+BANDS, ROWS = 12, 3   # LSH layout; finds pairs at Jaccard 0.6 ~95% of the time
+DUPLICATE_THRESHOLD = 0.6
+
+_MASKS = [random.Random(i).getrandbits(64) for i in range(BANDS * ROWS)]
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def shingles(text: str) -> set[int]:
+    """Hashed character *SHINGLE*-grams of *text*, case and punctuation ignored."""
+    norm = " ".join(_WORD_RE.findall(text.lower()))
+    grams = {norm[i:i + SHINGLE] for i in range(max(1, len(norm) - SHINGLE + 1))}
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), "big")
+        for g in grams if g
+    }
+
+
+def signature(text: str) -> tuple[int, ...] | None:
+    """MinHash signature of *text*; None for text without words."""
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    return tuple(min(h ^ m for h in hashes) for m in _MASKS)
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def question_text(stem: str, context_sentence: str | None) -> str:
+    return f"{stem}\n{context_sentence or ''}"
+
+
+class StemIndex:
+    """MinHash/LSH index over question texts, keyed by question id.
+
+    Duplicates are looked for within one cluster: the same sentence frame
+    asking for a word from another cluster is a different question.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.signatures: dict[str, tuple[str, tuple[int, ...]]] = {}
+        self.buckets: dict[tuple, set[str]] = {}
+
+    @classmethod
+    def from_db(cls, db: Database) -> StemIndex:
+        index = cls()
+        for row in db.get_question_texts():
+            index.add(row["id"], question_text(row["stem"], row["context_sentence"]),
+                      row["cluster_title"] or "")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    @staticmethod
+    def _bands(cluster: str, sig: tuple[int, ...]):
+        for b in range(BANDS):
+            yield (cluster, b, *sig[b * ROWS:(b + 1) * ROWS])
+
+    def add(self, qid: str, text: str, cluster: str = "") -> None:
+        self.remove(qid)
+        sig = signature(text)
+        if sig is None:
+            return
+        self.signatures[qid] = (cluster, sig)
+        for key in self._bands(cluster, sig):
+            self.buckets.setdefault(key, set()).add(qid)
+
+    def remove(self, qid: str) -> None:
+        entry = self.signatures.pop(qid, None)
+        if entry is None:
+            return
+        for key in self._bands(*entry):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(qid)
+                if not bucket:
+                    del self.buckets[key]
+
+    def cluster_of(self, qid: str) -> str | None:
+        entry = self.signatures.get(qid)
+        return entry[0] if entry else None
+
+    def find_duplicate(self, text: str, cluster: str = "") -> tuple[str, float] | None:
+        """The most similar question in *cluster* at or above the threshold,
+        with its estimated similarity; None if *text* is new there."""
+        sig = signature(text)
+        if sig is None:
+            return None
+        candidates: set[str] = set()
+        for key in self._bands(cluster, sig):
+            candidates |= self.buckets.get(key, set())
+        best = None
+        for qid in candidates:
+            sim = similarity(sig, self.signatures[qid][1])
+            if sim >= self.threshold and (best is None or sim > best[1]):
+                best = (qid, sim)
+        return best
@@ -0,0 +1,264 @@
+"""Optional embedding index over vocabulary and cluster words.
+
+Palette words are otherwise ranked by shared definition terms (see
+palette.py), and distractors come only from the cluster itself.  With an
+``embedding_model`` set, every entry in ``words`` and ``cluster_words`` is
+embedded once and stored in the ``embeddings`` table as a float32 blob,
+next to a hash of the text it was computed from.  :func:`sync_embeddings`
+runs after every import and embeds only new or changed entries, dropping
+rows whose entry is gone; changing the model re-embeds everything.
+
+:class:`EmbeddingIndex` loads the stored vectors into two normalised NumPy
+matrices, so a top-k lookup is one matrix-vector product.  Queries use
+stored vectors only — a cluster is represented by the mean of its words'
+vectors — so picking palette words or near neighbours from other clusters
+needs no embedding call while generating.
+
+``embedding_model`` is an Ollama embedding model (``nomic-embed-text``,
+``mxbai-embed-large``, ...) served at ``ollama_url``, or ``"hashing"`` for
+:class:`HashingEmbedder`, a local stand-in that hashes word and character
+features and needs no model.  NumPy is an optional dependency
+(``vocab-trainer[embeddings]``); without it the index is skipped.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from typing import TYPE_CHECKING
+
+import httpx
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+if TYPE_CHECKING:
+    from vocab_trainer.db import Database
+
+log = logging.getLogger("vocab_trainer.embeddings")
+
+HASHING_MODEL = "hashing"
+BATCH = 64  # texts per embedding request
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def available() -> bool:
+    return np is not None
+
+
+def entry_text(word: str, meaning: str | None, distinction: str | None = None) -> str:
+    text = f"{word}: {meaning or ''}"
+    return f"{text} — {distinction}" if distinction else text
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class HashingEmbedder:
+    """Feature-hashing stand-in for an embedding model.
+
+    Words and their character 3-grams are hashed into *dim* signed buckets,
+    so texts sharing vocabulary (or word stems) end up close.  Much weaker
+    than a trained model, but deterministic and free.
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.model = f"{HASHING_MODEL}-{dim}"
+
+    def _features(self, text: str):
+        for w in _WORD_RE.findall(text.lower()):
+            yield w, 1.0
+            padded = f"<{w}>"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        out = []
+        for text in texts:
+            vec = [0.0] * self.dim
+            for feature, weight in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+                vec[h % self.dim] += weight if (h >> 32) & 1 else -weight
+            out.append(vec)
+        return out
+
+
+class OllamaEmbedder:
+    """Ollama ``/api/embed``, one request per batch of texts."""
+
+    def __init__(self, base_url: str = "http://localhost:11434",
+                 model: str = "nomic-embed-text", timeout: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        resp = httpx.post(f"{self.base_url}/api/embed",
+                          json={"model": self.model, "input": texts}, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()["embeddings"]
+
+
+def make_embedder(model: str, ollama_url: str = "http://localhost:11434"):
+    """The embedder for an ``embedding_model`` setting, or None when unset."""
+    if not model:
+        return None
+    if model == HASHING_MODEL:
+        return HashingEmbedder()
+    return OllamaEmbedder(ollama_url, model)
+
+
+def refresh(db: Database, model: str, ollama_url: str = "http://localhost:11434") -> dict | None:
+    """Sync the index for an ``embedding_model`` setting; None when unset or
+    when the embedding backend can't be reached (the index is optional)."""
+    embedder = make_embedder(model, ollama_url)
+    if embedder is None:
+        return None
+    try:
+        return sync_embeddings(db, embedder)
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        log.warning("Embedding index not updated (%s): %s", model, e)
+        return None
+
+
+def _entries(db: Database) -> dict[tuple[str, str], str]:
+    """(cluster title or "", word) -> text to embed, for every word entry."""
+    entries = {("", w["word"]): entry_text(w["word"], w["definition"])
+               for w in db.get_all_words()}
+    titles = {c["id"]: c["title"] for c in db.get_all_clusters()}
+    for cid, words in db.get_all_cluster_words().items():
+        title = titles.get(cid)
+        if title is None:
+            continue
+        for w in words:
+            entries[(title, w["word"])] = entry_text(w["word"], w["meaning"], w["distinction"])
+    return entries
+
+
+def sync_embeddings(db: Database, embedder) -> dict | None:
+    """Bring the ``embeddings`` table in line with the current vocabulary.
+
+    Embeds only entries that are new, whose text changed, or that were
+    embedded with another model.  Returns counts, or None without NumPy.
+    """
+    if np is None:
+        log.warning("NumPy is not installed; skipping the embedding index")
+        return None
+    entries = _entries(db)
+    stored = db.get_embedding_hashes()
+    todo = [
+        (key, text) for key, text in entries.items()
+        if stored.get(key) != (embedder.model, text_hash(text))
+    ]
+    gone = [key for key in stored if key not in entries]
+    for i in range(0, len(todo), BATCH):
+        batch = todo[i:i + BATCH]
+        vectors = np.asarray(embedder.embed([text for _, text in batch]), dtype=np.float32)
+        db.save_embeddings([
+            (title, word, embedder.model, text_hash(text), vec.tobytes())
+            for ((title, word), text), vec in zip(batch, vectors)
+        ])
+    db.delete_embeddings(gone)
+    if todo or gone:
+        log.info("Embedding index: %d embedded, %d removed, %d total",
+                 len(todo), len(gone), len(entries))
+    return {"embedded": len(todo), "removed": len(gone), "total": len(entries)}
+
+
+def _normalised(rows: list[bytes]):
+    m = np.vstack([np.frombuffer(b, dtype=np.float32) for b in rows])
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingIndex:
+    """Stored vectors of vocabulary words and cluster words, for top-k lookup.
+
+    Results are memoised: they only change when the vectors do, and then
+    the database loads a new index.
+    """
+
+    def __init__(self, rows: list[dict]):
+        words = [r for r in rows if not r["cluster_title"]]
+        members = [r for r in rows if r["cluster_title"]]
+        self.words = [r["word"] for r in words]
+        self.word_matrix = _normalised([r["vector"] for r in words]) if words else None
+        self.members = [(r["cluster_title"], r["word"]) for r in members]
+        self.member_matrix = _normalised([r["vector"] for r in members]) if members else None
+        self.rows_by_cluster: dict[str, list[int]] = {}
+        for i, (title, _) in enumerate(self.members):
+            self.rows_by_cluster.setdefault(title, []).append(i)
+        self._memo: dict[tuple, list[str]] = {}
+
+    @classmethod
+    def from_db(cls, db: Database) -> EmbeddingIndex | None:
+        """The stored index, or None without NumPy or stored vectors."""
+        if np is None:
+            return None
+        rows = db.get_embeddings()
+        if not rows or len({len(r["vector"]) for r in rows}) != 1:
+            return None  # empty, or a model switch left mixed dimensions
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.words) + len(self.members)
+
+    @staticmethod
+    def _top(scores, k: int) -> list[int]:
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+    def _centroid(self, cluster_title: str):
+        rows = self.rows_by_cluster.get(cluster_title)
+        if not rows or self.member_matrix is None:
+            return None
+        c = self.member_matrix[rows].mean(axis=0)
+        n = np.linalg.norm(c)
+        return c / n if n else None
+
+    def nearest_words(self, cluster_title: str, k: int,
+                      exclude: list[str] | None = None) -> list[str]:
+        """The *k* vocabulary words closest to the cluster, most similar first."""
+        skip = frozenset(w.lower() for w in exclude or [])
+        key = ("words", cluster_title, k, skip)
+        if key not in self._memo:
+            q = self._centroid(cluster_title)
+            if q is None or self.word_matrix is None:
+                return []
+            top = self._top(self.word_matrix @ q, k + len(skip))
+            self._memo[key] = [self.words[i] for i in top
+                               if self.words[i].lower() not in skip][:k]
+        return list(self._memo[key])
+
+    def distractor_candidates(self, cluster_title: str, target_word: str, k: int) -> list[str]:
+        """Words from other clusters closest to *target_word*'s entry."""
+        key = ("distractors", cluster_title, target_word.lower(), k)
+        if key not in self._memo:
+            self._memo[key] = self._distractors(cluster_title, target_word, k)
+        return list(self._memo[key])
+
+    def _distractors(self, cluster_title: str, target_word: str, k: int) -> list[str]:
+        rows = self.rows_by_cluster.get(cluster_title, [])
+        target = target_word.lower()
+        row = next((i for i in rows if self.members[i][1].lower() == target), None)
+        if row is None:
+            return []
+        scores = self.member_matrix @ self.member_matrix[row]
+        scores[rows] = -np.inf
+        own = {self.members[i][1].lower() for i in rows}
+        out: list[str] = []
+        for i in self._top(scores, k + len(rows) + k):
+            word = self.members[i][1]
+            if word.lower() not in own and word not in out:
+                out.append(word)
+            if len(out) == k:
+                break
+        return out
@@ -0,0 +1,312 @@
+"""A stand-in Ollama server for load tests and CI machines without a GPU.
+
+Speaks enough of the Ollama HTTP API for :class:`OllamaProvider` and the
+router: ``POST /api/generate`` (NDJSON streaming or a single JSON reply,
+``system``, ``think``, ``keep_alive``, usage counters in the final line),
+``GET /api/tags`` and ``GET /api/ps``.
+
+Timing follows a GPU's shape: loading a model that is not resident takes
+*load_delay*, the prompt is prefilled at *prompt_rate* tokens/s and the
+answer generated at *token_rate* tokens/s.  At most *gpus* generations run
+at once; further requests wait for a free GPU, the way a single-GPU Ollama
+serialises chat behind background work.  A client that
+disconnects frees its GPU at the next token, as Ollama does.
+
+Prompts from the question pipeline get valid JSON answers (via
+:class:`~vocab_trainer.providers.llm_fake.FakeLLMProvider`), so the whole
+app can run against it; anything else gets *tokens* tokens of filler.
+With ``think`` unset the answer is preceded by an inline ``<think>`` block,
+as Qwen3 emits it; with ``think: true`` the reasoning comes in the separate
+``thinking`` field.
+
+Run with: uv run vocab-trainer fake-ollama [--port 11434] [--gpus 1] ...
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import select
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from vocab_trainer.providers.llm_fake import FakeLLMProvider
+
+FILLER = "Words that share a meaning rarely share a register, and the difference is the lesson ".split()
+THINKING = "The student needs the distinction, not the definition; start from the example".split()
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeOllama:
+    """In-process fake Ollama server; :meth:`start` runs it on a daemon thread."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        gpus: int = 1,
+        token_rate: float = 50.0,
+        prompt_rate: float = 2000.0,
+        load_delay: float = 0.0,
+        tokens: int = 40,
+        models: list[str] | None = None,
+    ):
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        self.load_delay = load_delay
+        self.tokens = tokens
+        self.models = list(models or ["qwen3:8b"])
+        self.gpus = threading.BoundedSemaphore(max(1, gpus))
+        self._lock = threading.Lock()
+        self._resident: dict[str, float] = {}  # model -> expiry (monotonic)
+        self._answers = FakeLLMProvider()
+        self.requests = 0
+        self.completed = 0
+        self.disconnects = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> FakeOllama:
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True,
+        )
+        self.thread.start()
+        return self
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "completed": self.completed,
+            "disconnects": self.disconnects,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+        }
+
+    def _bump(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    # ── Model residency ───────────────────────────────────────────────
+
+    def _keep(self, model: str, keep_alive) -> None:
+        """Mark *model* resident for *keep_alive* (Ollama duration or seconds)."""
+        seconds = _duration(keep_alive)
+        with self._lock:
+            if seconds == 0:
+                self._resident.pop(model, None)
+            else:
+                self._resident[model] = time.monotonic() + seconds
+
+    def _is_resident(self, model: str) -> bool:
+        with self._lock:
+            expiry = self._resident.get(model)
+            if expiry is not None and expiry < time.monotonic():
+                del self._resident[model]
+                expiry = None
+            return expiry is not None
+
+    # ── Generation ────────────────────────────────────────────────────
+
+    def _answer(self, prompt: str, think) -> tuple[list[str], list[str]]:
+        """(thinking tokens, response tokens) for one request."""
+        kind = self._answers._kind(prompt)
+        if kind == "text":
+            words = (FILLER * (self.tokens // len(FILLER) + 1))[:self.tokens]
+            text = " ".join(words) + "."
+        else:
+            text = self._answers._answer(prompt, kind, None)
+        response = [text[i:i + 4] for i in range(0, len(text), 4)]
+        thinking = [w + " " for w in THINKING]
+        if think is None:
+            return [], ["<think>", *thinking, "</think>", *response]
+        return (thinking if think else []), response
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, obj: dict, status: int = 200):
+                body = json.dumps(obj).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _chunk(self, obj: dict):
+                data = (json.dumps(obj) + "\n").encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _gone(self) -> bool:
+                """Has the client hung up?  (A readable socket with nothing to read.)"""
+                readable, _, _ = select.select([self.connection], [], [], 0)
+                try:
+                    return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+                except OSError:
+                    return True
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    return self._json({"models": [{"name": m, "model": m} for m in fake.models]})
+                if self.path == "/api/ps":
+                    loaded = [m for m in fake.models if fake._is_resident(m)]
+                    expires = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+                    return self._json({"models": [
+                        {"name": m, "model": m, "expires_at": expires, "size_vram": 5 << 30}
+                        for m in loaded
+                    ]})
+                self._json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                if self.path != "/api/generate":
+                    return self._json({"error": "not found"}, 404)
+                length = int(self.headers.get("Content-Length", 0))
+                req = json.loads(self.rfile.read(length) or b"{}")
+                model = req.get("model", "")
+                with fake._lock:
+                    fake.requests += 1
+                    fake.waiting += 1
+                    fake.max_waiting = max(fake.max_waiting, fake.waiting)
+                fake.gpus.acquire()
+                with fake._lock:
+                    fake.waiting -= 1
+                try:
+                    self._generate(req, model)
+                finally:
+                    fake.gpus.release()
+
+            def _generate(self, req: dict, model: str):
+                t0 = time.monotonic()
+                prompt = req.get("prompt", "")
+                keep_alive = req.get("keep_alive", "5m")
+                load = 0.0
+                if not fake._is_resident(model) and (prompt or _duration(keep_alive) != 0):
+                    time.sleep(fake.load_delay)
+                    load = fake.load_delay
+                fake._keep(model, keep_alive)
+                if not prompt:
+                    # Empty prompt: just load (or, with keep_alive 0, unload)
+                    fake._bump("completed")
+                    return self._json({"model": model, "response": "", "done": True,
+                                       "load_duration": int(load * 1e9)})
+
+                prompt_tokens = _tokens(req.get("system", "") + prompt)
+                prefill = prompt_tokens / fake.prompt_rate if fake.prompt_rate else 0.0
+                time.sleep(prefill)
+                thinking, response = fake._answer(prompt, req.get("think"))
+                per_token = 1.0 / fake.token_rate if fake.token_rate else 0.0
+                counters = {
+                    "load_duration": int(load * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(prefill * 1e9),
+                    "eval_count": len(thinking) + len(response),
+                }
+
+                if not req.get("stream", True):
+                    for _ in range(counters["eval_count"]):
+                        time.sleep(per_token)
+                        if self._gone():
+                            fake._bump("disconnects")
+                            self.close_connection = True
+                            return
+                    out = {"model": model, "response": "".join(response), "done": True}
+                    if thinking:
+                        out["thinking"] = "".join(thinking)
+                    counters["eval_duration"] = int(per_token * counters["eval_count"] * 1e9)
+                    counters["total_duration"] = int((time.monotonic() - t0) * 1e9)
+                    fake._bump("completed")
+                    return self._json({**out, **counters})
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                t_eval = time.monotonic()
+                try:
+                    for field, toks in (("thinking", thinking), ("response", response)):
+                        for tok in toks:
+                            time.sleep(per_token)
+                            line = {"model": model, "response": "", "done": False}
+                            line[field] = tok
+                            self._chunk(line)
+                    counters["eval_duration"] = int((time.monotonic() - t_eval) * 1e9)
+                    counters["total_duration"] = int((time.monotonic() - t0) * 1e9)
+                    self._chunk({"model": model, "response": "", "done": True,
+                                 "done_reason": "stop", **counters})
+                    self.wfile.write(b"0\r\n\r\n")
+                    fake._bump("completed")
+                except (BrokenPipeError, ConnectionResetError):
+                    fake._bump("disconnects")
+                    self.close_connection = True
+
+        return Handler
+
+
+def _duration(value) -> float:
+    """Seconds for an Ollama ``keep_alive`` value; negative means forever."""
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    value = str(value).strip()
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    for suffix in sorted(units, key=len, reverse=True):
+        if value.endswith(suffix):
+            n = float(value[:-len(suffix)])
+            return float("inf") if n < 0 else n * units[suffix]
+    n = float(value)
+    return float("inf") if n < 0 else n
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="vocab-trainer fake-ollama", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--gpus", type=int, default=1, help="generations served at once")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="generated tokens per second")
+    parser.add_argument("--prompt-rate", type=float, default=2000.0, help="prefilled prompt tokens per second")
+    parser.add_argument("--load-delay", type=float, default=0.0, help="seconds to load a non-resident model")
+    parser.add_argument("--tokens", type=int, default=40, help="tokens in a free-text answer")
+    parser.add_argument("--model", action="append", dest="models", help="model name to advertise (repeatable)")
+    args = parser.parse_args(argv)
+
+    fake = FakeOllama(
+        host=args.host, port=args.port, gpus=args.gpus, token_rate=args.token_rate,
+        prompt_rate=args.prompt_rate, load_delay=args.load_delay, tokens=args.tokens,
+        models=args.models,
+    )
+    print(f"Fake Ollama listening on {fake.url} ({args.gpus} GPU, {args.token_rate:g} tok/s)")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""In-process LLM usage metrics per call type (stage), and generation outcomes."""
+from __future__ import annotations
+
+import threading
+
+
+class UsageStats:
+    """Aggregate provider usage reports per stage.
+
+    Register :meth:`record` with
+    :func:`vocab_trainer.providers.base.add_usage_listener`.  Prefill figures
+    show what prompt caching saves: ``cached_tokens`` is input the backend
+    served from its cache, ``prefill_tokens``/``prefill_seconds`` what it
+    still had to evaluate.
+    """
+
+    _FIELDS = ("prompt_tokens", "cached_tokens", "prefill_tokens",
+               "prefill_seconds", "completion_tokens")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict] = {}
+
+    def record(self, usage: dict) -> None:
+        with self._lock:
+            st = self._stages.setdefault(
+                usage.get("stage", "other"),
+                {"calls": 0, **{f: 0 for f in self._FIELDS}},
+            )
+            st["calls"] += 1
+            for f in self._FIELDS:
+                if usage.get(f) is not None:
+                    st[f] += usage[f]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def snapshot(self) -> dict[str, dict]:
+        """Per-stage totals plus per-call prefill averages and cache hit rate."""
+        out = {}
+        with self._lock:
+            for stage, st in sorted(self._stages.items()):
+                calls = st["calls"]
+                row = dict(st)
+                row["prefill_seconds"] = round(st["prefill_seconds"], 3)
+                row["prefill_tokens_per_call"] = round(st["prefill_tokens"] / calls, 1)
+                row["prefill_ms_per_call"] = round(1000 * st["prefill_seconds"] / calls, 1)
+                row["cache_hit_rate"] = (
+                    round(st["cached_tokens"] / st["prompt_tokens"], 3)
+                    if st["prompt_tokens"] else None
+                )
+                out[stage] = row
+        return out
+
+
+class GenerationStats:
+    """Counters for what happens to drafts inside the question pipeline.
+
+    Events are free-form names counted by :meth:`count`; :meth:`snapshot`
+    adds derived rates.  ``dedup_checked``/``duplicate`` give the share of
+    step-1 drafts rejected as near-duplicates of the bank.
+    ``gate_calls_saved`` counts grammar-gate calls avoided, by skipping the
+    gate (``gate_skipped``) or by the local pre-filter rejecting a draft
+    before it got there (``prefilter_rejected``).
+
+    :meth:`outcome` records whether each LLM response a stage received was
+    usable (valid draft, parseable verdict, valid enrichment), per stage
+    and model, so routing a stage to another model shows what it costs in
+    rejected responses.
+
+    :meth:`time_question` measures the background generation rate: time
+    spent on attempts that produced nothing is charged to the next question
+    that is saved, and ``seconds_per_question`` is a moving average of that.
+    """
+
+    RATE_SMOOTHING = 0.2  # weight of the newest question in the average
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}
+        self._unproductive = 0.0
+        self._seconds_per_question: float | None = None
+        # (stage, model) -> [responses, accepted]
+        self._outcomes: dict[tuple[str, str], list[int]] = {}
+
+    def count(self, event: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[event] = self._counts.get(event, 0) + n
+
+    def outcome(self, stage: str, model: str, accepted: bool) -> None:
+        with self._lock:
+            r = self._outcomes.setdefault((stage, model), [0, 0])
+            r[0] += 1
+            r[1] += 1 if accepted else 0
+
+    def acceptance(self) -> list[dict]:
+        """Responses and acceptance rate per (stage, model)."""
+        with self._lock:
+            rows = sorted((k, list(v)) for k, v in self._outcomes.items())
+        return [{"stage": stage, "model": model, "responses": n,
+                 "acceptance_rate": round(ok / n, 3)}
+                for (stage, model), (n, ok) in rows]
+
+    def time_question(self, seconds: float, produced: bool) -> None:
+        with self._lock:
+            self._unproductive += seconds
+            if not produced:
+                return
+            sample, self._unproductive = self._unproductive, 0.0
+            if self._seconds_per_question is None:
+                self._seconds_per_question = sample
+            else:
+                self._seconds_per_question += self.RATE_SMOOTHING * (
+                    sample - self._seconds_per_question)
+
+    def seconds_per_question(self) -> float | None:
+        """Smoothed wall time per generated question; None until measured."""
+        with self._lock:
+            return self._seconds_per_question
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._unproductive = 0.0
+            self._seconds_per_question = None
+            self._outcomes.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out: dict = dict(sorted(self._counts.items()))
+            rate = self._seconds_per_question
+        checked = out.get("dedup_checked", 0)
+        out["dedup_rate"] = round(out.get("duplicate", 0) / checked, 3) if checked else None
+        out["gate_calls_saved"] = out.get("gate_skipped", 0) + out.get("prefilter_rejected", 0)
+        out["seconds_per_question"] = round(rate, 1) if rate is not None else None
+        out["acceptance"] = self.acceptance()
+        return out
+
+
+# Shared by the question generator (writer) and the server (reader).
+generation_stats = GenerationStats()
@@ -0,0 +1,194 @@
+"""The vocabulary palette in step-1 prompts: which words, and how many.
+
+Every draft prompt used to carry 15–30 random words from the vocabulary
+as a "palette for inspiration".  Those words are prefilled on every
+attempt, and random words rarely fit the cluster anyway.
+:func:`pick_palette` ranks a random sample of the vocabulary by how much
+each definition shares with the cluster's title, meanings and distinctions,
+and keeps the most relevant.
+
+:class:`PaletteSizer` decides how many to send, per question type.  Sizes
+step through :data:`LEVELS` up to a configured maximum.  After every
+``window`` drafts at the current size it compares draft acceptance there
+with the next size down: if the smaller palette does about as well
+(within ``margin``), or its rate isn't known yet, it steps down; if the
+next size up was clearly better, it steps back up.  Independently, when
+the measured prefill time of draft calls exceeds ``max_prefill_ms``, it
+steps down regardless.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+
+LEVELS = (0, 5, 10, 20, 30)
+DEFAULT_WORDS = 20  # palette size when no sizer is given
+POOL = 200  # random words ranked per prompt
+
+_WORD_RE = re.compile(r"[a-z]{3,}")
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "but", "not", "are",
+    "was", "who", "which", "one", "its", "into", "than", "more", "less", "very",
+    "being", "having", "something", "someone", "especially", "often", "usually",
+    "meaning", "what", "sets", "apart", "word", "words",
+}
+
+
+def _terms(text: str) -> set[str]:
+    """Content words of *text*, cut to a 5-letter prefix as a cheap stemmer."""
+    return {w[:5] for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS}
+
+
+def cluster_terms(cluster_title: str, cluster_words: list[dict]) -> set[str]:
+    parts = [cluster_title] + [
+        f"{w['word']} {w.get('meaning') or ''} {w.get('distinction') or ''}"
+        for w in cluster_words
+    ]
+    return _terms(" ".join(parts))
+
+
+def pick_palette(candidates: list[dict], terms: set[str], n: int) -> list[dict]:
+    """The *n* candidates whose definitions best overlap *terms*.
+
+    Overlap is normalised by the square root of the definition's length so
+    long definitions don't win by size alone; ties keep the candidates'
+    (random) order.
+    """
+    if n <= 0:
+        return []
+
+    def score(c: dict) -> float:
+        own = _terms(c.get("definition") or "")
+        return len(own & terms) / math.sqrt(len(own)) if own else 0.0
+
+    ranked = sorted(candidates, key=score, reverse=True)
+    return ranked[:n]
+
+
+class PaletteSizer:
+    """Adaptive palette size per question type.
+
+    With ``adaptive`` off the size is always ``max_words``.
+    """
+
+    def __init__(self, max_words: int = 30, max_prefill_ms: float = 0.0,
+                 adaptive: bool = True, window: int = 20, margin: float = 0.05):
+        self.max_words = max_words
+        self.max_prefill_ms = max_prefill_ms
+        self.adaptive = adaptive
+        self.window = window
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._level: dict[str, int] = {}              # question type -> index in levels
+        self._since: dict[str, int] = {}              # drafts since the last decision
+        self._tally: dict[tuple[str, int], list[int]] = {}  # (qtype, size) -> [n, ok]
+        self._prefill_ms: dict[str, float] = {}       # smoothed per draft call
+        self._words_sent = 0
+        self._words_saved = 0
+
+    def configure(self, max_words: int | None = None, max_prefill_ms: float | None = None,
+                  adaptive: bool | None = None) -> None:
+        if max_words is not None:
+            self.max_words = max_words
+        if max_prefill_ms is not None:
+            self.max_prefill_ms = max_prefill_ms
+        if adaptive is not None:
+            self.adaptive = adaptive
+
+    def _levels(self) -> list[int]:
+        top = max(0, self.max_words)
+        return [lv for lv in LEVELS if lv < top] + [top]
+
+    def _index(self, qtype: str, levels: list[int]) -> int:
+        return min(self._level.get(qtype, len(levels) - 1), len(levels) - 1)
+
+    def size(self, question_type: str) -> int:
+        """Palette words to put in the next *question_type* prompt."""
+        with self._lock:
+            levels = self._levels()
+            n = levels[self._index(question_type, levels)] if self.adaptive else levels[-1]
+            self._words_sent += n
+            self._words_saved += levels[-1] - n
+            return n
+
+    def _rate(self, qtype: str, size: int) -> float | None:
+        n, ok = self._tally.get((qtype, size), (0, 0))
+        return ok / n if n >= self.window else None
+
+    def record(self, question_type: str, size: int, accepted: bool) -> None:
+        """Record whether a draft written with a *size*-word palette was usable."""
+        with self._lock:
+            t = self._tally.setdefault((question_type, size), [0, 0])
+            t[0] += 1
+            t[1] += 1 if accepted else 0
+            if not self.adaptive:
+                return
+            self._since[question_type] = self._since.get(question_type, 0) + 1
+            if self._since[question_type] < self.window:
+                return
+            self._since[question_type] = 0
+            self._level[question_type] = self._decide(question_type)
+
+    def _decide(self, qtype: str) -> int:
+        levels = self._levels()
+        i = self._index(qtype, levels)
+        here = self._rate(qtype, levels[i])
+        slow = (self.max_prefill_ms > 0
+                and self._prefill_ms.get(qtype, 0.0) > self.max_prefill_ms)
+        if i + 1 < len(levels) and not slow:
+            above = self._rate(qtype, levels[i + 1])
+            if above is not None and here is not None and above > here + self.margin:
+                return i + 1
+        if i == 0:
+            return i
+        below = self._rate(qtype, levels[i - 1])
+        if slow or below is None or here is None or below + self.margin >= here:
+            return i - 1
+        return i
+
+    def record_usage(self, usage: dict) -> None:
+        """Usage listener: smoothed prefill time per call, by stage.
+
+        Only the draft stages (question types) are consulted.
+        """
+        seconds = usage.get("prefill_seconds")
+        if seconds is None:
+            return
+        stage = usage.get("stage") or "other"
+        with self._lock:
+            ms = 1000 * seconds
+            prev = self._prefill_ms.get(stage)
+            self._prefill_ms[stage] = ms if prev is None else prev + 0.2 * (ms - prev)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._level.clear()
+            self._since.clear()
+            self._tally.clear()
+            self._prefill_ms.clear()
+            self._words_sent = self._words_saved = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            levels = self._levels()
+            qtypes = sorted({q for q, _ in self._tally} | set(self._level))
+            return {
+                "max_words": levels[-1],
+                "adaptive": self.adaptive,
+                "words_sent": self._words_sent,
+                "words_saved": self._words_saved,
+                "question_types": {
+                    q: {
+                        "size": levels[self._index(q, levels)] if self.adaptive else levels[-1],
+                        "prefill_ms": (round(self._prefill_ms[q], 1)
+                                       if q in self._prefill_ms else None),
+                        "acceptance": {
+                            size: round(ok / n, 3)
+                            for (qq, size), (n, ok) in sorted(self._tally.items())
+                            if qq == q and n
+                        },
+                    }
+                    for q in qtypes
+                },
+            }
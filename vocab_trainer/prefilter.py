@@ -0,0 +1,251 @@
+"""Local quality rules run on a draft before the LLM grammar gate.
+
+Every draft that passes ``_validate_question`` used to cost a full
+grammar-check call.  Many failures are mechanical and can be caught
+without one: an article that disagrees with every choice, choices in
+different grammatical forms, a stem far too short or too long, a doubled
+word, or a stem that already contains the answer in another form.
+:func:`check_draft` fixes what it can in place and returns a reason for
+the rest, which the generator feeds back to the model like any other
+validation error.
+
+:class:`GrammarGate` then decides whether the LLM gate is still worth
+calling.  It keeps the gate's measured pass rate per model and question
+type; once a pair has enough checks and passes at ``skip_at`` or better,
+most of its questions skip the gate and every ``audit_every``-th one is
+still checked, so the rate keeps being measured.
+"""
+from __future__ import annotations
+
+import re
+import threading
+
+# Stem length bounds in words (the blank counts as one), per question type.
+STEM_WORDS = {
+    "fill_blank": (4, 60),
+    "best_fit": (4, 100),
+    "distinction": (4, 80),
+}
+
+# Words whose initial letter misleads the a/an choice.
+_AN_CONSONANT_LETTER = ("honest", "honor", "honour", "hour", "heir")
+_A_VOWEL_LETTER = ("uni", "use", "usu", "uti", "eu", "one", "once")
+# Legitimately doubled words ("had had", "that that").
+_DOUBLES_OK = {"had", "that"}
+
+_WORD_RE = re.compile(r"[A-Za-z']+|_{3}")
+_ARTICLE_RE = re.compile(r"\b([Aa]n?) ___")
+_DOUBLED_RE = re.compile(r"\b([A-Za-z']+)\s+\1\b", re.IGNORECASE)
+
+_SUFFIXES = ("s", "es", "ed", "d", "ing", "ly", "er", "est",
+             "tion", "ment", "ness", "ous", "ive", "al")
+_E_DROP_SUFFIXES = ("ing", "ed", "er", "est", "ation", "ive", "ous", "able", "ible")
+_Y_SUFFIXES = ("ed", "es", "er", "est", "ness", "ly")
+_SAME_FORM = {"d": "ed", "es": "s"}
+
+# Giveaway check: a shorter base matches too many unrelated words
+# ("ear" → "early", "fin" → "final").
+_MIN_GIVEAWAY_BASE = 4
+# Common words that look like a shorter word plus a suffix but are not
+# forms of it ("several" is not "sever" + -al).
+_NOT_DERIVED = frozenset({
+    "several", "dental", "portal", "mortal", "sandal", "scandal", "spiral",
+    "early", "family", "belly", "bully", "rally", "folly", "jolly", "supply",
+    "corner", "number", "butter", "master", "sister", "manner", "matter",
+    "border", "ginger", "finger", "liver", "lover", "cover", "never", "other",
+    "evening", "morning", "ceiling", "herring", "pudding",
+    "news", "lens", "canvas",
+    "nervous", "jealous", "various",
+    "massive", "passive",
+    "garment", "segment", "pigment", "comment", "torment",
+})
+
+
+def inflection_suffix(candidate: str, base: str) -> str | None:
+    """The suffix turning *base* into *candidate* ("" if equal), or None.
+
+    Covers regular suffixes (-s, -ed, -ing, -ly, ...), e-dropping
+    ("explicate" → "explicating") and y→i ("carry" → "carried").
+    """
+    if candidate == base:
+        return ""
+    if candidate.startswith(base):
+        suffix = candidate[len(base):]
+        return suffix if suffix in _SUFFIXES else None
+    if base.endswith("e") and candidate.startswith(base[:-1]):
+        suffix = candidate[len(base) - 1:]
+        return suffix if suffix in _E_DROP_SUFFIXES else None
+    if base.endswith("y") and candidate.startswith(base[:-1] + "i"):
+        suffix = candidate[len(base):]
+        return suffix if suffix in _Y_SUFFIXES else None
+    return None
+
+
+def _is_form_of(word: str, base: str) -> bool:
+    """Whether *word* is *base* or an inflected/derived form of it, for the
+    giveaway check."""
+    if word == base:
+        return True
+    if len(base) < _MIN_GIVEAWAY_BASE or word in _NOT_DERIVED:
+        return False
+    return inflection_suffix(word, base) is not None
+
+
+def _article(word: str) -> str:
+    w = word.lower()
+    if w.startswith(_AN_CONSONANT_LETTER):
+        return "an"
+    if w.startswith(_A_VOWEL_LETTER):
+        return "a"
+    return "an" if w[:1] in "aeiou" else "a"
+
+
+def _fix_article(stem: str, choices: list[str]) -> str:
+    """Make 'a ___'/'an ___' agree when every choice takes the same article."""
+    articles = {_article(c) for c in choices if c}
+    if len(articles) != 1:
+        return stem  # mixed: _fix_article_before_blank writes "a(n)"
+    want = articles.pop()
+
+    def repl(m: re.Match) -> str:
+        art = m.group(1)
+        fixed = want.capitalize() if art[0].isupper() else want
+        return f"{fixed} ___"
+
+    return _ARTICLE_RE.sub(repl, stem)
+
+
+def _forms(choices: list[str], cluster_words: list[str]) -> set[str] | None:
+    """Grammatical form of each choice relative to its cluster word, or None
+    when a choice can't be traced back to one."""
+    bases = [w.lower() for w in cluster_words]
+    forms = set()
+    for choice in choices:
+        c = choice.lower().strip()
+        suffix = "" if c in bases else next(
+            (s for b in bases if (s := inflection_suffix(c, b))), None)
+        if suffix is None:
+            return None
+        forms.add(_SAME_FORM.get(suffix, suffix))
+    return forms
+
+
+def check_draft(
+    data: dict,
+    question_type: str,
+    correct_word: str,
+    cluster_words: list[str],
+) -> tuple[str | None, list[str]]:
+    """Run the local rules on a validated draft.
+
+    Returns (reason, fixes): *reason* is feedback for the model when the
+    draft must be rewritten, else None; *fixes* names the rules that
+    patched *data* in place.
+    """
+    fixes: list[str] = []
+    stem = data["stem"]
+    choices = data["choices"]
+
+    if question_type == "fill_blank":
+        fixed = _fix_article(stem, choices)
+        if fixed != stem:
+            data["stem"] = stem = fixed
+            fixes.append("article")
+
+        forms = _forms(choices, cluster_words)
+        if forms is not None and len(forms) > 1:
+            return (
+                "All four choices must be in the same grammatical form so each one "
+                f"fits the blank (same tense, number and part of speech). Your "
+                f"choices were: [{', '.join(choices)}].",
+                fixes,
+            )
+
+    lo, hi = STEM_WORDS.get(question_type, STEM_WORDS["fill_blank"])
+    n = len(_WORD_RE.findall(stem))
+    if n < lo:
+        return f"The stem is too short ({n} words); give enough context to decide.", fixes
+    if n > hi:
+        return f"The stem is too long ({n} words); keep it under {hi} words.", fixes
+
+    for m in _DOUBLED_RE.finditer(stem):
+        if m.group(1).lower() not in _DOUBLES_OK:
+            return f"The stem repeats a word: {m.group(0)!r}.", fixes
+
+    answer = correct_word.lower().strip()
+    for word in _WORD_RE.findall(stem.lower()):
+        if word == "___" or len(word) < 4:
+            continue
+        if _is_form_of(word, answer) or _is_form_of(answer, word):
+            return (
+                f"The stem gives the answer away: it contains {word!r}, a form of "
+                f"'{correct_word}'. Describe the concept without that word.",
+                fixes,
+            )
+    return None, fixes
+
+
+class GrammarGate:
+    """Measured grammar-gate pass rates and the decision to skip the gate.
+
+    Rates are kept per (model, question type) since startup.  *skip_at* of
+    0 disables skipping.
+    """
+
+    def __init__(self, skip_at: float = 0.95, min_checks: int = 50, audit_every: int = 5):
+        self.skip_at = skip_at
+        self.min_checks = min_checks
+        self.audit_every = audit_every
+        self._lock = threading.Lock()
+        # (model, question type) -> [checked, passed, skipped, eligible]
+        self._rates: dict[tuple[str, str], list[int]] = {}
+
+    def configure(self, skip_at: float | None = None, min_checks: int | None = None) -> None:
+        if skip_at is not None:
+            self.skip_at = skip_at
+        if min_checks is not None:
+            self.min_checks = min_checks
+
+    def pass_rate(self, model: str, question_type: str) -> float | None:
+        with self._lock:
+            checked, passed, _, _ = self._rates.get((model, question_type), (0, 0, 0, 0))
+        return passed / checked if checked else None
+
+    def should_check(self, model: str, question_type: str) -> bool:
+        """Whether this question should go through the LLM gate."""
+        with self._lock:
+            r = self._rates.setdefault((model, question_type), [0, 0, 0, 0])
+            checked, passed = r[0], r[1]
+            if (not self.skip_at or checked < self.min_checks
+                    or passed / checked < self.skip_at):
+                return True
+            r[3] += 1
+            if r[3] % self.audit_every == 0:
+                return True
+            r[2] += 1
+            return False
+
+    def record(self, model: str, question_type: str, passed: bool) -> None:
+        with self._lock:
+            r = self._rates.setdefault((model, question_type), [0, 0, 0, 0])
+            r[0] += 1
+            r[1] += 1 if passed else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rates.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rates = {k: list(v) for k, v in self._rates.items()}
+        return {
+            "skip_at": self.skip_at,
+            "min_checks": self.min_checks,
+            "skipped": sum(r[2] for r in rates.values()),
+            "rates": [
+                {"model": model, "question_type": qtype, "checked": r[0],
+                 "pass_rate": round(r[1] / r[0], 3) if r[0] else None,
+                 "skipped": r[2]}
+                for (model, qtype), r in sorted(rates.items())
+            ],
+        }
@@ -1,22 +1,89 @@
 from __future__ import annotations
 
+import logging
 from abc import ABC, abstractmethod
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 
+log = logging.getLogger("vocab_trainer.llm")
+
+# ── Call-type tagging and usage reporting ─────────────────────────
+#
+# Callers tag LLM calls with the pipeline stage they belong to ("fill_blank",
+# "grammar", "enrichment", "chat", ...); providers report token usage after
+# each call and listeners (metrics, accounting) receive it with the stage
+# attached.  A context variable carries the stage through schedulers and
+# routers without threading an argument through every wrapper.
+
+_stage: ContextVar[str] = ContextVar("llm_stage", default="other")
+_usage_listeners: list[Callable[[dict], None]] = []
+
+
+@contextmanager
+def llm_stage(name: str) -> Iterator[None]:
+    """Tag every LLM call made inside the block with stage *name*."""
+    token = _stage.set(name)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
+def current_stage() -> str:
+    return _stage.get()
+
+
+def add_usage_listener(fn: Callable[[dict], None]) -> None:
+    _usage_listeners.append(fn)
+
+
+def remove_usage_listener(fn: Callable[[dict], None]) -> None:
+    if fn in _usage_listeners:
+        _usage_listeners.remove(fn)
+
+
+def report_usage(provider: str, **usage) -> None:
+    """Publish one call's usage to all listeners.
+
+    Keys, all optional: ``prompt_tokens`` (input tokens, including cached
+    ones), ``cached_tokens`` (input served from a prompt/KV cache),
+    ``cache_creation_tokens`` (input written to a provider's prompt cache),
+    ``prefill_tokens`` and ``prefill_seconds`` (input actually evaluated and
+    the time it took), ``completion_tokens``.
+    """
+    record = {"stage": current_stage(), "provider": provider, **usage}
+    for fn in list(_usage_listeners):
+        try:
+            fn(record)
+        except Exception:
+            log.exception("Usage listener failed")
+
 
 class LLMProvider(ABC):
+    """A text-generation backend.
+
+    *system* is a static instruction prefix.  Keeping it byte-identical
+    across calls lets backends reuse their cached prefill for it.
+    """
+
     @abstractmethod
-    async def generate(self, prompt: str, temperature: float = 0.7, thinking: bool = True) -> str:
+    async def generate(
+        self, prompt: str, temperature: float = 0.7, system: str | None = None, thinking: bool = True
+    ) -> str:
         ...
 
     async def generate_stream(
         self, prompt: str, temperature: float = 0.7, system: str | None = None, thinking: bool = True
     ) -> AsyncIterator[str]:
         """Stream response tokens. Default: yield full response at once."""
-        result = await self.generate(prompt, temperature, thinking=thinking)
+        result = await self.generate(prompt, temperature, system=system, thinking=thinking)
         yield result
 
+    async def aclose(self) -> None:
+        """Release held resources (e.g. pooled connections). Default: nothing."""
+
     @abstractmethod
     def name(self) -> str:
         ...
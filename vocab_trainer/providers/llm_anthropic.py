@@ -1,26 +1,106 @@
 from __future__ import annotations
 
 import os
+from collections.abc import AsyncIterator
 
-from vocab_trainer.providers.base import LLMProvider
+from vocab_trainer.providers.base import LLMProvider, report_usage
+
+THINKING_BUDGET = 2048
+
+
+def _system_blocks(system: str | None) -> dict:
+    if not system:
+        return {}
+    # Mark the static prefix cacheable: later calls read it from
+    # Anthropic's prompt cache instead of paying full input price.
+    return {"system": [
+        {"type": "text", "text": system, "cache_control": {"type": "ephemeral"}},
+    ]}
 
 
 class AnthropicProvider(LLMProvider):
-    def __init__(self, model: str = "claude-sonnet-4-20250514"):
+    def __init__(self, model: str = "claude-sonnet-4-20250514", base_url: str | None = None):
         import anthropic
         self.client = anthropic.AsyncAnthropic(
             api_key=os.environ.get("ANTHROPIC_API_KEY", ""),
+            base_url=base_url,
         )
         self.model = model
 
-    async def generate(self, prompt: str, temperature: float = 0.7, thinking: bool = True) -> str:
+    async def generate(
+        self, prompt: str, temperature: float = 0.7, system: str | None = None, thinking: bool = True
+    ) -> str:
         message = await self.client.messages.create(
             model=self.model,
             max_tokens=1024,
-            temperature=temperature,
             messages=[{"role": "user", "content": prompt}],
+            # Sent raw: newer SDK releases dropped sampling parameters from
+            # the typed signature, but the API still takes them for this model.
+            extra_body={"temperature": temperature},
+            **_system_blocks(system),
+        )
+        usage = message.usage
+        self._report_usage(
+            usage.input_tokens, usage.cache_read_input_tokens,
+            usage.cache_creation_input_tokens, usage.output_tokens,
         )
         return message.content[0].text
 
+    async def generate_stream(
+        self, prompt: str, temperature: float = 0.7, system: str | None = None, thinking: bool = True
+    ) -> AsyncIterator[str]:
+        """Stream text deltas as they arrive.
+
+        With *thinking*, extended thinking is enabled; its deltas arrive as a
+        separate content block and are not yielded.  The API requires the
+        default temperature while thinking, so *temperature* is dropped then.
+        """
+        if thinking:
+            options = {
+                "max_tokens": 1024 + THINKING_BUDGET,
+                "thinking": {"type": "enabled", "budget_tokens": THINKING_BUDGET},
+            }
+        else:
+            options = {"max_tokens": 1024, "extra_body": {"temperature": temperature}}
+        stream = await self.client.messages.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            **options,
+            **_system_blocks(system),
+        )
+        usage = None
+        output_tokens = 0
+        try:
+            async for event in stream:
+                if event.type == "content_block_delta":
+                    if event.delta.type == "text_delta" and event.delta.text:
+                        yield event.delta.text
+                elif event.type == "message_start":
+                    usage = event.message.usage
+                    output_tokens = usage.output_tokens or 0
+                elif event.type == "message_delta":
+                    output_tokens = event.usage.output_tokens
+        finally:
+            await stream.close()
+        if usage is not None:
+            self._report_usage(
+                usage.input_tokens, usage.cache_read_input_tokens,
+                usage.cache_creation_input_tokens, output_tokens,
+            )
+
+    def _report_usage(self, input_tokens: int, cache_read: int | None,
+                      cache_creation: int | None, output_tokens: int) -> None:
+        cached = cache_read or 0
+        prefill = input_tokens + (cache_creation or 0)
+        report_usage(
+            self.name(),
+            prompt_tokens=prefill + cached,
+            cached_tokens=cached,
+            cache_creation_tokens=cache_creation or 0,
+            prefill_tokens=prefill,
+            completion_tokens=output_tokens,
+        )
+
     def name(self) -> str:
         return f"anthropic/{self.model}"
@@ -0,0 +1,211 @@
+"""Deterministic offline LLM for benchmarks and tests (``llm_provider: "fake"``).
+
+Answers the question pipeline's three prompts — step-1 draft, grammar gate,
+choice enrichment — with valid JSON built from the prompt itself (target
+word, cluster words, choices), so ``generate_question``, ``generate_batch``
+and the background loop run end to end without a model.
+
+Timing is simulated: each call waits a latency drawn from a log-normal
+distribution around *latency* (spread *jitter*), then produces its output
+at *tokens_per_second*.  Failures are injected per call, either from a
+*script* (consumed in order, ``None`` meaning a normal answer) or at the
+given *failure_rates* once the script runs out:
+
+- ``"error"``          — raise :class:`ConnectionError` (any call)
+- ``"bad_json"``       — answer with prose instead of JSON (any call)
+- ``"missing_target"`` — draft whose choices omit the target word
+- ``"grammar_fail"``   — grammar gate rejects the question
+
+Every random draw comes from one generator seeded with *seed*, so a run
+with the same prompts in the same order is reproducible.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import re
+from collections import Counter
+from collections.abc import AsyncIterator
+
+from vocab_trainer.providers.base import LLMProvider, report_usage
+
+FAILURES = ("error", "bad_json", "missing_target", "grammar_fail")
+
+# Stems are assembled from these parts so a long run doesn't repeat itself
+# more than a real model would (the pipeline rejects near-duplicate stems).
+_SUBJECTS = ["Her", "The senator's", "Our guide's", "The critic's", "His neighbour's",
+             "The chairman's", "A stranger's", "The author's", "My aunt's", "The coach's"]
+_NOUNS = ["reply", "remark", "manner", "letter", "speech", "answer", "toast", "review"]
+_ENDINGS = ["left the committee unsure what she meant",
+            "surprised everyone at the dinner table",
+            "was quoted in the morning papers",
+            "ended the argument before it began",
+            "earned a quiet nod from the judges",
+            "made the evening memorable for the wrong reasons",
+            "puzzled the interns for a week",
+            "became a running joke among the staff"]
+_PLACES = ["in Lisbon", "at the harbour", "during the storm", "after the recital",
+           "on the night train", "at the village fete", "before the vote",
+           "in the crowded lobby", "at the funeral", "over breakfast",
+           "in the faculty lounge", "at the border crossing"]
+
+_TARGET_RE = re.compile(r"Target word: \*\*(.+?)\*\*")
+_CLUSTER_WORD_RE = re.compile(r"^- \*\*(.+?)\*\*:", re.MULTILINE)
+_CHOICES_RE = re.compile(r"^Choices: (.+)$", re.MULTILINE)
+_CORRECT_RE = re.compile(r"^Correct answer: (.+?)(?: \(index \d+\))?$", re.MULTILINE)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeLLMProvider(LLMProvider):
+    def __init__(
+        self,
+        model: str = "scripted",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        tokens_per_second: float = 0.0,
+        failure_rates: dict[str, float] | None = None,
+        script: list[str | None] | None = None,
+        seed: int = 0,
+    ):
+        unknown = set(failure_rates or {}) | {f for f in script or [] if f is not None}
+        unknown -= set(FAILURES)
+        if unknown:
+            raise ValueError(f"Unknown failure mode(s): {', '.join(sorted(unknown))}")
+        self.model = model
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.failure_rates = dict(failure_rates or {})
+        self.script = list(script or [])
+        self.rng = random.Random(seed)
+        self.calls: Counter[str] = Counter()
+        self.failures: Counter[str] = Counter()
+
+    # ── Simulation ────────────────────────────────────────────────────
+
+    def _kind(self, prompt: str) -> str:
+        if "Target word:" in prompt:
+            return "draft"
+        if prompt.startswith("Question type:"):
+            return "grammar"
+        if "Correct answer:" in prompt and "Choices:" in prompt:
+            return "enrichment"
+        return "text"
+
+    def _failure(self, kind: str) -> str | None:
+        if self.script:
+            return self.script.pop(0)
+        for mode, rate in self.failure_rates.items():
+            applies = (
+                mode in ("error", "bad_json")
+                or (mode == "missing_target" and kind == "draft")
+                or (mode == "grammar_fail" and kind == "grammar")
+            )
+            if applies and self.rng.random() < rate:
+                return mode
+        return None
+
+    def _latency(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.jitter <= 0:
+            return self.latency
+        return self.rng.lognormvariate(math.log(self.latency), self.jitter)
+
+    def _answer(self, prompt: str, kind: str, failure: str | None) -> str:
+        if failure == "bad_json":
+            return "Here is a question that should work well for this cluster."
+        if kind == "draft":
+            return json.dumps(self._draft(prompt, failure == "missing_target"))
+        if kind == "grammar":
+            if failure == "grammar_fail":
+                return json.dumps({"grammar_ok": False,
+                                   "grammar_issue": "article does not agree with the choices"})
+            return json.dumps({"grammar_ok": True, "grammar_issue": None})
+        if kind == "enrichment":
+            return json.dumps({"choice_details": self._details(prompt)})
+        return "A word's meaning lives in the company it keeps."
+
+    def _draft(self, prompt: str, drop_target: bool) -> dict:
+        m = _TARGET_RE.search(prompt)
+        target = m.group(1) if m else "word"
+        others = [w for w in _CLUSTER_WORD_RE.findall(prompt) if w.lower() != target.lower()]
+        while len(others) < 4:
+            others.append(f"{target}{len(others) + 1}x")
+        distractors = self.rng.sample(others, 4)
+        choices = distractors[:4] if drop_target else distractors[:3] + [target]
+        if not drop_target:
+            self.rng.shuffle(choices)
+        sentence = (f"{self.rng.choice(_SUBJECTS)} {{}} {self.rng.choice(_NOUNS)} "
+                    f"{self.rng.choice(_PLACES)} {self.rng.choice(_ENDINGS)}.")
+        return {
+            "stem": sentence.format("___"),
+            "choices": choices,
+            "correct_index": choices.index(target) if target in choices else 0,
+            "explanation": f"Only {target} captures the precise shade of meaning here.",
+            "context_sentence": sentence.format(target),
+        }
+
+    def _details(self, prompt: str) -> list[dict]:
+        m = _CHOICES_RE.search(prompt)
+        choices = [c.strip() for c in m.group(1).split(",")] if m else []
+        c = _CORRECT_RE.search(prompt)
+        correct = c.group(1).strip() if c else ""
+        return [
+            {
+                "word": w,
+                "base_word": w,
+                "meaning": f"meaning of {w}",
+                "distinction": f"what sets {w} apart",
+                "why": "fits the sentence" if w == correct else f"{w} misses the nuance",
+            }
+            for w in choices
+        ]
+
+    async def _respond(self, prompt: str, system: str | None) -> tuple[str, float]:
+        """Draw failure and timing for one call.  Returns (text, seconds per token)."""
+        kind = self._kind(prompt)
+        self.calls[kind] += 1
+        failure = self._failure(kind)
+        if failure:
+            self.failures[failure] += 1
+        await asyncio.sleep(self._latency())
+        if failure == "error":
+            raise ConnectionError(f"{self.name()}: simulated backend error")
+        text = self._answer(prompt, kind, failure)
+        report_usage(
+            self.name(),
+            prompt_tokens=_tokens((system or "") + prompt),
+            cached_tokens=0,
+            prefill_tokens=_tokens((system or "") + prompt),
+            completion_tokens=_tokens(text),
+        )
+        per_token = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return text, per_token
+
+    # ── LLMProvider ───────────────────────────────────────────────────
+
+    async def generate(
+        self, prompt: str, temperature: float = 0.7, system: str | None = None, thinking: bool = True
+    ) -> str:
+        text, per_token = await self._respond(prompt, system)
+        if per_token:
+            await asyncio.sleep(per_token * _tokens(text))
+        return text
+
+    async def generate_stream(
+        self, prompt: str, temperature: float = 0.7, system: str | None = None, thinking: bool = True
+    ) -> AsyncIterator[str]:
+        text, per_token = await self._respond(prompt, system)
+        for i in range(0, len(text), 4):
+            if per_token:
+                await asyncio.sleep(per_token)
+            yield text[i:i + 4]
+
+    def name(self) -> str:
+        return f"fake/{self.model}"
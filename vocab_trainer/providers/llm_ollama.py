@@ -1,44 +1,112 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
-import re
 import time
 from collections.abc import AsyncIterator
 
 import httpx
 
-from vocab_trainer.providers.base import LLMProvider
+from vocab_trainer.providers.base import LLMProvider, report_usage
+from vocab_trainer.providers.think import strip_think, strip_think_stream
 
 log = logging.getLogger("vocab_trainer.llm")
 
 
+def _tagged(model: str) -> str:
+    """Ollama reports untagged models as ``name:latest``."""
+    return model if ":" in model else f"{model}:latest"
+
+
 class OllamaProvider(LLMProvider):
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "qwen3:8b"):
+    """Ollama ``/api/generate`` over one long-lived, pooled HTTP client.
+
+    Reusing the client keeps connections alive between the many small calls
+    a question needs (step 1, grammar gate, enrichment) and between chat
+    turns.  The client is bound to the event loop it was created on; a call
+    from a different loop (the CLI runs one ``asyncio.run`` per question)
+    transparently gets a fresh client.
+
+    *keep_alive* (e.g. ``"30m"``, ``-1`` for forever, ``None`` for the
+    server default) is sent with every request so the model stays loaded
+    between bursts of work instead of being evicted after Ollama's default
+    five idle minutes.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = "qwen3:8b",
+        timeout: float = 120.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 8,
+        keep_alive: str | int | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._client: httpx.AsyncClient | None = None
+        self._client_loop: asyncio.AbstractEventLoop | None = None
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=self.limits,
+            )
+            self._client_loop = loop
+        return self._client
 
-    async def generate(self, prompt: str, temperature: float = 0.7, thinking: bool = True) -> str:
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None and self._client_loop is asyncio.get_running_loop():
+            await client.aclose()
+
+    def _body(self, **fields) -> dict:
+        body = {"model": self.model, **fields}
+        if self.keep_alive is not None:
+            body["keep_alive"] = self.keep_alive
+        return body
+
+    def _report_usage(self, data: dict) -> None:
+        """Forward Ollama's timing fields.
+
+        Ollama reuses the KV cache for a prompt prefix identical to the
+        previous request's, and ``prompt_eval_count``/``_duration`` cover
+        only what it actually had to evaluate — so a stable system prefix
+        shows up here as fewer prefill tokens and less prefill time.
+        """
+        duration = data.get("prompt_eval_duration")
+        report_usage(
+            self.name(),
+            prefill_tokens=data.get("prompt_eval_count", 0),
+            prefill_seconds=duration / 1e9 if duration is not None else None,
+            completion_tokens=data.get("eval_count"),
+        )
+
+    async def generate(
+        self, prompt: str, temperature: float = 0.7, system: str | None = None, thinking: bool = True
+    ) -> str:
         log.info("LLM request (%s, %d chars)", self.model, len(prompt))
         log.debug("── PROMPT ──\n%s", prompt)
         t0 = time.monotonic()
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "temperature": temperature,
-                    "stream": False,
-                    "think": thinking,
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        body = self._body(prompt=prompt, temperature=temperature, stream=False, think=thinking)
+        if system:
+            body["system"] = system
+        resp = await self._http().post("/api/generate", json=body)
+        resp.raise_for_status()
+        data = resp.json()
+        self._report_usage(data)
         elapsed = time.monotonic() - t0
         response = data["response"]
         # Strip <think>...</think> blocks (Qwen3 reasoning)
-        response = re.sub(r"<think>.*?</think>", "", response, flags=re.DOTALL).strip()
+        response = strip_think(response).strip()
         tokens = data.get("eval_count", "?")
         log.info("LLM response (%.1fs, %s tokens, %d chars)", elapsed, tokens, len(response))
         log.debug("── RESPONSE ──\n%s", response)
@@ -53,66 +121,66 @@ class OllamaProvider(LLMProvider):
         if system:
             log.debug("── SYSTEM ──\n%s", system)
         t0 = time.monotonic()
-        buf = ""
-        in_think = False
-
-        body: dict = {
-            "model": self.model,
-            "prompt": prompt,
-            "temperature": temperature,
-            "stream": True,
-            "think": thinking,
-        }
+        body = self._body(prompt=prompt, temperature=temperature, stream=True, think=thinking)
         if system:
             body["system"] = system
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/api/generate",
-                json=body,
-            ) as resp:
-                resp.raise_for_status()
-                async for line in resp.aiter_lines():
-                    if not line.strip():
-                        continue
-                    data = json.loads(line)
-                    token = data.get("response", "")
-                    if not token:
-                        continue
-
-                    buf += token
-
-                    # Filter <think>...</think> blocks from Qwen3
-                    while True:
-                        if in_think:
-                            idx = buf.find("</think>")
-                            if idx >= 0:
-                                buf = buf[idx + 8:]
-                                in_think = False
-                            else:
-                                buf = ""
-                                break
-                        else:
-                            idx = buf.find("<think>")
-                            if idx >= 0:
-                                if idx > 0:
-                                    yield buf[:idx]
-                                buf = buf[idx + 7:]
-                                in_think = True
-                            else:
-                                # Hold back last 6 chars for partial tag detection
-                                if len(buf) > 6:
-                                    yield buf[:-6]
-                                    buf = buf[-6:]
-                                break
-
-        # Flush remaining buffer
-        if buf and not in_think:
-            yield buf
+        async for token in strip_think_stream(self._stream_tokens(body)):
+            yield token
 
         elapsed = time.monotonic() - t0
         log.info("LLM stream complete (%.1fs)", elapsed)
 
+    async def _stream_tokens(self, body: dict) -> AsyncIterator[str]:
+        async with self._http().stream("POST", "/api/generate", json=body) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("done"):
+                    self._report_usage(data)
+                token = data.get("response", "")
+                if token:
+                    yield token
+
+    async def ping(self) -> bool:
+        """Health check: is the server up and answering?"""
+        try:
+            resp = await self._http().get("/api/tags", timeout=5.0)
+            return resp.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    async def warm_up(self) -> float:
+        """Load the model into memory without generating; returns seconds taken.
+
+        Ollama loads a model on an empty prompt and keeps it for
+        ``keep_alive``, so the first real call doesn't pay the load time.
+        """
+        t0 = time.monotonic()
+        resp = await self._http().post("/api/generate", json=self._body(prompt=""))
+        resp.raise_for_status()
+        elapsed = time.monotonic() - t0
+        log.info("Warmed up %s on %s (%.1fs)", self.model, self.base_url, elapsed)
+        return elapsed
+
+    async def status(self) -> dict:
+        """Whether the model is currently loaded, from Ollama's ``/api/ps``."""
+        info = {"url": self.base_url, "model": self.model, "reachable": False,
+                "resident": False, "expires_at": None, "size_vram": None}
+        try:
+            resp = await self._http().get("/api/ps", timeout=5.0)
+            resp.raise_for_status()
+        except httpx.HTTPError:
+            return info
+        info["reachable"] = True
+        for m in resp.json().get("models", []):
+            if _tagged(m.get("model") or m.get("name", "")) == _tagged(self.model):
+                info.update(resident=True, expires_at=m.get("expires_at"),
+                            size_vram=m.get("size_vram"))
+                break
+        return info
+
     def name(self) -> str:
         return f"ollama/{self.model}"
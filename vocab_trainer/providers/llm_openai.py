@@ -1,25 +1,84 @@
 from __future__ import annotations
 
 import os
+from collections.abc import AsyncIterator
 
-from vocab_trainer.providers.base import LLMProvider
+from vocab_trainer.providers.base import LLMProvider, report_usage
+from vocab_trainer.providers.think import strip_think_stream
+
+
+def _messages(prompt: str, system: str | None) -> list[dict]:
+    # OpenAI caches identical prompt prefixes automatically; putting the
+    # static instructions first as the system message is what makes the
+    # prefix identical from call to call.
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    return messages
 
 
 class OpenAIProvider(LLMProvider):
-    def __init__(self, model: str = "gpt-4o-mini"):
+    def __init__(self, model: str = "gpt-4o-mini", base_url: str | None = None):
         import openai
         self.client = openai.AsyncOpenAI(
             api_key=os.environ.get("OPENAI_API_KEY", ""),
+            base_url=base_url,
         )
         self.model = model
 
-    async def generate(self, prompt: str, temperature: float = 0.7, thinking: bool = True) -> str:
+    async def generate(
+        self, prompt: str, temperature: float = 0.7, system: str | None = None, thinking: bool = True
+    ) -> str:
         resp = await self.client.chat.completions.create(
             model=self.model,
             temperature=temperature,
-            messages=[{"role": "user", "content": prompt}],
+            messages=_messages(prompt, system),
         )
+        self._report_usage(resp.usage)
         return resp.choices[0].message.content
 
+    async def generate_stream(
+        self, prompt: str, temperature: float = 0.7, system: str | None = None, thinking: bool = True
+    ) -> AsyncIterator[str]:
+        """Stream content deltas as they arrive.
+
+        Only the answer is yielded: ``reasoning_content`` deltas and
+        ``<think>`` blocks (reasoning models behind OpenAI-compatible
+        servers) are dropped either way.
+        """
+        async for token in strip_think_stream(self._stream_tokens(prompt, temperature, system)):
+            yield token
+
+    async def _stream_tokens(self, prompt: str, temperature: float, system: str | None) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            temperature=temperature,
+            messages=_messages(prompt, system),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        try:
+            async for chunk in stream:
+                # The usage chunk comes last, with no choices
+                if chunk.usage is not None:
+                    self._report_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+    def _report_usage(self, usage) -> None:
+        if usage is None:
+            return
+        details = usage.prompt_tokens_details
+        cached = (details.cached_tokens or 0) if details is not None else 0
+        report_usage(
+            self.name(),
+            prompt_tokens=usage.prompt_tokens,
+            cached_tokens=cached,
+            prefill_tokens=usage.prompt_tokens - cached,
+            completion_tokens=usage.completion_tokens,
+        )
+
     def name(self) -> str:
         return f"openai/{self.model}"
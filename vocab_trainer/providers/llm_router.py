@@ -0,0 +1,231 @@
+"""Spread LLM calls across several backends serving the same model."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+
+from vocab_trainer.providers.base import LLMProvider
+
+log = logging.getLogger("vocab_trainer.router")
+
+
+class _Backend:
+    """Load and health bookkeeping for one routed provider."""
+
+    def __init__(self, provider: LLMProvider):
+        self.provider = provider
+        self.in_flight = 0
+        self.latency: float | None = None  # EWMA of successful call durations
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.ejections = 0
+        self.probe: asyncio.Task | None = None  # health probe in flight, if any
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def stats(self) -> dict:
+        return {
+            "name": self.provider.name(),
+            "url": getattr(self.provider, "base_url", None),
+            "healthy": not self.ejected_until,
+            "in_flight": self.in_flight,
+            "latency_s": round(self.latency, 3) if self.latency is not None else None,
+            "calls": self.calls,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class RouterProvider(LLMProvider):
+    """Dispatch each call to the least-loaded healthy backend.
+
+    Load is ``(in_flight + 1) * recent_latency``, so a box that is both idle
+    and fast wins; a backend with no latency sample yet borrows the fastest
+    known one so it still gets tried.  After *eject_after* consecutive
+    failures a backend is ejected for *eject_seconds*; once the cooldown
+    expires it must answer a health probe (``ping()``, if the provider has
+    one) before it is re-admitted, unless a real call tried on it as a last
+    resort succeeds first.  The probe runs in the background, at
+    most one per backend, so no request waits on it.  Failed calls fail over
+    to the next backend, so a single dead box never surfaces as an error.
+    """
+
+    def __init__(
+        self,
+        backends: list[LLMProvider],
+        eject_after: int = 2,
+        eject_seconds: float = 30.0,
+        latency_alpha: float = 0.3,
+    ):
+        if not backends:
+            raise ValueError("RouterProvider needs at least one backend")
+        self.backends = [_Backend(p) for p in backends]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.latency_alpha = latency_alpha
+
+    # ── Selection ─────────────────────────────────────────────────────
+
+    def _load(self, b: _Backend, default_latency: float) -> float:
+        latency = b.latency if b.latency is not None else default_latency
+        return (b.in_flight + 1) * latency
+
+    def _candidates(self) -> list[_Backend]:
+        """Healthy backends, least-loaded first; ejected ones only as a last resort.
+
+        A backend whose cooldown expired stays at the back until its health
+        probe, started here but not awaited, re-admits it.
+        """
+        now = time.monotonic()
+        for b in self.backends:
+            if b.ejected_until and not b.is_ejected(now):
+                self._start_probe(b)
+        known = [b.latency for b in self.backends if b.latency is not None]
+        default = min(known) if known else 1.0
+        healthy = [b for b in self.backends if not b.ejected_until]
+        healthy.sort(key=lambda b: (self._load(b, default), b.calls))
+        ejected = sorted(
+            (b for b in self.backends if b.ejected_until),
+            key=lambda b: b.ejected_until,
+        )
+        return healthy + ejected
+
+    def _start_probe(self, b: _Backend) -> None:
+        """Start a health probe for *b* unless one is already running."""
+        if b.probe is not None and not b.probe.done():
+            return
+        if getattr(b.provider, "ping", None) is None:
+            self._readmit(b)  # nothing to ask — re-admit on the cooldown alone
+            return
+        b.probe = asyncio.create_task(self._probe(b))
+
+    def _readmit(self, b: _Backend) -> None:
+        log.info("Backend %s re-admitted", b.provider.name())
+        b.ejected_until = 0.0
+        b.consecutive_failures = 0
+
+    async def _probe(self, b: _Backend) -> None:
+        """Re-admit a backend whose cooldown expired if it answers a health check."""
+        try:
+            ok = await b.provider.ping()
+        except Exception:
+            ok = False
+        if ok:
+            self._readmit(b)
+        else:
+            b.ejected_until = time.monotonic() + self.eject_seconds
+
+    # ── Bookkeeping ───────────────────────────────────────────────────
+
+    def _record_success(self, b: _Backend, elapsed: float) -> None:
+        if b.ejected_until:
+            # Tried as a last resort and it answered: that beats any probe
+            if b.probe is not None and not b.probe.done():
+                b.probe.cancel()
+            self._readmit(b)
+        b.consecutive_failures = 0
+        if b.latency is None:
+            b.latency = elapsed
+        else:
+            b.latency += self.latency_alpha * (elapsed - b.latency)
+
+    def _record_failure(self, b: _Backend, error: Exception) -> None:
+        b.errors += 1
+        b.consecutive_failures += 1
+        log.warning("Backend %s failed (%d in a row): %s",
+                    b.provider.name(), b.consecutive_failures, error)
+        if b.consecutive_failures >= self.eject_after:
+            b.ejected_until = time.monotonic() + self.eject_seconds
+            b.ejections += 1
+            log.warning("Backend %s ejected for %.0fs", b.provider.name(), self.eject_seconds)
+
+    # ── LLMProvider ───────────────────────────────────────────────────
+
+    async def generate(self, prompt: str, temperature: float = 0.7, **kwargs) -> str:
+        last_error: Exception | None = None
+        for b in self._candidates():
+            b.in_flight += 1
+            b.calls += 1
+            t0 = time.monotonic()
+            try:
+                result = await b.provider.generate(prompt, temperature, **kwargs)
+            except Exception as e:
+                self._record_failure(b, e)
+                last_error = e
+                continue
+            finally:
+                b.in_flight -= 1
+            self._record_success(b, time.monotonic() - t0)
+            return result
+        assert last_error is not None
+        raise last_error
+
+    async def generate_stream(
+        self, prompt: str, temperature: float = 0.7, **kwargs
+    ) -> AsyncIterator[str]:
+        last_error: Exception | None = None
+        for b in self._candidates():
+            b.in_flight += 1
+            b.calls += 1
+            t0 = time.monotonic()
+            started = False
+            try:
+                async for token in b.provider.generate_stream(prompt, temperature, **kwargs):
+                    started = True
+                    yield token
+            except Exception as e:
+                self._record_failure(b, e)
+                if started:
+                    raise  # tokens already reached the client — can't fail over
+                last_error = e
+                continue
+            finally:
+                b.in_flight -= 1
+            self._record_success(b, time.monotonic() - t0)
+            return
+        assert last_error is not None
+        raise last_error
+
+    async def aclose(self) -> None:
+        for b in self.backends:
+            if b.probe is not None and not b.probe.done():
+                b.probe.cancel()
+            await b.provider.aclose()
+
+    async def warm_up(self) -> float:
+        """Load the model on every backend that supports it, concurrently."""
+        t0 = time.monotonic()
+        calls = [b.provider.warm_up() for b in self.backends if hasattr(b.provider, "warm_up")]
+        for result in await asyncio.gather(*calls, return_exceptions=True):
+            if isinstance(result, Exception):
+                log.warning("Warm-up failed on a backend: %s", result)
+        return time.monotonic() - t0
+
+    async def status(self) -> list[dict]:
+        """Residency of each backend that can report it."""
+        calls = [b.provider.status() for b in self.backends if hasattr(b.provider, "status")]
+        return list(await asyncio.gather(*calls))
+
+    def stats(self) -> list[dict]:
+        return [b.stats() for b in self.backends]
+
+    def name(self) -> str:
+        names = list(dict.fromkeys(b.provider.name() for b in self.backends))
+        return names[0] if len(names) == 1 else "router/" + ",".join(names)
+
+
+def build_ollama_router(urls: list[str], model: str, **options) -> RouterProvider:
+    """Router over one :class:`OllamaProvider` per URL, all serving *model*.
+
+    *options* (timeouts, connection limits, keep-alive) apply to every backend.
+    """
+    from vocab_trainer.providers.llm_ollama import OllamaProvider
+    return RouterProvider([
+        OllamaProvider(base_url=u, model=model, **options) for u in urls
+    ])
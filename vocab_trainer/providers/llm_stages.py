@@ -0,0 +1,74 @@
+"""Send each pipeline stage to its own model.
+
+The grammar gate and choice enrichment are structured, short-answer tasks
+that a small local model handles well; stem writing and chat benefit from
+the large one.  :class:`StageRoutedLLM` picks the provider for the current
+:func:`~vocab_trainer.providers.base.llm_stage` on every call, so the
+question pipeline, scheduler and policy wrappers need no changes.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+from vocab_trainer.providers.base import LLMProvider, current_stage
+
+
+class StageRoutedLLM(LLMProvider):
+    """Dispatch calls to ``routes[stage]``, or *default* for unrouted stages.
+
+    :meth:`name` is the name of the provider serving the current stage, so
+    usage, questions and metrics are attributed to the model that answered.
+    """
+
+    def __init__(self, default: LLMProvider, routes: dict[str, LLMProvider]):
+        self.default = default
+        self.routes = dict(routes)
+
+    def provider_for(self, stage: str) -> LLMProvider:
+        return self.routes.get(stage, self.default)
+
+    def providers(self) -> list[LLMProvider]:
+        """Distinct providers, the default first."""
+        seen: dict[int, LLMProvider] = {id(self.default): self.default}
+        for p in self.routes.values():
+            seen.setdefault(id(p), p)
+        return list(seen.values())
+
+    async def generate(self, prompt: str, temperature: float = 0.7, **kwargs) -> str:
+        return await self.provider_for(current_stage()).generate(prompt, temperature, **kwargs)
+
+    async def generate_stream(
+        self, prompt: str, temperature: float = 0.7, **kwargs
+    ) -> AsyncIterator[str]:
+        provider = self.provider_for(current_stage())
+        async for token in provider.generate_stream(prompt, temperature, **kwargs):
+            yield token
+
+    async def aclose(self) -> None:
+        for p in self.providers():
+            await p.aclose()
+
+    async def warm_up(self) -> None:
+        """Load every routed model that supports it, concurrently."""
+        calls = [p.warm_up() for p in self.providers() if hasattr(p, "warm_up")]
+        await asyncio.gather(*calls)
+
+    async def status(self) -> list[dict]:
+        """Residency of every routed model that can report it."""
+        out: list[dict] = []
+        for p in self.providers():
+            if hasattr(p, "status"):
+                result = await p.status()
+                out.extend(result if isinstance(result, list) else [result])
+        return out
+
+    def stats(self) -> list[dict]:
+        return [s for p in self.providers() if hasattr(p, "stats") for s in p.stats()]
+
+    def route_names(self) -> dict[str, str]:
+        """Stage → provider name for every routed stage."""
+        return {stage: p.name() for stage, p in sorted(self.routes.items())}
+
+    def name(self) -> str:
+        return self.provider_for(current_stage()).name()
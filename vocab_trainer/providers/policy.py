@@ -0,0 +1,319 @@
+"""Timeouts, retries and a circuit breaker around LLM calls.
+
+Every call gets a deadline for its stage (a grammar verdict should not take
+as long as a draft), failed calls are retried after a jittered exponential
+backoff, and after several consecutive failures a :class:`CircuitBreaker`
+opens: calls fail fast with :class:`BackendUnavailable` until a cool-down
+has passed, then a single probe call decides whether it closes again.
+Each backend has its own breakers, one for chat and one for background
+generation, so a model that is down (or a burst of background timeouts)
+never locks out the others.  Background generation checks its breakers and
+pauses while one is open instead of hammering a backend that is down.
+
+:class:`PolicyLLM` sits *inside* :class:`~vocab_trainer.providers.scheduler.ScheduledLLM`,
+so timeouts measure backend time only (not time queued behind chat), and a
+background call sleeping in backoff is preempted like any other.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections.abc import AsyncIterator
+
+from vocab_trainer.providers.base import LLMProvider, current_stage
+
+log = logging.getLogger("vocab_trainer.policy")
+
+DEFAULT_STAGE_TIMEOUTS = {
+    "fill_blank": 90.0,
+    "best_fit": 90.0,
+    "distinction": 90.0,
+    "grammar": 30.0,
+    "enrichment": 60.0,
+    "chat": 120.0,
+    "chat_summary": 60.0,
+}
+
+# Stages a user is waiting on; they get breakers of their own.
+INTERACTIVE_STAGES = frozenset({"chat", "chat_summary"})
+
+
+class BackendUnavailable(Exception):
+    """The circuit breaker is open: the backend recently failed repeatedly."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"LLM backend unavailable, retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Open after *threshold* consecutive failures; probe after *cooldown* seconds."""
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trips = 0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.retry_in() == 0 else "open"
+
+    @property
+    def is_open(self) -> bool:
+        """Whether a call made now would be rejected."""
+        state = self.state
+        return state == "open" or (state == "half_open" and self._probing)
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe is allowed (0 when calls may go through)."""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go out now.  Half-open admits one probe at a time."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            log.info("Circuit breaker closed — backend is back")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def abandon(self) -> None:
+        """A call ended without a verdict (cancelled); free the probe slot."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or (self.opened_at is None and self.failures >= self.threshold):
+            if self.opened_at is None:
+                self.trips += 1
+            log.warning("Circuit breaker open after %d failures — pausing %.0fs",
+                        self.failures, self.cooldown)
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def reset(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in": round(self.retry_in(), 1),
+            "trips": self.trips,
+        }
+
+
+class LLMPolicy:
+    """Shared timeout/retry settings, breakers and per-stage counters.
+
+    Breakers are keyed by backend (the provider name serving the stage) and
+    traffic kind, ``"chat"`` or ``"background"``; see :meth:`breaker_for`.
+
+    ``seconds`` adds up the backend time of successful calls; ``latency_s``
+    in :meth:`stats` is its mean per call.
+    """
+
+    _COUNTERS = ("calls", "ok", "timeouts", "errors", "retries", "rejected",
+                 "backoff_seconds", "seconds")
+
+    def __init__(
+        self,
+        stage_timeouts: dict[str, float] | None = None,
+        default_timeout: float = 120.0,
+        retries: int = 2,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+    ):
+        self.stage_timeouts = dict(DEFAULT_STAGE_TIMEOUTS if stage_timeouts is None else stage_timeouts)
+        self.default_timeout = default_timeout
+        self.retries = max(0, int(retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker_threshold = max(1, int(breaker_threshold))
+        self.breaker_cooldown = breaker_cooldown
+        self.breakers: dict[tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict] = {}
+
+    def configure(self, stage_timeouts: dict[str, float], default_timeout: float,
+                  retries: int, breaker_threshold: int, breaker_cooldown: float) -> None:
+        self.stage_timeouts = {**DEFAULT_STAGE_TIMEOUTS, **stage_timeouts}
+        self.default_timeout = default_timeout
+        self.retries = max(0, int(retries))
+        self.breaker_threshold = max(1, int(breaker_threshold))
+        self.breaker_cooldown = breaker_cooldown
+        for breaker in self.breakers.values():
+            breaker.threshold = self.breaker_threshold
+            breaker.cooldown = breaker_cooldown
+
+    def breaker_for(self, backend: str, stage: str) -> CircuitBreaker:
+        """The breaker guarding calls to *backend* for *stage*."""
+        key = (backend, "chat" if stage in INTERACTIVE_STAGES else "background")
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_cooldown)
+        return breaker
+
+    def blocking_breaker(self) -> CircuitBreaker | None:
+        """An open background breaker, if any; background work waits for it."""
+        for (_, traffic), breaker in self.breakers.items():
+            if traffic == "background" and breaker.is_open:
+                return breaker
+        return None
+
+    def reset_breakers(self) -> None:
+        """Forget every breaker (the backend was replaced)."""
+        self.breakers.clear()
+
+    def timeout_for(self, stage: str) -> float:
+        return self.stage_timeouts.get(stage, self.default_timeout)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number *attempt* (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def count(self, stage: str, counter: str, amount: float = 1) -> None:
+        with self._lock:
+            st = self._stages.setdefault(stage, {c: 0 for c in self._COUNTERS})
+            st[counter] += amount
+
+    def stats(self) -> dict:
+        with self._lock:
+            stages = {
+                stage: {**st, "backoff_seconds": round(st["backoff_seconds"], 3),
+                        "seconds": round(st["seconds"], 3),
+                        "latency_s": round(st["seconds"] / st["ok"], 3) if st["ok"] else None}
+                for stage, st in sorted(self._stages.items())
+            }
+        breakers = [
+            {"backend": backend, "traffic": traffic, **breaker.stats()}
+            for (backend, traffic), breaker in sorted(self.breakers.items())
+        ]
+        return {"breakers": breakers, "stages": stages}
+
+
+class PolicyLLM(LLMProvider):
+    """Apply *policy* to every call of *provider*.
+
+    ``generate`` is retried with backoff on any provider error or timeout.
+    Streams are not retried — the client has already seen their tokens — but
+    a stream that fails, or stalls longer than the stage timeout between
+    tokens, counts against the breaker.  The breaker is picked per call from
+    the provider name and stage, so a stage-routed provider trips only the
+    breaker of the model that failed.
+    """
+
+    def __init__(self, provider: LLMProvider, policy: LLMPolicy):
+        self.provider = provider
+        self.policy = policy
+
+    def _admit(self, stage: str, breaker: CircuitBreaker) -> bool:
+        """Count the call or reject it; True if it is the breaker's probe."""
+        probe = breaker.state == "half_open"
+        if not breaker.allow():
+            self.policy.count(stage, "rejected")
+            raise BackendUnavailable(breaker.retry_in())
+        self.policy.count(stage, "calls")
+        return probe
+
+    async def generate(self, prompt: str, temperature: float = 0.7, **kwargs) -> str:
+        policy = self.policy
+        stage = current_stage()
+        timeout = policy.timeout_for(stage)
+        breaker = policy.breaker_for(self.provider.name(), stage)
+        attempt = 0
+        while True:
+            probe = self._admit(stage, breaker)
+            t0 = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    self.provider.generate(prompt, temperature, **kwargs), timeout,
+                )
+            except asyncio.CancelledError:
+                if probe:
+                    breaker.abandon()
+                raise
+            except asyncio.TimeoutError as e:
+                policy.count(stage, "timeouts")
+                error, exc = f"timed out after {timeout:.0f}s", e
+            except Exception as e:
+                policy.count(stage, "errors")
+                error, exc = str(e) or type(e).__name__, e
+            else:
+                breaker.record_success()
+                policy.count(stage, "ok")
+                policy.count(stage, "seconds", time.monotonic() - t0)
+                return result
+            breaker.record_failure()
+            if breaker.is_open:
+                raise BackendUnavailable(breaker.retry_in()) from exc
+            if attempt >= policy.retries:
+                raise exc
+            delay = policy.backoff(attempt)
+            attempt += 1
+            policy.count(stage, "retries")
+            policy.count(stage, "backoff_seconds", delay)
+            log.info("%s %s: %s — retry %d/%d in %.1fs",
+                     self.name(), stage, error, attempt, policy.retries, delay)
+            await asyncio.sleep(delay)
+
+    async def generate_stream(
+        self, prompt: str, temperature: float = 0.7, **kwargs
+    ) -> AsyncIterator[str]:
+        policy = self.policy
+        stage = current_stage()
+        timeout = policy.timeout_for(stage)
+        breaker = policy.breaker_for(self.provider.name(), stage)
+        probe = self._admit(stage, breaker)
+        t0 = time.monotonic()
+        tokens = self.provider.generate_stream(prompt, temperature, **kwargs).__aiter__()
+        try:
+            while True:
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                yield token
+        except asyncio.TimeoutError:
+            policy.count(stage, "timeouts")
+            breaker.record_failure()
+            raise RuntimeError(f"{self.name()} {stage}: stream stalled for {timeout:.0f}s") from None
+        except (asyncio.CancelledError, GeneratorExit):
+            if probe:
+                breaker.abandon()
+            raise
+        except Exception:
+            policy.count(stage, "errors")
+            breaker.record_failure()
+            raise
+        finally:
+            await tokens.aclose()
+        breaker.record_success()
+        policy.count(stage, "ok")
+        policy.count(stage, "seconds", time.monotonic() - t0)
+
+    def name(self) -> str:
+        return self.provider.name()
@@ -0,0 +1,141 @@
+"""Build LLM/TTS providers from settings, once, and reuse them.
+
+``build_llm`` / ``build_tts`` are the single factory shared by the server
+and the CLI.  The server keeps its providers in a :class:`ProviderRegistry`
+so SDK clients, pooled HTTP connections and router health state survive
+across requests; an instance is rebuilt only when a setting it was built
+from changes.
+"""
+from __future__ import annotations
+
+import logging
+
+from vocab_trainer.config import Settings
+from vocab_trainer.providers.base import LLMProvider, TTSProvider
+
+log = logging.getLogger("vocab_trainer.providers")
+
+
+def llm_key(s: Settings) -> tuple:
+    """The settings an LLM provider is built from."""
+    if s.llm_provider == "ollama":
+        key: tuple = ("ollama", s.llm_model, s.ollama_url, tuple(s.ollama_urls),
+                      tuple(sorted(s.ollama_options().items())))
+    else:
+        key = (s.llm_provider,)
+    routes = s.stage_models()
+    return key + (tuple(sorted(routes.items())),) if routes else key
+
+
+def tts_key(s: Settings) -> tuple:
+    """The settings a TTS provider is built from."""
+    if s.tts_provider == "elevenlabs":
+        return (s.tts_provider, s.tts_voice, s.elevenlabs_model)
+    return (s.tts_provider, s.tts_voice)
+
+
+def _build_model(s: Settings, kind: str, model: str | None) -> LLMProvider:
+    """One provider of *kind*; *model* None means the provider's default."""
+    if kind == "ollama":
+        model = model or s.llm_model
+        if s.ollama_urls:
+            from vocab_trainer.providers.llm_router import build_ollama_router
+            return build_ollama_router(list(s.ollama_urls), model, **s.ollama_options())
+        from vocab_trainer.providers.llm_ollama import OllamaProvider
+        return OllamaProvider(base_url=s.ollama_url, model=model, **s.ollama_options())
+    elif kind == "anthropic":
+        from vocab_trainer.providers.llm_anthropic import AnthropicProvider
+        return AnthropicProvider(model=model) if model else AnthropicProvider()
+    elif kind == "openai":
+        from vocab_trainer.providers.llm_openai import OpenAIProvider
+        return OpenAIProvider(model=model) if model else OpenAIProvider()
+    elif kind == "fake":
+        from vocab_trainer.providers.llm_fake import FakeLLMProvider
+        return FakeLLMProvider(model=model) if model else FakeLLMProvider()
+    raise ValueError(f"Unknown LLM provider: {kind}")
+
+
+def build_llm(s: Settings) -> LLMProvider:
+    """The configured provider, wrapped in a :class:`StageRoutedLLM` when
+    *llm_stage_models* sends some stages to other models.  Stages routed to
+    the same model share one instance."""
+    default = _build_model(s, s.llm_provider, None)
+    routes = s.stage_models()
+    if not routes:
+        return default
+    from vocab_trainer.providers.llm_stages import StageRoutedLLM
+    default_model = s.llm_model if s.llm_provider == "ollama" else None
+    built: dict[tuple, LLMProvider] = {(s.llm_provider, default_model): default}
+    for kind, model in routes.values():
+        if (kind, model) not in built:
+            built[(kind, model)] = _build_model(s, kind, model)
+    return StageRoutedLLM(default, {stage: built[r] for stage, r in routes.items()})
+
+
+def build_tts(s: Settings) -> TTSProvider:
+    if s.tts_provider == "edge-tts":
+        from vocab_trainer.providers.tts_edge import EdgeTTSProvider
+        return EdgeTTSProvider(voice=s.tts_voice)
+    elif s.tts_provider == "elevenlabs":
+        from vocab_trainer.providers.tts_elevenlabs import ElevenLabsProvider
+        return ElevenLabsProvider(voice_id=s.tts_voice, model_id=s.elevenlabs_model)
+    elif s.tts_provider == "piper":
+        from vocab_trainer.providers.tts_piper import PiperTTSProvider
+        return PiperTTSProvider(model=s.tts_voice)
+    raise ValueError(f"Unknown TTS provider: {s.tts_provider}")
+
+
+class ProviderRegistry:
+    """Cached LLM and TTS providers, rebuilt when their settings change.
+
+    Replaced LLM providers may still have calls in flight, so they are not
+    closed on the spot; :meth:`aclose` releases them together with the
+    current ones at shutdown.
+    """
+
+    def __init__(self):
+        self._llm: LLMProvider | None = None
+        self._llm_key: tuple | None = None
+        self._tts: TTSProvider | None = None
+        self._tts_key: tuple | None = None
+        self._retired: list[LLMProvider] = []
+
+    def llm(self, s: Settings) -> LLMProvider:
+        key = llm_key(s)
+        if self._llm is None or self._llm_key != key:
+            provider = build_llm(s)
+            if self._llm is not None:
+                self._retired.append(self._llm)
+            self._llm, self._llm_key = provider, key
+        return self._llm
+
+    def tts(self, s: Settings) -> TTSProvider:
+        key = tts_key(s)
+        if self._tts is None or self._tts_key != key:
+            self._tts, self._tts_key = build_tts(s), key
+        return self._tts
+
+    def refresh(self, s: Settings) -> list[str]:
+        """Drop providers whose settings changed; they rebuild on next use.
+
+        Returns which kinds (``"llm"``, ``"tts"``) were dropped.
+        """
+        dropped = []
+        if self._llm is not None and self._llm_key != llm_key(s):
+            self._retired.append(self._llm)
+            self._llm = self._llm_key = None
+            dropped.append("llm")
+        if self._tts is not None and self._tts_key != tts_key(s):
+            self._tts = self._tts_key = None
+            dropped.append("tts")
+        if dropped:
+            log.info("Settings changed — rebuilding %s provider(s)", ", ".join(dropped))
+        return dropped
+
+    async def aclose(self) -> None:
+        providers = self._retired + ([self._llm] if self._llm is not None else [])
+        self._retired = []
+        self._llm = self._llm_key = None
+        self._tts = self._tts_key = None
+        for p in providers:
+            await p.aclose()
@@ -0,0 +1,205 @@
+"""Priority scheduler for LLM calls sharing one backend.
+
+A local model server can only run a few generations at once (usually one
+per GPU).  Every LLM call goes through a :class:`LLMScheduler`, which admits
+calls in priority order up to ``max_concurrent``:
+
+- ``CHAT``     — interactive tutor chat (someone is watching the cursor)
+- ``REFILL``   — replacement questions an active session is waiting for
+- ``PREFETCH`` — speculative generation for clusters nobody needs yet
+
+Lower-priority work is never discarded.  Each LLM call is one stage of a
+question (step 1, grammar gate, enrichment), so a background question
+simply waits at its next stage boundary while chat holds the slot.  With
+preemption enabled, a higher-priority arrival additionally cancels an
+in-flight lower-priority *call* and re-queues it — only that one stage is
+repeated, everything the question already produced is kept.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import IntEnum
+
+from vocab_trainer.providers.base import LLMProvider
+
+log = logging.getLogger("vocab_trainer.scheduler")
+
+
+class Priority(IntEnum):
+    CHAT = 0
+    REFILL = 1
+    PREFETCH = 2
+
+
+class _Slot:
+    """A granted concurrency slot, optionally bound to a preemptible call."""
+
+    __slots__ = ("priority", "preemptible", "preempted", "call")
+
+    def __init__(self, priority: Priority, preemptible: bool):
+        self.priority = priority
+        self.preemptible = preemptible
+        self.preempted = False
+        self.call: asyncio.Future | None = None
+
+    def preempt(self) -> bool:
+        if self.call is None or self.call.done() or self.preempted:
+            return False
+        self.preempted = True
+        self.call.cancel()
+        return True
+
+
+class LLMScheduler:
+    """Admit LLM calls in priority order, at most *max_concurrent* at a time."""
+
+    def __init__(self, max_concurrent: int = 1, preempt: bool = True):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.preempt = preempt
+        self._running: set[_Slot] = set()
+        self._reserved = 0  # woken waiters that have not resumed yet
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.preemptions = 0
+        self.completed = {p.name.lower(): 0 for p in Priority}
+        self.wait_seconds = {p.name.lower(): 0.0 for p in Priority}
+
+    def configure(self, max_concurrent: int | None = None, preempt: bool | None = None) -> None:
+        """Apply new limits; waiters are admitted at once if capacity grew."""
+        if max_concurrent is not None:
+            self.max_concurrent = max(1, int(max_concurrent))
+        if preempt is not None:
+            self.preempt = bool(preempt)
+        self._wake_next()
+
+    # ── Admission ─────────────────────────────────────────────────────
+
+    def _has_capacity(self) -> bool:
+        return len(self._running) + self._reserved < self.max_concurrent
+
+    def _wake_next(self) -> None:
+        while self._waiters and self._has_capacity():
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                # Reserve the slot now so a newcomer can't jump the queue
+                # between set_result() and the waiter resuming.
+                self._reserved += 1
+                fut.set_result(None)
+
+    def _preempt_for(self, priority: Priority) -> None:
+        victims = [
+            s for s in self._running
+            if s.preemptible and s.priority > priority and not s.preempted
+        ]
+        if not victims:
+            return
+        victim = max(victims, key=lambda s: s.priority)
+        if victim.preempt():
+            self.preemptions += 1
+            log.info("Preempted %s call for %s", victim.priority.name, priority.name)
+
+    async def acquire(self, priority: Priority, preemptible: bool = True) -> _Slot:
+        t0 = time.monotonic()
+        if not self._has_capacity():
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (int(priority), next(self._seq), fut))
+            if self.preempt:
+                self._preempt_for(priority)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # Woken and cancelled in the same tick — hand the slot on
+                    self._reserved -= 1
+                    self._wake_next()
+                raise
+            self._reserved -= 1
+        slot = _Slot(priority, preemptible)
+        self._running.add(slot)
+        self.wait_seconds[priority.name.lower()] += time.monotonic() - t0
+        return slot
+
+    def release(self, slot: _Slot) -> None:
+        if slot in self._running:
+            self._running.discard(slot)
+            if not slot.preempted:
+                self.completed[slot.priority.name.lower()] += 1
+        self._wake_next()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority, preemptible: bool = True):
+        s = await self.acquire(priority, preemptible)
+        try:
+            yield s
+        finally:
+            self.release(s)
+
+    def busy_above(self, priority: Priority) -> bool:
+        """Whether any call more urgent than *priority* is running or waiting."""
+        return (
+            any(s.priority < priority for s in self._running)
+            or any(p < priority and not fut.done() for p, _, fut in self._waiters)
+        )
+
+    def stats(self) -> dict:
+        waiting = {p.name.lower(): 0 for p in Priority}
+        for p, _, fut in self._waiters:
+            if not fut.done():
+                waiting[Priority(p).name.lower()] += 1
+        running = {p.name.lower(): 0 for p in Priority}
+        for s in self._running:
+            running[s.priority.name.lower()] += 1
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": running,
+            "waiting": waiting,
+            "completed": dict(self.completed),
+            "wait_seconds": {k: round(v, 3) for k, v in self.wait_seconds.items()},
+            "preemptions": self.preemptions,
+        }
+
+
+class ScheduledLLM(LLMProvider):
+    """Route every call of *provider* through *scheduler* at a fixed priority.
+
+    Extra keyword arguments are forwarded verbatim so wrapped providers keep
+    whatever optional parameters they support.
+    """
+
+    def __init__(self, provider: LLMProvider, scheduler: LLMScheduler, priority: Priority):
+        self.provider = provider
+        self.scheduler = scheduler
+        self.priority = priority
+
+    async def generate(self, prompt: str, temperature: float = 0.7, **kwargs) -> str:
+        while True:
+            async with self.scheduler.slot(self.priority) as slot:
+                call = asyncio.ensure_future(
+                    self.provider.generate(prompt, temperature, **kwargs)
+                )
+                slot.call = call
+                try:
+                    return await call
+                except asyncio.CancelledError:
+                    if slot.preempted and call.cancelled():
+                        # Re-queue this stage behind the higher-priority work
+                        continue
+                    raise
+
+    async def generate_stream(
+        self, prompt: str, temperature: float = 0.7, **kwargs
+    ) -> AsyncIterator[str]:
+        # Streams are consumed by a client as they arrive, so they are never
+        # preempted — restarting would replay tokens the user already saw.
+        async with self.scheduler.slot(self.priority, preemptible=False):
+            async for token in self.provider.generate_stream(prompt, temperature, **kwargs):
+                yield token
+
+    def name(self) -> str:
+        return self.provider.name()
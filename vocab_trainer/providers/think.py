@@ -0,0 +1,96 @@
+"""Incremental removal of ``<think>...</think>`` reasoning blocks.
+
+Qwen3-style models wrap their chain of thought in think tags.  The same
+filter serves streamed tokens, complete responses and JSON extraction:
+each chunk is scanned once with ``str.find``, and the only state carried
+between chunks is whether we are inside a block and how many characters
+of a tag the previous chunk ended with — so the work per token is
+constant, however long the response grows.
+
+An unclosed ``<think>`` (a response cut off mid-reasoning) hides
+everything after it.
+"""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+OPEN_TAG = "<think>"
+CLOSE_TAG = "</think>"
+
+
+class ThinkFilter:
+    """Feed chunks in order; get back the visible text of each."""
+
+    def __init__(self):
+        self.inside = False
+        self._partial = 0  # length of the tag prefix the last chunk ended with
+
+    def feed(self, chunk: str) -> str:
+        if not self._partial and "<" not in chunk:
+            # Most tokens: no tag can start here
+            return "" if self.inside else chunk
+        out: list[str] = []
+        i, n = 0, len(chunk)
+        while i < n:
+            tag = CLOSE_TAG if self.inside else OPEN_TAG
+            if self._partial:
+                need = tag[self._partial:]
+                take = chunk[i:i + len(need)]
+                if need.startswith(take):
+                    i += len(take)
+                    if len(take) < len(need):
+                        self._partial += len(take)
+                        break
+                    self._partial = 0
+                    self.inside = not self.inside
+                    continue
+                # Not a tag after all.  Both tags have their only "<" first,
+                # so the held-back characters cannot start another tag.
+                if not self.inside:
+                    out.append(tag[:self._partial])
+                self._partial = 0
+                continue
+            j = chunk.find(tag, i)
+            if j >= 0:
+                if not self.inside:
+                    out.append(chunk[i:j])
+                i = j + len(tag)
+                self.inside = not self.inside
+                continue
+            # No whole tag left: hold back a trailing tag prefix, if any
+            end = n
+            k = chunk.find("<", max(i, n - len(tag) + 1))
+            while k >= 0:
+                if tag.startswith(chunk[k:]):
+                    self._partial = n - k
+                    end = k
+                    break
+                k = chunk.find("<", k + 1)
+            if not self.inside:
+                out.append(chunk[i:end])
+            break
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Text held back at the end of the stream (an incomplete tag)."""
+        held = "" if self.inside else OPEN_TAG[:self._partial]
+        self._partial = 0
+        return held
+
+
+def strip_think(text: str) -> str:
+    """*text* without its think blocks."""
+    f = ThinkFilter()
+    return f.feed(text) + f.flush()
+
+
+async def strip_think_stream(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Drop think blocks from a token stream, yielding visible text as it arrives."""
+    f = ThinkFilter()
+    async for token in tokens:
+        visible = f.feed(token)
+        if visible:
+            yield visible
+    tail = f.flush()
+    if tail:
+        yield tail
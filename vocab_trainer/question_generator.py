@@ -10,13 +10,21 @@ import uuid
 _log = logging.getLogger("vocab_trainer.qgen")
 from typing import TYPE_CHECKING
 
+from vocab_trainer.dedup import question_text
+from vocab_trainer.metrics import generation_stats
 from vocab_trainer.models import Question
+from vocab_trainer.palette import DEFAULT_WORDS, POOL, PaletteSizer, cluster_terms, pick_palette
+from vocab_trainer.prefilter import GrammarGate, check_draft, inflection_suffix
+from vocab_trainer.providers.base import llm_stage
+from vocab_trainer.providers.policy import BackendUnavailable
+from vocab_trainer.providers.think import strip_think
 from vocab_trainer.prompts import (
     BEST_FIT_PROMPT,
     CHOICE_ENRICHMENT_PROMPT,
     DISTINCTION_PROMPT,
     FILL_BLANK_PROMPT,
     GRAMMAR_CHECK_PROMPT,
+    SYSTEM_PROMPTS,
     format_cluster_info,
     format_enrichment,
 )
@@ -26,6 +34,10 @@ if TYPE_CHECKING:
     from vocab_trainer.providers.base import LLMProvider
 
 MAX_RETRIES = 3
+NEIGHBOURS = 4  # words from other clusters offered as distractor ideas
+# How long a run holds its checkpoint; renewed at every stage.  A checkpoint
+# whose run crashed becomes resumable by others after this.
+CHECKPOINT_HOLD_SECONDS = 300.0
 
 # Question type weights
 TYPE_WEIGHTS = {
@@ -55,27 +67,14 @@ def _pick_cluster_and_target(db: Database) -> tuple[dict, dict] | None:
     """Pick a cluster weighted by coverage deficit, then a target word within it.
 
     Step 1: Pick cluster proportional to 1 / (1 + question_count).
-    Step 2: Pick target word within cluster using _pick_target_in_cluster().
+    Step 2: Pick target word within cluster, weighted by error rate.
 
-    Returns (cluster_dict, word_info_dict) or None if no valid clusters exist.
+    Both weights come from the database's in-memory
+    :class:`~vocab_trainer.sampler.ClusterSampler`, so a pick makes no
+    queries.  Returns (cluster_dict, word_info_dict) or None if no valid
+    clusters exist.
     """
-    clusters = db.get_cluster_question_counts()
-    if not clusters:
-        return None
-
-    weights = [1.0 / (1 + c["question_count"]) for c in clusters]
-    chosen = random.choices(clusters, weights=weights, k=1)[0]
-
-    cluster = db.get_cluster_by_title(chosen["cluster_title"])
-    if cluster is None:
-        return None
-
-    cluster_words = db.get_cluster_words(cluster["id"])
-    if len(cluster_words) < 4:
-        return None
-
-    word_info = _pick_target_in_cluster(db, chosen["cluster_title"], cluster_words)
-    return cluster, word_info
+    return db.cluster_sampler().pick()
 
 
 def _pick_target_in_cluster(
@@ -86,26 +85,7 @@ def _pick_target_in_cluster(
     Never-tested words get weight 2.0, others get 1.0 + error_rate
     (range [1.0, 2.0]).
     """
-    accuracy = db.get_cluster_word_accuracy(cluster_title)
-    acc_map = {a["word"].lower(): a for a in accuracy}
-
-    weights = []
-    for cw in cluster_words:
-        key = cw["word"].lower()
-        if key in acc_map:
-            total = acc_map[key]["total"]
-            correct = acc_map[key]["correct"]
-            error_rate = 1.0 - (correct / total) if total > 0 else 1.0
-            weights.append(1.0 + error_rate)
-        else:
-            weights.append(2.0)  # never tested — highest priority
-
-    chosen = random.choices(cluster_words, weights=weights, k=1)[0]
-    return {
-        "word": chosen["word"],
-        "meaning": chosen["meaning"],
-        "distinction": chosen["distinction"],
-    }
+    return db.cluster_sampler().pick_target(cluster_title, cluster_words)
 
 
 def _extract_json(text: str) -> dict | None:
@@ -118,7 +98,7 @@ def _extract_json(text: str) -> dict | None:
     answer.
     """
     # Strip <think>…</think> blocks that may contain draft JSON
-    text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
+    text = strip_think(text).strip()
 
     # 1. Try JSON inside a code fence (most reliable)
     m = re.search(r"```(?:json)?\s*\n?({.*?})\s*\n?```", text, re.DOTALL)
@@ -194,23 +174,7 @@ def _is_inflection(candidate: str, base: str) -> bool:
     Covers regular suffixes: -s, -es, -ed, -d, -ing, -ly, -er, -est, -tion,
     and the e-dropping pattern (e.g. "explicate" → "explicating").
     """
-    if candidate == base:
-        return True
-    # candidate must start with the base (or base minus trailing 'e')
-    if candidate.startswith(base):
-        suffix = candidate[len(base):]
-        return suffix in ("s", "es", "ed", "d", "ing", "ly", "er", "est",
-                          "tion", "ment", "ness", "ous", "ive", "al")
-    # e-dropping: "explicate" → "explicating", "cajole" → "cajoled"
-    if base.endswith("e") and candidate.startswith(base[:-1]):
-        suffix = candidate[len(base) - 1:]
-        return suffix in ("ing", "ed", "er", "est", "ation", "ive",
-                          "ous", "able", "ible")
-    # y→i: "carry" → "carried"
-    if base.endswith("y") and candidate.startswith(base[:-1] + "i"):
-        suffix = candidate[len(base):]
-        return suffix in ("ed", "es", "er", "est", "ness", "ly")
-    return False
+    return inflection_suffix(candidate, base) is not None
 
 
 def _validate_question(data: dict, target_word: str, question_type: str = "fill_blank") -> str | None:
@@ -311,17 +275,21 @@ def _validate_question(data: dict, target_word: str, question_type: str = "fill_
 
 GRAMMAR_CHECK_RETRIES = 2
 
+# _validate_grammar's result when no attempt produced a parseable verdict.
+NO_VERDICT = object()
+
 
 async def _validate_grammar(
     llm: LLMProvider,
     question_type: str,
     data: dict,
-) -> str | None:
+) -> str | None | object:
     """Dedicated grammar validation via a focused LLM call.
 
     Returns a description of the grammar issue if bad, None if OK.
-    On total failure (no valid JSON after retries), returns None so
-    generation is not blocked by validation failures.
+    On total failure (no valid JSON after retries), returns
+    :data:`NO_VERDICT`; the caller lets the question through so generation
+    is not blocked, but must not count it as a pass.
     """
     prompt = GRAMMAR_CHECK_PROMPT.format(
         question_type=question_type,
@@ -333,8 +301,12 @@ async def _validate_grammar(
     for attempt in range(GRAMMAR_CHECK_RETRIES):
         try:
             _log.info("  Grammar check (attempt %d/%d)", attempt + 1, GRAMMAR_CHECK_RETRIES)
-            response = await llm.generate(prompt, temperature=0.2)
+            with llm_stage("grammar"):
+                response = await llm.generate(
+                    prompt, temperature=0.2, system=SYSTEM_PROMPTS["grammar"],
+                )
             parsed = _extract_json(response)
+            _outcome(llm, "grammar", parsed is not None)
             if parsed is None:
                 _log.info("  Grammar check: no valid JSON")
                 continue
@@ -346,12 +318,14 @@ async def _validate_grammar(
 
             _log.info("  Grammar check: PASS")
             return None
+        except BackendUnavailable:
+            raise
         except Exception as e:
             _log.info("  Grammar check: error — %s", e)
 
     # Total failure — don't block generation
     _log.info("  Grammar check: could not validate, allowing through")
-    return None
+    return NO_VERDICT
 
 
 ENRICHMENT_RETRIES = 3
@@ -402,9 +376,13 @@ async def _enrich_choices(
     for attempt in range(ENRICHMENT_RETRIES):
         try:
             _log.info("  Enrich choices (attempt %d/%d)", attempt + 1, ENRICHMENT_RETRIES)
-            response = await llm.generate(prompt, temperature=0.3)
+            with llm_stage("enrichment"):
+                response = await llm.generate(
+                    prompt, temperature=0.3, system=SYSTEM_PROMPTS["enrichment"],
+                )
             parsed = _extract_json(response)
             if parsed is None:
+                _outcome(llm, "enrichment", False)
                 feedback = "Your response did not contain valid JSON. Respond with ONLY a JSON object, no other text."
                 prompt = base_prompt + "\n\n" + feedback
                 _log.info("  Enrich: no valid JSON — feeding back")
@@ -412,6 +390,7 @@ async def _enrich_choices(
 
             details = parsed.get("choice_details", [])
             error = _validate_enrichment(details, len(data["choices"]))
+            _outcome(llm, "enrichment", not error)
             if error:
                 prompt = base_prompt + f"\n\nYour previous response had errors:\n{error}\n\nPlease fix and respond with corrected JSON only."
                 _log.info("  Enrich: validation failed — feeding back: %s", error.split('\n')[0])
@@ -419,6 +398,8 @@ async def _enrich_choices(
 
             _log.info("  Enrich: OK")
             return details
+        except BackendUnavailable:
+            raise
         except Exception as e:
             _log.info("  Enrich: error — %s", e)
 
@@ -445,11 +426,31 @@ async def generate_question(
     cluster: dict | None = None,
     target_word_info: dict | None = None,
     question_type: str | None = None,
+    checkpoint: bool = True,
+    gate: GrammarGate | None = None,
+    palette: PaletteSizer | None = None,
 ) -> Question | None:
     """Generate a single question using the LLM.
 
     If cluster/target_word_info not provided, picks a random cluster and word.
+
+    With a *gate*, the grammar check is skipped for model/question-type
+    pairs whose measured pass rate is high enough; without one it always
+    runs.  *palette* sizes the step-1 vocabulary palette (see palette.py).
+
+    With *checkpoint*, each stage's validated output is persisted to
+    ``pending_questions`` (step-1 draft, then the grammar verdict), and a
+    checkpoint left behind for this cluster by a cancelled or crashed run is
+    resumed at the stage where it stopped instead of starting over (only one
+    for *target_word_info*'s word, when the caller names one).  A run
+    claims the checkpoint it works on, so concurrent runs for the same
+    cluster (refill and forecast loops, worker processes) never resume the
+    same one; the claim is given up if the run is cancelled or fails.  The
+    checkpoint is cleared when the caller saves the returned question.
     """
+    # A target the caller asked for must not be swapped for a checkpoint's
+    wanted_word = target_word_info["word"] if target_word_info is not None else None
+
     # Pick cluster + word using coverage-weighted selection if not provided
     if cluster is None or target_word_info is None:
         picked = _pick_cluster_and_target(db)
@@ -461,16 +462,195 @@ async def generate_question(
     if len(cluster_words) < 4:
         return None
 
+    qid = None
+    data = None
+    stage = None
+    quality_issue = None
+    owner = uuid.uuid4().hex
+    if checkpoint:
+        pending = _load_checkpoint(db, cluster, cluster_words, question_type, owner,
+                                   wanted_word)
+        if pending is not None:
+            qid, data, stage = pending["id"], pending["data"], pending["stage"]
+            quality_issue = pending["quality_issue"]
+            question_type = pending["question_type"]
+            target_word_info = pending["target_word_info"]
+
     # Pick question type
     if question_type is None:
         question_type = _pick_question_type()
 
-    # Get enrichment words (exclude cluster words to avoid overlap)
-    cluster_word_names = [w["word"] for w in cluster_words]
-    enrichment = db.get_random_words(
-        limit=random.randint(15, 30), exclude=cluster_word_names,
+    try:
+        if data is None:
+            data = await _generate_draft(
+                llm, db, cluster, cluster_words, target_word_info, question_type, palette,
+            )
+            if data is None:
+                return None
+            qid = str(uuid.uuid4())
+            stage = "drafted"
+            if checkpoint:
+                db.save_pending_question(
+                    qid, cluster["title"], target_word_info["word"], question_type, data,
+                    owner=owner, hold_seconds=CHECKPOINT_HOLD_SECONDS,
+                )
+        return await _finish_question(
+            llm, db, cluster, cluster_words, target_word_info, question_type,
+            qid, data, stage, quality_issue, checkpoint, gate,
+        )
+    except BaseException:
+        if checkpoint and qid is not None:
+            db.release_pending_question(qid, owner)
+        raise
+
+
+async def _finish_question(
+    llm: LLMProvider,
+    db: Database,
+    cluster: dict,
+    cluster_words: list[dict],
+    target_word_info: dict,
+    question_type: str,
+    qid: str,
+    data: dict,
+    stage: str,
+    quality_issue: str | None,
+    checkpoint: bool,
+    gate: GrammarGate | None,
+) -> Question:
+    """Run the stages after step 1 (grammar gate, enrichment) on a draft."""
+    # Step 2: Grammar validation (dedicated adversarial LLM call)
+    if stage == "drafted":
+        model = _stage_model(llm, "grammar")
+        if gate is None or gate.should_check(model, question_type):
+            verdict = await _validate_grammar(llm, question_type, data)
+            generation_stats.count("gate_checked")
+            if verdict is NO_VERDICT:
+                quality_issue = None
+            else:
+                quality_issue = verdict
+                if gate is not None:
+                    gate.record(model, question_type, not quality_issue)
+        else:
+            _log.info("  Grammar check: skipped (pass rate %.0f%% for %s)",
+                      100 * gate.pass_rate(model, question_type), question_type)
+            generation_stats.count("gate_skipped")
+        if checkpoint:
+            db.mark_pending_checked(qid, quality_issue, hold_seconds=CHECKPOINT_HOLD_SECONDS)
+
+    if quality_issue:
+        _log.warning("  Grammar issue for '%s' (%s): %s",
+                     target_word_info["word"], cluster["title"], quality_issue)
+        # Skip enrichment — no point enriching a flagged question
+        choice_details: list[dict] = []
+    else:
+        # Step 3: Enrich choices (only reached for grammar-OK questions)
+        choice_details = await _enrich_choices(
+            llm, cluster, cluster_words, data,
+        )
+        _log.info("  Saved (%s)", cluster["title"])
+
+    return Question(
+        id=qid,
+        question_type=question_type,
+        stem=data["stem"],
+        choices=data["choices"],
+        correct_index=data["correct_index"],
+        correct_word=target_word_info["word"],
+        explanation=data["explanation"],
+        context_sentence=data["context_sentence"],
+        cluster_title=cluster["title"],
+        llm_provider=_stage_model(llm, question_type),
+        choice_details=choice_details,
+        quality_issue=quality_issue or None,
     )
 
+
+def _load_checkpoint(
+    db: Database,
+    cluster: dict,
+    cluster_words: list[dict],
+    question_type: str | None,
+    owner: str,
+    target_word: str | None = None,
+) -> dict | None:
+    """Claim a resumable checkpoint for *cluster* (and *target_word*, if
+    given) for *owner*, discarding stale ones.  Checkpoints another live run
+    holds are skipped.
+
+    A checkpoint is stale when its target word has left the cluster or its
+    draft no longer validates (e.g. the word list was edited).
+    """
+    while True:
+        pending = db.claim_pending_question(
+            cluster["title"], owner, CHECKPOINT_HOLD_SECONDS, question_type, target_word,
+        )
+        if pending is None:
+            return None
+        target = pending["target_word"].lower()
+        info = next((w for w in cluster_words if w["word"].lower() == target), None)
+        if info is not None and _validate_question(
+            pending["data"], info["word"], pending["question_type"],
+        ) is None:
+            _log.info("Resuming checkpointed %s for '%s' (target: %s) at stage '%s'",
+                      pending["question_type"], cluster["title"], info["word"],
+                      pending["stage"])
+            pending["target_word_info"] = {
+                "word": info["word"],
+                "meaning": info["meaning"],
+                "distinction": info["distinction"],
+            }
+            return pending
+        _log.info("Discarding stale checkpoint for '%s' (target: %s)",
+                  cluster["title"], pending["target_word"])
+        db.delete_pending_question(pending["id"])
+
+
+async def _generate_draft(
+    llm: LLMProvider,
+    db: Database,
+    cluster: dict,
+    cluster_words: list[dict],
+    target_word_info: dict,
+    question_type: str,
+    palette: PaletteSizer | None = None,
+) -> dict | None:
+    """Step 1: write the stem and choices, retrying with validation feedback.
+
+    A draft that validates but nearly repeats a question already in the
+    bank is re-prompted the same way, before the grammar and enrichment
+    stages spend calls on it.
+
+    The prompt's vocabulary palette holds the words most related to the
+    cluster; *palette* sets how many and learns from each draft's outcome.
+
+    Returns the validated (possibly auto-fixed) question data, or None.
+    """
+    # Palette words, most relevant first (exclude cluster words to avoid overlap).
+    # With an embedding index: nearest words, plus close words from other
+    # clusters as distractor ideas.
+    size = palette.size(question_type) if palette is not None else DEFAULT_WORDS
+    enrichment: list[dict] = []
+    neighbours: list[str] = []
+    if size:
+        cluster_word_names = [w["word"] for w in cluster_words]
+        index = db.embedding_index()
+        if index is not None:
+            enrichment = [{"word": w} for w in index.nearest_words(
+                cluster["title"], size, exclude=cluster_word_names)]
+            neighbours = index.distractor_candidates(
+                cluster["title"], target_word_info["word"], NEIGHBOURS)
+        if not enrichment:
+            candidates = db.get_random_words(limit=max(POOL, size), exclude=cluster_word_names)
+            enrichment = pick_palette(
+                candidates, cluster_terms(cluster["title"], cluster_words), size,
+            )
+
+    def judge(accepted: bool) -> None:
+        _outcome(llm, question_type, accepted)
+        if palette is not None:
+            palette.record(question_type, size, accepted)
+
     # Format prompt
     prompt_template = PROMPTS[question_type]
     base_prompt = prompt_template.format(
@@ -479,7 +659,7 @@ async def generate_question(
         target_word=target_word_info["word"],
         target_meaning=target_word_info["meaning"],
         target_distinction=target_word_info["distinction"],
-        enrichment_section=format_enrichment(enrichment),
+        enrichment_section=format_enrichment(enrichment, neighbours),
     )
 
     # Try generation with retries — feed validation errors back to the LLM
@@ -489,76 +669,92 @@ async def generate_question(
         try:
             _log.info("Generate %s (attempt %d/%d)",
                        question_type, attempt + 1, MAX_RETRIES)
-            response = await llm.generate(prompt, temperature=0.7)
+            with llm_stage(question_type):
+                response = await llm.generate(
+                    prompt, temperature=0.7, system=SYSTEM_PROMPTS[question_type],
+                )
             data = _extract_json(response)
             if data is None:
+                judge(False)
                 feedback = "Your response did not contain valid JSON. Respond with ONLY a JSON object, no other text."
                 prompt = base_prompt + "\n\n" + feedback
                 _log.info("  Step 1 failed: no valid JSON — feeding back")
                 _log.debug("  Raw response: %.300s", response)
                 continue
-            reason = _validate_question(data, target, question_type)
+            reason = _validate_question(data, target, question_type) or _prefilter(
+                data, question_type, cluster_words,
+            )
             if reason:
+                judge(False)
                 prompt = base_prompt + f"\n\nYour previous response had errors: {reason}\nPlease fix and respond with corrected JSON only."
                 _log.info("  Step 1 failed: %s — feeding back", reason)
                 continue
-
-            _log.info("  Step 1 OK — question generated")
-
-            # Step 2: Grammar validation (dedicated adversarial LLM call)
-            quality_issue = await _validate_grammar(llm, question_type, data)
-
-            if quality_issue:
-                _log.warning("  Grammar issue for '%s' (%s): %s",
-                             target_word_info["word"], cluster["title"], quality_issue)
-                # Skip enrichment — no point enriching a flagged question
-                return Question(
-                    id=str(uuid.uuid4()),
-                    question_type=question_type,
-                    stem=data["stem"],
-                    choices=data["choices"],
-                    correct_index=data["correct_index"],
-                    correct_word=target_word_info["word"],
-                    explanation=data["explanation"],
-                    context_sentence=data["context_sentence"],
-                    cluster_title=cluster["title"],
-                    llm_provider=llm.name(),
-                    choice_details=[],
-                    quality_issue=quality_issue,
+            duplicate = _find_duplicate(db, cluster["title"], data)
+            judge(not duplicate)
+            if duplicate:
+                prompt = base_prompt + (
+                    f"\n\nYour sentence is nearly identical to an existing question: "
+                    f"\"{duplicate}\"\nWrite a different scenario with a different "
+                    f"sentence, and respond with corrected JSON only."
                 )
+                _log.info("  Step 1 failed: near-duplicate stem — feeding back")
+                continue
 
-            # Step 3: Enrich choices (only reached for grammar-OK questions)
-            choice_details = await _enrich_choices(
-                llm, cluster, cluster_words, data,
-            )
-
-            _log.info("  Saved (%s)", cluster["title"])
-            return Question(
-                id=str(uuid.uuid4()),
-                question_type=question_type,
-                stem=data["stem"],
-                choices=data["choices"],
-                correct_index=data["correct_index"],
-                correct_word=target_word_info["word"],
-                explanation=data["explanation"],
-                context_sentence=data["context_sentence"],
-                cluster_title=cluster["title"],
-                llm_provider=llm.name(),
-                choice_details=choice_details,
-                quality_issue=None,
-            )
+            _log.info("  Step 1 OK — question generated")
+            return data
+        except BackendUnavailable:
+            raise
         except Exception as e:
             if attempt == MAX_RETRIES - 1:
                 _log.warning("Failed after %d attempts: %s", MAX_RETRIES, e)
     return None
 
 
+def _stage_model(llm: LLMProvider, stage: str) -> str:
+    """Name of the model *llm* routes *stage* calls to."""
+    with llm_stage(stage):
+        return llm.name()
+
+
+def _outcome(llm: LLMProvider, stage: str, accepted: bool) -> None:
+    """Record whether a *stage* response was usable, under the model that wrote it."""
+    generation_stats.outcome(stage, _stage_model(llm, stage), accepted)
+
+
+def _prefilter(data: dict, question_type: str, cluster_words: list[dict]) -> str | None:
+    """Local rule checks on a validated draft (see :mod:`vocab_trainer.prefilter`)."""
+    generation_stats.count("prefilter_checked")
+    reason, fixes = check_draft(
+        data, question_type, data["choices"][data["correct_index"]],
+        [w["word"] for w in cluster_words],
+    )
+    if fixes:
+        generation_stats.count("prefilter_fixed")
+    if reason:
+        generation_stats.count("prefilter_rejected")
+    return reason
+
+
+def _find_duplicate(db: Database, cluster_title: str, data: dict) -> str | None:
+    """Stem of a question in the cluster that the draft nearly repeats, or None."""
+    generation_stats.count("dedup_checked")
+    match = db.stem_index().find_duplicate(
+        question_text(data["stem"], data.get("context_sentence")), cluster_title,
+    )
+    if match is None:
+        return None
+    generation_stats.count("duplicate")
+    return db.get_question_stem(match[0]) or data["stem"]
+
+
 async def generate_batch(
     llm: LLMProvider,
     db: Database,
     count: int = 10,
     target_words: list[str] | None = None,
     target_clusters: list[str] | None = None,
+    gate: GrammarGate | None = None,
+    palette: PaletteSizer | None = None,
 ) -> list[Question]:
     """Generate a batch of questions and save to database.
 
@@ -581,7 +777,8 @@ async def generate_batch(
             word_info = _pick_target_in_cluster(db, cluster_title, cw)
             _log.info("[%d/%d] Generating for '%s' (target: %s)",
                       cl_idx, total_clusters, cluster_title, word_info["word"])
-            q = await generate_question(llm, db, cluster=cluster, target_word_info=word_info)
+            q = await generate_question(llm, db, cluster=cluster, target_word_info=word_info,
+                                        gate=gate, palette=palette)
             if q:
                 db.save_question(q)
                 questions.append(q)
@@ -591,24 +788,22 @@ async def generate_batch(
     if target_words:
         # Generate questions for specific words (legacy)
         for word in target_words:
-            all_clusters = db.get_all_clusters()
-            for cl in all_clusters:
-                cw = db.get_cluster_words(cl["id"])
-                word_info = next((w for w in cw if w["word"].lower() == word.lower()), None)
-                if word_info:
-                    q = await generate_question(llm, db, cluster=cl, target_word_info=word_info)
-                    if q:
-                        db.save_question(q)
-                        questions.append(q)
-                    else:
-                        _log.warning("Batch [%d/%d]: failed to generate for '%s'", len(questions), count, word)
-                    break
+            found = db.find_word_cluster(word)
+            if found:
+                cl, word_info = found
+                q = await generate_question(llm, db, cluster=cl, target_word_info=word_info,
+                                            gate=gate, palette=palette)
+                if q:
+                    db.save_question(q)
+                    questions.append(q)
+                else:
+                    _log.warning("Batch [%d/%d]: failed to generate for '%s'", len(questions), count, word)
             if len(questions) >= count:
                 break
     elif not target_clusters:
         # Generate random questions (only if no targeted generation)
         for i in range(count):
-            q = await generate_question(llm, db)
+            q = await generate_question(llm, db, gate=gate, palette=palette)
             if q:
                 db.save_question(q)
                 questions.append(q)
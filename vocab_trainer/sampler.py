@@ -0,0 +1,233 @@
+"""In-memory weighted sampling of clusters and target words.
+
+Random question generation picks a cluster with probability proportional to
+``1 / (1 + ready questions)`` and then a target word weighted by error rate
+(see :mod:`vocab_trainer.question_generator`).  Computing those weights in
+SQL costs two aggregates per question; :class:`ClusterSampler` loads them
+once and keeps them current as questions are saved, answered and clusters
+archived, so a pick is O(log n) with no database round trips.
+
+The :class:`~vocab_trainer.db.Database` owns the sampler: it builds it on
+first use, forwards every write that changes a weight, and drops it when
+clusters are re-imported.
+"""
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vocab_trainer.db import Database
+
+MIN_CLUSTER_WORDS = 4  # enough for four choices
+
+
+class FenwickTree:
+    """Prefix sums over a list of non-negative weights.
+
+    Point updates and prefix searches are O(log n); :meth:`find` maps a
+    uniform draw in ``[0, total)`` to an index chosen proportionally to
+    its weight.
+    """
+
+    def __init__(self, weights: list[float]):
+        self.weights = list(weights)
+        n = len(self.weights)
+        self.tree = [0.0] + self.weights
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def total(self) -> float:
+        return self.prefix(len(self.weights))
+
+    def prefix(self, count: int) -> float:
+        """Sum of the first *count* weights."""
+        s = 0.0
+        while count > 0:
+            s += self.tree[count]
+            count -= count & -count
+        return s
+
+    def set(self, index: int, weight: float) -> None:
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def find(self, x: float) -> int:
+        """Smallest index whose cumulative weight exceeds *x*."""
+        pos = 0
+        step = 1 << len(self.weights).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self.tree) and self.tree[nxt] <= x:
+                pos = nxt
+                x -= self.tree[nxt]
+            step >>= 1
+        pos = min(pos, len(self.weights) - 1)
+        # Rounding can land on a zero-weight slot at a boundary; step back
+        while pos > 0 and self.weights[pos] <= 0:
+            pos -= 1
+        return pos
+
+
+class ClusterSampler:
+    """Cluster and target-word weights, mirrored from the database.
+
+    Eligible clusters are those with at least four words; archived ones
+    stay indexed with weight 0 so restoring them is a point update.
+    """
+
+    def __init__(
+        self,
+        clusters: list[dict],
+        cluster_words: dict[int, list[dict]],
+        questions: list[dict],
+        archived: set[str],
+        rng: random.Random | None = None,
+    ):
+        self.rng = rng or random
+        self.clusters: list[dict] = []
+        self.words: dict[str, list[dict]] = {}
+        self.index: dict[str, int] = {}
+        for c in clusters:
+            cw = cluster_words.get(c["id"], [])
+            if len(cw) < MIN_CLUSTER_WORDS:
+                continue
+            self.index[c["title"]] = len(self.clusters)
+            self.clusters.append(c)
+            self.words[c["title"]] = cw
+        self.archived = set(archived)
+        self.ready: dict[str, int] = {}
+        # word accuracy per cluster: title -> lowercased word -> [total, correct]
+        self.accuracy: dict[str, dict[str, list[int]]] = {}
+        # question id -> (cluster title, target word, ready, was_correct or None)
+        self.questions: dict[str, tuple[str, str, bool, bool | None]] = {}
+        for q in questions:
+            self._add(q["id"], q["cluster_title"] or "", q["target_word"],
+                      q["ready"], q["was_correct"])
+        self.tree = FenwickTree([self._weight(c["title"]) for c in self.clusters])
+
+    @classmethod
+    def from_db(cls, db: Database, rng: random.Random | None = None) -> ClusterSampler:
+        return cls(
+            db.get_all_clusters(),
+            db.get_all_cluster_words(),
+            db.get_question_outcomes(),
+            db.get_archived_cluster_titles(),
+            rng=rng,
+        )
+
+    # ── Weights ───────────────────────────────────────────────────────
+
+    def _weight(self, title: str) -> float:
+        if title in self.archived:
+            return 0.0
+        return 1.0 / (1 + self.ready.get(title, 0))
+
+    def _refresh(self, title: str) -> None:
+        i = self.index.get(title)
+        if i is not None:
+            self.tree.set(i, self._weight(title))
+
+    def weight(self, title: str) -> float:
+        """Current sampling weight of *title* (0 if archived or ineligible)."""
+        return self.tree.weights[self.index[title]] if title in self.index else 0.0
+
+    def _add(self, qid: str, title: str, word: str, ready: bool, was_correct) -> None:
+        self.questions[qid] = (title, word, ready, was_correct)
+        if ready and was_correct is None:
+            self.ready[title] = self.ready.get(title, 0) + 1
+        if was_correct is not None:
+            stats = self.accuracy.setdefault(title, {}).setdefault(word.lower(), [0, 0])
+            stats[0] += 1
+            stats[1] += 1 if was_correct else 0
+
+    def _remove(self, qid: str) -> None:
+        title, word, ready, was_correct = self.questions.pop(qid)
+        if ready and was_correct is None:
+            self.ready[title] -= 1
+            if not self.ready[title]:
+                del self.ready[title]
+        if was_correct is not None:
+            stats = self.accuracy[title][word.lower()]
+            stats[0] -= 1
+            stats[1] -= 1 if was_correct else 0
+
+    # ── Updates (called by Database) ──────────────────────────────────
+
+    def question_saved(self, qid: str, title: str, word: str, ready: bool) -> None:
+        """A question was inserted or replaced (unanswered)."""
+        if qid in self.questions:
+            old_title = self.questions[qid][0]
+            self._remove(qid)
+            self._refresh(old_title)
+        self._add(qid, title, word, ready, None)
+        self._refresh(title)
+
+    def question_answered(self, qid: str, was_correct: bool) -> bool:
+        """Record an answer; False if *qid* is unknown (the caller rebuilds)."""
+        if qid not in self.questions:
+            return False
+        title, word, ready, _ = self.questions[qid]
+        self._remove(qid)
+        self._add(qid, title, word, ready, was_correct)
+        self._refresh(title)
+        return True
+
+    def set_archived(self, title: str, archived: bool) -> None:
+        if archived:
+            self.archived.add(title)
+        else:
+            self.archived.discard(title)
+        self._refresh(title)
+
+    # ── Sampling ──────────────────────────────────────────────────────
+
+    def pick_cluster(self) -> dict | None:
+        """A cluster row, weighted by coverage deficit; None if none eligible."""
+        total = self.tree.total()
+        if not self.clusters or total <= 0:
+            return None
+        return self.clusters[self.tree.find(self.rng.random() * total)]
+
+    def target_weights(self, title: str, cluster_words: list[dict]) -> list[float]:
+        """Error-rate weights for *cluster_words*: 2.0 never tested, else 1 + error rate."""
+        acc = self.accuracy.get(title, {})
+        weights = []
+        for cw in cluster_words:
+            total, correct = acc.get(cw["word"].lower(), (0, 0))
+            weights.append(2.0 - correct / total if total else 2.0)
+        return weights
+
+    def pick_target(self, title: str, cluster_words: list[dict] | None = None) -> dict:
+        cluster_words = cluster_words if cluster_words is not None else self.words[title]
+        weights = self.target_weights(title, cluster_words)
+        chosen = self.rng.choices(cluster_words, weights=weights, k=1)[0]
+        return {
+            "word": chosen["word"],
+            "meaning": chosen["meaning"],
+            "distinction": chosen["distinction"],
+        }
+
+    def pick(self) -> tuple[dict, dict] | None:
+        """(cluster row, target word info), or None when nothing is eligible."""
+        cluster = self.pick_cluster()
+        if cluster is None:
+            return None
+        return cluster, self.pick_target(cluster["title"])
+
+    def stats(self) -> dict:
+        return {
+            "clusters": len(self.clusters),
+            "archived": sum(1 for t in self.archived if t in self.index),
+            "ready_questions": sum(self.ready.values()),
+            "total_weight": round(self.tree.total(), 3),
+        }
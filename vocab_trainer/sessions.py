@@ -0,0 +1,149 @@
+"""Active quiz sessions, kept where every server process can see them.
+
+A session's state (its question list, position, score, the question on
+screen) used to live in a dict in the server process, which tied the app
+to a single process.  :class:`MemorySessionStore` keeps that behaviour for
+one process; :class:`SQLiteSessionStore` keeps the state in the
+``active_sessions`` table, so ``serve --workers N`` can send each request
+of a session to a different process.
+
+Both stores hand out a private copy of the state with a version number,
+and :meth:`save` only succeeds if nobody saved the session since it was
+loaded (optimistic concurrency): otherwise it raises
+:class:`SessionConflict` and the caller reloads and applies its change
+again.  The same check turns a second submission of the same answer,
+from a retried request or a second device, into a clean refusal.
+"""
+from __future__ import annotations
+
+import copy
+import json
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vocab_trainer.db import Database
+
+STORES = ("memory", "sqlite")
+
+# Fields held as sets in memory and as lists in the stored JSON.
+_SET_FIELDS = ("seen_ids", "seen_clusters")
+
+
+class SessionConflict(Exception):
+    """The session was saved by another request since it was loaded."""
+
+
+def encode(state: dict) -> str:
+    out = dict(state)
+    for f in _SET_FIELDS:
+        if f in out:
+            out[f] = sorted(out[f])
+    return json.dumps(out)
+
+
+def decode(blob: str) -> dict:
+    state = json.loads(blob)
+    for f in _SET_FIELDS:
+        if f in state:
+            state[f] = set(state[f])
+    return state
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class MemorySessionStore:
+    """Sessions in this process only (a single-process server).
+
+    States are kept as dicts and deep-copied on the way in and out; only
+    :class:`SQLiteSessionStore` encodes them.
+    """
+
+    def __init__(self):
+        # session id -> (state, version, saved at); oldest save first
+        self._items: dict[int, tuple[dict, int, str]] = {}
+
+    def load(self, session_id: int) -> tuple[dict, int] | None:
+        item = self._items.get(session_id)
+        return (copy.deepcopy(item[0]), item[1]) if item else None
+
+    def save(self, session_id: int, state: dict, version: int) -> int:
+        """Store *state* if the session is still at *version*; returns the
+        new version."""
+        item = self._items.get(session_id)
+        if item is None or item[1] != version:
+            raise SessionConflict(session_id)
+        del self._items[session_id]
+        self._items[session_id] = (copy.deepcopy(state), version + 1, _now())
+        return version + 1
+
+    def __setitem__(self, session_id: int, state: dict) -> None:
+        """Create or replace a session regardless of its version."""
+        old = self._items.pop(session_id, None)
+        self._items[session_id] = (copy.deepcopy(state), old[1] + 1 if old else 1, _now())
+
+    def __contains__(self, session_id: int) -> bool:
+        return session_id in self._items
+
+    def delete(self, session_id: int) -> bool:
+        return self._items.pop(session_id, None) is not None
+
+    def latest(self) -> int | None:
+        """The most recently saved session."""
+        return next(reversed(self._items), None)
+
+    def prune(self, before: str) -> int:
+        """Drop sessions last saved before *before* (ISO time)."""
+        stale = [sid for sid, (_, _, at) in self._items.items() if at < before]
+        for sid in stale:
+            del self._items[sid]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+class SQLiteSessionStore:
+    """Sessions in the ``active_sessions`` table, shared by every process
+    using the database."""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def load(self, session_id: int) -> tuple[dict, int] | None:
+        row = self.db.get_session_state(session_id)
+        return (decode(row[0]), row[1]) if row else None
+
+    def save(self, session_id: int, state: dict, version: int) -> int:
+        if not self.db.update_session_state(session_id, encode(state), version):
+            raise SessionConflict(session_id)
+        return version + 1
+
+    def __setitem__(self, session_id: int, state: dict) -> None:
+        self.db.put_session_state(session_id, encode(state))
+
+    def __contains__(self, session_id: int) -> bool:
+        return self.db.get_session_state(session_id) is not None
+
+    def delete(self, session_id: int) -> bool:
+        return self.db.delete_session_state(session_id)
+
+    def latest(self) -> int | None:
+        return self.db.get_latest_session_id()
+
+    def prune(self, before: str) -> int:
+        return self.db.prune_session_states(before)
+
+    def clear(self) -> None:
+        self.db.prune_session_states()
+
+
+def make_session_store(kind: str, db: Database):
+    """The store for a ``session_store`` setting."""
+    if kind == "sqlite":
+        return SQLiteSessionStore(db)
+    if kind == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown session store: {kind!r} (expected one of {', '.join(STORES)})")
@@ -89,7 +89,8 @@ const API = '';
 let currentSessionId = null;
 let questionStartTime = null;
 let currentQuestionContext = null;
-let chatHistory = [];
+let chatHistory = [];  // server keeps the conversation; this re-seeds it if lost
+let chatConversationId = null;
 let chatStreaming = false;
 let activeAudioElements = [];  // all playing/playable audio to stop on navigation
 let pendingAudioTimeout = null;
@@ -599,6 +600,7 @@ function showQuestion(data) {
 
     // Reset chat and archive state
     chatHistory = [];
+    chatConversationId = null;
     currentQuestionContext = null;
     document.getElementById('chat-messages').innerHTML = '';
     document.getElementById('chat-input').value = '';
@@ -1381,6 +1383,7 @@ async function sendChatMessage(message) {
             body: JSON.stringify({
                 message,
                 context: currentQuestionContext,
+                conversation_id: chatConversationId,
                 history: chatHistory,
                 thinking: thinkingEnabled,
             }),
@@ -1399,6 +1402,9 @@ async function sendChatMessage(message) {
                 if (!line.startsWith('data: ')) continue;
                 try {
                     const data = JSON.parse(line.slice(6));
+                    if (data.conversation_id) {
+                        chatConversationId = data.conversation_id;
+                    }
                     if (data.thinking === true) {
                         thinkingIndicator = document.createElement('span');
                         thinkingIndicator.className = 'chat-thinking';
@@ -0,0 +1,209 @@
+"""Generation worker: writes questions for jobs queued in ``generation_jobs``.
+
+With ``external_workers`` on, the web server no longer generates questions
+on its event loop.  It queues one job per question it needs (a refill for a
+cluster a session just used, a new cluster, a cluster coming due) and
+watches the table for finished jobs; ``vocab-trainer worker`` processes
+claim jobs, most urgent first, and write the questions into the shared
+database.  Any number of workers can run next to the server: a claim is a
+compare-and-set on the job's row, so no two take the same job.
+
+Jobs outlive the processes.  Queued jobs wait across server and worker
+restarts; a worker heartbeats the job it is on, and a running job whose
+heartbeat is older than ``STALE_SECONDS`` (its worker crashed or was
+killed) is put back in the queue by the next worker that looks.  A job
+that stops because the worker is shutting down is released at once; one
+that stops because the backend is down is released with a growing delay
+before it may be claimed again, and fails after ``MAX_ATTEMPTS`` claims.
+Its finished stages are checkpointed in ``pending_questions`` as usual.
+
+Each worker keeps its own LLM provider, retry policy, grammar gate and
+palette sizer, records token usage in the shared ledger, and follows
+``config.json`` as it changes.  The cluster sampler and the stem index
+behind near-duplicate checks are rebuilt from the database for every job
+claimed, so they see what other processes saved up to then; drafts
+written concurrently by another worker still aren't checked against each
+other.  The embedding index is loaded once per worker: restart workers
+after a vocabulary import to pick up new embeddings.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+from vocab_trainer.accounting import UsageLedger, budget_used, throttle_delay
+from vocab_trainer.config import Settings, load_settings
+from vocab_trainer.db import Database
+from vocab_trainer.palette import PaletteSizer
+from vocab_trainer.prefilter import GrammarGate
+from vocab_trainer.providers.base import add_usage_listener, remove_usage_listener
+from vocab_trainer.providers.policy import BackendUnavailable, LLMPolicy, PolicyLLM
+from vocab_trainer.providers.registry import ProviderRegistry
+from vocab_trainer.providers.scheduler import Priority
+from vocab_trainer.question_generator import _pick_target_in_cluster, generate_question
+
+log = logging.getLogger("vocab_trainer.worker")
+
+HEARTBEAT_SECONDS = 10.0
+STALE_SECONDS = 60.0  # a running job silent this long is requeued
+POLL_SECONDS = 1.0    # idle wait between queue checks
+KEEP_FINISHED_HOURS = 24.0
+MAX_ATTEMPTS = 5             # claims before a job the backend keeps refusing fails
+RELEASE_BACKOFF = 5.0        # delay before the first retry of a released job
+RELEASE_BACKOFF_MAX = 300.0
+
+
+def _ago(seconds: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat()
+
+
+def _release_delay(job: dict, error: BackendUnavailable) -> float:
+    """Seconds a job released by *error* waits: doubling per attempt, and at
+    least until the breaker lets a probe through."""
+    backoff = min(RELEASE_BACKOFF_MAX, RELEASE_BACKOFF * 2 ** (job["attempts"] - 1))
+    return max(backoff, error.retry_in)
+
+
+class GenerationWorker:
+    """Claims and runs generation jobs until stopped.
+
+    *settings* pins the settings (tests, benchmarks); by default they are
+    re-read from ``config.json`` before every job.
+    """
+
+    def __init__(self, db: Database, settings: Settings | None = None,
+                 name: str | None = None, llm=None):
+        self.db = db
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self._settings = settings
+        self._llm = llm
+        self.providers = ProviderRegistry()
+        self.policy = LLMPolicy()
+        self.gate = GrammarGate()
+        self.palette = PaletteSizer()
+        self.processed = {"done": 0, "failed": 0, "released": 0}
+
+    def settings(self) -> Settings:
+        s = self._settings if self._settings is not None else load_settings()
+        self.policy.configure(**s.policy_options())
+        self.gate.configure(skip_at=float(s.grammar_skip_pass_rate))
+        self.palette.configure(max_words=int(s.palette_words),
+                               max_prefill_ms=float(s.palette_max_prefill_ms),
+                               adaptive=bool(s.adaptive_palette))
+        return s
+
+    def llm(self, s: Settings) -> PolicyLLM:
+        return PolicyLLM(self._llm or self.providers.llm(s), self.policy)
+
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            self.db.heartbeat_generation_job(job_id)
+
+    async def _wait_for_backend(self) -> None:
+        while (breaker := self.policy.blocking_breaker()) is not None:
+            delay = breaker.retry_in() or 1.0
+            log.info("Backend unavailable — waiting %.0fs", delay)
+            await asyncio.sleep(delay)
+
+    def _finish(self, job: dict, question_id: str | None = None,
+                error: str | None = None) -> None:
+        self.db.finish_generation_job(job["id"], question_id, error)
+        self.processed["done" if question_id else "failed"] += 1
+        if error:
+            log.warning("Job %d for '%s' failed: %s", job["id"], job["cluster_title"], error)
+
+    async def run_one(self) -> bool:
+        """Claim and run one job.  False when the queue is empty."""
+        requeued = self.db.requeue_stale_generation_jobs(_ago(STALE_SECONDS))
+        if requeued:
+            log.info("Requeued %d jobs from stopped workers", requeued)
+        job = self.db.claim_generation_job(self.name)
+        if job is None:
+            return False
+        self.db.forget_cached_indexes()  # see questions others saved since the last job
+
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            await self._run(job)
+        except asyncio.CancelledError:
+            self.db.release_generation_job(job["id"])
+            self.processed["released"] += 1
+            raise
+        except BackendUnavailable as e:
+            if job["attempts"] >= MAX_ATTEMPTS:
+                self._finish(job, error=f"backend unavailable after {job['attempts']} attempts")
+            else:
+                self.db.release_generation_job(job["id"], delay=_release_delay(job, e))
+                self.processed["released"] += 1
+            raise
+        except Exception as e:
+            self._finish(job, error=str(e) or type(e).__name__)
+        finally:
+            heartbeat.cancel()
+        return True
+
+    async def _run(self, job: dict) -> None:
+        s = self.settings()
+        db = self.db
+        title = job["cluster_title"]
+        delay = throttle_delay(job["priority"] <= Priority.REFILL, budget_used(db, s))
+        if delay is None:
+            self._finish(job, error="daily LLM budget reserved for refills")
+            return
+        if delay > 0:
+            log.info("Daily LLM budget running low — waiting %.0fs", delay)
+            await asyncio.sleep(delay)
+
+        cluster = db.get_cluster_by_title(title)
+        cw = db.get_cluster_words(cluster["id"]) if cluster else []
+        if len(cw) < 4:
+            self._finish(job, error="cluster not found or fewer than 4 words")
+            return
+        word_info = _pick_target_in_cluster(db, title, cw)
+        log.info("Job %d: generating for '%s' (target: %s)", job["id"], title, word_info["word"])
+        await self._wait_for_backend()
+        q = await generate_question(self.llm(s), db, cluster=cluster, target_word_info=word_info,
+                                    gate=self.gate, palette=self.palette)
+        if q is None:
+            self._finish(job, error="no valid question after retries")
+            return
+        db.save_question(q)
+        self._finish(job, question_id=q.id)
+
+    async def run(self, drain: bool = False, stop: asyncio.Event | None = None) -> dict:
+        """Process jobs until *stop* is set (or, with *drain*, the queue is
+        empty).  Returns counts of jobs done, failed and released."""
+        ledger = UsageLedger(self.db)
+        add_usage_listener(ledger.record)
+        add_usage_listener(self.palette.record_usage)
+        log.info("Worker %s started", self.name)
+        try:
+            while stop is None or not stop.is_set():
+                try:
+                    worked = await self.run_one()
+                except BackendUnavailable:
+                    await self._wait_for_backend()
+                    continue
+                if worked:
+                    continue
+                if drain:
+                    break
+                self.db.prune_generation_jobs(_ago(3600 * KEEP_FINISHED_HOURS))
+                if stop is None:
+                    await asyncio.sleep(POLL_SECONDS)
+                else:
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            remove_usage_listener(ledger.record)
+            remove_usage_listener(self.palette.record_usage)
+            ledger.flush()
+            await self.providers.aclose()
+            log.info("Worker %s stopped: %s", self.name, self.processed)
+        return dict(self.processed)